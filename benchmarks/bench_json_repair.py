@@ -0,0 +1,100 @@
+"""Benchmark: LLM re-rolls avoided by the repairing JSON parser.
+
+Replays the reply corpus in ``tests/data/llm_json_corpus.json`` through the
+old strict checks (``json.loads`` for tasks, fence stripping plus
+``json.loads`` for evaluations) and through :mod:`json_repair` followed by
+:func:`llm_schemas.validate` (as ``main._parse_llm_json`` does), and prints
+how many replies each would have sent back to the LLM and the parse cost.
+
+    python benchmarks/bench_json_repair.py [--rounds 2000]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import llm_schemas  # noqa: E402
+from json_repair import parse_task, repair_json  # noqa: E402
+
+CORPUS = os.path.join(ROOT, "tests", "data", "llm_json_corpus.json")
+
+
+def strict_task(text: str) -> None:
+    """Old /generate_task check: the reply itself must be JSON."""
+    json.loads(text.strip())
+
+
+def strict_evaluation(text: str) -> None:
+    """Old /evaluate_code check: the first {...} block, markdown fences stripped."""
+    if not text or not text.strip():
+        raise ValueError("empty")
+    fenced = re.search(r"```(?:json)?\s*([\s\S]*?)\s*```", text, re.I)
+    body = (fenced.group(1) if fenced else text).strip()
+    start, end = body.find("{"), body.rfind("}") + 1
+    if start == -1 or end <= start:
+        raise ValueError("no object")
+    json.loads(body[start:end])
+
+
+def tolerant_task(text: str) -> None:
+    llm_schemas.validate(llm_schemas.Task, parse_task(text)[0])
+
+
+def tolerant_evaluation(text: str) -> None:
+    llm_schemas.validate(llm_schemas.Evaluation, repair_json(text)[0])
+
+
+def count_failures(samples, checks) -> int:
+    failures = 0
+    for sample in samples:
+        try:
+            checks[sample["kind"]](sample["text"])
+        except ValueError:
+            failures += 1
+    return failures
+
+
+def per_parse_us(samples, checks, rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for sample in samples:
+            try:
+                checks[sample["kind"]](sample["text"])
+            except ValueError:
+                pass
+    return (time.perf_counter() - started) / (rounds * len(samples)) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(CORPUS, encoding="utf-8") as f:
+        samples = json.load(f)
+
+    strict = {"task": strict_task, "evaluation": strict_evaluation}
+    tolerant = {"task": tolerant_task, "evaluation": tolerant_evaluation}
+
+    strict_rerolls = count_failures(samples, strict)
+    tolerant_rerolls = count_failures(samples, tolerant)
+    print(f"corpus replies:          {len(samples)}")
+    print(f"LLM re-rolls (strict):   {strict_rerolls}")
+    print(f"LLM re-rolls (repair):   {tolerant_rerolls}")
+    print(f"re-rolls avoided:        {strict_rerolls - tolerant_rerolls}")
+    print(f"strict parse:            {per_parse_us(samples, strict, args.rounds):8.1f} us/reply")
+    print(f"repairing parse:         {per_parse_us(samples, tolerant, args.rounds):8.1f} us/reply")
+
+    unrepairable = [s["label"] for s in samples if s["expected"] == "unrepairable"]
+    print(f"still re-rolled:         {', '.join(unrepairable)}")
+
+
+if __name__ == "__main__":
+    main()
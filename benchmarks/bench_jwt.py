@@ -0,0 +1,51 @@
+"""Micro-benchmark: ``get_current_user`` with and without the verified-token cache.
+
+    python benchmarks/bench_jwt.py [--iterations 20000] [--tokens 100]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.security import HTTPAuthorizationCredentials  # noqa: E402
+
+import jwt_utils  # noqa: E402
+
+
+def run(label: str, credentials, iterations: int) -> float:
+    started = time.perf_counter()
+    for i in range(iterations):
+        jwt_utils.get_current_user(credentials[i % len(credentials)])
+    ops = iterations / (time.perf_counter() - started)
+    print(f"{label:<22} {ops:>10.0f} ops/s")
+    return ops
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--tokens", type=int, default=100, help="distinct users sending requests")
+    args = parser.parse_args()
+
+    credentials = [
+        HTTPAuthorizationCredentials(
+            scheme="Bearer",
+            credentials=jwt_utils.create_user_token(i, f"user{i}", f"user{i}@innopolis.university"),
+        )
+        for i in range(args.tokens)
+    ]
+
+    jwt_utils.TOKEN_CACHE_ENABLED = False
+    before = run("full jose decode", credentials, args.iterations)
+    jwt_utils.TOKEN_CACHE_ENABLED = True
+    jwt_utils.token_cache.clear()
+    after = run("verified-token cache", credentials, args.iterations)
+    print(f"speedup: {after / before:.1f}x  cache: {jwt_utils.token_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
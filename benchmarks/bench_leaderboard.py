@@ -0,0 +1,91 @@
+"""Micro-benchmark: leaderboard queries from memory vs. SQL over 100k users.
+
+Fills a throw-away database, times the startup rebuild (index-only scan),
+then compares top-10, own rank and neighbours with the equivalent SQL
+queries, and measures incremental score updates.
+
+    python benchmarks/bench_leaderboard.py [--users 100000] [--iterations 2000]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+from leaderboard import Leaderboard  # noqa: E402
+from storage import close_storage  # noqa: E402
+
+TOP_SQL = "SELECT user_id, login, score FROM users ORDER BY score DESC, user_id LIMIT 10"
+RANK_SQL = "SELECT COUNT(*) + 1 FROM users WHERE score > (SELECT score FROM users WHERE user_id = ?)"
+AROUND_SQL = """
+    SELECT user_id, login, score FROM users
+    WHERE score BETWEEN (SELECT score FROM users WHERE user_id = ?) - 1 AND (SELECT score FROM users WHERE user_id = ?) + 1
+    ORDER BY score DESC, user_id LIMIT 5
+"""
+
+
+def timed(label: str, fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for i in range(iterations):
+        fn(i)
+    per_op = (time.perf_counter() - started) / iterations * 1e6
+    print(f"{label:<28} {per_op:>10.1f} us/op")
+    return per_op
+
+
+def fill(users: int) -> None:
+    rng = random.Random(7)
+    rows = [
+        (f"user{i}@example.com", f"user{i}", "x", "2026-01-01", int(rng.paretovariate(1.5)) - 1)
+        for i in range(users)
+    ]
+    database._db().write(lambda conn: conn.executemany(
+        "INSERT INTO users (email, login, password_hash, registration_date, score) VALUES (?, ?, ?, ?, ?)", rows,
+    ))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "bench.db")
+        database.init_db()
+        fill(args.users)
+
+        board = Leaderboard()
+        started = time.perf_counter()
+        board.rebuild()
+        print(f"rebuild: {len(board)} ranked of {args.users} users in {(time.perf_counter() - started) * 1e3:.0f} ms")
+
+        rng = random.Random(1)
+        ids = [rng.randint(1, args.users) for _ in range(args.iterations)]
+        n = args.iterations
+        with database._db().read() as conn:
+            sql = [
+                timed("SQL top-10", lambda i: conn.execute(TOP_SQL).fetchall(), max(1, n // 20)),
+                timed("SQL own rank", lambda i: conn.execute(RANK_SQL, (ids[i],)).fetchone(), max(1, n // 20)),
+                timed("SQL neighbours", lambda i: conn.execute(AROUND_SQL, (ids[i], ids[i])).fetchall(),
+                      max(1, n // 20)),
+            ]
+        memory = [
+            timed("memory top-10", lambda i: board.top(10), n),
+            timed("memory own rank", lambda i: board.rank(ids[i]), n),
+            timed("memory neighbours", lambda i: board.around(ids[i], 2), n),
+        ]
+        for label, before, after in zip(("top-10", "rank", "neighbours"), sql, memory):
+            print(f"speedup {label:<12} {before / after:>8.0f}x")
+        timed("incremental update", lambda i: board.set_score(ids[i], f"user{ids[i]}", i % 50 + 1), n)
+        close_storage(database.DB_PATH)
+
+
+if __name__ == "__main__":
+    main()
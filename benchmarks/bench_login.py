@@ -0,0 +1,66 @@
+"""Micro-benchmark: concurrent /login throughput, inline bcrypt vs. process pool.
+
+Fires ``--concurrency`` simultaneous password checks at an event loop, once
+with ``bcrypt.checkpw`` called inline (the old handler) and once through
+``executors.cpu_executor``, and prints logins/sec plus the pool's wait stats.
+
+    python benchmarks/bench_login.py [--requests 32] [--concurrency 16]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bcrypt  # noqa: E402
+
+import executors  # noqa: E402
+from executors import check_password, cpu_executor  # noqa: E402
+
+PASSWORD = "correct horse"
+
+
+async def inline_login(password_hash: str) -> bool:
+    return bcrypt.checkpw(PASSWORD.encode(), password_hash.encode())
+
+
+async def pooled_login(password_hash: str) -> bool:
+    return await cpu_executor.run(check_password, PASSWORD, password_hash)
+
+
+async def drive(login, password_hash: str, requests: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            assert await login(password_hash)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return requests / (time.perf_counter() - started)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    password_hash = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt()).decode()
+    await asyncio.to_thread(cpu_executor.warm)
+
+    before = await drive(inline_login, password_hash, args.requests, args.concurrency)
+    after = await drive(pooled_login, password_hash, args.requests, args.concurrency)
+    print(f"cores: {executors.CPU_WORKERS}")
+    print(f"inline bcrypt      {before:8.1f} logins/s")
+    print(f"process pool       {after:8.1f} logins/s  ({after / before:.1f}x)")
+    print(f"cpu pool stats     {cpu_executor.stats()}")
+    executors.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
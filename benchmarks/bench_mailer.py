@@ -0,0 +1,98 @@
+"""Throughput benchmark: one SMTP connection per email vs. the mailer queue.
+
+Runs against a local aiosmtpd server (``pip install aiosmtpd``). Handshake
+cost is simulated with ``--handshake-ms`` of server-side delay per new
+connection, standing in for the TCP + STARTTLS + AUTH round trips to a real
+provider.
+
+    python benchmarks/bench_mailer.py [--messages 500] [--handshake-ms 50]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import smtplib
+import socket
+import sys
+import time
+from email.mime.text import MIMEText
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mailer import Mailer  # noqa: E402
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    sys.exit("aiosmtpd is required: pip install aiosmtpd")
+
+
+class Handler:
+    def __init__(self, handshake: float) -> None:
+        self.handshake = handshake
+        self.received = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        await asyncio.sleep(self.handshake)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 OK"
+
+
+def message(i: int) -> MIMEText:
+    msg = MIMEText(f"Hi user{i}! This is your notification from Study Buddy.")
+    msg["Subject"] = "Study Buddy Notification"
+    msg["From"] = "bot@test"
+    msg["To"] = f"user{i}@innopolis.university"
+    return msg
+
+
+def per_message(port: int, count: int) -> float:
+    started = time.perf_counter()
+    for i in range(count):
+        with smtplib.SMTP("127.0.0.1", port) as server:
+            server.sendmail("bot@test", [f"user{i}@innopolis.university"], message(i).as_string())
+    return count / (time.perf_counter() - started)
+
+
+def queued(port: int, count: int, workers: int) -> float:
+    mailer = Mailer(host="127.0.0.1", port=port, username="", password="", from_email="bot@test",
+                    starttls=False, workers=workers, max_per_minute=0)
+    started = time.perf_counter()
+    for i in range(count):
+        mailer.send(f"user{i}@innopolis.university", message(i))
+    mailer.flush()
+    rate = count / (time.perf_counter() - started)
+    mailer.stop()
+    print(f"  mailer stats: {mailer.stats()}")
+    return rate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--handshake-ms", type=float, default=50)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    handler = Handler(args.handshake_ms / 1000)
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    try:
+        before = per_message(port, args.messages)
+        print(f"connection per email  {before:8.1f} emails/s")
+        after = queued(port, args.messages, args.workers)
+        print(f"mailer queue          {after:8.1f} emails/s  ({after / before:.1f}x)")
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
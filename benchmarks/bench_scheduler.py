@@ -0,0 +1,99 @@
+"""Micro-benchmark: one notification scheduler tick, full scan vs. due-time index.
+
+Seeds ``--users`` subscribers spread over all minutes of the day and times
+the old per-minute scan (every enabled row, days parsed in Python, one
+``last_notification_date`` query per candidate) against the indexed
+``next_fire_at`` range query.
+
+    python benchmarks/bench_scheduler.py [--users 50000]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+from storage import close_storage, get_storage  # noqa: E402
+
+
+def legacy_tick(now: datetime):
+    """The scan formerly done by get_users_with_notifications_enabled()."""
+    current_time = now.strftime("%H:%M")
+    current_day = str(now.weekday() + 1)
+    with get_storage(database.DB_PATH).read() as conn:
+        rows = conn.execute("""
+            SELECT u.user_id, u.email, u.login, ns.notification_time, ns.notification_days
+            FROM users u
+            JOIN notification_settings ns ON u.user_id = ns.user_id
+            WHERE ns.enabled = 1
+        """).fetchall()
+    users = []
+    for user_id, email, login, notification_time, notification_days in rows:
+        days = notification_days.split(",") if notification_days else []
+        if (current_time == notification_time and current_day in days and
+                (now - timedelta(days=1)).strftime("%Y-%m-%d") > database.get_last_notification_date(user_id)):
+            users.append((user_id, email, login))
+    return users
+
+
+def seed(users: int) -> None:
+    rnd = random.Random(0)
+    database.init_db()
+    now = datetime.now()
+
+    def insert(conn):
+        conn.executemany(
+            "INSERT INTO users (user_id, email, login, password_hash, registration_date) VALUES (?, ?, ?, 'x', 'now')",
+            [(i, f"u{i}@innopolis.university", f"u{i}") for i in range(1, users + 1)],
+        )
+        rows = []
+        for i in range(1, users + 1):
+            time_str = f"{rnd.randrange(24):02d}:{rnd.randrange(60):02d}"
+            days = sorted(rnd.sample(range(1, 8), rnd.randrange(1, 8)))
+            rows.append((i, time_str, ",".join(map(str, days)),
+                         database._schedule(time_str, days, None, now)))  # pylint: disable=protected-access
+        conn.executemany(
+            "INSERT INTO notification_settings (user_id, notification_time, notification_days, next_fire_at)"
+            " VALUES (?, ?, ?, ?)", rows,
+        )
+
+    get_storage(database.DB_PATH).write(insert)
+
+
+def timed(fn, now):
+    started = time.perf_counter()
+    due = fn(now)
+    return (time.perf_counter() - started) * 1000, len(due)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "bench.db")
+        seed(args.users)
+        # Tick at a minute somebody is scheduled for
+        with get_storage(database.DB_PATH).read() as conn:
+            first = conn.execute("SELECT MIN(next_fire_at) FROM notification_settings").fetchone()[0]
+        now = datetime.strptime(first, "%Y-%m-%d %H:%M")
+
+        legacy_ms, legacy_due = timed(legacy_tick, now)
+        indexed_ms, indexed_due = timed(database.get_users_with_notifications_enabled, now)
+        close_storage()
+
+    print(f"subscribers: {args.users}")
+    print(f"full scan     {legacy_ms:9.1f} ms/tick  ({legacy_due} due)")
+    print(f"indexed       {indexed_ms:9.1f} ms/tick  ({indexed_due} due)")
+
+
+if __name__ == "__main__":
+    main()
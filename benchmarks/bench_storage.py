@@ -0,0 +1,157 @@
+"""Micro-benchmark: per-call ``sqlite3.connect`` vs. the pooled storage layer.
+
+Measures ops/sec for the login lookup and the notification settings query,
+with reader threads running while a background thread keeps writing (as the
+notification scheduler does).
+
+    python benchmarks/bench_storage.py [--users 2000] [--seconds 3] [--threads 4]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+from storage import close_storage, get_storage  # noqa: E402
+
+LOGIN_SQL = "SELECT user_id, login, email, password_hash FROM users WHERE LOWER(email) = ? OR LOWER(login) = ?"
+SETTINGS_SQL = (
+    "SELECT enabled, notification_time, notification_days FROM notification_settings WHERE user_id = ?"
+)
+WRITE_SQL = "UPDATE notification_settings SET last_notification_date = ? WHERE user_id = ?"
+
+
+def seed(path: str, users: int) -> None:
+    database.DB_PATH = path
+    database.init_db()
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.executemany(
+            "INSERT INTO users (email, login, password_hash, registration_date) VALUES (?, ?, 'x', datetime('now'))",
+            [(f"user{i}@innopolis.university", f"user{i}") for i in range(users)],
+        )
+        conn.executemany(
+            "INSERT INTO notification_settings (user_id) VALUES (?)", [(i + 1,) for i in range(users)]
+        )
+    conn.close()
+
+
+# -- the two access patterns --------------------------------------------------
+
+def legacy_login(path, ident):
+    with sqlite3.connect(path) as conn:
+        return conn.execute(LOGIN_SQL, (ident, ident)).fetchone()
+
+
+def legacy_settings(path, user_id):
+    with sqlite3.connect(path) as conn:
+        return conn.execute(SETTINGS_SQL, (user_id,)).fetchone()
+
+
+def legacy_write(path, user_id):
+    with sqlite3.connect(path) as conn:
+        conn.execute(WRITE_SQL, ("2024-01-01", user_id))
+
+
+def pooled_login(path, ident):
+    with get_storage(path).read() as conn:
+        return conn.execute(LOGIN_SQL, (ident, ident)).fetchone()
+
+
+def pooled_settings(path, user_id):
+    with get_storage(path).read() as conn:
+        return conn.execute(SETTINGS_SQL, (user_id,)).fetchone()
+
+
+def pooled_write(path, user_id):
+    get_storage(path).write(lambda conn: conn.execute(WRITE_SQL, ("2024-01-01", user_id)))
+
+
+# -- driver -------------------------------------------------------------------
+
+def run(label, path, users, seconds, threads, query, write):
+    stop = threading.Event()
+    counts = [0] * threads
+    errors = [0]
+
+    def reader(slot):
+        rnd = random.Random(slot)
+        while not stop.is_set():
+            try:
+                query(path, rnd.randrange(users))
+                counts[slot] += 1
+            except sqlite3.OperationalError:
+                errors[0] += 1
+
+    def writer():
+        rnd = random.Random(-1)
+        while not stop.is_set():
+            try:
+                write(path, rnd.randrange(users) + 1)
+            except sqlite3.OperationalError:
+                errors[0] += 1
+
+    workers = [threading.Thread(target=reader, args=(i,)) for i in range(threads)]
+    workers.append(threading.Thread(target=writer))
+    for t in workers:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in workers:
+        t.join()
+    ops = sum(counts) / seconds
+    print(f"{label:<28} {ops:>10.0f} ops/s   locked errors: {errors[0]}")
+    return ops
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.db")
+        pooled_path = os.path.join(tmp, "pooled.db")
+        seed(legacy_path, args.users)
+        seed(pooled_path, args.users)
+        # The legacy database stays in rollback-journal mode
+        close_storage(legacy_path)
+        conn = sqlite3.connect(legacy_path)
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.close()
+
+        def login(query):
+            return lambda path, i: query(path, f"user{i}")
+
+        def settings(query):
+            return lambda path, i: query(path, i + 1)
+
+        common = (args.users, args.seconds, args.threads)
+        results = {
+            "login": (
+                run("login    (connect per call)", legacy_path, *common, login(legacy_login), legacy_write),
+                run("login    (pooled, WAL)", pooled_path, *common, login(pooled_login), pooled_write),
+            ),
+            "settings": (
+                run("settings (connect per call)", legacy_path, *common, settings(legacy_settings), legacy_write),
+                run("settings (pooled, WAL)", pooled_path, *common, settings(pooled_settings), pooled_write),
+            ),
+        }
+        close_storage()
+
+    for name, (before, after) in results.items():
+        print(f"{name}: {after / max(before, 1):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Micro-benchmark: syllabus reads from disk vs. the in-memory snapshot.
+
+    python benchmarks/bench_syllabus.py [--iterations 20000] [--topics 50]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from syllabus_store import SyllabusStore  # noqa: E402
+
+
+def run(label: str, fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    ops = iterations / (time.perf_counter() - started)
+    print(f"{label:<28} {ops:>12.0f} reads/s")
+    return ops
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--topics", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "syllabus.json"
+        store = SyllabusStore(lambda: path)
+        store.save([f"Topic number {i}" for i in range(args.topics)])
+
+        def read_file() -> bytes:
+            # What /get_syllabus used to do on every request
+            with path.open("r", encoding="utf-8") as f_in:
+                topics = json.load(f_in).get("topics")
+            return json.dumps({"topics": topics}, ensure_ascii=False).encode("utf-8")
+
+        before = run("open + parse + serialize", read_file, args.iterations)
+        after = run("snapshot", lambda: store.snapshot().body, args.iterations)
+        print(f"speed-up: {after / before:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
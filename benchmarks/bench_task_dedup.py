@@ -0,0 +1,89 @@
+"""Micro-benchmark: near-duplicate lookups with MinHash/LSH vs. a linear scan.
+
+Stores synthetic tasks in a throw-away database, times how long a fresh index
+takes to load their signatures, then measures the signature cost, an LSH
+lookup and a scan that compares the signature with every stored task of the
+same topic and difficulty.
+
+    python benchmarks/bench_task_dedup.py [--tasks 20000] [--topics 20] [--iterations 2000]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+from storage import close_storage  # noqa: E402
+from task_dedup import TaskIndex, minhash, pack, similarity  # noqa: E402
+
+WORDS = ("read print list string number sum count sort reverse word line integer even odd vowel "
+         "matrix row column dictionary key value loop index maximum minimum average file character").split()
+
+
+def synthetic_task(rng: random.Random) -> dict:
+    return {
+        "Task name": " ".join(rng.choices(WORDS, k=3)),
+        "Task description": " ".join(rng.choices(WORDS, k=30)),
+    }
+
+
+def timed(label: str, fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for i in range(iterations):
+        fn(i)
+    per_op = (time.perf_counter() - started) / iterations * 1e6
+    print(f"{label:<28} {per_op:>10.1f} us/op")
+    return per_op
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=20_000)
+    parser.add_argument("--topics", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    tasks = [(f"topic{i % args.topics}", synthetic_task(rng)) for i in range(args.tasks)]
+    signatures = [minhash(task) for _, task in tasks]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "bench.db")
+        database.init_db()
+        rows = [(f"t{i}", topic, "beginner", "{}", "", pack(sig))
+                for i, ((topic, _), sig) in enumerate(zip(tasks, signatures))]
+        database._db().write(lambda conn: conn.executemany(
+            "INSERT INTO tasks (task_id, topic, difficulty, task, prompt, created_at, minhash) "
+            "VALUES (?, ?, ?, ?, ?, '2026-01-01', ?)", rows,
+        ))
+
+        index = TaskIndex()
+        started = time.perf_counter()
+        loaded = index.catch_up()
+        print(f"load: {loaded} signatures in {(time.perf_counter() - started) * 1e3:.0f} ms")
+
+        probes = [tasks[rng.randrange(len(tasks))] for _ in range(args.iterations)]
+        probe_sigs = [minhash(task) for _, task in probes]
+        by_topic: dict = {}
+        for (topic, _), sig in zip(tasks, signatures):
+            by_topic.setdefault(topic, []).append(sig)
+
+        n = args.iterations
+        timed("signature (minhash)", lambda i: minhash(probes[i][1]), n)
+        lsh = timed("LSH lookup", lambda i: index.find(probes[i][0], "beginner", probe_sigs[i]), n)
+        scan = timed("linear scan", lambda i: [s for s in by_topic[probes[i][0]]
+                                               if similarity(probe_sigs[i], s) >= index.threshold],
+                     max(1, n // 20))
+        timed("catch-up (no new rows)", lambda i: index.catch_up(), n)
+        print(f"speedup lookup {scan / lsh:>8.0f}x")
+        close_storage(database.DB_PATH)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Benchmark: API throughput with 1, 2, 4... uvicorn workers.
+
+Starts the fake OpenRouter and the app on a throw-away database for each
+worker count, then saturates it from several client processes (closed
+loop, no think time) and reports requests/s and the speed-up over one
+worker. ``login`` is CPU-bound (bcrypt) and ``get_syllabus`` is cheap, so
+the default mix shows both ends:
+
+    python benchmarks/bench_workers.py [--workers 1 2 4] [--duration 10] [--clients 8]
+
+Scaling is only expected up to the number of cores on the machine.
+"""
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loadtest.loadgen import PASSWORD, TOPICS, spawn  # noqa: E402
+
+LOGIN = "benchworkers"
+
+
+def _client(url: str, endpoint: str, duration: float, counts) -> None:
+    done = 0
+    with httpx.Client(base_url=url, timeout=30.0) as client:
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            if endpoint == "login":
+                response = client.post("/login", json={"identifier": LOGIN, "password": PASSWORD})
+            else:
+                response = client.get("/get_syllabus")
+            done += response.status_code < 400
+    counts.put(done)
+
+
+def measure(url: str, endpoint: str, clients: int, duration: float) -> float:
+    counts = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_client, args=(url, endpoint, duration, counts)) for _ in range(clients)]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    total = sum(counts.get() for _ in processes)
+    for process in processes:
+        process.join()
+    return total / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--endpoints", nargs="+", default=["get_syllabus", "login"], choices=["get_syllabus", "login"])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--app-port", type=int, default=8025)
+    parser.add_argument("--fake-port", type=int, default=8020)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} cores, {args.clients} client processes, {args.duration:g}s per run")
+    baseline = {}
+    for workers in args.workers:
+        with spawn(args.app_port, args.fake_port, ["--latency-ms", "0"], workers=workers) as url:
+            httpx.post(f"{url}/save_syllabus", json={"topics": list(TOPICS)}).raise_for_status()
+            httpx.post(f"{url}/signup", json={
+                "email": f"{LOGIN}@innopolis.university", "login": LOGIN, "password": PASSWORD,
+            }).raise_for_status()
+            for endpoint in args.endpoints:
+                rps = measure(url, endpoint, args.clients, args.duration)
+                baseline.setdefault(endpoint, rps)
+                print(f"workers={workers:<3} {endpoint:<14} {rps:>10.1f} req/s  x{rps / baseline[endpoint]:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""Circuit breaker, jittered backoff and retry budget for the LLM upstream.
+
+When OpenRouter is degraded, naive retries multiply the load on it and make
+every user wait through all attempts. Three shared pieces prevent that:
+
+* :class:`CircuitBreaker` - after ``failure_threshold`` consecutive upstream
+  failures the circuit *opens* and calls fail fast with :class:`CircuitOpen`
+  (the API answers 503) for ``reset_timeout`` seconds, or as long as the
+  upstream's ``Retry-After`` asked. Then it is *half-open*: a few probe
+  calls go through, and the first success closes it again.
+* :func:`backoff` - "full jitter" exponential delays that never undercut
+  ``Retry-After``.
+* :class:`RetryBudget` - retries may add at most ``ratio`` extra load on top
+  of first attempts (plus a small per-second allowance), so a failing
+  upstream sees ~1.2x traffic instead of 5x.
+
+Every API worker has its own breaker and budget. A breaker that opens
+reports it through ``on_open``; main.py stores that in the database and the
+other workers :meth:`~CircuitBreaker.trip` theirs, so the upstream is not
+probed once per worker. The budget's per-second allowance and capacity
+default to their single-process values divided by ``WEB_CONCURRENCY``; the
+ratio needs no scaling as each worker only deposits for its own calls.
+"""
+from __future__ import annotations
+
+import email.utils
+import logging
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+import httpx
+
+from metrics import LLM_BREAKER_TRANSITIONS, LLM_RETRY_BUDGET_EXHAUSTED
+
+logger = logging.getLogger("app.llm")
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT: float = float(os.getenv("LLM_BREAKER_RESET_TIMEOUT", "30"))  # seconds open
+BREAKER_HALF_OPEN_PROBES: int = int(os.getenv("LLM_BREAKER_HALF_OPEN_PROBES", "1"))
+
+RETRY_BASE_DELAY: float = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY: float = float(os.getenv("LLM_RETRY_MAX_DELAY", "8"))  # longer Retry-After: give up
+# Budget defaults are for the whole service and split between the API workers
+WEB_CONCURRENCY: int = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+RETRY_BUDGET_RATIO: float = float(os.getenv("LLM_RETRY_BUDGET_RATIO", "0.2"))
+RETRY_BUDGET_MIN_PER_SECOND: float = float(
+    os.getenv("LLM_RETRY_BUDGET_MIN_PER_SECOND", str(0.5 / WEB_CONCURRENCY))
+)
+RETRY_BUDGET_CAPACITY: float = float(
+    os.getenv("LLM_RETRY_BUDGET_CAPACITY", str(max(1.0, 10.0 / WEB_CONCURRENCY)))
+)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling the upstream while the circuit is open."""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"LLM upstream unavailable, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Upstream overload or outage (not a bad request or a bad key)."""
+
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status >= 500 or status in (408, 429)
+    return isinstance(exc, httpx.TransportError)
+
+
+def retry_after_seconds(exc: BaseException, now: Optional[float] = None) -> Optional[float]:
+    """Parse the ``Retry-After`` header (seconds or HTTP date) of an upstream error."""
+
+    if not isinstance(exc, httpx.HTTPStatusError):
+        return None
+    value = exc.response.headers.get("retry-after", "").strip()
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - (time.time() if now is None else now))
+
+
+def backoff(attempt: int, retry_after: Optional[float] = None, *,
+            base: float = RETRY_BASE_DELAY, cap: float = RETRY_MAX_DELAY,
+            rng: random.Random = random) -> float:
+    """Delay before retry number ``attempt`` (1-based): full jitter, at least ``retry_after``."""
+
+    delay = rng.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+    return max(delay, retry_after or 0.0)
+
+
+# ---------------------------------------------------------------------------
+# Retry budget
+# ---------------------------------------------------------------------------
+
+class RetryBudget:
+    """Token bucket: each first attempt deposits ``ratio`` tokens, each retry spends one."""
+
+    def __init__(self, ratio: float = RETRY_BUDGET_RATIO, min_per_second: float = RETRY_BUDGET_MIN_PER_SECOND,
+                 *, capacity: float = RETRY_BUDGET_CAPACITY) -> None:
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.spent = 0
+        self.denied = 0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    def deposit(self) -> None:
+        """Record a first attempt."""
+
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        """Take a token for one retry; False means the retry must not happen."""
+
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                self.spent += 1
+                return True
+            self.denied += 1
+        LLM_RETRY_BUDGET_EXHAUSTED.inc()
+        return False
+
+    def tokens(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+
+# ---------------------------------------------------------------------------
+# Circuit breaker
+# ---------------------------------------------------------------------------
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker shared by all calls to one upstream.
+
+    ``on_open(until)`` is called (outside the lock) when a failure opens the
+    circuit, with the wall-clock time it stays open.
+    """
+
+    def __init__(
+        self,
+        name: str = "openrouter",
+        *,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = BREAKER_RESET_TIMEOUT,
+        half_open_probes: int = BREAKER_HALF_OPEN_PROBES,
+        on_open: Optional[Callable[[float], None]] = None,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.on_open = on_open
+        self.state = CLOSED
+        self._failures = 0
+        self._open_until = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.rejected = 0
+
+    def _transition(self, state: str) -> None:
+        if state != self.state:
+            logger.warning("Circuit %s: %s -> %s", self.name, self.state, state)
+            LLM_BREAKER_TRANSITIONS.labels(self.name, state).inc()
+            self.state = state
+
+    def before_call(self) -> None:
+        """Admit a call or raise :class:`CircuitOpen`."""
+
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN and now >= self._open_until:
+                self._transition(HALF_OPEN)
+                self._probes = 0
+            if self.state == OPEN or (self.state == HALF_OPEN and self._probes >= self.half_open_probes):
+                self.rejected += 1
+                raise CircuitOpen(max(1.0, self._open_until - now))
+            if self.state == HALF_OPEN:
+                self._probes += 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._transition(CLOSED)
+
+    def record_failure(self, retry_after: Optional[float] = None) -> None:
+        """Count an upstream failure; opens the circuit at the threshold or on a failed probe."""
+
+        opened_for = None
+        with self._lock:
+            self._failures += 1
+            if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+                opened_for = max(self.reset_timeout, retry_after or 0.0)
+                self._open_until = time.monotonic() + opened_for
+                if self.state != OPEN:
+                    self.opened += 1
+                self._transition(OPEN)
+        if opened_for is not None and self.on_open is not None:
+            self.on_open(time.time() + opened_for)
+
+    def trip(self, until: float) -> None:
+        """Open the circuit until the wall-clock time ``until`` (another worker saw it fail)."""
+
+        with self._lock:
+            remaining = until - time.time()
+            if remaining <= 0 or (self.state == OPEN and self._open_until >= time.monotonic() + remaining):
+                return
+            self._open_until = time.monotonic() + remaining
+            if self.state != OPEN:
+                self.opened += 1
+            self._transition(OPEN)
+
+    def release_probe(self) -> None:
+        """Give back a half-open probe slot whose call ended without a verdict."""
+
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record(self, exc: Optional[BaseException]) -> None:
+        """Classify the outcome of an admitted call (``exc`` is None on success)."""
+
+        if exc is None:
+            self.record_success()
+        elif is_retryable(exc):
+            self.record_failure(retry_after_seconds(exc))
+        elif isinstance(exc, httpx.HTTPStatusError):
+            self.record_success()  # the upstream answered; the request itself was wrong
+        else:
+            self.release_probe()  # cancelled, or failed on our side
+
+    def retry_after(self) -> float:
+        with self._lock:
+            return max(0.0, self._open_until - time.monotonic()) if self.state == OPEN else 0.0
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "open": int(self.state == OPEN),
+                "half_open": int(self.state == HALF_OPEN),
+                "consecutive_failures": self._failures,
+                "opened": self.opened,
+                "rejected": self.rejected,
+            }
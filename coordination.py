@@ -0,0 +1,171 @@
+"""Coordination between worker processes sharing one SQLite database.
+
+The API runs as several uvicorn workers (one per core). Two things must
+then be agreed on across processes:
+
+* **Who runs the scheduler.** Every worker starts APScheduler, but only the
+  holder of the ``scheduler`` :class:`LeaderLease` executes jobs. The lease
+  is a row in the ``leases`` table with an expiry; the leader renews it every
+  ``ttl / 3`` seconds and another worker takes over once it lapses (e.g. the
+  leader crashed). Sends are additionally de-duplicated by
+  :func:`database.claim_notification`, so a lease hand-over can't double-send.
+
+* **When an in-process cache is stale.** A worker that changes shared state
+  bumps a named counter in ``cache_generations``
+  (:meth:`GenerationWatcher.bump`); every worker polls the counters once per
+  ``interval`` in a background thread and runs the callbacks registered for
+  names that moved. Reads stay in memory; staleness is bounded by the
+  poll interval.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+import database
+
+logger = logging.getLogger("app.coordination")
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+LEADER_LEASE_TTL: float = float(os.getenv("LEADER_LEASE_TTL", "30"))  # seconds
+INVALIDATION_POLL_INTERVAL: float = float(os.getenv("INVALIDATION_POLL_INTERVAL", "1"))
+
+# Identifies this process in the leases table
+WORKER_ID: str = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+# ---------------------------------------------------------------------------
+# Leader election
+# ---------------------------------------------------------------------------
+
+class LeaderLease:
+    """Time-bounded, renewable ownership of a named role.
+
+    :meth:`renew` must be called more often than ``ttl``; :meth:`is_leader`
+    is a local check that turns False a safety margin before the lease
+    could be taken over by another worker.
+    """
+
+    def __init__(self, name: str, *, ttl: float = LEADER_LEASE_TTL, holder: str = WORKER_ID) -> None:
+        self.name = name
+        self.ttl = ttl
+        self.holder = holder
+        self._valid_until = 0.0
+        self._lock = threading.Lock()
+        self.acquired = 0  # times this process became leader
+
+    def renew(self) -> bool:
+        """Acquire or extend the lease; returns whether this process is leader."""
+
+        now = time.time()
+        try:
+            leader = database.try_acquire_lease(self.name, self.holder, self.ttl, now)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Could not renew the %s lease", self.name)
+            leader = False
+        with self._lock:
+            was_leader = self._valid_until > now
+            # Stop acting a third of the TTL early so clock skew between the
+            # check and the job can't overlap with the next leader.
+            self._valid_until = now + self.ttl * 2 / 3 if leader else 0.0
+        if leader and not was_leader:
+            self.acquired += 1
+            logger.info("%s became %s leader", self.holder, self.name)
+        elif was_leader and not leader:
+            logger.warning("%s lost the %s lease", self.holder, self.name)
+        return leader
+
+    def is_leader(self) -> bool:
+        with self._lock:
+            return self._valid_until > time.time()
+
+    def release(self) -> None:
+        with self._lock:
+            held, self._valid_until = self._valid_until > time.time(), 0.0
+        if held:
+            database.release_lease(self.name, self.holder)
+
+    def stats(self) -> Dict[str, object]:
+        return {"holder": self.holder, "leader": self.is_leader(), "acquired": self.acquired}
+
+
+# ---------------------------------------------------------------------------
+# Cross-worker cache invalidation
+# ---------------------------------------------------------------------------
+
+class GenerationWatcher:
+    """Polls ``cache_generations`` and fires callbacks when a counter moves."""
+
+    def __init__(self, *, interval: float = INVALIDATION_POLL_INTERVAL) -> None:
+        self.interval = interval
+        self._callbacks: Dict[str, List[Callable[[], None]]] = {}
+        self._seen: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.invalidations = 0
+
+    def on_change(self, name: str, callback: Callable[[], None]) -> None:
+        self._callbacks.setdefault(name, []).append(callback)
+
+    def bump(self, name: str) -> None:
+        """Tell the other workers that ``name`` changed (local caches are updated by the caller)."""
+
+        generation = database.bump_generation(name)
+        with self._lock:
+            self._seen[name] = max(self._seen.get(name, 0), generation)
+
+    def poll(self) -> List[str]:
+        """Check the counters once; returns the names whose callbacks ran."""
+
+        generations = database.get_generations()
+        changed = []
+        with self._lock:
+            for name, generation in generations.items():
+                if generation > self._seen.get(name, 0):
+                    self._seen[name] = generation
+                    changed.append(name)
+        for name in changed:
+            for callback in self._callbacks.get(name, []):
+                try:
+                    callback()
+                except Exception:  # pylint: disable=broad-except
+                    logger.exception("Invalidation callback for %s failed", name)
+            self.invalidations += 1
+        return changed
+
+    def start(self) -> None:
+        """Record the current generations and start polling in the background."""
+
+        if self._thread is not None:
+            return
+        with self._lock:
+            self._seen.update(database.get_generations())
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="cache-invalidation", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Polling cache generations failed")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {"invalidations": self.invalidations, "generations": dict(self._seen)}
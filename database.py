@@ -1,12 +1,24 @@
 import sqlite3
 import bcrypt
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
 import os
 
-DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'users.db')
+from storage import get_storage
+
+DB_PATH = os.getenv(
+    "DATABASE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), 'users.db')
+)
+
+# Due notifications older than this (e.g. after downtime) are skipped and rescheduled
+NOTIFICATION_CATCHUP_MINUTES = int(os.getenv("NOTIFICATION_CATCHUP_MINUTES", "60"))
+_FIRE_FORMAT = "%Y-%m-%d %H:%M"
+
+def _db():
+    """Shared pooled storage for the current ``DB_PATH`` (see storage.py)."""
+    return get_storage(DB_PATH)
 
 def init_db():
-    with sqlite3.connect(DB_PATH) as conn:
+    def create_schema(conn):
         cursor = conn.cursor()
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS users (
@@ -21,6 +33,12 @@ def init_db():
         """)
         cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_unique_email ON users(LOWER(email));")
         cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_unique_login ON users(LOWER(login));")
+        # score_seq: "leaderboard" generation of the user's last score change (see leaderboard.py)
+        user_columns = {row[1] for row in cursor.execute("PRAGMA table_info(users)")}
+        if "score_seq" not in user_columns:
+            cursor.execute("ALTER TABLE users ADD COLUMN score_seq INTEGER NOT NULL DEFAULT 0")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_score ON users(score, user_id, login)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_score_seq ON users(score_seq)")
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS syllabus (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -34,10 +52,138 @@ def init_db():
                 notification_time TEXT DEFAULT '09:00',
                 notification_days TEXT DEFAULT '1,2,3,4,5',
                 last_notification_date TEXT,
+                next_fire_at TEXT,
                 FOREIGN KEY (user_id) REFERENCES users(user_id)
             )
         """)
-        conn.commit()
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(notification_settings)")}
+        if "next_fire_at" not in columns:
+            cursor.execute("ALTER TABLE notification_settings ADD COLUMN next_fire_at TEXT")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_notification_next_fire
+            ON notification_settings(next_fire_at) WHERE enabled = 1
+        """)
+        _backfill_next_fire(cursor)
+        # Coordination between worker processes (see coordination.py)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS leases (
+                name TEXT PRIMARY KEY,
+                holder TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS cache_generations (
+                name TEXT PRIMARY KEY,
+                generation INTEGER NOT NULL
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS revoked_tokens (
+                token_hash BLOB PRIMARY KEY,
+                expires_at REAL NOT NULL
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS notification_ledger (
+                user_id INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                sent_at TEXT NOT NULL,
+                PRIMARY KEY (user_id, day)
+            )
+        """)
+        # Generated tasks, referenced by submissions via task_id (see task_registry.py)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                task_id TEXT PRIMARY KEY,
+                topic TEXT NOT NULL,
+                difficulty TEXT NOT NULL,
+                task TEXT NOT NULL,
+                prompt TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                submissions INTEGER NOT NULL DEFAULT 0,
+                solved INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        # minhash: packed MinHash signature for near-duplicate detection (see task_dedup.py)
+        task_columns = {row[1] for row in cursor.execute("PRAGMA table_info(tasks)")}
+        if "minhash" not in task_columns:
+            cursor.execute("ALTER TABLE tasks ADD COLUMN minhash BLOB")
+        # Persistent evaluation verdicts (see eval_cache.py)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS eval_cache (
+                key TEXT PRIMARY KEY,
+                verdict TEXT NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_eval_cache_last_used ON eval_cache(last_used)")
+        # Until when each upstream's circuit is open, shared by the workers (see circuit_breaker.py)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS circuit_breakers (
+                name TEXT PRIMARY KEY,
+                open_until REAL NOT NULL
+            )
+        """)
+        # Pre-generated tasks shared by all workers, and the ad-hoc keys to keep warm (see task_pool.py)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS task_pool (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                topic TEXT NOT NULL,
+                difficulty TEXT NOT NULL,
+                task TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_task_pool_key ON task_pool(topic, difficulty, id)")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS task_pool_demand (
+                topic TEXT NOT NULL,
+                difficulty TEXT NOT NULL,
+                name_topic TEXT NOT NULL,
+                name_difficulty TEXT NOT NULL,
+                last_request REAL NOT NULL,
+                PRIMARY KEY (topic, difficulty)
+            )
+        """)
+        # Graded submissions, appended in batches by submissions.SubmissionWriter
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS submissions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER,
+                task_id TEXT,
+                topic TEXT NOT NULL DEFAULT '',
+                difficulty TEXT NOT NULL DEFAULT '',
+                correct INTEGER NOT NULL,
+                created_at TEXT NOT NULL
+            )
+        """)
+        # Covers the history page (keyset on created_at, id) and the per-user totals
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_submissions_user_created
+            ON submissions(user_id, created_at, id, task_id, topic, difficulty, correct)
+        """)
+        # Covers per-task lookups, e.g. "has this user solved this task before"
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_submissions_task
+            ON submissions(task_id, user_id, correct)
+        """)
+
+    _db().write(create_schema)
+
+def _backfill_next_fire(cursor):
+    """Schedule enabled rows created before next_fire_at existed."""
+    cursor.execute("""
+        SELECT user_id, notification_time, notification_days, last_notification_date
+        FROM notification_settings
+        WHERE enabled = 1 AND next_fire_at IS NULL
+    """)
+    now = datetime.now()
+    updates = [
+        (_schedule(time_str, days, last, now), user_id)
+        for user_id, time_str, days, last in cursor.fetchall()
+    ]
+    cursor.executemany("UPDATE notification_settings SET next_fire_at = ? WHERE user_id = ?", updates)
 
 def register_user(email, login, password):
     if not email.endswith('@innopolis.university'):
@@ -46,31 +192,68 @@ def register_user(email, login, password):
     if len(password) < 6:
         raise ValueError("Password must be at least 6 characters long")
 
-    try:
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.cursor()
+    password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+    def insert_user(conn):
+        cursor = conn.cursor()
 
-            cursor.execute("SELECT 1 FROM users WHERE LOWER(email) = LOWER(?)", (email,))
-            if cursor.fetchone():
-                raise ValueError("Email already registered")
+        cursor.execute("SELECT 1 FROM users WHERE LOWER(email) = LOWER(?)", (email,))
+        if cursor.fetchone():
+            raise ValueError("Email already registered")
 
-            cursor.execute("SELECT 1 FROM users WHERE LOWER(login) = LOWER(?)", (login,))
-            if cursor.fetchone():
-                raise ValueError("Username already taken")
+        cursor.execute("SELECT 1 FROM users WHERE LOWER(login) = LOWER(?)", (login,))
+        if cursor.fetchone():
+            raise ValueError("Username already taken")
 
-            now = datetime.now().isoformat()
-            password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        now = datetime.now().isoformat()
+        cursor.execute("""
+            INSERT INTO users (email, login, password_hash, registration_date)
+            VALUES (?, ?, ?, ?)
+        """, (email.lower(), login.lower(), password_hash, now))
 
-            cursor.execute("""
-                INSERT INTO users (email, login, password_hash, registration_date)
-                VALUES (?, ?, ?, ?)
-            """, (email.lower(), login.lower(), password_hash, now))
-            conn.commit()
+    try:
+        _db().write(insert_user)
     except sqlite3.IntegrityError as e:
         raise ValueError("User already exists")
 
+def get_signup_conflict(email, login):
+    """Return an error message if the email or login is already taken, else None."""
+    with _db().read() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM users WHERE LOWER(email) = ?", (email.lower(),))
+        if cursor.fetchone():
+            return "Email already registered"
+
+        cursor.execute("SELECT 1 FROM users WHERE LOWER(login) = ?", (login.lower(),))
+        if cursor.fetchone():
+            return "Login already taken"
+    return None
+
+def create_user(email, login, password_hash):
+    """Insert a user with an already hashed password and return its user_id.
+
+    Raises sqlite3.IntegrityError if the email or login is taken.
+    """
+    def insert_user(conn):
+        cursor = conn.execute(
+            "INSERT INTO users (email, login, password_hash, registration_date) VALUES (?, ?, ?, datetime('now'))",
+            (email.lower(), login.lower(), password_hash)
+        )
+        return cursor.lastrowid
+
+    return _db().write(insert_user)
+
+def get_user_for_login(identifier):
+    """Return (user_id, login, email, password_hash) for an email or login, or None."""
+    with _db().read() as conn:
+        cursor = conn.execute(
+            "SELECT user_id, login, email, password_hash FROM users WHERE LOWER(email) = ? OR LOWER(login) = ?",
+            (identifier.lower(), identifier.lower())
+        )
+        return cursor.fetchone()
+
 def login_user(identifier, password):
-    with sqlite3.connect(DB_PATH) as conn:
+    with _db().read() as conn:
         cursor = conn.cursor()
 
         cursor.execute("""
@@ -80,50 +263,44 @@ def login_user(identifier, password):
         """, (identifier, identifier))
         user = cursor.fetchone()
 
-        if not user:
-            raise ValueError("User not found")
+    if not user:
+        raise ValueError("User not found")
 
-        user_id, email, login, password_hash = user
+    user_id, email, login, password_hash = user
 
-        if not bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8')):
-            raise ValueError("Incorrect password")
+    if not bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8')):
+        raise ValueError("Incorrect password")
 
-        return {"user_id": user_id, "name": login}
+    return {"user_id": user_id, "name": login}
 
 def update_score(user_id, points):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
     now = datetime.now().isoformat()
-    cursor.execute("""
+    _db().write(lambda conn: conn.execute("""
     UPDATE users
-    SET score = score + ?, last_completed_at = ?
+    SET score = score + ?, last_completed_at = ?, score_seq = ?
     WHERE user_id = ?
-    """, (points, now, user_id))
-    conn.commit()
-    conn.close()
+    """, (points, now, _bump(conn, "leaderboard"), user_id)))
 
 def get_inactive_users():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
     yesterday = (datetime.now() - timedelta(days=1)).isoformat()
-    cursor.execute("""
-        SELECT email, user_id, login FROM users
-        WHERE last_completed_at IS NULL OR last_completed_at < ?
-    """, (yesterday,))
-    inactive_users = cursor.fetchall()
-    conn.close()
-    return inactive_users
+    with _db().read() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT email, user_id, login FROM users
+            WHERE last_completed_at IS NULL OR last_completed_at < ?
+        """, (yesterday,))
+        return cursor.fetchall()
 
 def save_syllabus(topics: list):
-    with sqlite3.connect(DB_PATH) as conn:
+    def replace_topics(conn):
         cursor = conn.cursor()
         cursor.execute("DELETE FROM syllabus")
-        for topic in topics:
-            cursor.execute("INSERT INTO syllabus (topic) VALUES (?)", (topic,))
-        conn.commit()
+        cursor.executemany("INSERT INTO syllabus (topic) VALUES (?)", [(topic,) for topic in topics])
+
+    _db().write(replace_topics)
 
 def get_syllabus():
-    with sqlite3.connect(DB_PATH) as conn:
+    with _db().read() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT topic FROM syllabus")
         return [row[0] for row in cursor.fetchall()]
@@ -133,7 +310,7 @@ def get_hint(topic: str, difficulty: str):
 
 def get_notification_settings(user_id: int):
     """Get notification settings for a user."""
-    with sqlite3.connect(DB_PATH) as conn:
+    with _db().read() as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT enabled, notification_time, notification_days
@@ -141,68 +318,104 @@ def get_notification_settings(user_id: int):
             WHERE user_id = ?
         """, (user_id,))
         result = cursor.fetchone()
-        
-        if result:
-            enabled, time, days = result
-            return {
-                "enabled": bool(enabled),
-                "notification_time": time,
-                "notification_days": days.split(",") if days else []
-            }
-        else:
-            # Return default settings if none exist
-            return {
-                "enabled": True,
-                "notification_time": "09:00",
-                "notification_days": ["1", "2", "3", "4", "5"]
-            }
+
+    if result:
+        enabled, time, days = result
+        return {
+            "enabled": bool(enabled),
+            "notification_time": time,
+            "notification_days": days.split(",") if days else []
+        }
+    else:
+        # Return default settings if none exist
+        return {
+            "enabled": True,
+            "notification_time": "09:00",
+            "notification_days": ["1", "2", "3", "4", "5"]
+        }
+
+def next_fire_time(notification_time: str, notification_days, after: datetime):
+    """Return the first scheduled slot at or after ``after`` (None if no days are set)."""
+    hour, minute = map(int, notification_time.split(":"))
+    weekdays = {int(day) for day in notification_days if str(day).strip()}
+    after = after.replace(second=0, microsecond=0)
+    for offset in range(8):
+        day = after.date() + timedelta(days=offset)
+        if day.isoweekday() in weekdays:
+            candidate = datetime.combine(day, time(hour, minute))
+            if candidate >= after:
+                return candidate
+    return None
+
+def _schedule(notification_time: str, notification_days, last_notification_date, now: datetime):
+    """Next fire time as stored in ``next_fire_at``; at most one notification per day."""
+    if isinstance(notification_days, str):
+        notification_days = notification_days.split(",")
+    after = now
+    if last_notification_date and last_notification_date >= now.strftime("%Y-%m-%d"):
+        after = datetime.combine(now.date() + timedelta(days=1), time())
+    fire = next_fire_time(notification_time, notification_days, after)
+    return fire.strftime(_FIRE_FORMAT) if fire else None
 
 def update_notification_settings(user_id: int, enabled: bool, notification_time: str, notification_days: list):
-    """Update notification settings for a user."""
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        days_str = ",".join(map(str, notification_days))
-        
-        cursor.execute("""
-            INSERT OR REPLACE INTO notification_settings 
-            (user_id, enabled, notification_time, notification_days)
-            VALUES (?, ?, ?, ?)
-        """, (user_id, enabled, notification_time, days_str))
-        conn.commit()
+    """Update notification settings for a user and reschedule their next notification."""
+    days_str = ",".join(map(str, notification_days))
 
-def get_users_with_notifications_enabled():
-    """Get all users who have notifications enabled and should receive them now."""
-    from datetime import datetime, timedelta
-    
-    now = datetime.now()
-    current_time = now.strftime("%H:%M")
-    current_day = str(now.weekday() + 1)  # Monday=1, Sunday=7
-    
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT u.user_id, u.email, u.login, ns.notification_time, ns.notification_days
-            FROM users u
-            JOIN notification_settings ns ON u.user_id = ns.user_id
-            WHERE ns.enabled = 1
-        """)
-        
-        users = []
-        for row in cursor.fetchall():
-            user_id, email, login, notification_time, notification_days = row
-            days = notification_days.split(",") if notification_days else []
-            
-            # Check if user should receive notification now
-            if (current_time == notification_time and 
-                current_day in days and
-                (now - timedelta(days=1)).strftime("%Y-%m-%d") > get_last_notification_date(user_id)):
-                users.append((user_id, email, login))
-        
-        return users
+    def upsert(conn):
+        row = conn.execute(
+            "SELECT last_notification_date FROM notification_settings WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        last = row[0] if row else None
+        next_fire = _schedule(notification_time, notification_days, last, datetime.now()) if enabled else None
+        conn.execute("""
+            INSERT INTO notification_settings
+            (user_id, enabled, notification_time, notification_days, next_fire_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+                enabled = excluded.enabled,
+                notification_time = excluded.notification_time,
+                notification_days = excluded.notification_days,
+                next_fire_at = excluded.next_fire_at
+        """, (user_id, enabled, notification_time, days_str, next_fire))
+
+    _db().write(upsert)
+
+def get_users_with_notifications_enabled(now: datetime = None):
+    """Get all users who have notifications enabled and should receive them now.
+
+    One range query over the partial ``next_fire_at`` index, so the cost is
+    proportional to the number of due users. Slots missed by more than
+    ``NOTIFICATION_CATCHUP_MINUTES`` are rescheduled instead of sent.
+    """
+    now = now or datetime.now()
+    cutoff = (now - timedelta(minutes=NOTIFICATION_CATCHUP_MINUTES)).strftime(_FIRE_FORMAT)
+
+    with _db().read() as conn:
+        rows = conn.execute("""
+            SELECT u.user_id, u.email, u.login, ns.next_fire_at,
+                   ns.notification_time, ns.notification_days, ns.last_notification_date
+            FROM notification_settings ns
+            JOIN users u ON u.user_id = ns.user_id
+            WHERE ns.enabled = 1 AND ns.next_fire_at <= ?
+            ORDER BY ns.next_fire_at
+        """, (now.strftime(_FIRE_FORMAT),)).fetchall()
+
+    users, stale = [], []
+    for user_id, email, login, next_fire_at, time_str, days, last in rows:
+        if next_fire_at < cutoff:
+            stale.append((_schedule(time_str, days, last, now), user_id))
+        else:
+            users.append((user_id, email, login))
+
+    if stale:
+        _db().write(lambda conn: conn.executemany(
+            "UPDATE notification_settings SET next_fire_at = ? WHERE user_id = ?", stale
+        ))
+    return users
 
 def get_last_notification_date(user_id: int):
     """Get the last notification date for a user."""
-    with sqlite3.connect(DB_PATH) as conn:
+    with _db().read() as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT last_notification_date
@@ -212,13 +425,323 @@ def get_last_notification_date(user_id: int):
         result = cursor.fetchone()
         return result[0] if result and result[0] else "1970-01-01"
 
-def update_last_notification_date(user_id: int):
-    """Update the last notification date for a user."""
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
+def update_last_notification_date(user_id: int, now: datetime = None):
+    """Record today's notification for a user and schedule the next one."""
+    now = now or datetime.now()
+    today = now.strftime("%Y-%m-%d")
+
+    def mark_sent(conn):
+        row = conn.execute(
+            "SELECT notification_time, notification_days FROM notification_settings WHERE user_id = ?",
+            (user_id,)
+        ).fetchone()
+        next_fire = _schedule(row[0], row[1], today, now) if row else None
+        conn.execute("""
             UPDATE notification_settings
-            SET last_notification_date = ?
+            SET last_notification_date = ?, next_fire_at = ?
             WHERE user_id = ?
-        """, (datetime.now().strftime("%Y-%m-%d"), user_id))
-        conn.commit()
+        """, (today, next_fire, user_id))
+
+    _db().write(mark_sent)
+
+def claim_notification(user_id: int, now: datetime = None) -> bool:
+    """Record that today's notification for a user is being sent.
+
+    Returns False if it was already claimed (by this or another worker), so
+    a notification goes out at most once per user and day.
+    """
+    now = now or datetime.now()
+
+    def claim(conn):
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO notification_ledger (user_id, day, sent_at) VALUES (?, ?, ?)",
+            (user_id, now.strftime("%Y-%m-%d"), now.isoformat()),
+        )
+        return cursor.rowcount == 1
+
+    return _db().write(claim)
+
+def try_acquire_lease(name: str, holder: str, ttl: float, now: float) -> bool:
+    """Take or renew the named lease for ``holder`` unless someone else holds an unexpired one."""
+    def acquire(conn):
+        conn.execute("""
+            INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                holder = excluded.holder,
+                expires_at = excluded.expires_at
+            WHERE leases.holder = excluded.holder OR leases.expires_at <= ?
+        """, (name, holder, now + ttl, now))
+        row = conn.execute("SELECT holder FROM leases WHERE name = ?", (name,)).fetchone()
+        return row is not None and row[0] == holder
+
+    return _db().write(acquire)
+
+def release_lease(name: str, holder: str) -> None:
+    """Give up the named lease if ``holder`` still owns it."""
+    _db().write(lambda conn: conn.execute(
+        "DELETE FROM leases WHERE name = ? AND holder = ?", (name, holder)
+    ))
+
+def _bump(conn, name):
+    conn.execute("""
+        INSERT INTO cache_generations (name, generation) VALUES (?, 1)
+        ON CONFLICT(name) DO UPDATE SET generation = generation + 1
+    """, (name,))
+    return conn.execute("SELECT generation FROM cache_generations WHERE name = ?", (name,)).fetchone()[0]
+
+def bump_generation(name: str) -> int:
+    """Increment and return the generation counter of a shared cache."""
+    return _db().write(lambda conn: _bump(conn, name))
+
+def get_generations():
+    """Return ``{name: generation}`` for all shared caches."""
+    with _db().read() as conn:
+        return dict(conn.execute("SELECT name, generation FROM cache_generations").fetchall())
+
+def open_circuit(name: str, until: float) -> None:
+    """Record that the named circuit is open until ``until`` (unix time), keeping the later time."""
+    _db().write(lambda conn: conn.execute("""
+        INSERT INTO circuit_breakers (name, open_until) VALUES (?, ?)
+        ON CONFLICT(name) DO UPDATE SET open_until = MAX(open_until, excluded.open_until)
+    """, (name, until)))
+
+def get_circuit_open_until(name: str) -> float:
+    """Return until when the named circuit is open (0 if it never opened)."""
+    with _db().read() as conn:
+        row = conn.execute("SELECT open_until FROM circuit_breakers WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else 0.0
+
+def add_revoked_token(token_hash: bytes, expires_at: float, now: float) -> None:
+    """Persist a token revocation and forget revocations that expired."""
+    def add(conn):
+        conn.execute("DELETE FROM revoked_tokens WHERE expires_at <= ?", (now,))
+        conn.execute(
+            "INSERT OR REPLACE INTO revoked_tokens (token_hash, expires_at) VALUES (?, ?)",
+            (token_hash, expires_at),
+        )
+
+    _db().write(add)
+
+def get_revoked_tokens(now: float):
+    """Return ``[(token_hash, expires_at)]`` of revocations still in force."""
+    with _db().read() as conn:
+        return conn.execute(
+            "SELECT token_hash, expires_at FROM revoked_tokens WHERE expires_at > ?", (now,)
+        ).fetchall()
+
+_TASK_COLUMNS = ("task_id", "topic", "difficulty", "task", "prompt", "submissions", "solved")
+
+def save_task(task_id: str, topic: str, difficulty: str, task: str, prompt: str, minhash: bytes = None) -> None:
+    """Store a generated task; registering the same task again is a no-op."""
+    now = datetime.now().isoformat()
+    _db().write(lambda conn: conn.execute("""
+        INSERT OR IGNORE INTO tasks (task_id, topic, difficulty, task, prompt, created_at, minhash)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (task_id, topic, difficulty, task, prompt, now, minhash)))
+
+def get_task(task_id: str):
+    """Return the task with its submission counters as a dict, or None."""
+    with _db().read() as conn:
+        row = conn.execute(
+            f"SELECT {', '.join(_TASK_COLUMNS)} FROM tasks WHERE task_id = ?", (task_id,)
+        ).fetchone()
+    return None if row is None else dict(zip(_TASK_COLUMNS, row))
+
+def get_task_signatures(after: int):
+    """Return ``[(rowid, task_id, topic, difficulty, minhash)]`` of tasks stored after ``rowid``."""
+    with _db().read() as conn:
+        return conn.execute(
+            "SELECT rowid, task_id, topic, difficulty, minhash FROM tasks "
+            "WHERE rowid > ? AND minhash IS NOT NULL ORDER BY rowid",
+            (after,),
+        ).fetchall()
+
+def take_pool_task(topic: str, difficulty: str, fresh_after: float, now: float):
+    """Pop the oldest pooled task created after ``fresh_after``; returns ``(task or None, expired)``.
+
+    Also drops stale tasks of the key and marks an ad-hoc key as requested.
+    """
+    def take(conn):
+        expired = conn.execute(
+            "DELETE FROM task_pool WHERE topic = ? AND difficulty = ? AND created_at <= ?",
+            (topic, difficulty, fresh_after),
+        ).rowcount
+        row = conn.execute(
+            "SELECT id, task FROM task_pool WHERE topic = ? AND difficulty = ? ORDER BY id LIMIT 1",
+            (topic, difficulty),
+        ).fetchone()
+        if row is not None:
+            conn.execute("DELETE FROM task_pool WHERE id = ?", (row[0],))
+        conn.execute(
+            "UPDATE task_pool_demand SET last_request = ? WHERE topic = ? AND difficulty = ?",
+            (now, topic, difficulty),
+        )
+        return (row[1] if row else None), expired
+
+    return _db().write(take)
+
+def add_pool_task(topic: str, difficulty: str, task: str, size: int, now: float) -> bool:
+    """Pool a task unless the key already holds ``size``; returns whether it was added."""
+    def add(conn):
+        (count,) = conn.execute(
+            "SELECT COUNT(*) FROM task_pool WHERE topic = ? AND difficulty = ?", (topic, difficulty)
+        ).fetchone()
+        if count >= size:
+            return False
+        conn.execute(
+            "INSERT INTO task_pool (topic, difficulty, task, created_at) VALUES (?, ?, ?, ?)",
+            (topic, difficulty, task, now),
+        )
+        return True
+
+    return _db().write(add)
+
+def purge_pool_tasks(fresh_after: float) -> int:
+    """Delete pooled tasks created at or before ``fresh_after``; returns how many."""
+    return _db().write(lambda conn: conn.execute(
+        "DELETE FROM task_pool WHERE created_at <= ?", (fresh_after,)
+    ).rowcount)
+
+def get_pool_levels(fresh_after: float):
+    """Return ``{(topic, difficulty): ready}`` of fresh pooled tasks."""
+    with _db().read() as conn:
+        rows = conn.execute(
+            "SELECT topic, difficulty, COUNT(*) FROM task_pool WHERE created_at > ? GROUP BY topic, difficulty",
+            (fresh_after,),
+        ).fetchall()
+    return {(topic, difficulty): count for topic, difficulty, count in rows}
+
+def add_pool_demand(topic: str, difficulty: str, name_topic: str, name_difficulty: str,
+                    now: float, limit: int) -> None:
+    """Ask for a key to be kept warm; ignored once ``limit`` keys are wanted."""
+    _db().write(lambda conn: conn.execute("""
+        INSERT INTO task_pool_demand (topic, difficulty, name_topic, name_difficulty, last_request)
+        SELECT ?, ?, ?, ?, ? WHERE (SELECT COUNT(*) FROM task_pool_demand) < ?
+        ON CONFLICT(topic, difficulty) DO UPDATE SET last_request = excluded.last_request
+    """, (topic, difficulty, name_topic, name_difficulty, now, limit)))
+
+def get_pool_demand(idle_after: float):
+    """Forget keys last requested before ``idle_after``; return ``[(topic, difficulty)]`` of the rest."""
+    def demanded(conn):
+        conn.execute("DELETE FROM task_pool_demand WHERE last_request < ?", (idle_after,))
+        return conn.execute("SELECT name_topic, name_difficulty FROM task_pool_demand").fetchall()
+
+    return _db().write(demanded)
+
+def get_eval_verdict(key: str):
+    """Return the cached verdict JSON for ``key`` (and mark it used), or None."""
+    with _db().read() as conn:
+        row = conn.execute("SELECT verdict FROM eval_cache WHERE key = ?", (key,)).fetchone()
+    if row is None:
+        return None
+    now = datetime.now().timestamp()
+    _db().write(lambda conn: conn.execute("UPDATE eval_cache SET last_used = ? WHERE key = ?", (now, key)))
+    return row[0]
+
+def save_eval_verdict(key: str, verdict: str, keep: int = None) -> None:
+    """Store a verdict; with ``keep``, also drop all but the ``keep`` most recently used."""
+    now = datetime.now().timestamp()
+
+    def store(conn):
+        conn.execute(
+            "INSERT OR REPLACE INTO eval_cache (key, verdict, last_used) VALUES (?, ?, ?)", (key, verdict, now)
+        )
+        if keep is not None:
+            conn.execute("""
+                DELETE FROM eval_cache WHERE key IN (
+                    SELECT key FROM eval_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+            """, (keep,))
+
+    _db().write(store)
+
+def clear_eval_cache() -> None:
+    _db().write(lambda conn: conn.execute("DELETE FROM eval_cache"))
+
+_SUBMISSION_COLUMNS = ("id", "task_id", "topic", "difficulty", "correct", "created_at")
+
+def add_submissions(submissions) -> None:
+    """Append graded submissions in one transaction.
+
+    ``submissions`` are ``submissions.Submission`` records. Each one also
+    updates the task's counters. The first correct submission of a task by a
+    user adds a point to ``users.score``. Submissions of tasks without an id
+    (raw tasks from older clients, which the client wrote itself) are kept in
+    the history but never score. A batch that changes scores bumps the
+    ``leaderboard`` generation once.
+    """
+    def insert(conn):
+        seq = None
+        for sub in submissions:
+            first_solve = sub.correct and sub.user_id is not None and sub.task_id is not None and (
+                conn.execute(
+                    "SELECT 1 FROM submissions WHERE task_id = ? AND user_id = ? AND correct = 1 LIMIT 1",
+                    (sub.task_id, sub.user_id),
+                ).fetchone() is None
+            )
+            conn.execute("""
+                INSERT INTO submissions (user_id, task_id, topic, difficulty, correct, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (sub.user_id, sub.task_id, sub.topic, sub.difficulty, int(sub.correct), sub.created_at))
+            if sub.task_id is not None:
+                conn.execute("""
+                    UPDATE tasks SET submissions = submissions + 1, solved = solved + ?
+                    WHERE task_id = ?
+                """, (int(sub.correct), sub.task_id))
+            if first_solve:
+                if seq is None:
+                    seq = _bump(conn, "leaderboard")
+                conn.execute("""
+                    UPDATE users SET score = score + 1, last_completed_at = ?, score_seq = ?
+                    WHERE user_id = ?
+                """, (sub.created_at, seq, sub.user_id))
+
+    _db().write(insert)
+
+def get_submissions(user_id: int, limit: int, before=None):
+    """Return up to ``limit`` of a user's submissions, newest first.
+
+    ``before`` is the ``(created_at, id)`` of the last row of the previous
+    page. The query is answered from ``idx_submissions_user_created`` alone.
+    """
+    query = f"SELECT {', '.join(_SUBMISSION_COLUMNS)} FROM submissions WHERE user_id = ?"
+    params = [user_id]
+    if before is not None:
+        query += " AND (created_at, id) < (?, ?)"
+        params.extend(before)
+    query += " ORDER BY created_at DESC, id DESC LIMIT ?"
+    params.append(limit)
+    with _db().read() as conn:
+        rows = conn.execute(query, params).fetchall()
+    return [dict(zip(_SUBMISSION_COLUMNS, row)) for row in rows]
+
+def get_score(user_id: int):
+    """Return ``{"score", "submissions", "solved"}`` for a user."""
+    with _db().read() as conn:
+        row = conn.execute("SELECT score FROM users WHERE user_id = ?", (user_id,)).fetchone()
+        submissions, solved = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(correct), 0) FROM submissions WHERE user_id = ?", (user_id,)
+        ).fetchone()
+    return {"score": row[0] if row else 0, "submissions": submissions, "solved": solved}
+
+def get_ranked_users():
+    """Return ``(leaderboard generation, [(user_id, login, score)])`` for users with points.
+
+    The generation is read first, so a change racing with the scan is
+    picked up again by :func:`get_score_changes`. The scan reads only
+    ``idx_users_score``.
+    """
+    with _db().read() as conn:
+        row = conn.execute("SELECT generation FROM cache_generations WHERE name = 'leaderboard'").fetchone()
+        users = conn.execute(
+            "SELECT user_id, login, score FROM users WHERE score > 0 ORDER BY score DESC"
+        ).fetchall()
+    return (row[0] if row else 0), users
+
+def get_score_changes(after: int):
+    """Return ``[(user_id, login, score, score_seq)]`` changed after generation ``after``."""
+    with _db().read() as conn:
+        return conn.execute(
+            "SELECT user_id, login, score, score_seq FROM users WHERE score_seq > ? ORDER BY score_seq",
+            (after,),
+        ).fetchall()
@@ -0,0 +1,202 @@
+"""Content-addressed cache of LLM evaluation verdicts.
+
+Entries are keyed by a hash of the task plus a *normalized* form of the
+submitted code (an AST dump without comments, whitespace or docstrings), so
+resubmitting the same solution - even reformatted - returns the stored verdict
+without another OpenRouter round trip. With ``EVAL_CACHE_PERSIST`` verdicts
+are also written to the ``eval_cache`` table of the main database, so they
+survive restarts and are shared by all workers.
+"""
+from __future__ import annotations
+
+import ast
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+import database
+
+logger = logging.getLogger("app.eval_cache")
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+EVAL_CACHE_MAX_ENTRIES: int = int(os.getenv("EVAL_CACHE_MAX_ENTRIES", "5000"))
+EVAL_CACHE_PERSIST: bool = os.getenv("EVAL_CACHE_PERSIST", "0").lower() in ("1", "true", "yes")
+_PRUNE_EVERY: int = 64  # trim the eval_cache table after this many writes
+
+
+# ---------------------------------------------------------------------------
+# Normalization
+# ---------------------------------------------------------------------------
+
+def _strip_docstrings(tree: ast.AST) -> ast.AST:
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            body = node.body
+            if (
+                body
+                and isinstance(body[0], ast.Expr)
+                and isinstance(body[0].value, ast.Constant)
+                and isinstance(body[0].value.value, str)
+            ):
+                node.body = body[1:] or [ast.Pass()]
+    return tree
+
+
+def normalize_code(code: str) -> str:
+    """Return a formatting-independent representation of ``code``.
+
+    Valid Python is reduced to an AST dump without docstrings (comments and
+    whitespace never reach the AST). Anything else - e.g. a question instead
+    of a solution - falls back to its whitespace-collapsed text.
+    """
+
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return " ".join(code.split())
+    return ast.dump(_strip_docstrings(tree), annotate_fields=False)
+
+
+def _normalize_task(task: str) -> str:
+    try:
+        return json.dumps(json.loads(task), sort_keys=True, ensure_ascii=False)
+    except (TypeError, ValueError):
+        return " ".join(task.split())
+
+
+def cache_key(task: str, code: str) -> str:
+    """Return the hex SHA-256 key for a (task, code) pair."""
+
+    digest = hashlib.sha256()
+    digest.update(_normalize_task(task).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(normalize_code(code).encode("utf-8"))
+    return digest.hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+
+class EvaluationCache:
+    """Bounded LRU of verdicts with optional write-through to the ``eval_cache`` table.
+
+    ``get`` and ``put`` may touch SQLite (through :mod:`storage`), so async
+    code calls them via ``executors.db_executor``.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = EVAL_CACHE_MAX_ENTRIES,
+        persistent: bool = EVAL_CACHE_PERSIST,
+        load: Callable[[str], Optional[str]] = database.get_eval_verdict,
+        store: Callable[..., None] = database.save_eval_verdict,
+        clear: Callable[[], None] = database.clear_eval_cache,
+    ) -> None:
+        self.max_entries = max_entries
+        self.persistent = persistent
+        self._load_row = load
+        self._store_row = store
+        self._clear_rows = clear
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._writes = 0
+
+    def get(self, task: str, code: str) -> Optional[Dict[str, Any]]:
+        """Return the cached verdict for ``(task, code)`` or ``None``."""
+
+        key = cache_key(task, code)
+        with self._lock:
+            verdict = self._entries.get(key)
+            if verdict is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(verdict)
+
+        verdict = self._load(key)
+        with self._lock:
+            if verdict is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._remember(key, verdict)
+        return dict(verdict)
+
+    def put(self, task: str, code: str, verdict: Dict[str, Any]) -> None:
+        """Store ``verdict`` for ``(task, code)``."""
+
+        key = cache_key(task, code)
+        with self._lock:
+            self._remember(key, dict(verdict))
+            self._writes += 1
+            # Keep the table bounded by the same LRU limit
+            prune = self._writes % _PRUNE_EVERY == 0
+        self._store(key, verdict, prune)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current size."""
+
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "persistent": self.persistent,
+        }
+
+    def clear(self) -> None:
+        """Drop all entries (memory and disk)."""
+
+        with self._lock:
+            self._entries.clear()
+        if self.persistent:
+            self._clear_rows()
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _remember(self, key: str, verdict: Dict[str, Any]) -> None:
+        # Caller holds ``self._lock``
+        self._entries[key] = verdict
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.persistent:
+            return None
+        try:
+            row = self._load_row(key)
+            return None if row is None else json.loads(row)
+        except (sqlite3.Error, ValueError):
+            logger.exception("Failed to read evaluation cache entry")
+            return None
+
+    def _store(self, key: str, verdict: Dict[str, Any], prune: bool) -> None:
+        if not self.persistent:
+            return
+        try:
+            self._store_row(key, json.dumps(verdict, ensure_ascii=False),
+                            self.max_entries if prune else None)
+        except sqlite3.Error:
+            logger.exception("Failed to persist evaluation cache entry")
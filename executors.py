@@ -0,0 +1,211 @@
+"""Execution layer for blocking work called from async request handlers.
+
+* :data:`cpu_executor` – a process pool sized to the available cores for
+  CPU-bound work (bcrypt hashing/checking), so password checks run in
+  parallel instead of freezing the event loop one after another.
+* :data:`db_executor` – a bounded thread pool for blocking SQLite and file
+  I/O, sized to the storage reader pool.
+
+Both record queue depth and queue wait time (submission to start of
+execution), exposed through :meth:`InstrumentedExecutor.stats`.
+"""
+from __future__ import annotations
+
+import asyncio
+import collections
+import functools
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+import bcrypt
+
+from metrics import EXECUTOR_JOB_DURATION, EXECUTOR_WAIT
+from storage import STORAGE_POOL_SIZE
+
+T = TypeVar("T")
+
+logger = logging.getLogger("app.executors")
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+
+def _available_cores() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+# With several API workers (uvicorn reads WEB_CONCURRENCY) the cores are
+# shared between their bcrypt pools instead of each one claiming all of them
+WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "1"))
+CPU_WORKERS: int = int(os.getenv("CPU_WORKERS", str(max(1, _available_cores() // max(1, WEB_CONCURRENCY)))))
+DB_WORKERS: int = int(os.getenv("DB_WORKERS", str(STORAGE_POOL_SIZE)))
+WAIT_SAMPLES: int = 1024  # recent wait times kept for percentiles
+
+
+# ---------------------------------------------------------------------------
+# Picklable job helpers (executed inside worker processes)
+# ---------------------------------------------------------------------------
+
+def _timed(fn: Callable[..., T], *args: Any) -> Tuple[float, float, T]:
+    """Run ``fn(*args)`` and return ``(wall-clock start, wall-clock end, result)``."""
+
+    started = time.time()
+    result = fn(*args)
+    return started, time.time(), result
+
+
+def hash_password(password: str) -> str:
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+
+
+def check_password(password: str, password_hash: str) -> bool:
+    return bcrypt.checkpw(password.encode(), password_hash.encode())
+
+
+# ---------------------------------------------------------------------------
+# Executor wrapper
+# ---------------------------------------------------------------------------
+
+class InstrumentedExecutor:
+    """Lazily created executor with queue-depth and wait-time accounting.
+
+    Parameters
+    ----------
+    name:
+        Label used in logs and stats.
+    factory:
+        Creates the underlying :class:`concurrent.futures.Executor`.
+    workers:
+        Number of workers ``factory`` creates; jobs beyond it are queued.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Executor], workers: int) -> None:
+        self.name = name
+        self.workers = workers
+        self._factory = factory
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+        self._inflight = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._waits: Deque[float] = collections.deque(maxlen=WAIT_SAMPLES)
+
+    def _get(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._factory()
+            return self._executor
+
+    def warm(self) -> None:
+        """Start the workers ahead of the first job."""
+
+        executor = self._get()
+        for future in [executor.submit(time.time) for _ in range(self.workers)]:
+            future.result()
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run ``fn(*args)`` in the pool and await its result.
+
+        For process pools ``fn`` and its arguments must be picklable.
+        """
+
+        loop = asyncio.get_running_loop()
+        submitted_at = time.time()
+        with self._lock:
+            self._inflight += 1
+            self._submitted += 1
+        try:
+            try:
+                started_at, finished_at, result = await loop.run_in_executor(
+                    self._get(), functools.partial(_timed, fn, *args)
+                )
+            except BrokenProcessPool:
+                logger.warning("%s pool broke, restarting it", self.name)
+                self._reset()
+                started_at, finished_at, result = await loop.run_in_executor(
+                    self._get(), functools.partial(_timed, fn, *args)
+                )
+        except BaseException:
+            with self._lock:
+                self._inflight -= 1
+                self._failed += 1
+            raise
+        wait = max(0.0, started_at - submitted_at)
+        EXECUTOR_WAIT.labels(self.name).observe(wait)
+        EXECUTOR_JOB_DURATION.labels(self.name, getattr(fn, "__name__", "job")).observe(finished_at - started_at)
+        with self._lock:
+            self._inflight -= 1
+            self._completed += 1
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+            self._waits.append(wait)
+        return result
+
+    def queue_depth(self) -> int:
+        """Jobs submitted but not yet picked up by a worker."""
+
+        with self._lock:
+            return max(0, self._inflight - self.workers)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = sorted(self._waits)
+            finished = self._completed
+            return {
+                "workers": self.workers,
+                "running": min(self._inflight, self.workers),
+                "queue_depth": max(0, self._inflight - self.workers),
+                "submitted": self._submitted,
+                "completed": finished,
+                "failed": self._failed,
+                "wait_avg_ms": round(self._wait_total / finished * 1000, 3) if finished else 0.0,
+                "wait_p95_ms": round(waits[int(len(waits) * 0.95)] * 1000, 3) if waits else 0.0,
+                "wait_max_ms": round(self._wait_max * 1000, 3),
+            }
+
+    def _reset(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        """Stop the workers; the pool is re-created on next use."""
+
+        self._reset()
+
+
+def _process_pool() -> Executor:
+    # "spawn" keeps workers independent of the parent's threads (scheduler,
+    # SQLite writer) which a forked child would inherit in a locked state.
+    return ProcessPoolExecutor(max_workers=CPU_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+
+def _thread_pool() -> Executor:
+    return ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="db")
+
+
+cpu_executor = InstrumentedExecutor("cpu", _process_pool, CPU_WORKERS)
+db_executor = InstrumentedExecutor("db", _thread_pool, DB_WORKERS)
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    return {"cpu": cpu_executor.stats(), "db": db_executor.stats()}
+
+
+def shutdown() -> None:
+    cpu_executor.shutdown()
+    db_executor.shutdown()
@@ -0,0 +1,259 @@
+"""Tolerant parsing of the JSON objects the LLM returns.
+
+The model often produces almost-JSON: single quotes, Python tuples or
+``True``/``False``/``None``, trailing commas, a ``<think>`` preamble,
+markdown fences or a reply cut off before its closing braces. Instead of
+paying another LLM round trip for each of these, :func:`repair_json` fixes
+them in a single pass over the text and reports which repairs were needed;
+:func:`parse_task` also turns a list of hints into the ``Hints`` object.
+Checking that the result has the shape the API returns is left to
+:func:`llm_schemas.validate`.
+
+Valid JSON takes the fast path (one :func:`json.loads`) and is never
+rewritten.
+"""
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+_THINK_RE = re.compile(r"<think>.*?(?:</think>|$)", re.S | re.I)
+_FENCE_RE = re.compile(r"```(?:json)?\s*([\s\S]*?)\s*(?:```|$)", re.I)
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_JSON_LITERALS = {"true", "false", "null"}
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t", "'": "'"}
+_VALUE_END = ",:}])"
+
+TASK_HINTS = ("Hint1", "Hint2", "Hint3")
+
+
+class RepairError(ValueError):
+    """The text could not be turned into the expected JSON object.
+
+    ``missing`` lists required fields that were absent or invalid and
+    ``partial`` holds the object that was parsed (both empty when the text
+    was not parsable at all).
+    """
+
+    def __init__(
+        self,
+        message: str,
+        missing: Optional[List[str]] = None,
+        partial: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        super().__init__(message)
+        self.missing = missing or []
+        self.partial = partial or {}
+
+
+# ---------------------------------------------------------------------------
+# Repairing parser
+# ---------------------------------------------------------------------------
+
+def repair_json(text: str) -> Tuple[Any, List[str]]:
+    """Parse the first JSON object in ``text``, repairing it if necessary.
+
+    Returns ``(value, repairs)`` where ``repairs`` names the fixes applied,
+    e.g. ``["single_quotes", "trailing_commas"]``.
+
+    Raises
+    ------
+    RepairError
+        If no object could be recovered.
+    """
+
+    repairs: List[str] = []
+    if not text or not text.strip():
+        raise RepairError("LLM returned an empty string")
+
+    body = text
+    if "<think>" in body.lower():
+        body = _THINK_RE.sub("", body)
+        repairs.append("think")
+    fenced = _FENCE_RE.search(body)
+    if fenced:
+        body = fenced.group(1)
+        repairs.append("markdown_fence")
+    start = body.find("{")
+    if start == -1:
+        raise RepairError("No JSON object found in the response")
+    if body[:start].strip():
+        repairs.append("leading_text")
+
+    end = body.rfind("}") + 1
+    if end > start:
+        try:
+            value = json.loads(body[start:end])
+            if body[end:].strip():
+                repairs.append("trailing_text")
+            return value, repairs
+        except json.JSONDecodeError:
+            pass
+
+    found: List[str] = []
+    fixed = _Scanner(body, start, found).run()
+    try:
+        value = json.loads(fixed)
+    except json.JSONDecodeError as exc:
+        raise RepairError(f"Unrepairable JSON: {exc}") from exc
+    repairs.extend(r for r in dict.fromkeys(found))
+    return value, repairs
+
+
+class _Scanner:
+    """Single pass re-emitting ``text[start:]`` as strict JSON tokens."""
+
+    def __init__(self, text: str, start: int, repairs: List[str]) -> None:
+        self.text = text
+        self.pos = start
+        self.repairs = repairs
+        self.tokens: List[Tuple[str, str]] = []  # (kind, json text)
+        self.stack: List[str] = []  # closers still expected
+
+    def run(self) -> str:
+        text, n = self.text, len(self.text)
+        while self.pos < n:
+            ch = text[self.pos]
+            if ch in "\"'":
+                self._string(ch)
+            elif ch in "{[(":
+                if ch == "(":
+                    self.repairs.append("tuples")
+                self.stack.append("}" if ch == "{" else "]")
+                self.tokens.append(("open", "{" if ch == "{" else "["))
+                self.pos += 1
+            elif ch in "}])":
+                self.pos += 1
+                if not self.stack:
+                    continue
+                self._drop_trailing_commas()
+                self.tokens.append(("close", self.stack.pop()))
+                if not self.stack:
+                    if text[self.pos:].strip():
+                        self.repairs.append("trailing_text")
+                    return self._emit()
+            elif ch == ",":
+                self.tokens.append(("comma", ","))
+                self.pos += 1
+            elif ch == ":":
+                self.tokens.append(("colon", ":"))
+                self.pos += 1
+            elif ch.isspace():
+                self.pos += 1
+            elif ch.isalpha() or ch == "_":
+                self._word()
+            else:
+                self._raw()
+        self._close_truncated()
+        return self._emit()
+
+    def _emit(self) -> str:
+        return "".join(tok for _, tok in self.tokens)
+
+    def _drop_trailing_commas(self) -> None:
+        while self.tokens and self.tokens[-1][0] == "comma":
+            self.tokens.pop()
+            self.repairs.append("trailing_commas")
+
+    def _string(self, quote: str) -> None:
+        text, n = self.text, len(self.text)
+        if quote == "'":
+            self.repairs.append("single_quotes")
+        chars: List[str] = []
+        i = self.pos + 1
+        while i < n:
+            ch = text[i]
+            if ch == "\\" and i + 1 < n:
+                nxt = text[i + 1]
+                if nxt == "u" and re.fullmatch(r"[0-9a-fA-F]{4}", text[i + 2:i + 6]):
+                    chars.append(chr(int(text[i + 2:i + 6], 16)))
+                    i += 6
+                    continue
+                if nxt in _ESCAPES:
+                    chars.append(_ESCAPES[nxt])
+                else:
+                    chars.append("\\" + nxt)  # e.g. a regex "\d": keep the backslash
+                    self.repairs.append("invalid_escapes")
+                i += 2
+                continue
+            if ch == quote and self._closes_string(i + 1):
+                self.pos = i + 1
+                self.tokens.append(("str", json.dumps("".join(chars), ensure_ascii=False)))
+                return
+            if ch == quote:
+                self.repairs.append("unescaped_quotes")
+            elif ch < " ":
+                self.repairs.append("control_chars")
+            chars.append(ch)
+            i += 1
+        # Cut off mid-string: the value itself is incomplete, don't guess
+        raise RepairError("Reply was truncated inside a string")
+
+    def _closes_string(self, i: int) -> bool:
+        """A quote ends the string only if a JSON delimiter (or the end) follows."""
+
+        rest = self.text[i:].lstrip()
+        return not rest or rest[0] in _VALUE_END
+
+    def _word(self) -> None:
+        text, n = self.text, len(self.text)
+        end = self.pos
+        while end < n and (text[end].isalnum() or text[end] == "_"):
+            end += 1
+        word = text[self.pos:end]
+        self.pos = end
+        if word in _JSON_LITERALS:
+            self.tokens.append(("lit", word))
+        elif word in _PY_LITERALS:
+            self.repairs.append("python_literals")
+            self.tokens.append(("lit", _PY_LITERALS[word]))
+        else:
+            self.repairs.append("unquoted_strings")
+            self.tokens.append(("str", json.dumps(word)))
+
+    def _raw(self) -> None:
+        text, n = self.text, len(self.text)
+        end = self.pos
+        while end < n and not text[end].isspace() and text[end] not in "\"'{}[](),:":
+            end += 1
+        self.tokens.append(("raw", text[self.pos:end]))
+        self.pos = end
+
+    def _close_truncated(self) -> None:
+        if not self.stack:
+            return
+        self.repairs.append("truncated")
+        self._drop_trailing_commas()
+        if self.tokens and self.tokens[-1][0] == "colon":
+            self.tokens.append(("lit", "null"))
+        elif (self.stack[-1] == "}" and self.tokens and self.tokens[-1][0] == "str"
+              and len(self.tokens) > 1 and self.tokens[-2][0] in ("open", "comma")):
+            self.tokens.pop()  # dangling key without a value
+            self._drop_trailing_commas()
+        while self.stack:
+            self.tokens.append(("close", self.stack.pop()))
+
+
+# ---------------------------------------------------------------------------
+# Tasks
+# ---------------------------------------------------------------------------
+
+def parse_task(text: str) -> Tuple[Any, List[str]]:
+    """:func:`repair_json` for a generated task.
+
+    Hints given as a three-element list are turned into the ``Hints``
+    object. Missing or invalid fields are not checked here.
+
+    Raises
+    ------
+    RepairError
+        If the text is unparsable.
+    """
+
+    task, repairs = repair_json(text)
+    hints = task.get("Hints") if isinstance(task, dict) else None
+    if isinstance(hints, list) and len(hints) == len(TASK_HINTS):
+        task["Hints"] = dict(zip(TASK_HINTS, hints))
+        repairs.append("hints_list")
+    return task, repairs
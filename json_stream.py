@@ -0,0 +1,114 @@
+"""Incremental extraction of top-level JSON fields from a streamed LLM reply.
+
+The model streams its JSON answer token by token. :class:`JsonFieldStream`
+scans the text as it arrives and yields every top-level ``"key": value`` pair
+as soon as the value is complete, so e.g. the task name and description can
+be shown before the hints have been generated.
+"""
+from __future__ import annotations
+
+import json
+from typing import Any, List, Optional, Tuple
+
+
+class JsonFieldStream:
+    """Feed text chunks, get back completed top-level ``(key, value)`` pairs.
+
+    Anything before the first ``{`` (markdown fences, reasoning preambles) is
+    ignored. Values that fail to decode are skipped; the caller still
+    validates the complete document at the end of the stream.
+    """
+
+    def __init__(self) -> None:
+        self.text = ""
+        self._pos = 0
+        self._started = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        # Top-level parsing state
+        self._key: Optional[str] = None
+        self._token_start: Optional[int] = None  # start of current key/value token
+        self._expect_value = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Consume ``chunk`` and return fields completed by it."""
+
+        self.text += chunk
+        fields: List[Tuple[str, Any]] = []
+        text = self.text
+        if not self._started:
+            # Reasoning models may emit a <think>...</think> preamble first
+            if "<think>" in text:
+                think_end = text.find("</think>")
+                if think_end == -1:
+                    return fields
+                self._pos = max(self._pos, think_end + len("</think>"))
+        i = self._pos
+        while i < len(text) and not self._done:
+            ch = text[i]
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+                i += 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._end_token(i + 1, fields)
+                i += 1
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._token_start is None:
+                    self._token_start = i
+            elif ch in "{[":
+                if self._depth == 1 and self._token_start is None:
+                    self._token_start = i
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1:
+                    self._end_token(i + 1, fields)
+                elif self._depth == 0:
+                    self._end_token(i, fields)
+                    self._done = True
+            elif self._depth == 1:
+                if ch == ":":
+                    self._expect_value = True
+                elif ch == ",":
+                    self._end_token(i, fields)
+                elif not ch.isspace() and self._token_start is None:
+                    self._token_start = i  # number / true / false / null
+            i += 1
+        self._pos = i
+        return fields
+
+    def _end_token(self, end: int, fields: List[Tuple[str, Any]]) -> None:
+        if self._token_start is None:
+            return
+        raw = self.text[self._token_start:end].strip()
+        self._token_start = None
+        if not raw:
+            return
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            value = None
+            raw = ""
+        if not self._expect_value:
+            self._key = value if isinstance(value, str) else None
+            return
+        self._expect_value = False
+        if self._key is not None and raw:
+            fields.append((self._key, value))
+        self._key = None
@@ -1,11 +1,15 @@
 """
 JWT utilities for authentication
 """
+import hashlib
 import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from jose import JWTError, jwt
-from fastapi import HTTPException, status
+from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 # JWT Configuration
@@ -13,6 +17,10 @@ SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Verified-token cache
+TOKEN_CACHE_ENABLED = os.getenv("TOKEN_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+
 security = HTTPBearer()
 
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
@@ -27,19 +35,138 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str) -> Dict[str, Any]:
-    """Verify and decode a JWT token."""
+def _credentials_error() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+class TokenCache:
+    """Bounded LRU of already-verified tokens, keyed by the token's SHA-256.
+
+    Entries expire at the token's ``exp`` claim. Revoked tokens are
+    remembered until their own expiry and are rejected even if they are
+    still cached.
+    """
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._revoked: Dict[bytes, float] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, key: bytes) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def put(self, key: bytes, payload: Dict[str, Any]) -> None:
+        exp = payload.get("exp")
+        if not isinstance(exp, (int, float)):
+            return  # never cache tokens without an expiry
+        with self._lock:
+            if key in self._revoked:
+                return
+            self._entries[key] = (float(exp), dict(payload))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def is_revoked(self, key: bytes) -> bool:
+        with self._lock:
+            return key in self._revoked
+
+    def revoke(self, key: bytes, exp: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._entries.pop(key, None)
+            self._revoked[key] = exp
+            # Forget revocations of tokens that have expired anyway
+            for revoked_key in [k for k, e in self._revoked.items() if e <= now]:
+                del self._revoked[revoked_key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._revoked.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "size": len(self._entries),
+                "revoked": len(self._revoked),
+                "enabled": TOKEN_CACHE_ENABLED,
+            }
+
+token_cache = TokenCache()
+
+def _decode_token(token: str) -> Dict[str, Any]:
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise _credentials_error()
+
+def verify_token(token: str) -> Dict[str, Any]:
+    """Verify and decode a JWT token.
+
+    Tokens that were verified before are served from :data:`token_cache`
+    until they expire or are revoked. Revoked tokens are rejected even when
+    the cache is disabled.
+    """
+    key = TokenCache.key(token)
+    if token_cache.is_revoked(key):
+        raise _credentials_error()
+    if not TOKEN_CACHE_ENABLED:
+        return _decode_token(token)
+
+    payload = token_cache.get(key)
+    if payload is not None:
+        return payload
+
+    payload = _decode_token(token)
+    token_cache.put(key, payload)
+    return payload
+
+def revoke_token(token: str) -> Optional[Tuple[bytes, float]]:
+    """Invalidate a token immediately (e.g. on logout).
+
+    Returns ``(cache key, expiry)`` so the revocation can be shared with
+    other worker processes, or None if the token does not verify (forged,
+    expired or already revoked), in which case nothing is stored. The
+    expiry is capped at one token lifetime from now.
+    """
+    try:
+        claims = verify_token(token)
+    except HTTPException:
+        return None
+    latest = time.time() + ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    exp = claims.get("exp")
+    exp = min(float(exp), latest) if isinstance(exp, (int, float)) else latest
+    key = TokenCache.key(token)
+    token_cache.revoke(key, exp)
+    return key, exp
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = security) -> Dict[str, Any]:
+def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict[str, Any]:
     """Get current user from JWT token."""
     token = credentials.credentials
     payload = verify_token(token)
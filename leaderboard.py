@@ -0,0 +1,160 @@
+"""In-memory leaderboard with O(log n) rank queries.
+
+Ranking users with ``ORDER BY score`` on every page load would scan the
+whole ``users`` table. Instead every worker keeps the users with points in a
+:class:`sortedcontainers.SortedList` keyed by ``(-score, user_id)``:
+
+* top-N is a slice from the front;
+* a user's rank is one bisection (users tied on score share a rank);
+* neighbours are a slice around the user's position.
+
+The list is built once from an index-only scan
+(:func:`database.get_ranked_users`) and then kept up to date incrementally.
+Every score change stamps the user row with a new ``leaderboard`` generation
+(``users.score_seq``). When :class:`coordination.GenerationWatcher` sees that
+counter move, :meth:`Leaderboard.catch_up` applies only the rows changed
+since the last generation it saw. Each change costs O(log n).
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from sortedcontainers import SortedList
+
+import database
+
+logger = logging.getLogger("app.leaderboard")
+
+LEADERBOARD_MAX_LIMIT = 100  # entries per top-N request
+LEADERBOARD_MAX_RADIUS = 10  # neighbours on each side of a user
+
+_Key = Tuple[int, int]  # (-score, user_id)
+
+
+class Leaderboard:
+    """Sorted ``(-score, user_id)`` keys plus ``user_id -> (score, login)``."""
+
+    def __init__(
+        self,
+        load: Callable[[], Tuple[int, Sequence[Tuple[int, str, int]]]] = database.get_ranked_users,
+        changes: Callable[[int], Sequence[Tuple[int, str, int, int]]] = database.get_score_changes,
+    ) -> None:
+        self._load = load
+        self._changes = changes
+        self._keys: SortedList = SortedList()
+        self._users: Dict[int, Tuple[int, str]] = {}
+        self._seq = 0
+        self._loaded = False
+        self._lock = threading.RLock()
+        self.rebuilds = 0
+        self.updates = 0
+
+    # -- maintenance -----------------------------------------------------------
+
+    def rebuild(self) -> None:
+        """Reload every user with points from SQLite."""
+
+        seq, rows = self._load()
+        users = {user_id: (score, login) for user_id, login, score in rows if score > 0}
+        keys = SortedList((-score, user_id) for user_id, (score, _) in users.items())
+        with self._lock:
+            self._keys, self._users, self._seq = keys, users, seq
+            # Scores changed while loading went to the state just replaced
+            self._apply(self._changes(seq))
+            self._loaded = True
+            self.rebuilds += 1
+        logger.info("Leaderboard rebuilt with %d users (generation %d)", len(users), seq)
+
+    def catch_up(self) -> int:
+        """Apply score changes made (by any worker) since the last rebuild or catch-up."""
+
+        if not self._loaded:
+            self.rebuild()
+            return 0
+        with self._lock:
+            after = self._seq
+        rows = self._changes(after)
+        with self._lock:
+            self._apply(rows)
+        return len(rows)
+
+    def set_score(self, user_id: int, login: str, score: int) -> None:
+        """Record ``user_id``'s current score; users without points are not ranked."""
+
+        self._ensure_loaded()
+        with self._lock:
+            self._set(user_id, login, score)
+
+    def _apply(self, rows: Sequence[Tuple[int, str, int, int]]) -> None:
+        for user_id, login, score, seq in rows:
+            self._set(user_id, login, score)
+            self._seq = max(self._seq, seq)
+
+    def _set(self, user_id: int, login: str, score: int) -> None:
+        old = self._users.pop(user_id, None)
+        if old is not None:
+            self._keys.remove((-old[0], user_id))
+        if score > 0:
+            self._users[user_id] = (score, login)
+            self._keys.add((-score, user_id))
+        self.updates += 1
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.rebuild()
+
+    # -- queries ---------------------------------------------------------------
+
+    def _rank_of_score(self, score: int) -> int:
+        # (-score,) sorts before every (-score, user_id): counts strictly better users
+        return self._keys.bisect_left((-score,)) + 1
+
+    def _entry(self, key: _Key) -> Dict[str, Any]:
+        score, user_id = -key[0], key[1]
+        return {"rank": self._rank_of_score(score), "user_id": user_id,
+                "login": self._users[user_id][1], "score": score}
+
+    def top(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """The ``limit`` best users, best first."""
+
+        self._ensure_loaded()
+        with self._lock:
+            return [self._entry(key) for key in self._keys.islice(0, max(0, limit))]
+
+    def rank(self, user_id: int) -> Dict[str, int]:
+        """``{"rank", "score"}`` of a user; users without points share the last rank."""
+
+        self._ensure_loaded()
+        with self._lock:
+            score = self._users.get(user_id, (0, ""))[0]
+            if score > 0:
+                return {"rank": self._rank_of_score(score), "score": score}
+            return {"rank": len(self._keys) + 1, "score": 0}
+
+    def around(self, user_id: int, radius: int = 2) -> List[Dict[str, Any]]:
+        """Up to ``radius`` users on each side of ``user_id`` (the user included if ranked)."""
+
+        self._ensure_loaded()
+        with self._lock:
+            entry = self._users.get(user_id)
+            # An unranked user sits below the last ranked one
+            position = self._keys.index((-entry[0], user_id)) if entry else len(self._keys)
+            start = max(0, position - radius)
+            return [self._entry(key) for key in self._keys.islice(start, position + radius + 1)]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ranked_users": len(self._keys),
+                "generation": self._seq,
+                "rebuilds": self.rebuilds,
+                "updates": self.updates,
+            }
+
@@ -0,0 +1,204 @@
+"""Asynchronous, connection-pooled HTTP client for the OpenRouter API.
+
+All LLM calls in the process share one :class:`httpx.AsyncClient`, so requests
+reuse keep-alive (HTTP/2 when available) connections instead of paying a TCP +
+TLS handshake each time, and the event loop is never blocked while waiting for
+the upstream model.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, Awaitable, Dict, Optional, TypeVar
+
+import httpx
+from fastapi import Request
+
+from metrics import LLM_REQUEST_DURATION
+
+T = TypeVar("T")
+
+logger = logging.getLogger("app.llm")
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+# OpenRouter is the only upstream host, so the pool-wide limits below are
+# effectively per-host limits.
+LLM_MAX_CONNECTIONS_PER_HOST: int = int(os.getenv("LLM_MAX_CONNECTIONS_PER_HOST", "20"))
+LLM_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "10"))
+LLM_KEEPALIVE_EXPIRY: float = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+LLM_HTTP2: bool = os.getenv("LLM_HTTP2", "1").lower() not in ("0", "false", "no")
+
+# How often a pending LLM call checks whether the browser is still connected
+DISCONNECT_POLL_INTERVAL: float = 0.25
+
+
+class ClientDisconnected(Exception):
+    """Raised when the HTTP client went away while an LLM call was pending."""
+
+
+# ---------------------------------------------------------------------------
+# Client
+# ---------------------------------------------------------------------------
+
+class LLMClient:
+    """Lazily created, process-wide :class:`httpx.AsyncClient` wrapper.
+
+    The underlying client is bound to the event loop it was created on; if
+    it is used from a different loop (e.g. a new ``TestClient`` session) a
+    fresh client is created transparently.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_connections: int = LLM_MAX_CONNECTIONS_PER_HOST,
+        max_keepalive_connections: int = LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = LLM_KEEPALIVE_EXPIRY,
+        http2: bool = LLM_HTTP2,
+    ) -> None:
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            http2 = self.http2
+            if http2:
+                try:
+                    import h2  # noqa: F401  pylint: disable=import-outside-toplevel,unused-import
+                except ImportError:
+                    logger.warning("h2 is not installed, falling back to HTTP/1.1 keep-alive")
+                    http2 = False
+            self._client = httpx.AsyncClient(http2=http2, limits=self.limits)
+            self._loop = loop
+        return self._client
+
+    async def post_json(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        *,
+        headers: Dict[str, str],
+        timeout: float,
+    ) -> Dict[str, Any]:
+        """POST ``payload`` and return the decoded JSON body.
+
+        Raises
+        ------
+        httpx.HTTPStatusError
+            If the upstream answered with a 4xx/5xx status.
+        """
+
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = await self._get().post(url, json=payload, headers=headers, timeout=timeout)
+            status = str(response.status_code)
+            response.raise_for_status()
+            return response.json()
+        except httpx.TimeoutException:
+            status = "timeout"
+            raise
+        finally:
+            LLM_REQUEST_DURATION.labels("call", status).observe(time.perf_counter() - started)
+
+    async def stream_content(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        *,
+        headers: Dict[str, str],
+        timeout: float,
+    ) -> AsyncIterator[str]:
+        """POST ``payload`` with ``stream: true`` and yield content deltas.
+
+        OpenRouter answers with Server-Sent Events carrying chat completion
+        chunks; keep-alive comments are skipped and ``[DONE]`` ends the stream.
+
+        Raises
+        ------
+        httpx.HTTPStatusError
+            If the upstream answered with a 4xx/5xx status.
+        """
+
+        payload = {**payload, "stream": True}
+        started = time.perf_counter()
+        status = "error"
+        try:
+            async with self._get().stream("POST", url, json=payload, headers=headers, timeout=timeout) as response:
+                status = str(response.status_code)
+                if response.is_error:
+                    await response.aread()
+                    response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    try:
+                        chunk = json.loads(data)
+                    except ValueError:
+                        logger.debug("Skipping undecodable stream chunk: %s", data)
+                        continue
+                    choices = chunk.get("choices") or [{}]
+                    delta = (choices[0].get("delta") or {}).get("content")
+                    if delta:
+                        yield delta
+        except httpx.TimeoutException:
+            status = "timeout"
+            raise
+        finally:
+            LLM_REQUEST_DURATION.labels("stream", status).observe(time.perf_counter() - started)
+
+    async def aclose(self) -> None:
+        """Close pooled connections (called on application shutdown)."""
+
+        if self._client is not None and not self._client.is_closed:
+            if self._loop is asyncio.get_running_loop():
+                await self._client.aclose()
+        self._client = None
+        self._loop = None
+
+
+client = LLMClient()
+
+
+# ---------------------------------------------------------------------------
+# Cancellation
+# ---------------------------------------------------------------------------
+
+async def run_until_disconnected(request: Request, awaitable: Awaitable[T]) -> T:
+    """Await ``awaitable`` but cancel it as soon as ``request``'s client disconnects.
+
+    Raises
+    ------
+    ClientDisconnected
+        If the client closed the connection before the result was ready.
+    """
+
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                logger.info("Client disconnected, cancelled pending LLM call")
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
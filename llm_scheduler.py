@@ -0,0 +1,284 @@
+"""Admission control for LLM work: priorities, per-user fairness, backpressure.
+
+The free OpenRouter tier gives the whole deployment a small quota, so LLM
+calls are not fired straight from request handlers:
+
+* :meth:`LLMScheduler.admit` charges the user's token bucket once per HTTP
+  request (``LLM_USER_RATE`` per minute, bursts of ``LLM_USER_BURST``) and
+  returns a :class:`Ticket`. A user over their rate gets
+  :class:`AdmissionRejected`, which the API turns into a 429 with
+  ``Retry-After``.
+* Every upstream call then takes one of ``LLM_MAX_CONCURRENCY`` slots
+  (:meth:`LLMScheduler.slot`). Waiting calls are served strictly by
+  priority - interactive evaluations, then task generation, then background
+  work such as the task pool - and within a priority by weighted fair
+  queueing across users, so one user with many queued calls can't delay
+  somebody else's first one.
+* When the queue is ``LLM_QUEUE_MAX_DEPTH`` long, or the expected (or
+  actual) wait exceeds ``LLM_QUEUE_MAX_WAIT``, calls are rejected with 429
+  instead of piling up.
+
+Each API worker has its own scheduler, so the defaults are service-wide
+totals divided by ``WEB_CONCURRENCY``: the slots and queue are split
+between the workers, and as the kernel spreads a user's connections over
+them, each worker allows the user ``1/WEB_CONCURRENCY`` of the rate and
+burst (at least one request). Explicitly set values apply per worker.
+
+The active ticket is carried in a context variable, so helpers deep in the
+call chain (re-rolls, field fills, singleflight leaders) inherit the
+caller's user and priority; code without a ticket runs as background work.
+Single-flight followers wait on the leader's ticket, so ``call_openrouter``
+only coalesces calls made at the same priority.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from metrics import LLM_ADMISSION_REJECTED, LLM_QUEUE_WAIT
+
+logger = logging.getLogger("app.llm")
+
+# Priorities, lower is served first
+INTERACTIVE, GENERATE, BACKGROUND = 0, 1, 2
+PRIORITY_NAMES: Tuple[str, ...] = ("interactive", "generate", "background")
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+# Defaults are for the whole service and split between the API workers
+WEB_CONCURRENCY: int = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", str(max(1, 8 // WEB_CONCURRENCY))))
+LLM_QUEUE_MAX_DEPTH: int = int(os.getenv("LLM_QUEUE_MAX_DEPTH", str(max(1, 64 // WEB_CONCURRENCY))))
+LLM_QUEUE_MAX_WAIT: float = float(os.getenv("LLM_QUEUE_MAX_WAIT", "20"))  # seconds
+# LLM requests per user per minute, 0 = off
+LLM_USER_RATE: float = float(os.getenv("LLM_USER_RATE", str(12 / WEB_CONCURRENCY)))
+LLM_USER_BURST: float = float(os.getenv("LLM_USER_BURST", str(max(1.0, 6 / WEB_CONCURRENCY))))
+
+MAX_TRACKED_USERS = 10_000  # buckets / fair-queue tags kept before idle ones are pruned
+
+
+class AdmissionRejected(Exception):
+    """The caller is over its rate or the LLM queue is full; retry later."""
+
+    def __init__(self, reason: str, retry_after: float) -> None:
+        super().__init__(f"Too many LLM requests ({reason}), retry in {math.ceil(retry_after)}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class Ticket:
+    """Who an LLM call is made for; ``with ticket:`` makes it the active one."""
+
+    user: Optional[str]
+    priority: int
+    _tokens: List[contextvars.Token] = field(default_factory=list, compare=False, repr=False)
+
+    def __enter__(self) -> "Ticket":
+        self._tokens.append(_current.set(self))
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        _current.reset(self._tokens.pop())
+
+
+BACKGROUND_TICKET = Ticket(None, BACKGROUND)
+_current: contextvars.ContextVar[Ticket] = contextvars.ContextVar("llm_ticket", default=BACKGROUND_TICKET)
+
+
+def current_ticket() -> Ticket:
+    return _current.get()
+
+
+@dataclass
+class _Waiter:
+    ticket: Ticket
+    future: "asyncio.Future[None]"
+    enqueued_at: float
+    abandoned: bool = False
+
+
+class LLMScheduler:
+    """Global concurrency cap with priority + fair queueing and per-user token buckets."""
+
+    def __init__(
+        self,
+        *,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_depth: int = LLM_QUEUE_MAX_DEPTH,
+        max_wait: float = LLM_QUEUE_MAX_WAIT,
+        user_rate: float = LLM_USER_RATE,
+        user_burst: float = LLM_USER_BURST,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_depth = max_depth
+        self.max_wait = max_wait
+        self.user_rate = user_rate / 60.0  # tokens per second
+        self.user_burst = user_burst
+        self._buckets: Dict[str, Tuple[float, float]] = {}  # user -> (tokens, updated)
+        self._heap: List[Tuple[int, float, int, _Waiter]] = []
+        self._seq = itertools.count()
+        self._virtual_time = [0.0] * len(PRIORITY_NAMES)
+        self._last_finish: Dict[Tuple[int, Optional[str]], float] = {}
+        self._active = 0
+        self._queued = 0
+        self._service_time: Optional[float] = None  # EWMA seconds a slot is held
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {}
+
+    # -- admission ------------------------------------------------------------
+
+    def _reject(self, reason: str, priority: int, retry_after: float) -> AdmissionRejected:
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        LLM_ADMISSION_REJECTED.labels(PRIORITY_NAMES[priority], reason).inc()
+        return AdmissionRejected(reason, max(1.0, retry_after))
+
+    def admit(self, user: Optional[str], priority: int) -> Ticket:
+        """Charge one request to ``user``'s bucket and return its ticket.
+
+        Raises :class:`AdmissionRejected` if the user is over their rate.
+        """
+
+        if user is not None and self.user_rate > 0:
+            now = time.monotonic()
+            tokens, updated = self._buckets.get(user, (self.user_burst, now))
+            tokens = min(self.user_burst, tokens + (now - updated) * self.user_rate)
+            if tokens < 1.0:
+                self._buckets[user] = (tokens, now)
+                raise self._reject("user_rate", priority, (1.0 - tokens) / self.user_rate)
+            self._buckets[user] = (tokens - 1.0, now)
+            if len(self._buckets) > MAX_TRACKED_USERS:
+                self._prune_buckets(now)
+        self.admitted += 1
+        return Ticket(user, priority)
+
+    def _prune_buckets(self, now: float) -> None:
+        # A bucket that has refilled completely is the same as a missing one
+        full_after = self.user_burst / self.user_rate
+        self._buckets = {u: b for u, b in self._buckets.items() if now - b[1] < full_after}
+
+    # -- concurrency slots ------------------------------------------------------
+
+    def _expected_wait(self) -> Optional[float]:
+        if self._service_time is None:
+            return None
+        return (self._queued + 1) * self._service_time / self.max_concurrency
+
+    def _finish_tag(self, ticket: Ticket) -> float:
+        """Weighted fair queueing: each user's calls are spaced one unit apart in virtual time."""
+
+        key = (ticket.priority, ticket.user)
+        start = max(self._virtual_time[ticket.priority], self._last_finish.get(key, 0.0))
+        finish = start + 1.0
+        self._last_finish[key] = finish
+        if len(self._last_finish) > MAX_TRACKED_USERS:
+            self._last_finish = {
+                k: v for k, v in self._last_finish.items() if v > self._virtual_time[k[0]]
+            }
+        return finish
+
+    async def _acquire(self, ticket: Ticket) -> None:
+        if self._active < self.max_concurrency and not self._queued:
+            self._active += 1
+            LLM_QUEUE_WAIT.labels(PRIORITY_NAMES[ticket.priority]).observe(0.0)
+            return
+
+        if self._queued >= self.max_depth:
+            raise self._reject("queue_full", ticket.priority, self._expected_wait() or self.max_wait)
+        expected = self._expected_wait()
+        if expected is not None and expected > self.max_wait:
+            raise self._reject("wait_budget", ticket.priority, expected)
+
+        waiter = _Waiter(ticket, asyncio.get_running_loop().create_future(), time.monotonic())
+        heapq.heappush(self._heap, (ticket.priority, self._finish_tag(ticket), next(self._seq), waiter))
+        self._queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            if not waiter.future.done():
+                self._abandon(waiter)
+                raise self._reject("wait_timeout", ticket.priority, self._expected_wait() or self.max_wait)
+        except asyncio.CancelledError:
+            if waiter.future.done():
+                self._release()  # the slot was handed over as we were cancelled
+            else:
+                self._abandon(waiter)
+            raise
+        LLM_QUEUE_WAIT.labels(PRIORITY_NAMES[ticket.priority]).observe(time.monotonic() - waiter.enqueued_at)
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        waiter.abandoned = True  # lazily dropped from the heap
+        self._queued -= 1
+
+    def _release(self) -> None:
+        self._active -= 1
+        while self._heap:
+            priority, finish, _, waiter = heapq.heappop(self._heap)
+            if waiter.abandoned:
+                continue
+            self._queued -= 1
+            self._virtual_time[priority] = max(self._virtual_time[priority], finish - 1.0)
+            self._active += 1
+            waiter.future.set_result(None)
+            return
+
+    def try_acquire(self) -> bool:
+        """Take a slot without waiting, only if one is free and nobody is queued.
+
+        For optional extra requests (hedges) that must not delay queued
+        calls; return the slot with :meth:`release`.
+        """
+
+        if self._active < self.max_concurrency and not self._queued:
+            self._active += 1
+            return True
+        return False
+
+    def release(self) -> None:
+        """Return a slot taken with :meth:`try_acquire`."""
+
+        self._release()
+
+    @contextlib.asynccontextmanager
+    async def slot(self) -> AsyncIterator[Ticket]:
+        """Hold one upstream concurrency slot for the active ticket.
+
+        Raises :class:`AdmissionRejected` if the queue is full or the wait
+        would exceed ``max_wait``.
+        """
+
+        ticket = current_ticket()
+        await self._acquire(ticket)
+        started = time.monotonic()
+        try:
+            yield ticket
+        finally:
+            held = time.monotonic() - started
+            self._service_time = held if self._service_time is None else 0.8 * self._service_time + 0.2 * held
+            self._release()
+
+    def stats(self) -> Dict[str, object]:
+        depth = {name: 0 for name in PRIORITY_NAMES}
+        for priority, _, _, waiter in self._heap:
+            if not waiter.abandoned:
+                depth[PRIORITY_NAMES[priority]] += 1
+        return {
+            "in_flight": self._active,
+            "queue_depth": self._queued,
+            "max_concurrency": self.max_concurrency,
+            "expected_wait": round(self._expected_wait() or 0.0, 3),
+            "admitted": self.admitted,
+            "queued_by_priority": depth,
+            "rejected": dict(self.rejected),
+        }
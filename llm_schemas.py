@@ -0,0 +1,215 @@
+"""Typed shapes of the JSON objects the LLM must return.
+
+:class:`Task` and :class:`Evaluation` describe exactly the fields
+``static/script.js`` reads. They are used three ways:
+
+* as a JSON-schema ``response_format`` for models with structured-output
+  support (:func:`response_format`), so the upstream decoder cannot emit
+  anything else;
+* to validate every reply before it leaves the server (:func:`validate`);
+* to request only the fields a reply was missing (:func:`fields_model`)
+  instead of regenerating the whole object.
+"""
+from __future__ import annotations
+
+import copy
+import os
+from typing import Annotated, Any, ClassVar, Dict, FrozenSet, Iterable, List, Optional, Set, Type
+
+from pydantic import AfterValidator, BaseModel, ConfigDict, Field, ValidationError, create_model, model_validator
+
+from json_repair import RepairError
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+LLM_STRUCTURED_OUTPUT: bool = os.getenv("LLM_STRUCTURED_OUTPUT", "1").lower() not in ("0", "false", "no")
+
+# Models (or ``prefix*`` families) that accept a ``json_schema`` response_format
+STRUCTURED_OUTPUT_MODELS: List[str] = [
+    entry.strip()
+    for entry in os.getenv(
+        "LLM_STRUCTURED_OUTPUT_MODELS",
+        "openai/*,google/gemini-*,mistralai/*,qwen/qwen-2.5-*,meta-llama/llama-3.3-*",
+    ).split(",")
+    if entry.strip()
+]
+
+# Models whose provider rejected the schema at runtime (HTTP 400)
+_rejected: Set[str] = set()
+
+
+def structured_output_supported(model_name: str) -> bool:
+    """Whether requests to ``model_name`` should carry a JSON-schema response_format."""
+
+    if not LLM_STRUCTURED_OUTPUT or model_name in _rejected:
+        return False
+    for entry in STRUCTURED_OUTPUT_MODELS:
+        if entry.endswith("*") and model_name.startswith(entry[:-1]):
+            return True
+        if model_name == entry:
+            return True
+    return False
+
+
+def mark_unsupported(model_name: str) -> None:
+    """Stop sending schemas to ``model_name`` (its provider answered 400)."""
+
+    _rejected.add(model_name)
+
+
+# ---------------------------------------------------------------------------
+# Models
+# ---------------------------------------------------------------------------
+
+def _non_blank(value: str) -> str:
+    if not value.strip():
+        raise ValueError("must not be blank")
+    return value
+
+
+NonBlank = Annotated[str, AfterValidator(_non_blank)]
+
+
+class _Schema(BaseModel):
+    # Extra keys in a reply are dropped, not rejected; the schema sent
+    # upstream still forbids them (see _strict)
+    model_config = ConfigDict(populate_by_name=True, extra="ignore", coerce_numbers_to_str=True)
+
+    # Missing fields that may be requested on their own (see fields_model)
+    fillable: ClassVar[FrozenSet[str]] = frozenset()
+
+
+class TaskHints(_Schema):
+    hint1: NonBlank = Field(alias="Hint1", description="General concept")
+    hint2: NonBlank = Field(alias="Hint2", description="Solution logic")
+    hint3: NonBlank = Field(alias="Hint3", description="Partial solution or specific guidance")
+
+
+class SampleCase(_Schema):
+    input: str
+    expected_output: str
+
+
+class Task(_Schema):
+    name: NonBlank = Field(alias="Task name")
+    description: NonBlank = Field(alias="Task description")
+    sample_cases: List[SampleCase] = Field(alias="Sample input cases")
+    hints: TaskHints = Field(alias="Hints")
+
+    # Cases and hints follow from the name + description; those two can't
+    # be patched in without regenerating everything else.
+    fillable: ClassVar[FrozenSet[str]] = frozenset({"Sample input cases", "Hints", "Hint1", "Hint2", "Hint3"})
+
+
+class Evaluation(_Schema):
+    question: bool = False
+    correct: Optional[bool] = None
+    feedback: str
+
+    fillable: ClassVar[FrozenSet[str]] = frozenset({"feedback"})
+
+    @model_validator(mode="after")
+    def _verdict_required(self) -> "Evaluation":
+        if not self.question and self.correct is None:
+            raise ValueError("correct is required for a code submission")
+        return self
+
+
+# ---------------------------------------------------------------------------
+# Schemas
+# ---------------------------------------------------------------------------
+
+def _strict(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Adapt a Pydantic JSON schema to strict structured-output rules.
+
+    Every object lists all its properties as required and forbids extra
+    ones; ``default`` is not a supported keyword.
+    """
+
+    schema.pop("default", None)
+    if "properties" in schema:
+        schema["additionalProperties"] = False
+        schema["required"] = list(schema["properties"])
+        for sub in schema["properties"].values():
+            _strict(sub)
+    for sub in schema.get("$defs", {}).values():
+        _strict(sub)
+    for sub in schema.get("anyOf", []):
+        _strict(sub)
+    if isinstance(schema.get("items"), dict):
+        _strict(schema["items"])
+    return schema
+
+
+def response_format(model: Type[BaseModel]) -> Dict[str, Any]:
+    """OpenRouter ``response_format`` constraining the reply to ``model``."""
+
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": model.__name__,
+            "strict": True,
+            "schema": _strict(model.model_json_schema(by_alias=True)),
+        },
+    }
+
+
+def fields_model(model: Type[_Schema], missing: Iterable[str]) -> Optional[Type[_Schema]]:
+    """A model holding only the ``missing`` fields of ``model`` (by alias).
+
+    Names of nested fields (e.g. ``Hint2``) keep their parent object, so the
+    result has the same layout as ``model`` and can be merged into it.
+    Returns ``None`` if none of the names belong to ``model``.
+    """
+
+    missing = set(missing)
+    fields: Dict[str, Any] = {}
+    for name, field in model.model_fields.items():
+        alias = field.alias or name
+        annotation = field.annotation
+        if alias in missing:
+            fields[name] = (annotation, Field(alias=alias, description=field.description))
+        elif isinstance(annotation, type) and issubclass(annotation, _Schema):
+            nested = fields_model(annotation, missing)
+            if nested is not None:
+                fields[name] = (nested, Field(alias=alias))
+    if not fields:
+        return None
+    return create_model(f"{model.__name__}Fields", __base__=_Schema, **fields)
+
+
+def can_fill(model: Type[_Schema], error: RepairError) -> bool:
+    """Whether ``error`` is worth a follow-up request for its missing fields only."""
+
+    return bool(error.partial) and bool(error.missing) and set(error.missing) <= model.fillable
+
+
+def merge(partial: Dict[str, Any], patch: Dict[str, Any]) -> Dict[str, Any]:
+    """Deep-merge the fields in ``patch`` into a copy of ``partial``."""
+
+    merged = copy.deepcopy(partial)
+    for key, value in patch.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def validate(model: Type[_Schema], obj: Any) -> Dict[str, Any]:
+    """Validate ``obj`` against ``model`` and return it in canonical form.
+
+    Raises
+    ------
+    RepairError
+        With the aliases of the offending fields in ``missing``.
+    """
+
+    try:
+        return model.model_validate(obj).model_dump(by_alias=True, exclude_none=True)
+    except ValidationError as exc:
+        missing = list(dict.fromkeys(str(err["loc"][-1]) for err in exc.errors() if err["loc"]))
+        partial = obj if isinstance(obj, dict) else {}
+        raise RepairError(f"{model.__name__} does not match the schema: {exc}", missing, partial) from exc
@@ -0,0 +1,202 @@
+"""Local stand-in for the OpenRouter chat completions API.
+
+Answers ``POST /api/v1/chat/completions`` (plain and ``stream: true``) with
+canned tasks and verdicts after a configurable latency, and injects upstream
+failures at configurable rates:
+
+* ``--error-rate`` - HTTP 500;
+* ``--rate-limit-rate`` - HTTP 429 with ``Retry-After``;
+* ``--malformed-rate`` - a 200 whose content is broken JSON (half of them
+  truncated, half Python-style quoting the repair step can fix).
+
+Point the app at it with ``OPENROUTER_API_URL``::
+
+    python -m loadtest.fake_openrouter --port 8010 --latency-ms 150 --jitter 0.5
+    OPENROUTER_API_URL=http://127.0.0.1:8010/api/v1/chat/completions \\
+        OPENROUTER_API_KEY=fake uvicorn main:app --port 8005
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncIterator, Dict, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+LATENCY_DISTRIBUTIONS = ("lognormal", "uniform", "fixed")
+
+
+@dataclass
+class FakeConfig:
+    """Latency and failure injection settings."""
+
+    latency_ms: float = 150.0     # median (lognormal), midpoint (uniform) or constant (fixed)
+    jitter: float = 0.5           # lognormal sigma / uniform half-width as a fraction of latency_ms
+    distribution: str = "lognormal"
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    malformed_rate: float = 0.0
+    retry_after: float = 1.0      # seconds, sent with 429s
+    stream_chunk: int = 24        # characters per streamed delta
+    seed: Optional[int] = None
+
+    def latency(self, rng: random.Random) -> float:
+        """Draw one response delay in seconds."""
+
+        base = self.latency_ms / 1000
+        if self.distribution == "fixed" or self.jitter <= 0:
+            return base
+        if self.distribution == "uniform":
+            return max(0.0, rng.uniform(base * (1 - self.jitter), base * (1 + self.jitter)))
+        return rng.lognormvariate(0.0, self.jitter) * base
+
+
+# ---------------------------------------------------------------------------
+# Canned replies
+# ---------------------------------------------------------------------------
+
+_TASK_RE = re.compile(r"task on '(?P<topic>.*?)' with '(?P<difficulty>.*?)' difficulty")
+
+
+def _task(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    match = _TASK_RE.search(prompt)
+    topic, difficulty = match.groups() if match else ("python", "beginner")
+    a, b = rng.randint(1, 99), rng.randint(1, 99)
+    return {
+        "Task name": f"{topic.title()} warm-up ({difficulty})",
+        "Task description": f"Read two integers separated by a space and print their sum. Topic: {topic}.",
+        "Sample input cases": [
+            {"input": f"{a} {b}", "expected_output": str(a + b)},
+            {"input": "0 0", "expected_output": "0"},
+        ],
+        "Hints": {
+            "Hint1": "Read the whole line with input().",
+            "Hint2": "Split the line and convert both parts to int.",
+            "Hint3": "print(sum(map(int, input().split())))",
+        },
+    }
+
+
+def _evaluation(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    message = prompt.split("User message:", 1)[-1].split("Check if the user message", 1)[0]
+    if message.strip().endswith("?"):
+        return {"question": True, "feedback": "Read both numbers from one line of input."}
+    correct = rng.random() < 0.6
+    return {
+        "question": False,
+        "correct": correct,
+        "feedback": "Great job!" if correct else "The output does not match the expected sum.",
+    }
+
+
+def reply_for(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    """Return a plausible JSON object for a task, evaluation or field-fill prompt."""
+
+    if "Create one Python programming task" in prompt:
+        return _task(prompt, rng)
+    return _evaluation(prompt, rng)
+
+
+def _malformed(content: str, rng: random.Random) -> str:
+    if rng.random() < 0.5:
+        return content[: max(1, len(content) * 2 // 3)]  # cut off mid-reply
+    return content.replace('"', "'").replace("true", "True").replace("false", "False")
+
+
+# ---------------------------------------------------------------------------
+# App
+# ---------------------------------------------------------------------------
+
+def create_app(config: FakeConfig) -> FastAPI:
+    app = FastAPI(title="Fake OpenRouter")
+    rng = random.Random(config.seed)
+    counts: Counter = Counter()
+
+    @app.post("/api/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        await asyncio.sleep(config.latency(rng))
+
+        roll = rng.random()
+        if roll < config.error_rate:
+            counts["error"] += 1
+            return JSONResponse({"error": {"message": "Injected upstream error", "code": 500}}, status_code=500)
+        if roll < config.error_rate + config.rate_limit_rate:
+            counts["rate_limited"] += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit exceeded", "code": 429}},
+                status_code=429,
+                headers={"Retry-After": f"{config.retry_after:g}"},
+            )
+
+        content = json.dumps(reply_for(prompt, rng), ensure_ascii=False)
+        if rng.random() < config.malformed_rate:
+            counts["malformed"] += 1
+            content = _malformed(content, rng)
+        else:
+            counts["ok"] += 1
+
+        model = body.get("model", "fake/model")
+        if not body.get("stream"):
+            return {
+                "id": f"fake-{time.time_ns()}",
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            }
+
+        async def events() -> AsyncIterator[str]:
+            yield ": OPENROUTER PROCESSING\n\n"
+            for i in range(0, len(content), config.stream_chunk):
+                chunk = {"model": model, "choices": [{"index": 0, "delta": {"content": content[i:i + config.stream_chunk]}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(0)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    async def stats():
+        return {"config": asdict(config), "responses": dict(counts)}
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--latency-ms", type=float, default=FakeConfig.latency_ms)
+    parser.add_argument("--jitter", type=float, default=FakeConfig.jitter)
+    parser.add_argument("--distribution", choices=LATENCY_DISTRIBUTIONS, default=FakeConfig.distribution)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=FakeConfig.retry_after)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    import uvicorn  # pylint: disable=import-outside-toplevel
+
+    config = FakeConfig(
+        latency_ms=args.latency_ms,
+        jitter=args.jitter,
+        distribution=args.distribution,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        malformed_rate=args.malformed_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+"""Open-loop load generator with a per-endpoint latency report and SLO gate.
+
+Replays a weighted mix of signup, login, get_syllabus, generate_task and
+submit_code at a target rate (Poisson arrivals, so a slow server does not
+slow the offered load down), then prints p50/p90/p95/p99 per endpoint and
+exits with status 1 if the SLO is breached:
+
+* overall p95 above ``--slo-p95-ms`` (default 300 ms, the performance
+  scenario in docs/quality-attributes);
+* any ``--endpoint-slo NAME=MS`` p95 limit;
+* error rate above ``--max-error-rate``;
+* any endpoint p95 worse than ``--baseline`` by more than ``--max-regression``.
+
+Against a running app::
+
+    python -m loadtest.loadgen --url http://127.0.0.1:8005 --rps 20 --duration 60
+
+Or start the fake OpenRouter and the app (on a throw-away database and
+syllabus file) first::
+
+    python -m loadtest.loadgen --spawn --rps 20 --duration 60 --output report.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Weights of the default mix: page loads dominate, account actions are rare
+DEFAULT_MIX: Dict[str, float] = {
+    "get_syllabus": 40,
+    "generate_task": 20,
+    "submit_code": 25,
+    "login": 10,
+    "signup": 5,
+}
+TOPICS: Tuple[str, ...] = ("loops", "strings", "recursion", "lists", "dictionaries")
+DIFFICULTIES: Tuple[str, ...] = ("beginner", "medium", "hard")
+PASSWORD = "load-test-password"
+
+TASK = json.dumps({
+    "Task name": "Sum two numbers",
+    "Task description": "Read two integers separated by a space and print their sum.",
+    "Sample input cases": [{"input": "2 3", "expected_output": "5"}, {"input": "0 0", "expected_output": "0"}],
+    "Hints": {"Hint1": "input()", "Hint2": "split()", "Hint3": "int()"},
+})
+SUBMISSIONS: Tuple[str, ...] = (
+    "print(sum(map(int, input().split())))",          # correct
+    "a, b = input().split()\nprint(a + b)",            # wrong, rejected by the sandbox
+    "def add(a, b):\n    return a + b",                 # no stdin: goes to the LLM
+    "Should the numbers be on one line?",             # a question
+)
+
+
+# ---------------------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Sample:
+    endpoint: str
+    latency: float  # seconds
+    ok: bool
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of sorted ``values``."""
+
+    if not values:
+        return 0.0
+    rank = max(1, min(len(values), int(-(-pct * len(values) // 100))))
+    return values[rank - 1]
+
+
+def _summary(samples: List[Sample], duration: float) -> Dict[str, Any]:
+    latencies = sorted(s.latency * 1000 for s in samples)
+    errors = sum(1 for s in samples if not s.ok)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "rps": round(len(samples) / duration, 2) if duration else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p90_ms": round(percentile(latencies, 90), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "max_ms": round(latencies[-1], 1) if latencies else 0.0,
+    }
+
+
+def summarize(samples: List[Sample], duration: float) -> Dict[str, Any]:
+    """Build the report: overall and per-endpoint latency percentiles."""
+
+    endpoints: Dict[str, List[Sample]] = {}
+    for sample in samples:
+        endpoints.setdefault(sample.endpoint, []).append(sample)
+    return {
+        "duration_s": round(duration, 2),
+        "overall": _summary(samples, duration),
+        "endpoints": {name: _summary(group, duration) for name, group in sorted(endpoints.items())},
+    }
+
+
+@dataclass
+class SLO:
+    p95_ms: float = 300.0
+    endpoint_p95_ms: Dict[str, float] = field(default_factory=dict)
+    max_error_rate: float = 0.01
+    baseline: Optional[Dict[str, Any]] = None
+    max_regression: float = 0.2  # allowed relative p95 growth over the baseline
+
+
+def check_slo(report: Dict[str, Any], slo: SLO) -> List[str]:
+    """Return human-readable SLO violations (empty when the run passes)."""
+
+    violations = []
+    overall = report["overall"]
+    if overall["p95_ms"] > slo.p95_ms:
+        violations.append(f"overall p95 {overall['p95_ms']} ms > {slo.p95_ms:g} ms")
+    if overall["error_rate"] > slo.max_error_rate:
+        violations.append(f"error rate {overall['error_rate']:.2%} > {slo.max_error_rate:.2%}")
+    for name, limit in slo.endpoint_p95_ms.items():
+        stats = report["endpoints"].get(name)
+        if stats and stats["p95_ms"] > limit:
+            violations.append(f"{name} p95 {stats['p95_ms']} ms > {limit:g} ms")
+    if slo.baseline:
+        for name, stats in report["endpoints"].items():
+            before = slo.baseline.get("endpoints", {}).get(name)
+            if before and before["p95_ms"] > 0 and stats["p95_ms"] > before["p95_ms"] * (1 + slo.max_regression):
+                violations.append(
+                    f"{name} p95 regressed {before['p95_ms']} -> {stats['p95_ms']} ms "
+                    f"(> {slo.max_regression:.0%})"
+                )
+    return violations
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    columns = ("requests", "errors", "rps", "p50_ms", "p90_ms", "p95_ms", "p99_ms", "max_ms")
+    print(f"{'endpoint':<15}" + "".join(f"{c:>10}" for c in columns))
+    rows = list(report["endpoints"].items()) + [("overall", report["overall"])]
+    for name, stats in rows:
+        print(f"{name:<15}" + "".join(f"{stats[c]:>10}" for c in columns))
+
+
+# ---------------------------------------------------------------------------
+# Workload
+# ---------------------------------------------------------------------------
+
+class Workload:
+    """Issues one request of each kind against ``client``'s base URL."""
+
+    def __init__(self, client: httpx.AsyncClient, rng: random.Random) -> None:
+        self.client = client
+        self.rng = rng
+        self.run_id = uuid.uuid4().hex[:8]
+        self.users: List[str] = []
+        self.syllabus_etag = ""
+        self._signups = 0
+
+    def _new_login(self) -> str:
+        self._signups += 1
+        return f"lt{self.run_id}n{self._signups}"
+
+    async def setup(self, users: int) -> None:
+        """Seed the syllabus and the accounts used by ``login`` (not measured)."""
+
+        response = await self.client.post("/save_syllabus", json={"topics": list(TOPICS)})
+        response.raise_for_status()
+        for _ in range(users):
+            await self.signup()
+
+    async def signup(self) -> httpx.Response:
+        login = self._new_login()
+        response = await self.client.post(
+            "/signup",
+            json={"email": f"{login}@innopolis.university", "login": login, "password": PASSWORD},
+        )
+        if response.status_code == 200:
+            self.users.append(login)
+        return response
+
+    async def login(self) -> httpx.Response:
+        if not self.users:
+            return await self.signup()
+        return await self.client.post("/login", json={"identifier": self.rng.choice(self.users), "password": PASSWORD})
+
+    async def get_syllabus(self) -> httpx.Response:
+        # Browsers revalidate with the ETag they already hold
+        headers = {"If-None-Match": self.syllabus_etag} if self.syllabus_etag else {}
+        response = await self.client.get("/get_syllabus", headers=headers)
+        self.syllabus_etag = response.headers.get("etag", self.syllabus_etag)
+        return response
+
+    async def generate_task(self) -> httpx.Response:
+        params = {"topic": self.rng.choice(TOPICS), "difficulty": self.rng.choice(DIFFICULTIES)}
+        return await self.client.get("/generate_task", params=params)
+
+    async def submit_code(self) -> httpx.Response:
+        return await self.client.post("/submit_code", json={"task": TASK, "code": self.rng.choice(SUBMISSIONS)})
+
+
+async def _timed(workload: Workload, endpoint: str, samples: List[Sample]) -> None:
+    started = time.perf_counter()
+    try:
+        response = await getattr(workload, endpoint)()
+        ok = response.status_code < 400
+    except httpx.HTTPError:
+        ok = False
+    samples.append(Sample(endpoint, time.perf_counter() - started, ok))
+
+
+async def run_load(
+    url: str,
+    *,
+    rps: float,
+    duration: float,
+    mix: Dict[str, float] = DEFAULT_MIX,
+    users: int = 20,
+    seed: Optional[int] = None,
+    timeout: float = 30.0,
+) -> Dict[str, Any]:
+    """Offer ``rps`` requests/s for ``duration`` seconds and return the report."""
+
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    limits = httpx.Limits(max_connections=1000, max_keepalive_connections=200)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        workload = Workload(client, rng)
+        await workload.setup(users)
+
+        samples: List[Sample] = []
+        pending = []
+        started = time.perf_counter()
+        next_at = started
+        while next_at < started + duration:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            endpoint = rng.choices(names, weights)[0]
+            pending.append(asyncio.ensure_future(_timed(workload, endpoint, samples)))
+            next_at += rng.expovariate(rps)
+        await asyncio.gather(*pending)
+        return summarize(samples, time.perf_counter() - started)
+
+
+# ---------------------------------------------------------------------------
+# Spawned servers
+# ---------------------------------------------------------------------------
+
+def _wait_ready(url: str, process: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{process.args} exited with {process.returncode}")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout:g}s")
+
+
+@contextlib.contextmanager
+def spawn(app_port: int, fake_port: int, fake_args: List[str], workers: int = 1) -> Iterator[str]:
+    """Start the fake OpenRouter and the app with ``workers`` processes; yields the app's base URL."""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "OPENROUTER_API_URL": f"http://127.0.0.1:{fake_port}/api/v1/chat/completions",
+            "OPENROUTER_API_KEY": "loadtest",
+            "DATABASE_PATH": os.path.join(tmp, "users.db"),
+            "SYLLABUS_FILE": os.path.join(tmp, "syllabus.json"),
+            # All simulated users share one address; don't rate-limit them as one user
+            "LLM_USER_RATE": "0",
+        }
+        processes = []
+        try:
+            fake = subprocess.Popen(
+                [sys.executable, "-m", "loadtest.fake_openrouter", "--port", str(fake_port), *fake_args],
+                cwd=ROOT, env=env,
+            )
+            processes.append(fake)
+            _wait_ready(f"http://127.0.0.1:{fake_port}/stats", fake)
+            app = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--port", str(app_port), "--workers", str(workers),
+                 "--log-level", "warning"],
+                cwd=ROOT, env={**env, "WEB_CONCURRENCY": str(workers)},
+            )
+            processes.append(app)
+            url = f"http://127.0.0.1:{app_port}"
+            _wait_ready(f"{url}/get_syllabus", app)
+            yield url
+        finally:
+            for process in reversed(processes):
+                process.terminate()
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def _pairs(values: List[str], option: str) -> Dict[str, float]:
+    pairs = {}
+    for value in values:
+        name, sep, number = value.partition("=")
+        if not sep:
+            raise SystemExit(f"{option} expects NAME=VALUE, got {value!r}")
+        pairs[name] = float(number)
+    return pairs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8005")
+    parser.add_argument("--rps", type=float, default=20.0)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of measured load")
+    parser.add_argument("--users", type=int, default=20, help="accounts created before the run for logins")
+    parser.add_argument("--mix", action="append", default=[], metavar="ENDPOINT=WEIGHT")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--slo-p95-ms", type=float, default=300.0)
+    parser.add_argument("--endpoint-slo", action="append", default=[], metavar="ENDPOINT=MS")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--baseline", help="earlier --output report to compare p95s against")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--spawn", action="store_true", help="start the fake OpenRouter and the app first")
+    parser.add_argument("--app-port", type=int, default=8015)
+    parser.add_argument("--fake-port", type=int, default=8010)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for --spawn")
+    parser.add_argument("--fake-arg", action="append", default=[], metavar="ARG",
+                        help="passed through to fake_openrouter, e.g. --fake-arg=--malformed-rate=0.05")
+    args = parser.parse_args()
+
+    mix = {**DEFAULT_MIX, **_pairs(args.mix, "--mix")} if args.mix else DEFAULT_MIX
+    unknown = set(mix) - set(DEFAULT_MIX)
+    if unknown:
+        raise SystemExit(f"unknown endpoints in --mix: {', '.join(sorted(unknown))}")
+    slo = SLO(
+        p95_ms=args.slo_p95_ms,
+        endpoint_p95_ms=_pairs(args.endpoint_slo, "--endpoint-slo"),
+        max_error_rate=args.max_error_rate,
+        max_regression=args.max_regression,
+    )
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            slo.baseline = json.load(f)
+
+    def run(url: str) -> Dict[str, Any]:
+        return asyncio.run(run_load(url, rps=args.rps, duration=args.duration, mix=mix, users=args.users, seed=args.seed))
+
+    if args.spawn:
+        with spawn(args.app_port, args.fake_port, args.fake_arg, args.workers) as url:
+            report = run(url)
+    else:
+        report = run(args.url)
+
+    violations = check_slo(report, slo)
+    report["slo"] = {"p95_ms": slo.p95_ms, "violations": violations}
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if violations:
+        print("\nSLO FAILED:\n  " + "\n  ".join(violations))
+        sys.exit(1)
+    print("\nSLO passed")
+
+
+if __name__ == "__main__":
+    main()
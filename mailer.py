@@ -0,0 +1,312 @@
+"""Outbound mail queue with persistent SMTP sessions.
+
+Messages are enqueued with :meth:`Mailer.send`, which returns immediately.
+A few worker threads each keep one authenticated SMTP session open (STARTTLS
+and login happen once per session, not per message), drain the queue in
+batches, retry transient failures with exponential backoff and respect a
+shared per-minute send cap.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import smtplib
+import threading
+import time
+from dataclasses import dataclass
+from email.message import Message
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger("app.mailer")
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+MAIL_WORKERS: int = int(os.getenv("MAIL_WORKERS", "2"))                 # persistent SMTP sessions
+MAIL_BATCH_SIZE: int = int(os.getenv("MAIL_BATCH_SIZE", "50"))          # messages per session turn
+MAIL_MAX_PER_MINUTE: int = int(os.getenv("MAIL_MAX_PER_MINUTE", "600"))  # 0 disables the cap
+MAIL_MAX_ATTEMPTS: int = int(os.getenv("MAIL_MAX_ATTEMPTS", "4"))
+MAIL_RETRY_BASE_DELAY: float = float(os.getenv("MAIL_RETRY_BASE_DELAY", "2"))
+MAIL_SESSION_IDLE: float = float(os.getenv("MAIL_SESSION_IDLE", "60"))  # close idle sessions after
+SMTP_TIMEOUT: float = 30.0
+
+# Errors after which the session is discarded and the message retried
+_TRANSIENT_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, OSError)
+
+
+@dataclass
+class OutgoingMail:
+    to: str
+    message: Message
+    attempts: int = 0
+
+
+class _RateLimiter:
+    """Token bucket allowing ``per_minute`` sends per minute across threads."""
+
+    def __init__(self, per_minute: int) -> None:
+        self.per_minute = per_minute
+        self._tokens = float(per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.per_minute <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    float(self.per_minute), self._tokens + (now - self._updated) * self.per_minute / 60
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) * 60 / self.per_minute
+            time.sleep(wait)
+
+
+class Mailer:
+    """Queue + pool of persistent SMTP sessions.
+
+    Parameters
+    ----------
+    host, port, username, password, from_email:
+        SMTP settings; default to the ``SMTP_*`` / ``FROM_EMAIL`` env vars.
+    starttls:
+        Upgrade each session with STARTTLS (``SMTP_STARTTLS``, on by default).
+    smtp_factory:
+        Creates a session, ``smtplib.SMTP`` by default.
+    """
+
+    def __init__(
+        self,
+        *,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        from_email: Optional[str] = None,
+        starttls: Optional[bool] = None,
+        workers: int = MAIL_WORKERS,
+        batch_size: int = MAIL_BATCH_SIZE,
+        max_per_minute: int = MAIL_MAX_PER_MINUTE,
+        max_attempts: int = MAIL_MAX_ATTEMPTS,
+        retry_base_delay: float = MAIL_RETRY_BASE_DELAY,
+        session_idle: float = MAIL_SESSION_IDLE,
+        smtp_factory: Callable[..., smtplib.SMTP] = smtplib.SMTP,
+    ) -> None:
+        self.host = host or os.getenv("SMTP_HOST", "smtp.gmail.com")
+        self.port = port or int(os.getenv("SMTP_PORT", "587"))
+        self.username = username if username is not None else os.getenv("SMTP_USERNAME")
+        self.password = password if password is not None else os.getenv("SMTP_PASSWORD")
+        self.from_email = from_email or os.getenv("FROM_EMAIL", self.username)
+        if starttls is None:
+            starttls = os.getenv("SMTP_STARTTLS", "1").lower() not in ("0", "false", "no")
+        self.starttls = starttls
+        self.workers = workers
+        self.batch_size = max(1, batch_size)
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.session_idle = session_idle
+        self._smtp_factory = smtp_factory
+        self._rate = _RateLimiter(max_per_minute)
+
+        self._queue: "queue.Queue[Optional[OutgoingMail]]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._timers: List[threading.Timer] = []
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+        self._stopping = False
+
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.sessions_opened = 0
+        self.batches = 0
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def send(self, to: str, message: Message) -> None:
+        """Enqueue ``message`` for ``to``; delivery happens in the background."""
+
+        if "From" not in message and self.from_email:
+            message["From"] = self.from_email
+        if "To" not in message:
+            message["To"] = to
+        with self._lock:
+            self._pending += 1
+        self._ensure_started()
+        self._queue.put(OutgoingMail(to, message))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued message was sent or given up on."""
+
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Deliver what is queued (up to ``timeout``) and close all sessions."""
+
+        self.flush(timeout)
+        with self._lock:
+            self._stopping = True
+            threads, self._threads = self._threads, []
+            timers, self._timers = self._timers, []
+        for timer in timers:
+            timer.cancel()
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join(timeout)
+        with self._lock:
+            self._stopping = False
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "pending": self._pending,
+                "sent": self.sent,
+                "failed": self.failed,
+                "retried": self.retried,
+                "sessions_opened": self.sessions_opened,
+                "batches": self.batches,
+            }
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._threads or self._stopping:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"mailer-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _open_session(self) -> smtplib.SMTP:
+        session = self._smtp_factory(self.host, self.port, timeout=SMTP_TIMEOUT)
+        try:
+            if self.starttls:
+                session.starttls()
+            if self.username and self.password:
+                session.login(self.username, self.password)
+        except Exception:
+            self._close_session(session)
+            raise
+        with self._lock:
+            self.sessions_opened += 1
+        return session
+
+    @staticmethod
+    def _close_session(session: Optional[smtplib.SMTP]) -> None:
+        if session is None:
+            return
+        try:
+            session.quit()
+        except Exception:  # pylint: disable=broad-except
+            session.close()
+
+    def _next_batch(self) -> Optional[List[OutgoingMail]]:
+        """Wait for work and return up to ``batch_size`` messages.
+
+        Returns ``[]`` after ``session_idle`` seconds without mail and
+        ``None`` when the worker should exit.
+        """
+
+        try:
+            first = self._queue.get(timeout=self.session_idle)
+        except queue.Empty:
+            return []
+        if first is None:
+            return None
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # leave the stop signal for this worker's next turn
+                break
+            batch.append(item)
+        return batch
+
+    def _worker(self) -> None:
+        session: Optional[smtplib.SMTP] = None
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                break
+            if not batch:
+                self._close_session(session)  # idle: don't hold the server's connection
+                session = None
+                continue
+            with self._lock:
+                self.batches += 1
+            for mail in batch:
+                session = self._deliver(session, mail)
+        self._close_session(session)
+
+    def _deliver(self, session: Optional[smtplib.SMTP], mail: OutgoingMail) -> Optional[smtplib.SMTP]:
+        self._rate.acquire()
+        mail.attempts += 1
+        try:
+            if session is None:
+                session = self._open_session()
+            session.sendmail(self.from_email, [mail.to], mail.message.as_string())
+        except smtplib.SMTPRecipientsRefused as exc:
+            self._give_up(mail, exc)
+        except smtplib.SMTPResponseException as exc:
+            if exc.smtp_code >= 500:
+                self._give_up(mail, exc)
+            else:
+                self._close_session(session)
+                session = None
+                self._retry(mail, exc)
+        except _TRANSIENT_ERRORS as exc:
+            self._close_session(session)
+            session = None
+            self._retry(mail, exc)
+        else:
+            self._done(sent=True)
+        return session
+
+    def _retry(self, mail: OutgoingMail, exc: Exception) -> None:
+        if mail.attempts >= self.max_attempts:
+            self._give_up(mail, exc)
+            return
+        delay = self.retry_base_delay * 2 ** (mail.attempts - 1)
+        logger.warning("Sending to %s failed (%s), retrying in %.1fs", mail.to, exc, delay)
+        timer = threading.Timer(delay, self._queue.put, (mail,))
+        timer.daemon = True
+        with self._lock:
+            self.retried += 1
+            self._timers = [t for t in self._timers if t.is_alive()] + [timer]
+        timer.start()
+
+    def _give_up(self, mail: OutgoingMail, exc: Exception) -> None:
+        logger.error("Failed to send email to %s: %s", mail.to, exc)
+        self._done(sent=False)
+
+    def _done(self, *, sent: bool) -> None:
+        with self._lock:
+            if sent:
+                self.sent += 1
+            else:
+                self.failed += 1
+            self._pending -= 1
+            if self._pending == 0:
+                self._idle.notify_all()
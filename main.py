@@ -5,39 +5,78 @@ split into modules later (api, llm, storage, utils, etc.).
 from __future__ import annotations
 
 import sqlite3
-import bcrypt
 from pydantic import EmailStr
 from database import get_notification_settings, update_notification_settings
 
-from database import init_db
+import database
+from database import init_db, get_signup_conflict, create_user, get_user_for_login
+from storage import get_storage
 
 import asyncio
+import hashlib
+import ipaddress
 import json
 import logging
+import math
 import os
-import re
-from json import JSONDecodeError
+import time
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Type
 
-import requests
+import httpx
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException, Request, Depends
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
-from jwt_utils import create_user_token, get_current_user
-import smtplib
+from jwt_utils import create_user_token, get_current_user, revoke_token, security, token_cache, verify_token
+from llm_client import ClientDisconnected, client as llm_client, run_until_disconnected
+from task_pool import TaskPool
+from task_registry import TaskRecord, TaskRegistry, task_id_for
+from task_dedup import TASK_DEDUP_ENABLED, TASK_DEDUP_MAX_REROLLS, TaskIndex
+from leaderboard import LEADERBOARD_MAX_LIMIT, LEADERBOARD_MAX_RADIUS, Leaderboard
+from submissions import HISTORY_MAX_PAGE_SIZE, HISTORY_PAGE_SIZE, Submission, SubmissionWriter, decode_cursor, encode_cursor
+from eval_cache import EvaluationCache
+from singleflight import SingleFlight
+from json_stream import JsonFieldStream
+from syllabus_store import Snapshot, SyllabusStore
+import static_assets
+from static_assets import etag_matches
+from json_repair import RepairError, parse_task, repair_json
+import llm_schemas
+from model_router import LLM_MODELS, LLM_MODELS_BY_DIFFICULTY, ModelRouter
+from llm_scheduler import GENERATE, INTERACTIVE, PRIORITY_NAMES, AdmissionRejected, LLMScheduler, Ticket, current_ticket
+from circuit_breaker import RETRY_MAX_DELAY, CircuitBreaker, CircuitOpen, RetryBudget, backoff, is_retryable, retry_after_seconds
+from sandbox import SANDBOX_ENABLED, SandboxPool, local_verdict
+import executors
+from executors import check_password, cpu_executor, db_executor, hash_password
 from email.mime.text import MIMEText
+from mailer import Mailer
+import metrics
+from metrics import LLM_FIELD_FILLS, LLM_JSON_REPAIRS, LLM_PARSE_FAILURES, LLM_RETRIES, LLM_UPSTREAM_RETRIES, SCHEDULER_JOB_DURATION, SCHEDULER_JOB_LAG, SCHEDULER_JOB_MISSED
+from apscheduler.events import EVENT_JOB_MISSED, EVENT_JOB_SUBMITTED
 from apscheduler.schedulers.background import BackgroundScheduler
-from database import get_users_with_notifications_enabled, update_last_notification_date
+from database import claim_notification, get_users_with_notifications_enabled, update_last_notification_date
+from coordination import LEADER_LEASE_TTL, GenerationWatcher, LeaderLease
 import atexit
 
+# Every worker runs the scheduler, but only the lease holder executes jobs
+scheduler_lease = LeaderLease("scheduler")
+
 def scheduled_notifications_job():
+    if not scheduler_lease.is_leader():
+        return
+    started = time.perf_counter()
     users = get_users_with_notifications_enabled()
     for user_id, email, login in users:
-        send_email_notification(email, login)
+        # The ledger makes a send idempotent across lease hand-overs; a lost
+        # claim means today's mail already went out, so only reschedule
+        if claim_notification(user_id):
+            send_email_notification(email, login)
         update_last_notification_date(user_id)
+    SCHEDULER_JOB_DURATION.labels("notifications").observe(time.perf_counter() - started)
 
 # ---------------------------------------------------------------------------
 # Configuration & constants
@@ -45,19 +84,27 @@ def scheduled_notifications_job():
 
 load_dotenv()
 
-API_URL: str = "https://openrouter.ai/api/v1/chat/completions"
-MODEL_NAME: str = "deepseek/deepseek-r1-0528-qwen3-8b:free"
+# Overridable so load tests can target a local stand-in (loadtest/fake_openrouter.py)
+API_URL: str = os.getenv("OPENROUTER_API_URL", "https://openrouter.ai/api/v1/chat/completions")
+MODEL_NAME: str = "deepseek/deepseek-r1-0528-qwen3-8b:free"  # used unless LLM_MODELS is set
 
 # Retry / timeout parameters
 MAX_RETRIES: int = 5       # attempts for both task generation & evaluation
 MAX_ATTEMPTS: int = 5      # attempts for reparsing LLM evaluation output
-BASE_DELAY: float = 0.5    # seconds between evaluation retries
+BASE_DELAY: float = 0.5    # base of the jittered exponential backoff between re-rolls
 REQUEST_TIMEOUT: int = 30  # seconds for the HTTP call to OpenRouter
 
+# Reverse proxies (IPs or CIDRs, comma-separated) whose X-Real-IP header is
+# trusted; requests from anywhere else are keyed on their own address
+TRUSTED_PROXIES = [
+    ipaddress.ip_network(entry.strip(), strict=False)
+    for entry in os.getenv("TRUSTED_PROXIES", "").split(",")
+    if entry.strip()
+]
+
 # Files & dirs
 BASE_DIR: Path = Path(__file__).parent
-SYLLABUS_FILE: Path = BASE_DIR / "syllabus.json"
-DB_PATH = str(BASE_DIR / "users.db")
+SYLLABUS_FILE: Path = Path(os.getenv("SYLLABUS_FILE", str(BASE_DIR / "syllabus.json")))
 
 # Logging
 logger = logging.getLogger("app")
@@ -76,64 +123,331 @@ def _get_api_key() -> str:
     return key
 
 
-def call_openrouter(prompt: str, *, timeout: int = REQUEST_TIMEOUT) -> Dict[str, Any]:
-    """Send a single prompt to OpenRouter and return the raw JSON response."""
+def _openrouter_request(
+    prompt: str, schema: Optional[Type[BaseModel]] = None, model: Optional[str] = None
+) -> Tuple[Dict[str, str], Dict[str, Any]]:
+    """Return ``(headers, payload)`` for a single-prompt chat completion to ``model``.
 
+    With ``schema`` and a model that supports structured output, the reply
+    is constrained to it and OpenRouter only routes to providers honouring
+    the ``response_format``.
+    """
+
+    model = model or MODEL_NAME
     headers = {
         "Authorization": f"Bearer {_get_api_key()}",
         "Content-Type": "application/json",
     }
-    payload = {
-        "model": MODEL_NAME,
+    payload: Dict[str, Any] = {
+        "model": model,
         "messages": [{"role": "user", "content": prompt}],
     }
-    response = requests.post(API_URL, json=payload, headers=headers, timeout=timeout)
-    response.raise_for_status()
-    return response.json()
+    if schema is not None and llm_schemas.structured_output_supported(model):
+        payload["response_format"] = llm_schemas.response_format(schema)
+        payload["provider"] = {"require_parameters": True}
+    return headers, payload
 
 
-def extract_json_from_llm(text: str) -> Dict[str, Any]:
-    """Extract the *first* JSON object from an LLM reply.
+def _schema_rejected(payload: Dict[str, Any], exc: httpx.HTTPStatusError) -> bool:
+    """If the provider refused our ``response_format``, stop sending it for this model."""
 
-    Steps:
-    1. Remove optional markdown fences ```json ... ```
-    2. Take everything between the *first* "{" and the *last* "}".
-    3. Parse it with :pyfunc:`json.loads` and return a ``dict``.
+    if "response_format" not in payload or exc.response.status_code != 400:
+        return False
+    logger.warning("%s rejected the JSON schema, falling back to prompt-only JSON", payload["model"])
+    llm_schemas.mark_unsupported(payload["model"])
+    del payload["response_format"], payload["provider"]
+    return True
 
-    Raises
-    ------
-    ValueError
-        If no JSON block can be detected or the content is empty.
-    JSONDecodeError
-        If the extracted substring is not a valid JSON document.
+
+llm_flight: SingleFlight[Dict[str, Any]] = SingleFlight()
+model_router = ModelRouter(
+    LLM_MODELS, LLM_MODELS_BY_DIFFICULTY, default=lambda: MODEL_NAME, hedge_gate=lambda: _reserve_hedge(),
+)
+llm_breaker = CircuitBreaker("openrouter", on_open=lambda until: _share_breaker_open(until))
+retry_budget = RetryBudget()
+llm_scheduler = LLMScheduler()
+
+
+def _reserve_hedge() -> Optional[Callable[[], None]]:
+    """Let :data:`model_router` hedge only with a spare scheduler slot and retry budget.
+
+    A hedge is a second upstream request, so it takes its own slot (never
+    ahead of queued calls) and is paid for like a retry. Returns the slot's
+    release callback, or None to skip the hedge.
     """
 
-    if not text or not text.strip():
-        raise ValueError("LLM returned an empty string")
+    if not llm_scheduler.try_acquire():
+        return None
+    if not retry_budget.try_spend():
+        llm_scheduler.release()
+        return None
+    return llm_scheduler.release
+
+
+def _optional_user_id(request: Request) -> Optional[int]:
+    """User id from a valid Bearer token, or None for anonymous requests."""
+
+    auth = request.headers.get("authorization", "")
+    if auth[:7].lower() == "bearer ":
+        try:
+            return int(verify_token(auth[7:].strip())["sub"])
+        except (HTTPException, KeyError, ValueError):
+            pass
+    return None
+
+
+def _llm_user(request: Request) -> str:
+    """Fairness key for LLM admission: the account if a valid token is sent, else the client IP."""
+
+    user_id = _optional_user_id(request)
+    if user_id is not None:
+        return f"user:{user_id}"
+    return f"ip:{_client_ip(request)}"
+
+
+def _client_ip(request: Request) -> str:
+    """The browser's address: nginx's ``X-Real-IP`` if the request came through a trusted proxy."""
+
+    host = request.client.host if request.client else "unknown"
+    real_ip = request.headers.get("x-real-ip")
+    if not real_ip:
+        return host
+    try:
+        peer = ipaddress.ip_address(host)
+    except ValueError:
+        return host
+    return real_ip.strip() if any(peer in network for network in TRUSTED_PROXIES) else host
+
+
+async def _through_breaker(call: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Run one upstream attempt if :data:`llm_breaker` admits it and record the outcome."""
+
+    llm_breaker.before_call()
+    try:
+        result = await call()
+    except BaseException as exc:
+        llm_breaker.record(exc)
+        raise
+    llm_breaker.record(None)
+    return result
 
-    # 1) Strip markdown fences
-    fenced = re.search(r"```(?:json)?\s*([\s\S]*?)\s*```", text, re.I)
-    body = fenced.group(1) if fenced else text
-    body = body.strip()
 
-    # 2) Keep everything between the first "{" and the last "}"
-    start, end = body.find("{"), body.rfind("}") + 1
-    if start == -1 or end <= start:
-        raise ValueError("No JSON object found in the response")
+async def _with_upstream_retries(call: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Retry 429 / 5xx / network errors with jittered backoff within :data:`retry_budget`.
 
-    # 3) Parse
-    return json.loads(body[start:end])
+    A ``Retry-After`` longer than ``RETRY_MAX_DELAY`` is not waited out: the
+    error is raised so the user is not kept waiting.
+    """
 
+    retry_budget.deposit()
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            return await _through_breaker(call)
+        except Exception as exc:  # pylint: disable=broad-except
+            if attempt >= MAX_RETRIES or not is_retryable(exc):
+                raise
+            retry_after = retry_after_seconds(exc)
+            if (retry_after is not None and retry_after > RETRY_MAX_DELAY) or not retry_budget.try_spend():
+                raise
+            delay = backoff(attempt, retry_after)
+            reason = str(exc.response.status_code) if isinstance(exc, httpx.HTTPStatusError) else "network"
+            LLM_UPSTREAM_RETRIES.labels(reason).inc()
+            logger.warning("OpenRouter call failed (%s), retry %d in %.2fs", exc, attempt, delay)
+            await asyncio.sleep(delay)
+
+
+def _retry_delay(operation: str, attempt: int, limit: int) -> Optional[float]:
+    """Backoff before re-rolling ``operation``, or None when out of attempts or retry budget."""
+
+    if attempt >= limit or not retry_budget.try_spend():
+        return None
+    LLM_RETRIES.labels(operation).inc()
+    return backoff(attempt, base=BASE_DELAY)
+
+
+async def call_openrouter(
+    prompt: str,
+    *,
+    timeout: int = REQUEST_TIMEOUT,
+    schema: Optional[Type[BaseModel]] = None,
+    difficulty: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Send a single prompt to OpenRouter and return the raw JSON response.
+
+    The request goes through the shared async client in :mod:`llm_client`, so
+    it reuses pooled keep-alive connections and never blocks the event loop.
+    The model is chosen (and slow answers hedged) by :data:`model_router`,
+    optionally per task ``difficulty``; upstream errors are retried with
+    backoff and :class:`circuit_breaker.CircuitOpen` is raised while
+    OpenRouter is failing. Each attempt holds a :data:`llm_scheduler` slot
+    for the active ticket, and a hedge holds a second one (see
+    :func:`_reserve_hedge`). Concurrent calls with the same prompt and
+    priority share one upstream request (see :mod:`singleflight`); the
+    returned dict must not be mutated.
+    """
 
-async def _call_llm_async(prompt: str) -> str:
-    """Return the ``content`` field from an OpenRouter response.
+    async def post(model: str) -> Dict[str, Any]:
+        headers, payload = _openrouter_request(prompt, schema, model)
+        try:
+            return await llm_client.post_json(API_URL, payload, headers=headers, timeout=timeout)
+        except httpx.HTTPStatusError as exc:
+            if not _schema_rejected(payload, exc):
+                raise
+        return await llm_client.post_json(API_URL, payload, headers=headers, timeout=timeout)
+
+    async def attempt() -> Dict[str, Any]:
+        async with llm_scheduler.slot():
+            return await model_router.call(post, difficulty)
+
+    schema_name = schema.__name__ if schema is not None else "-"
+    # Followers wait behind the leader's scheduler ticket, so only calls of the
+    # same priority share a flight (a pool refill never holds up a user)
+    priority = PRIORITY_NAMES[current_ticket().priority]
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+    key = f"{priority}:{difficulty or '-'}:{schema_name}:{prompt_hash}"
+    return await llm_flight.do(key, lambda: _with_upstream_retries(attempt))
+
+
+async def stream_openrouter(
+    prompt: str,
+    *,
+    timeout: int = REQUEST_TIMEOUT,
+    schema: Optional[Type[BaseModel]] = None,
+    difficulty: Optional[str] = None,
+) -> AsyncIterator[str]:
+    """Stream a completion for ``prompt`` and yield content deltas as they arrive.
+
+    Streams go to the best model for ``difficulty`` but are never hedged
+    or retried, since deltas are already forwarded to the browser. The
+    :data:`llm_scheduler` slot is held until the stream ends.
+    """
 
-    The blocking HTTP call is performed directly; consider moving it to a
-    thread pool (``asyncio.to_thread``) or using an async HTTP client in
-    production to avoid blocking the event loop.
+    model = model_router.pick(difficulty)
+    headers, payload = _openrouter_request(prompt, schema, model)
+    llm_breaker.before_call()
+    retry_budget.deposit()
+    started: Optional[float] = None
+    ok: Optional[bool] = None  # stays None if the stream was abandoned or the request was at fault
+    error: Optional[BaseException] = None
+    try:
+        async with llm_scheduler.slot():
+            started = time.perf_counter()
+            try:
+                async for delta in llm_client.stream_content(API_URL, payload, headers=headers, timeout=timeout):
+                    yield delta
+                ok = True
+                return
+            except httpx.HTTPStatusError as exc:
+                # The status is checked before the first delta, so nothing was yielded yet
+                if not _schema_rejected(payload, exc):
+                    raise
+            async for delta in llm_client.stream_content(API_URL, payload, headers=headers, timeout=timeout):
+                yield delta
+            ok = True
+    except BaseException as exc:
+        error = exc
+        if is_retryable(exc):
+            ok = False
+        raise
+    finally:
+        llm_breaker.record(error)
+        if ok is not None and started is not None:
+            model_router.observe(model, time.perf_counter() - started, ok)
+
+
+def _sse(event: str, data: Any) -> str:
+    """Format a single Server-Sent Event."""
+
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _with_ticket(ticket: Ticket, events: AsyncIterator[str]) -> AsyncIterator[str]:
+    with ticket:
+        async for event in events:
+            yield event
+
+
+def _sse_response(events: AsyncIterator[str], ticket: Optional[Ticket] = None) -> StreamingResponse:
+    """Wrap an SSE generator; buffering is disabled so nginx forwards each event.
+
+    With ``ticket``, the generator's LLM calls are scheduled for that user
+    and priority (see :mod:`llm_scheduler`).
     """
 
-    result = call_openrouter(prompt)
+    return StreamingResponse(
+        events if ticket is None else _with_ticket(ticket, events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+_SCHEMAS: Dict[str, Type[BaseModel]] = {
+    "generate_task": llm_schemas.Task,
+    "evaluate_code": llm_schemas.Evaluation,
+}
+
+
+def _parse_llm_json(operation: str, text: str) -> Dict[str, Any]:
+    """Parse a task / evaluation reply with :mod:`json_repair`.
+
+    The result is validated against the operation's schema in
+    :mod:`llm_schemas` and returned in canonical form (schema keys only).
+    Raises :class:`json_repair.RepairError`.
+    """
+
+    parse = parse_task if operation == "generate_task" else repair_json
+    obj, repairs = parse(text)
+    for repair in repairs:
+        LLM_JSON_REPAIRS.labels(operation, repair).inc()
+    if repairs:
+        logger.info("[%s] repaired LLM JSON locally: %s", operation, ", ".join(repairs))
+    return llm_schemas.validate(_SCHEMAS[operation], obj)
+
+
+def _fields_prompt(prompt: str, partial: Dict[str, Any], missing: List[str]) -> str:
+    """Build the follow-up prompt asking only for ``missing`` fields."""
+
+    return (
+        f"{prompt}\n\n"
+        "Your previous answer was incomplete:\n"
+        f"{json.dumps(partial, ensure_ascii=False)}\n\n"
+        f"Respond ONLY with a JSON object containing the missing fields: {', '.join(missing)}. "
+        "Nest them exactly as in the structure above and do not repeat the other fields."
+    )
+
+
+async def _fill_missing_fields(operation: str, prompt: str, error: RepairError) -> Dict[str, Any] | None:
+    """Ask the LLM for just the fields ``error`` reports missing and merge them in.
+
+    Returns the completed, validated object, or ``None`` if the reply can't
+    be patched (the caller then regenerates it as a whole).
+    """
+
+    schema = _SCHEMAS[operation]
+    if not llm_schemas.can_fill(schema, error):
+        return None
+    fields = llm_schemas.fields_model(schema, error.missing)
+    try:
+        result = await call_openrouter(_fields_prompt(prompt, error.partial, error.missing), schema=fields)
+        patch, _ = repair_json(result["choices"][0]["message"].get("content", ""))
+        if not isinstance(patch, dict):
+            raise RepairError("Field patch is not a JSON object")
+        completed = llm_schemas.validate(schema, llm_schemas.merge(error.partial, patch))
+    except RepairError as exc:
+        LLM_FIELD_FILLS.labels(operation, "failed").inc()
+        logger.warning("[%s] could not fill missing fields %s: %s", operation, error.missing, exc)
+        return None
+    LLM_FIELD_FILLS.labels(operation, "filled").inc()
+    logger.info("[%s] filled missing fields: %s", operation, ", ".join(error.missing))
+    return completed
+
+
+async def _call_llm_async(prompt: str, schema: Optional[Type[BaseModel]] = None) -> str:
+    """Return the ``content`` field from an OpenRouter response."""
+
+    result = await call_openrouter(prompt, schema=schema)
     return result["choices"][0]["message"].get("content", "")
 
 
@@ -142,15 +456,119 @@ async def _call_llm_async(prompt: str) -> str:
 # ---------------------------------------------------------------------------
 
 app = FastAPI(title="Coding Tasks API")
+app.add_middleware(metrics.PrometheusMiddleware)
+
+
+@app.exception_handler(CircuitOpen)
+async def _circuit_open(request: Request, exc: CircuitOpen):
+    """Fail fast while OpenRouter is down instead of making the user wait through retries."""
+
+    return JSONResponse(
+        {"detail": str(exc)}, status_code=503, headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+    )
+
+
+@app.exception_handler(AdmissionRejected)
+async def _admission_rejected(request: Request, exc: AdmissionRejected):
+    """The user is over their LLM rate or the LLM queue is full (see :mod:`llm_scheduler`)."""
+
+    return JSONResponse(
+        {"detail": str(exc)}, status_code=429, headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
 # for creating an user table
 init_db() 
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 # --- APScheduler setup ---
+SCHEDULER_ENABLED: bool = os.getenv("SCHEDULER_ENABLED", "1").lower() not in ("0", "false", "no")
+
 scheduler = BackgroundScheduler()
-scheduler.add_job(scheduled_notifications_job, 'interval', minutes=1)
-scheduler.start()
-atexit.register(lambda: scheduler.shutdown())
+scheduler.add_job(
+    scheduler_lease.renew, 'interval', seconds=LEADER_LEASE_TTL / 3, id="leader_lease",
+    next_run_time=datetime.now(),
+)
+scheduler.add_job(scheduled_notifications_job, 'interval', minutes=1, id="notifications")
+
+
+def _record_scheduler_event(event):
+    if event.code == EVENT_JOB_MISSED:
+        SCHEDULER_JOB_MISSED.labels(event.job_id).inc()
+        return
+    lag = datetime.now(timezone.utc) - max(event.scheduled_run_times)
+    SCHEDULER_JOB_LAG.labels(event.job_id).observe(max(0.0, lag.total_seconds()))
+
+
+scheduler.add_listener(_record_scheduler_event, EVENT_JOB_SUBMITTED | EVENT_JOB_MISSED)
+if SCHEDULER_ENABLED:
+    scheduler.start()
+    atexit.register(lambda: scheduler.shutdown())
+
+
+@app.on_event("shutdown")
+async def _release_scheduler_lease() -> None:
+    # Let another worker take over right away instead of after the TTL
+    await asyncio.to_thread(scheduler_lease.release)
+
+
+# --- Cross-worker cache invalidation ---
+cache_watcher = GenerationWatcher()
+
+
+@app.on_event("startup")
+async def _start_cache_watcher() -> None:
+    await asyncio.to_thread(cache_watcher.start)
+
+
+@app.on_event("shutdown")
+async def _stop_cache_watcher() -> None:
+    await asyncio.to_thread(cache_watcher.stop)
+
+
+# --- Circuit breaker shared between workers ---
+_breaker_writes: Set[asyncio.Task] = set()
+
+
+def _store_breaker_open(until: float) -> None:
+    try:
+        database.open_circuit(llm_breaker.name, until)
+        cache_watcher.bump("llm_breaker")
+    except sqlite3.Error:
+        logger.exception("Could not share the open circuit with the other workers")
+
+
+def _share_breaker_open(until: float) -> None:
+    """Let the other workers open their breakers too instead of each probing the upstream."""
+
+    task = asyncio.get_running_loop().create_task(db_executor.run(_store_breaker_open, until))
+    _breaker_writes.add(task)
+    task.add_done_callback(_breaker_writes.discard)
+
+
+cache_watcher.on_change(
+    "llm_breaker", lambda: llm_breaker.trip(database.get_circuit_open_until(llm_breaker.name)),
+)
+
+
+@app.on_event("shutdown")
+async def _close_llm_client() -> None:
+    await llm_client.aclose()
+
+
+@app.on_event("startup")
+async def _warm_executors() -> None:
+    # Spawning the bcrypt workers takes a moment; do it before the first login
+    await asyncio.to_thread(cpu_executor.warm)
+
+
+@app.on_event("shutdown")
+async def _stop_executors() -> None:
+    executors.shutdown()
+
+
+@app.on_event("shutdown")
+async def _mark_metrics_process_dead() -> None:
+    metrics.mark_process_dead()
 
 # ---------------------------------------------------------------------------
 # Models
@@ -163,48 +581,70 @@ class SyllabusIn(BaseModel):
 # Syllabus endpoints
 # ---------------------------------------------------------------------------
 
-@app.post("/save_syllabus")
-async def save_syllabus(data: SyllabusIn):
-    """Save syllabus topics to *syllabus.json*."""
+# SYLLABUS_FILE is looked up on every call so it can be repointed at runtime
+syllabus = SyllabusStore(lambda: SYLLABUS_FILE)
+
+
+cache_watcher.on_change("syllabus", syllabus.invalidate)
 
+
+async def _write_syllabus(topics: List[str]) -> Snapshot:
     try:
-        with SYLLABUS_FILE.open("w", encoding="utf-8") as f_out:
-            json.dump({"topics": data.topics}, f_out, ensure_ascii=False, indent=2)
+        snap = await db_executor.run(syllabus.save, topics)
+        await db_executor.run(cache_watcher.bump, "syllabus")
     except Exception as exc:  # pylint: disable=broad-except
         logger.exception("Failed to save syllabus")
         raise HTTPException(500, f"Couldn't save syllabus: {exc}")
-    return {"message": "Syllabus saved"}
+    return snap
 
 
-@app.get("/get_syllabus")
-async def get_syllabus():
-    """Return list of topics from *syllabus.json* (empty if missing)."""
+@app.post("/save_syllabus")
+async def save_syllabus(data: SyllabusIn):
+    """Atomically save syllabus topics to *syllabus.json*."""
 
-    if not SYLLABUS_FILE.exists():
-        return {"topics": []}
+    snap = await _write_syllabus(data.topics)
+    return JSONResponse({"message": "Syllabus saved"}, headers={"ETag": snap.etag})
 
-    try:
-        with SYLLABUS_FILE.open("r", encoding="utf-8") as f_in:
-            data = json.load(f_in)
-        topics = data.get("topics")
-        if not isinstance(topics, list):
-            topics = []
-    except Exception:  # pylint: disable=broad-except
-        logger.exception("Failed to read syllabus")
-        topics = []
 
-    return {"topics": topics}
+@app.delete("/clear_syllabus")
+async def clear_syllabus():
+    """Remove all syllabus topics."""
+
+    snap = await _write_syllabus([])
+    return JSONResponse({"message": "Syllabus cleared"}, headers={"ETag": snap.etag})
+
+
+@app.get("/get_syllabus")
+async def get_syllabus(request: Request):
+    """Return list of topics from *syllabus.json* (empty if missing).
+
+    Served from memory; ``If-None-Match`` with the current ETag gets a 304.
+    """
+
+    snap = syllabus.snapshot()
+    headers = {"ETag": snap.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match", ""), snap.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(snap.body, media_type="application/json", headers=headers)
 
 # ---------------------------------------------------------------------------
 # Task generation endpoint
 # ---------------------------------------------------------------------------
 
-@app.get("/generate_task")
-async def generate_task(topic: str, difficulty: str):
-    """Generate a single programming task in JSON format."""
+def _task_prompt(topic: str, difficulty: str, avoid: Optional[List[str]] = None) -> str:
+    """Build the LLM prompt for a single task on ``topic``/``difficulty``.
 
-    prompt = (
+    ``avoid`` lists names of tasks rejected as near-duplicates (see
+    :mod:`task_dedup`); the model is asked for something different.
+    """
+
+    different = (
+        "It must be clearly different from these existing tasks: "
+        + "; ".join(f"'{name}'" for name in avoid) + ".\n"
+    ) if avoid else ""
+    return (
         f"Create one Python programming task on '{topic}' with '{difficulty}' difficulty.\n"
+        f"{different}"
         "Respond ONLY with valid JSON (no markdown, no explanations).\n"
         "Do NOT use Python tuples like ('a', 1). Use JSON arrays like [\"a\", 1].\n"
         "Use double quotes for all strings (not single quotes).\n"
@@ -226,26 +666,250 @@ async def generate_task(topic: str, difficulty: str):
         "Each hint MUST be meaningful. Do NOT leave any hint blank or undefined."
     )
 
+
+class TaskGenerationError(Exception):
+    """Raised when the LLM did not return valid task JSON after all retries."""
+
+
+task_index = TaskIndex(topics=syllabus.topics)
+
+
+async def _is_duplicate_task(topic: str, difficulty: str, task: Dict[str, Any]) -> bool:
+    """True if ``task`` nearly repeats a task already generated for ``topic``/``difficulty``.
+
+    A new task is added to :data:`task_index`. Lookup errors count as "not
+    a duplicate": a repeated task is better than no task.
+    """
+
+    if not TASK_DEDUP_ENABLED:
+        return False
+    try:
+        duplicate = await db_executor.run(task_index.check, topic, difficulty, task, task_id_for(task))
+    except sqlite3.Error:
+        logger.exception("Near-duplicate lookup failed for %s/%s", topic, difficulty)
+        return False
+    if duplicate is None:
+        return False
+    logger.info("[generate_task] %s/%s: near-duplicate of task %s (similarity %.2f)",
+                topic, difficulty, *duplicate)
+    return True
+
+
+async def _generate_task_str(topic: str, difficulty: str) -> str:
+    """Ask the LLM for a task and return it as a validated JSON string.
+
+    A near-duplicate of an earlier task is regenerated up to
+    ``TASK_DEDUP_MAX_REROLLS`` times and then accepted.
+
+    Raises
+    ------
+    TaskGenerationError
+        If no valid JSON was returned after ``MAX_RETRIES`` attempts.
+    httpx.HTTPStatusError
+        If OpenRouter answered with an error status.
+    """
+
+    prompt = _task_prompt(topic, difficulty)
     last_error: Exception | None = None
+    rejected: List[str] = []
     for attempt in range(1, MAX_RETRIES + 1):
         try:
-            result = call_openrouter(prompt)
+            result = await call_openrouter(prompt, schema=llm_schemas.Task, difficulty=difficulty)
             task_str = result["choices"][0]["message"]["content"].strip()
-            json.loads(task_str)  # validate JSON
-            return JSONResponse({"task": task_str})
-        except JSONDecodeError as exc:
-            last_error = exc
-            logger.warning("[generate_task] JSONDecodeError (%d/%d): %s", attempt, MAX_RETRIES, exc)
-            if attempt < MAX_RETRIES:
+            task = _parse_llm_json("generate_task", task_str)
+        except RepairError as exc:
+            task = await _fill_missing_fields("generate_task", prompt, exc)
+            if task is None:
+                last_error = exc
+                LLM_PARSE_FAILURES.labels("generate_task").inc()
+                logger.warning("[generate_task] unusable JSON (%d/%d): %s", attempt, MAX_RETRIES, exc)
+                delay = _retry_delay("generate_task", attempt, MAX_RETRIES)
+                if delay is None:
+                    break
+                await asyncio.sleep(delay)
                 continue
-        except requests.exceptions.HTTPError as http_err:
-            if http_err.response.status_code == 401:
-                raise HTTPException(401, "Invalid API Key")
-            raise HTTPException(500, str(http_err))
-        except Exception as exc:  # pylint: disable=broad-except
-            raise HTTPException(500, str(exc))
+        if (len(rejected) < TASK_DEDUP_MAX_REROLLS and attempt < MAX_RETRIES
+                and await _is_duplicate_task(topic, difficulty, task)):
+            rejected.append(str(task.get("Task name", "")))
+            prompt = _task_prompt(topic, difficulty, rejected)
+            continue
+        return json.dumps(task, ensure_ascii=False)
+
+    raise TaskGenerationError(f"Failed to get valid JSON after {attempt} attempts: {last_error}")
+
+
+# The pool is shared through the database; only the lease holder refills it
+# (every worker does when the scheduler, and so the lease, is disabled)
+task_pool = TaskPool(
+    _generate_task_str, syllabus.topics,
+    is_leader=lambda: not SCHEDULER_ENABLED or scheduler_lease.is_leader(),
+)
+task_registry = TaskRegistry()
+
+
+async def _register_task(topic: str, difficulty: str, task_str: str) -> Optional[str]:
+    """Store a generated task and return its ``task_id``.
+
+    Returns ``None`` if it could not be stored; the client then falls back
+    to sending the whole task with its submission.
+    """
+
+    try:
+        record = await db_executor.run(task_registry.register, topic, difficulty, task_str)
+    except (sqlite3.Error, ValueError):
+        logger.exception("Could not register task for %s/%s", topic, difficulty)
+        return None
+    return record.task_id
+
+
+@app.on_event("startup")
+async def _start_task_pool() -> None:
+    if task_pool.enabled and os.getenv("OPENROUTER_API_KEY"):
+        task_pool.start()
+
+
+@app.on_event("shutdown")
+async def _stop_task_pool() -> None:
+    await task_pool.stop()
+
+
+@app.get("/generate_task")
+async def generate_task(topic: str, difficulty: str, request: Request):
+    """Generate a single programming task in JSON format.
+
+    A pre-generated task from :data:`task_pool` is returned when available;
+    otherwise the LLM is called directly and the pending call is cancelled if
+    the browser disconnects. The response carries the ``task_id`` under
+    which submissions reference the task (see :mod:`task_registry`).
+    """
+
+    pooled = await db_executor.run(task_pool.get, topic, difficulty)
+    if pooled is not None:
+        return JSONResponse({"task": pooled, "task_id": await _register_task(topic, difficulty, pooled)})
+
+    try:
+        with llm_scheduler.admit(_llm_user(request), GENERATE):
+            task_str = await run_until_disconnected(request, _generate_task_str(topic, difficulty))
+    except ClientDisconnected:
+        raise HTTPException(499, "Client closed request")
+    except (CircuitOpen, AdmissionRejected):
+        raise
+    except httpx.HTTPStatusError as http_err:
+        if http_err.response.status_code == 401:
+            raise HTTPException(401, "Invalid API Key")
+        raise HTTPException(500, str(http_err))
+    except Exception as exc:  # pylint: disable=broad-except
+        raise HTTPException(500, str(exc))
+    return JSONResponse({"task": task_str, "task_id": await _register_task(topic, difficulty, task_str)})
+
+
+@app.get("/generate_task/stream")
+async def generate_task_stream(topic: str, difficulty: str, request: Request):
+    """Stream task generation as Server-Sent Events.
+
+    Events:
+    * ``field`` - ``{"name", "value"}`` for every completed top-level field,
+      so the task name and description arrive before the hints;
+    * ``retry`` - the model output was invalid JSON or a near-duplicate of
+      an earlier task (``"reason": "duplicate"``), fields restart;
+    * ``done`` - ``{"task": "<json str>", "task_id": ...}``, same shape as
+      ``/generate_task``;
+    * ``error`` - ``{"detail": "..."}``.
+    """
+
+    pooled = await db_executor.run(task_pool.get, topic, difficulty)
+    # Admission is checked before streaming starts so it can still answer 429
+    ticket = llm_scheduler.admit(_llm_user(request), GENERATE) if pooled is None else None
+
+    async def done(task_str: str) -> str:
+        return _sse("done", {"task": task_str, "task_id": await _register_task(topic, difficulty, task_str)})
+
+    async def events() -> AsyncIterator[str]:
+        if pooled is not None:
+            for name, value in json.loads(pooled).items():
+                yield _sse("field", {"name": name, "value": value})
+            yield await done(pooled)
+            return
+
+        prompt = _task_prompt(topic, difficulty)
+        last_error: Exception | None = None
+        rejected: List[str] = []
+        for attempt in range(1, MAX_RETRIES + 1):
+            parser = JsonFieldStream()
+            try:
+                async for delta in stream_openrouter(prompt, schema=llm_schemas.Task, difficulty=difficulty):
+                    for name, value in parser.feed(delta):
+                        yield _sse("field", {"name": name, "value": value})
+                task = _parse_llm_json("generate_task", parser.text.strip())
+            except RepairError as exc:
+                task = await _fill_missing_fields("generate_task", prompt, exc)
+                if task is None:
+                    last_error = exc
+                    LLM_PARSE_FAILURES.labels("generate_task").inc()
+                    logger.warning("[generate_task/stream] unusable JSON (%d/%d): %s", attempt, MAX_RETRIES, exc)
+                    delay = _retry_delay("generate_task", attempt, MAX_RETRIES)
+                    if delay is None:
+                        break
+                    yield _sse("retry", {"attempt": attempt})
+                    await asyncio.sleep(delay)
+                    continue
+                for name in task.keys() - exc.partial.keys():
+                    yield _sse("field", {"name": name, "value": task[name]})
+            except (CircuitOpen, AdmissionRejected) as exc:
+                yield _sse("error", {"detail": str(exc), "retry_after": round(exc.retry_after)})
+                return
+            except httpx.HTTPStatusError as http_err:
+                detail = "Invalid API Key" if http_err.response.status_code == 401 else str(http_err)
+                yield _sse("error", {"detail": detail})
+                return
+            except Exception as exc:  # pylint: disable=broad-except
+                yield _sse("error", {"detail": str(exc)})
+                return
+            if (len(rejected) < TASK_DEDUP_MAX_REROLLS and attempt < MAX_RETRIES
+                    and await _is_duplicate_task(topic, difficulty, task)):
+                rejected.append(str(task.get("Task name", "")))
+                prompt = _task_prompt(topic, difficulty, rejected)
+                yield _sse("retry", {"attempt": attempt, "reason": "duplicate"})
+                continue
+            yield await done(json.dumps(task, ensure_ascii=False))
+            return
+
+        yield _sse("error", {"detail": f"Failed to get valid JSON after {attempt} attempts: {last_error}"})
+
+    return _sse_response(events(), ticket)
 
-    raise HTTPException(500, f"Failed to get valid JSON after {MAX_RETRIES} attempts: {last_error}")
+
+@app.get("/task_pool/stats")
+async def task_pool_stats():
+    """Return warm task pool hit/miss counters and fill levels."""
+
+    return task_pool.stats()
+
+
+@app.get("/task_registry/stats")
+async def task_registry_stats():
+    """Return task registry counters (registered tasks, cache hits, unknown ids)."""
+
+    return task_registry.stats()
+
+
+@app.get("/task_dedup/stats")
+async def task_dedup_stats():
+    """Return near-duplicate counters: overall and per topic (see :mod:`task_dedup`)."""
+
+    return task_index.stats()
+
+
+@app.get("/tasks/{task_id}")
+async def get_task(task_id: str):
+    """Return a registered task with its submission statistics."""
+
+    row = await db_executor.run(database.get_task, task_id)
+    if row is None:
+        raise HTTPException(404, "Unknown task_id")
+    row.pop("prompt")
+    row["solve_rate"] = round(row["solved"] / row["submissions"], 4) if row["submissions"] else 0.0
+    return row
 
 
 # ---------------------------------------------------------------------------
@@ -259,69 +923,326 @@ async def submit_code_alias(request: Request):
     return await evaluate_code(request)
 
 
+eval_cache = EvaluationCache()
+
+# Returned when every attempt produced unparsable output
+_EVALUATION_FALLBACK: Dict[str, Any] = {
+    "correct": False,
+    "feedback": (
+        "⚠️ It was not possible to evaluate the solution because the LLM returned malformed output. "
+        "Please try again later."
+    ),
+}
+
+
+sandbox_pool = SandboxPool()
+
+
+@app.on_event("startup")
+async def _warm_sandbox() -> None:
+    if SANDBOX_ENABLED:
+        await sandbox_pool.warm()
+
+
+@app.on_event("shutdown")
+async def _close_sandbox() -> None:
+    await sandbox_pool.close()
+
+
+async def _local_verdict(task: str, code: str) -> Dict[str, Any] | None:
+    """Run the sample cases locally; return a verdict only for clear failures."""
+
+    if not SANDBOX_ENABLED:
+        return None
+    try:
+        return await local_verdict(sandbox_pool, task, code)
+    except Exception:  # pylint: disable=broad-except
+        logger.exception("Local sandbox check failed, falling back to the LLM")
+        return None
+
+
+def _evaluation_prompt(task: str, code: str) -> str:
+    """Build the LLM prompt that grades ``code`` (or answers a question) for ``task``."""
+
+    return (
+            f"Task:\n{task}\n\n"
+            f"User message:\n {code}\n"
+            "Check if the user message is a code solution or question regarding task\n"
+            "If the message is a question - respond with a JSON object with fields: 'question': true, 'feedback': answer for the question. Do not give away solution, only help with understanding task requirements"
+            "If the message is a code solution - Analyze the above code for correctness against the task requirements. "
+            "Respond with a JSON object with fields: 'question': false 'correct': true or false, 'feedback': a brief explanation (only if correct is false, if true - make a compliment). Do not include additional comments or formatting"
+        )
+
+
+async def _submitted_task(data: Dict[str, Any]) -> TaskRecord:
+    """Resolve the task a submission refers to.
+
+    Current clients send the ``task_id`` returned by ``/generate_task``; a
+    raw ``task`` string from older clients is still evaluated, but as the
+    client wrote it, it is recorded without an id and never scores.
+    """
+
+    task_id = data.get("task_id")
+    if task_id:
+        record = await db_executor.run(task_registry.get, str(task_id))
+        if record is None:
+            raise HTTPException(404, "Unknown task_id")
+        return record
+    task: str = data.get("task", "")
+    return TaskRecord("", "", "", task, task)
+
+
+leaderboard = Leaderboard()
+cache_watcher.on_change("leaderboard", leaderboard.catch_up)
+
+
+@app.on_event("startup")
+async def _load_leaderboard() -> None:
+    await asyncio.to_thread(leaderboard.rebuild)
+
+
+def _write_submissions(batch: List[Submission]) -> None:
+    database.add_submissions(batch)
+    try:
+        leaderboard.catch_up()  # other workers catch up through cache_watcher
+    except sqlite3.Error:
+        logger.exception("Could not update the leaderboard")
+
+
+submission_writer = SubmissionWriter(_write_submissions)
+
+
+@app.on_event("shutdown")
+async def _stop_submission_writer() -> None:
+    await asyncio.to_thread(submission_writer.stop)
+
+
+def _record_result(request: Request, data: Dict[str, Any], record: TaskRecord, verdict: Dict[str, Any]) -> None:
+    """Queue a graded submission (not a question) for the history, score and task statistics."""
+
+    if verdict.get("question") or "correct" not in verdict:
+        return
+    submission_writer.record(Submission(
+        user_id=_optional_user_id(request),
+        task_id=record.task_id or None,
+        topic=record.topic or str(data.get("topic") or ""),
+        difficulty=record.difficulty or str(data.get("difficulty") or ""),
+        correct=bool(verdict["correct"]),
+        created_at=datetime.now(timezone.utc).isoformat(timespec="microseconds"),
+    ))
+
+
+async def _llm_evaluation(eval_prompt: str) -> Dict[str, Any]:
+    """Ask the LLM for a verdict, completing it if only some fields are missing.
+
+    Raises :class:`json_repair.RepairError` if the reply has to be re-rolled.
+    """
+
+    llm_raw = await _call_llm_async(eval_prompt, llm_schemas.Evaluation)
+    try:
+        return _parse_llm_json("evaluate_code", llm_raw)
+    except RepairError as exc:
+        evaluation = await _fill_missing_fields("evaluate_code", eval_prompt, exc)
+        if evaluation is None:
+            logger.debug("Raw answer:\n%s", llm_raw)
+            raise
+        return evaluation
+
+
 @app.post("/evaluate_code")
 async def evaluate_code(request: Request):
     """Evaluate user solution using LLM and retry on malformed JSON.
 
+    Verdicts are cached by task + normalized code (see :mod:`eval_cache`), so
+    resubmitting the same solution does not call the LLM again. Submissions
+    that crash or fail the sample cases are rejected locally by
+    :mod:`sandbox` before any LLM call when ``SANDBOX_ENABLED`` is set.
+
     Expected request body::
 
         {
-            "task": "...",  # full task description
-            "code": "..."   # user Python code
+            "task_id": "...",  # from /generate_task (or "task": full task JSON)
+            "code": "..."      # user Python code
         }
     """
 
     data = await request.json()
-    task: str = data.get("task", "")
+    record = await _submitted_task(data)
     code: str = data.get("code", "")
 
-    eval_prompt = (
-            f"Task:\n{task}\n\n"
-            f"User message:\n {code}\n"
-            "Check if the user message is a code solution or question regarding task\n"
-            "If the message is a question - respond with a JSON object with fields: 'question': true, 'feedback': answer for the question. Do not give away solution, only help with understanding task requirements"
-            "If the message is a code solution - Analyze the above code for correctness against the task requirements. "
-            "Respond with a JSON object with fields: 'question': false 'correct': true or false, 'feedback': a brief explanation (only if correct is false, if true - make a compliment). Do not include additional comments or formatting"
-        ) 
+    cached = await db_executor.run(eval_cache.get, record.task, code)
+    if cached is not None:
+        _record_result(request, data, record, cached)
+        return JSONResponse(cached)
 
+    local = await _local_verdict(record.task, code)
+    if local is not None:
+        await db_executor.run(eval_cache.put, record.task, code, local)
+        _record_result(request, data, record, local)
+        return JSONResponse(local)
+
+    eval_prompt = _evaluation_prompt(record.prompt, code)
+    ticket = llm_scheduler.admit(_llm_user(request), INTERACTIVE)
 
-    llm_raw: str = ""
     for attempt in range(1, MAX_ATTEMPTS + 1):
         try:
-            llm_raw = await _call_llm_async(eval_prompt)
-            evaluation = extract_json_from_llm(llm_raw)
+            with ticket:
+                evaluation = await run_until_disconnected(request, _llm_evaluation(eval_prompt))
+            await db_executor.run(eval_cache.put, record.task, code, evaluation)
+            _record_result(request, data, record, evaluation)
             return JSONResponse(evaluation)  # success
-        except (ValueError, JSONDecodeError) as exc:
+        except RepairError as exc:
+            LLM_PARSE_FAILURES.labels("evaluate_code").inc()
             logger.warning("Attempt %d/%d: cannot parse LLM response (%s)", attempt, MAX_ATTEMPTS, exc)
-            logger.debug("Raw answer:\n%s", llm_raw)
-            if attempt < MAX_ATTEMPTS:
-                await asyncio.sleep(BASE_DELAY * attempt)
-                continue
+            delay = _retry_delay("evaluate_code", attempt, MAX_ATTEMPTS)
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+        except ClientDisconnected:
+            raise HTTPException(499, "Client closed request")
 
     # All attempts exhausted — return graceful fallback
-    return JSONResponse(
-        {
-            "correct": False,
-            "feedback": (
-                "⚠️ It was not possible to evaluate the solution because the LLM returned malformed output. "
-                "Please try again later."
-            ),
-        }
-    )
+    return JSONResponse(_EVALUATION_FALLBACK)
+
+
+@app.post("/evaluate_code/stream")
+async def evaluate_code_stream(request: Request):
+    """Stream the evaluation of a solution as Server-Sent Events.
+
+    Takes the same body as :func:`evaluate_code`. Emits ``field`` events for
+    completed verdict fields, ``retry`` when the output could not be parsed,
+    and finally ``done`` with the same object ``/evaluate_code`` returns.
+    """
+
+    data = await request.json()
+    record = await _submitted_task(data)
+    code: str = data.get("code", "")
+    known = await db_executor.run(eval_cache.get, record.task, code)
+    if known is None:
+        known = await _local_verdict(record.task, code)
+        if known is not None:
+            await db_executor.run(eval_cache.put, record.task, code, known)
+    # Like evaluate_code, only verdicts that need the LLM are admitted
+    ticket = llm_scheduler.admit(_llm_user(request), INTERACTIVE) if known is None else None
+
+    def done(verdict: Dict[str, Any]) -> str:
+        _record_result(request, data, record, verdict)
+        return _sse("done", verdict)
+
+    async def events() -> AsyncIterator[str]:
+        if known is not None:
+            yield done(known)
+            return
+
+        eval_prompt = _evaluation_prompt(record.prompt, code)
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            parser = JsonFieldStream()
+            try:
+                async for delta in stream_openrouter(eval_prompt, schema=llm_schemas.Evaluation):
+                    for name, value in parser.feed(delta):
+                        yield _sse("field", {"name": name, "value": value})
+                evaluation = _parse_llm_json("evaluate_code", parser.text)
+                await db_executor.run(eval_cache.put, record.task, code, evaluation)
+                yield done(evaluation)
+                return
+            except RepairError as exc:
+                evaluation = await _fill_missing_fields("evaluate_code", eval_prompt, exc)
+                if evaluation is not None:
+                    await db_executor.run(eval_cache.put, record.task, code, evaluation)
+                    yield done(evaluation)
+                    return
+                LLM_PARSE_FAILURES.labels("evaluate_code").inc()
+                logger.warning("Attempt %d/%d: cannot parse streamed LLM response (%s)", attempt, MAX_ATTEMPTS, exc)
+                delay = _retry_delay("evaluate_code", attempt, MAX_ATTEMPTS)
+                if delay is None:
+                    break
+                yield _sse("retry", {"attempt": attempt})
+                await asyncio.sleep(delay)
+            except (CircuitOpen, AdmissionRejected) as exc:
+                yield _sse("error", {"detail": str(exc), "retry_after": round(exc.retry_after)})
+                return
+            except Exception as exc:  # pylint: disable=broad-except
+                yield _sse("error", {"detail": str(exc)})
+                return
+
+        yield _sse("done", _EVALUATION_FALLBACK)
+
+    return _sse_response(events(), ticket)
+
+
+@app.get("/llm/stats")
+async def llm_stats():
+    """Return upstream LLM call counters (coalescing, per-model latency, breaker, retry budget, queue)."""
+
+    return {
+        "singleflight": llm_flight.stats(),
+        "router": model_router.stats(),
+        "breaker": llm_breaker.stats(),
+        "scheduler": llm_scheduler.stats(),
+        "retry_budget": {"tokens": round(retry_budget.tokens(), 2), "spent": retry_budget.spent,
+                         "denied": retry_budget.denied},
+    }
+
+
+@app.get("/eval_cache/stats")
+async def eval_cache_stats():
+    """Return evaluation cache hit/miss counters."""
+
+    return eval_cache.stats()
+
+
+@app.get("/executors/stats")
+async def executors_stats():
+    """Return queue depth and wait times of the bcrypt and DB worker pools."""
+
+    return executors.stats()
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus exposition of request, LLM, DB, pool and scheduler metrics."""
+
+    if not metrics.PROMETHEUS_AVAILABLE:
+        raise HTTPException(503, "prometheus_client is not installed")
+    body, content_type = metrics.render()
+    return Response(body, media_type=content_type)
 
 
 # ---------------------------------------------------------------------------
 # Static HTML
 # ---------------------------------------------------------------------------
 
+# Fingerprinted + pre-compressed once at startup, then served from memory
+frontend: Dict[str, static_assets.Asset] = (
+    static_assets.build() if (static_assets.STATIC_DIR / "index.html").exists() else {}
+)
+
+
+def _asset_response(asset: static_assets.Asset, request: Request) -> Response:
+    status, body, headers = static_assets.serve(
+        asset, request.headers.get("accept-encoding", ""), request.headers.get("if-none-match", "")
+    )
+    return Response(body, status_code=status, headers=headers)
+
+
 @app.get("/", response_class=HTMLResponse)
-async def root():
-    """Serve client SPA (static/index.html)."""
+async def root(request: Request):
+    """Serve client SPA (static/index.html with fingerprinted asset URLs)."""
 
-    index_path = Path("static/index.html")
-    if not index_path.exists():
+    index = frontend.get("/")
+    if index is None:
         return HTMLResponse("<h1>No frontend found</h1>", status_code=404)
-    return HTMLResponse(index_path.read_text(encoding="utf-8"))
+    return _asset_response(index, request)
+
+
+@app.get("/assets/{name}")
+async def asset(name: str, request: Request):
+    """Serve a fingerprinted script/stylesheet; safe to cache forever."""
+
+    found = frontend.get(static_assets.ASSET_PREFIX + name)
+    if found is None:
+        raise HTTPException(404, "Not Found")
+    return _asset_response(found, request)
 
 # ---------------------------------------------------------------------------
 # Login and Sign up
@@ -346,51 +1267,68 @@ async def signup(user: SignupInput):
     if not user.email.lower().endswith("@innopolis.university"):
         raise HTTPException(status_code=400, detail="Only @innopolis.university emails allowed")
 
+    conflict = await db_executor.run(get_signup_conflict, user.email, user.login)
+    if conflict:
+        raise HTTPException(status_code=400, detail=conflict)
+
+    hashed = await cpu_executor.run(hash_password, user.password)
     try:
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT 1 FROM users WHERE LOWER(email) = ?", (user.email.lower(),))
-            if cursor.fetchone():
-                raise HTTPException(status_code=400, detail="Email already registered")
-
-            cursor.execute("SELECT 1 FROM users WHERE LOWER(login) = ?", (user.login.lower(),))
-            if cursor.fetchone():
-                raise HTTPException(status_code=400, detail="Login already taken")
-
-            hashed = bcrypt.hashpw(user.password.encode(), bcrypt.gensalt()).decode()
-            cursor.execute(
-                "INSERT INTO users (email, login, password_hash, registration_date) VALUES (?, ?, ?, datetime('now'))",
-                (user.email.lower(), user.login.lower(), hashed)
-            )
-            conn.commit()
+        await db_executor.run(create_user, user.email, user.login, hashed)
         return {"name": user.login}
     except sqlite3.IntegrityError:
         raise HTTPException(status_code=500, detail="Internal DB error")
 
 @app.post("/login")
 async def login(data: LoginInput):
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT user_id, login, email, password_hash FROM users WHERE LOWER(email) = ? OR LOWER(login) = ?",
-            (data.identifier.lower(), data.identifier.lower())
-        )
-        row = cursor.fetchone()
-        if not row:
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-
-        user_id, login_name, email, password_hash = row
-        if not bcrypt.checkpw(data.password.encode(), password_hash.encode()):
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-
-        # Create JWT token
-        token = create_user_token(user_id, login_name, email)
-        
-        return {
-            "name": login_name,
-            "token": token,
-            "user_id": user_id
-        }
+    row = await db_executor.run(get_user_for_login, data.identifier)
+    if not row:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    user_id, login_name, email, password_hash = row
+    if not await cpu_executor.run(check_password, data.password, password_hash):
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    # Create JWT token
+    token = create_user_token(user_id, login_name, email)
+
+    return {
+        "name": login_name,
+        "token": token,
+        "user_id": user_id
+    }
+
+@app.post("/logout")
+async def logout(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Revoke the caller's token so it is rejected from now on (by every worker).
+
+    Tokens that do not verify are not stored, so forged tokens cannot grow
+    the revocation table.
+    """
+    revoked = revoke_token(credentials.credentials)
+    if revoked:
+        key, expires_at = revoked
+        await db_executor.run(database.add_revoked_token, key, expires_at, time.time())
+        await db_executor.run(cache_watcher.bump, "revoked_tokens")
+    return {"message": "Logged out"}
+
+
+def _load_revocations() -> None:
+    """Apply revocations made by other workers (or before a restart)."""
+    for key, expires_at in database.get_revoked_tokens(time.time()):
+        token_cache.revoke(key, expires_at)
+
+
+cache_watcher.on_change("revoked_tokens", _load_revocations)
+
+
+@app.on_event("startup")
+async def _load_revoked_tokens() -> None:
+    await asyncio.to_thread(_load_revocations)
+
+@app.get("/auth/stats")
+async def auth_stats():
+    """Return verified-token cache counters."""
+    return token_cache.stats()
 
 # ---------------------------------------------------------------------------
 # Notification Settings Endpoints
@@ -400,7 +1338,7 @@ async def login(data: LoginInput):
 async def get_notification_settings_endpoint(current_user: dict = Depends(get_current_user)):
     """Get notification settings for the current user."""
     user_id = int(current_user["sub"])
-    settings = get_notification_settings(user_id)
+    settings = await db_executor.run(get_notification_settings, user_id)
     return settings
 
 @app.post("/notification-settings")
@@ -424,7 +1362,8 @@ async def update_notification_settings_endpoint(
         if not (1 <= day <= 7):
             raise HTTPException(status_code=400, detail="Invalid day. Use 1-7 (Monday=1, Sunday=7)")
     
-    update_notification_settings(
+    await db_executor.run(
+        update_notification_settings,
         user_id,
         settings.enabled,
         settings.notification_time,
@@ -433,6 +1372,76 @@ async def update_notification_settings_endpoint(
     
     return {"message": "Notification settings updated successfully"}
 
+# ---------------------------------------------------------------------------
+# Submission history and score
+# ---------------------------------------------------------------------------
+
+@app.get("/submissions")
+async def submission_history(
+    limit: int = HISTORY_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(get_current_user),
+):
+    """Return the current user's graded submissions, newest first.
+
+    Pass the returned ``next_cursor`` to get the following page; it is
+    ``null`` on the last page. Submissions show up here a fraction of a
+    second after their verdict (see :mod:`submissions`).
+    """
+
+    limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+    try:
+        before = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    items = await db_executor.run(database.get_submissions, int(current_user["sub"]), limit, before)
+    for item in items:
+        item["correct"] = bool(item["correct"])
+    next_cursor = encode_cursor(items[-1]["created_at"], items[-1]["id"]) if len(items) == limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@app.get("/score")
+async def score(current_user: dict = Depends(get_current_user)):
+    """Return the current user's score (tasks solved) and submission totals."""
+
+    return await db_executor.run(database.get_score, int(current_user["sub"]))
+
+
+@app.get("/leaderboard")
+async def get_leaderboard(request: Request, limit: int = 10, radius: int = 2):
+    """Return the top users by score, served from memory (see :mod:`leaderboard`).
+
+    With a valid token the caller's own ``rank`` and up to ``radius``
+    neighbours on each side are included as ``me`` and ``neighbors``.
+    """
+
+    body: Dict[str, Any] = {"top": leaderboard.top(max(1, min(limit, LEADERBOARD_MAX_LIMIT)))}
+    user_id = _optional_user_id(request)
+    if user_id is not None:
+        body["me"] = leaderboard.rank(user_id)
+        body["neighbors"] = leaderboard.around(user_id, max(0, min(radius, LEADERBOARD_MAX_RADIUS)))
+    return body
+
+
+@app.get("/submissions/stats")
+async def submission_writer_stats():
+    """Return submission writer counters (queued, written, dropped, batches)."""
+
+    return submission_writer.stats()
+
+mailer = Mailer()
+
+@app.on_event("shutdown")
+async def _stop_mailer() -> None:
+    await asyncio.to_thread(mailer.stop)
+
+def _notification_message(user_name):
+    app_name = os.getenv("APP_NAME", "Study Buddy")
+    msg = MIMEText(f"Hi {user_name}! This is your notification from {app_name}.")
+    msg["Subject"] = f"{app_name} Notification"
+    return msg
+
 @app.post("/send-notification")
 async def send_notification(current_user: dict = Depends(get_current_user)):
     user_email = current_user.get("email")
@@ -440,48 +1449,41 @@ async def send_notification(current_user: dict = Depends(get_current_user)):
     if not user_email:
         raise HTTPException(status_code=400, detail="No email found for user")
 
-    smtp_host = os.getenv("SMTP_HOST", "smtp.gmail.com")
-    smtp_port = int(os.getenv("SMTP_PORT", "587"))
-    smtp_user = os.getenv("SMTP_USERNAME")
-    smtp_pass = os.getenv("SMTP_PASSWORD")
-    from_email = os.getenv("FROM_EMAIL", smtp_user)
-    app_name = os.getenv("APP_NAME", "Study Buddy")
+    mailer.send(user_email, _notification_message(user_name))
+    return {"message": f"Notification queued for {user_email}"}
 
-    msg = MIMEText(f"Hi {user_name}! This is your notification from {app_name}.")
-    msg["Subject"] = f"{app_name} Notification"
-    msg["From"] = from_email
-    msg["To"] = user_email
-
-    try:
-        with smtplib.SMTP(smtp_host, smtp_port) as server:
-            server.starttls()
-            server.login(smtp_user, smtp_pass)
-            server.sendmail(from_email, [user_email], msg.as_string())
-        return {"message": f"Notification sent to {user_email}"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to send email: {e}")
+@app.get("/mailer/stats")
+async def mailer_stats():
+    """Return outbound mail queue counters."""
+    return mailer.stats()
 
 def send_email_notification(user_email, user_name):
-    smtp_host = os.getenv("SMTP_HOST", "smtp.gmail.com")
-    smtp_port = int(os.getenv("SMTP_PORT", "587"))
-    smtp_user = os.getenv("SMTP_USERNAME")
-    smtp_pass = os.getenv("SMTP_PASSWORD")
-    from_email = os.getenv("FROM_EMAIL", smtp_user)
-    app_name = os.getenv("APP_NAME", "Study Buddy")
+    """Queue a reminder email; delivery and retries happen in the mailer."""
+    mailer.send(user_email, _notification_message(user_name))
+    logger.info(f"Notification queued for {user_email}")
 
-    msg = MIMEText(f"Hi {user_name}! This is your notification from {app_name}.")
-    msg["Subject"] = f"{app_name} Notification"
-    msg["From"] = from_email
-    msg["To"] = user_email
 
-    try:
-        with smtplib.SMTP(smtp_host, smtp_port) as server:
-            server.starttls()
-            server.login(smtp_user, smtp_pass)
-            server.sendmail(from_email, [user_email], msg.as_string())
-        logger.info(f"Notification sent to {user_email}")
-    except Exception as e:
-        logger.error(f"Failed to send email to {user_email}: {e}")
+# ---------------------------------------------------------------------------
+# Metrics bridge for the stats() endpoints
+# ---------------------------------------------------------------------------
+
+metrics.register_stats("task_pool", task_pool.stats)
+metrics.register_stats("task_registry", task_registry.stats)
+metrics.register_stats("task_dedup", task_index.stats, labels=task_index.topic_buckets)
+metrics.register_stats("submission_writer", submission_writer.stats)
+metrics.register_stats("leaderboard", leaderboard.stats)
+metrics.register_stats("eval_cache", eval_cache.stats)
+metrics.register_stats("llm_singleflight", llm_flight.stats)
+metrics.register_stats("llm_router", model_router.stats, labels=model_router.configured)
+metrics.register_stats("llm_breaker", llm_breaker.stats)
+metrics.register_stats("llm_scheduler", llm_scheduler.stats, labels=("queued_by_priority", "rejected"))
+metrics.register_stats("token_cache", token_cache.stats)
+metrics.register_stats("mailer", mailer.stats)
+metrics.register_stats("executors", executors.stats, labels=("cpu", "db"))
+metrics.register_stats("syllabus", syllabus.stats)
+metrics.register_stats("scheduler_lease", scheduler_lease.stats)
+metrics.register_stats("cache_watcher", cache_watcher.stats, labels=("generations",))
+metrics.register_stats("storage", lambda: {"write_queue_depth": get_storage(database.DB_PATH).queue_depth()})
 
 
 # ---------------------------------------------------------------------------
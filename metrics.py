@@ -0,0 +1,272 @@
+"""Prometheus metrics for the API.
+
+* :class:`PrometheusMiddleware` records per-route request latency, status
+  codes and in-flight requests (labelled by route template, not raw path).
+* Module-level metrics are updated by the LLM client, storage layer,
+  executors and the notification scheduler.
+* :func:`register_stats` bridges the ``stats()`` dicts of the caches and
+  pools into gauges at scrape time.
+
+``prometheus_client`` is optional: without it every metric is a no-op and
+``/metrics`` answers 503.
+
+With several uvicorn workers, set ``PROMETHEUS_MULTIPROC_DIR`` to an empty
+directory (the Docker image does): each worker then writes its samples
+there and a scrape of any worker returns the sum over all of them. The
+:func:`register_stats` gauges are read at scrape time and so describe the
+worker that answered.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import time
+from typing import Any, Callable, Collection, Dict, Iterator, List, Optional, Tuple, Union
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger("app.metrics")
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+    )
+    from prometheus_client.core import GaugeMetricFamily
+
+    PROMETHEUS_AVAILABLE = True
+except ImportError:  # pragma: no cover - exercised only without the dependency
+    PROMETHEUS_AVAILABLE = False
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+    class _NoopMetric:
+        def __init__(self, *args: Any, **kwargs: Any) -> None:
+            pass
+
+        def labels(self, *args: Any, **kwargs: Any) -> "_NoopMetric":
+            return self
+
+        def inc(self, *args: Any) -> None:
+            pass
+
+        dec = set = observe = inc
+
+    Counter = Gauge = Histogram = _NoopMetric  # type: ignore[misc,assignment]
+
+MULTIPROCESS: bool = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+# Latency buckets centred on the 300 ms p95 goal
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 2.5, 5, 10, 30, 60)
+LLM_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+DB_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1)
+
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency until the response is complete",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served", ["method", "route"],
+    multiprocess_mode="livesum",
+)
+
+LLM_REQUEST_DURATION = Histogram(
+    "llm_request_duration_seconds", "OpenRouter call latency", ["mode", "status"], buckets=LLM_BUCKETS,
+)
+LLM_RETRIES = Counter("llm_retries_total", "LLM calls repeated after unusable output", ["operation"])
+LLM_PARSE_FAILURES = Counter(
+    "llm_json_parse_failures_total", "LLM replies that were not valid JSON", ["operation"],
+)
+LLM_JSON_REPAIRS = Counter(
+    "llm_json_repairs_total", "LLM replies accepted after a local JSON repair", ["operation", "repair"],
+)
+LLM_FIELD_FILLS = Counter(
+    "llm_field_fills_total", "Follow-up LLM requests for only the fields a reply was missing",
+    ["operation", "outcome"],
+)
+LLM_MODEL_CALLS = Counter(
+    "llm_model_calls_total", "OpenRouter calls per routed model", ["model", "outcome"],
+)
+LLM_HEDGES = Counter("llm_hedges_total", "Hedged duplicate LLM requests sent / won / skipped", ["outcome"])
+LLM_UPSTREAM_RETRIES = Counter(
+    "llm_upstream_retries_total", "OpenRouter calls retried after an upstream error", ["reason"],
+)
+LLM_RETRY_BUDGET_EXHAUSTED = Counter(
+    "llm_retry_budget_exhausted_total", "Retries skipped because the retry budget was spent",
+)
+LLM_BREAKER_TRANSITIONS = Counter(
+    "llm_circuit_breaker_transitions_total", "Circuit breaker state changes", ["breaker", "state"],
+)
+LLM_QUEUE_WAIT = Histogram(
+    "llm_queue_wait_seconds", "Time LLM calls waited for a concurrency slot", ["priority"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_ADMISSION_REJECTED = Counter(
+    "llm_admission_rejected_total", "LLM requests turned away with 429", ["priority", "reason"],
+)
+
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "Time spent holding a SQLite connection", ["kind"], buckets=DB_BUCKETS,
+)
+EXECUTOR_WAIT = Histogram(
+    "executor_wait_seconds", "Time jobs waited for a pool worker", ["pool"], buckets=LATENCY_BUCKETS,
+)
+EXECUTOR_JOB_DURATION = Histogram(
+    "executor_job_duration_seconds", "Execution time of pool jobs (bcrypt, DB calls)",
+    ["pool", "job"], buckets=LATENCY_BUCKETS,
+)
+
+SCHEDULER_JOB_DURATION = Histogram(
+    "scheduler_job_duration_seconds", "Background job run time", ["job"], buckets=LATENCY_BUCKETS,
+)
+SCHEDULER_JOB_LAG = Histogram(
+    "scheduler_job_lag_seconds", "Delay between a job's scheduled and actual start", ["job"],
+    buckets=LATENCY_BUCKETS,
+)
+SCHEDULER_JOB_MISSED = Counter("scheduler_job_missed_total", "Job runs skipped as too late", ["job"])
+
+
+# ---------------------------------------------------------------------------
+# HTTP middleware
+# ---------------------------------------------------------------------------
+
+class PrometheusMiddleware:
+    """ASGI middleware timing each request until its last body chunk is sent.
+
+    Streaming (SSE) responses are therefore measured end to end. Requests
+    that match no route share the ``"unmatched"`` label to keep cardinality
+    bounded.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    def _route(self, scope: Scope) -> str:
+        router = scope["app"].router
+        for route in router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", "unmatched")
+        return "unmatched"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not PROMETHEUS_AVAILABLE:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = self._route(scope)
+        status = "500"
+        started = time.perf_counter()
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method, route)
+        in_flight.inc()
+        finished = False
+
+        def observe() -> None:
+            nonlocal finished
+            if not finished:
+                finished = True
+                in_flight.dec()
+                HTTP_REQUEST_DURATION.labels(method, route, status).observe(time.perf_counter() - started)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                observe()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            observe()
+
+
+def render() -> Tuple[bytes, str]:
+    """Return ``(body, content type)`` for the ``/metrics`` endpoint."""
+
+    if not MULTIPROCESS:
+        return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+    # Samples of all workers from PROMETHEUS_MULTIPROC_DIR, plus this worker's stats() gauges
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    if _collector is not None:
+        registry.register(_collector)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    """Drop this worker's live gauges from the multiprocess directory (call on shutdown)."""
+
+    if PROMETHEUS_AVAILABLE and MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+# ---------------------------------------------------------------------------
+# Bridge for existing stats() dicts
+# ---------------------------------------------------------------------------
+
+Labels = Union[Collection[str], Callable[[], Collection[str]]]
+
+_stats_sources: List[Tuple[str, Callable[[], Dict[str, Any]], Labels]] = []
+
+
+class _StatsCollector:
+    """Exposes numeric values of registered ``stats()`` dicts as gauges.
+
+    Nested dicts become labels, e.g. ``executors.stats()["cpu"]["queue_depth"]``
+    is exported as ``studybuddy_executors_queue_depth{key="cpu"}``. Only
+    nested keys listed in the source's ``labels`` are exported; the others
+    (task pool keys, in-flight prompt hashes) would grow without bound.
+    """
+
+    def collect(self) -> Iterator[Any]:
+        families: Dict[str, Any] = {}
+
+        def family(prefix: str, field: str, labelled: bool) -> Any:
+            name = f"studybuddy_{prefix}_{field}"
+            if name not in families:
+                families[name] = GaugeMetricFamily(
+                    name, f"{field} from {prefix} stats()", labels=["key"] if labelled else None,
+                )
+            return families[name]
+
+        for prefix, source, labels in list(_stats_sources):
+            try:
+                stats = source()
+                allowed = labels() if callable(labels) else labels
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("stats() for %s failed", prefix)
+                continue
+            for name, value in stats.items():
+                if isinstance(value, dict):
+                    if name not in allowed:
+                        continue
+                    for field, inner in value.items():
+                        if isinstance(inner, (int, float)):
+                            family(prefix, field, True).add_metric([str(name)], float(inner))
+                elif isinstance(value, (int, float)):
+                    family(prefix, name, False).add_metric([], float(value))
+        yield from families.values()
+
+
+_collector: Optional[_StatsCollector] = None
+
+
+def register_stats(prefix: str, source: Callable[[], Dict[str, Any]], labels: Labels = ()) -> None:
+    """Export ``source()``'s numeric values as ``studybuddy_<prefix>_*`` gauges.
+
+    ``labels`` lists the nested dicts to export with a ``key`` label (or is
+    a callable returning them); keep it to small, bounded sets.
+    """
+
+    global _collector  # pylint: disable=global-statement
+    _stats_sources[:] = [entry for entry in _stats_sources if entry[0] != prefix]
+    _stats_sources.append((prefix, source, labels))
+    if PROMETHEUS_AVAILABLE and _collector is None:
+        _collector = _StatsCollector()
+        REGISTRY.register(_collector)
@@ -0,0 +1,299 @@
+"""Latency-aware routing of LLM calls across several OpenRouter models.
+
+Every model in :data:`LLM_MODELS` keeps an exponentially weighted moving
+average (EWMA) of its latency and error rate plus a window of recent
+latencies. Each call goes to the model with the lowest expected time to a
+successful answer (``latency / (1 - error rate)``) among the healthy ones; a
+model whose error rate crossed :data:`LLM_MAX_ERROR_RATE` is skipped until
+:data:`LLM_MODEL_COOLDOWN` has passed since its last failure, then probed
+again.
+
+With :data:`LLM_HEDGING`, a call the primary has not answered by its p90
+latency is duplicated to the runner-up and whichever answers first wins; the
+other request is cancelled. A hedge is extra upstream load, so the router's
+``hedge_gate`` may veto it (main.py requires a free scheduler slot and retry
+budget). A primary that fails outright is failed over to the runner-up
+immediately. Either way at most two models are asked.
+
+Difficulties can have their own model list
+(``LLM_MODELS_BY_DIFFICULTY="beginner=small/model|other/model"``), e.g. a
+smaller, faster model for beginner tasks.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, TypeVar
+
+import httpx
+
+from circuit_breaker import is_retryable
+from metrics import LLM_HEDGES, LLM_MODEL_CALLS
+
+T = TypeVar("T")
+
+logger = logging.getLogger("app.llm")
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+# Models to route between; empty means the single default model (main.MODEL_NAME)
+LLM_MODELS: List[str] = [m.strip() for m in os.getenv("LLM_MODELS", "").split(",") if m.strip()]
+
+
+def _parse_difficulty_models(value: str) -> Dict[str, List[str]]:
+    """Parse ``"beginner=a|b,hard=c"`` into ``{"beginner": ["a", "b"], "hard": ["c"]}``."""
+
+    routes: Dict[str, List[str]] = {}
+    for entry in value.split(","):
+        difficulty, _, models = entry.partition("=")
+        names = [m.strip() for m in models.split("|") if m.strip()]
+        if difficulty.strip() and names:
+            routes[difficulty.strip().lower()] = names
+    return routes
+
+
+LLM_MODELS_BY_DIFFICULTY: Dict[str, List[str]] = _parse_difficulty_models(os.getenv("LLM_MODELS_BY_DIFFICULTY", ""))
+
+LLM_HEDGING: bool = os.getenv("LLM_HEDGING", "1").lower() not in ("0", "false", "no")
+LLM_HEDGE_QUANTILE: float = float(os.getenv("LLM_HEDGE_QUANTILE", "0.9"))
+LLM_HEDGE_MIN_SAMPLES: int = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_INITIAL_DELAY: float = float(os.getenv("LLM_HEDGE_INITIAL_DELAY", "8"))  # until p90 is known
+LLM_HEDGE_MIN_DELAY: float = float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.5"))
+
+LLM_EWMA_ALPHA: float = float(os.getenv("LLM_EWMA_ALPHA", "0.2"))
+LLM_MAX_ERROR_RATE: float = float(os.getenv("LLM_MAX_ERROR_RATE", "0.5"))
+LLM_MODEL_COOLDOWN: float = float(os.getenv("LLM_MODEL_COOLDOWN", "30"))  # seconds
+
+LATENCY_WINDOW = 200  # recent latencies kept per model for the hedge quantile
+
+
+# ---------------------------------------------------------------------------
+# Per-model health
+# ---------------------------------------------------------------------------
+
+class ModelStats:
+    """EWMA latency / error rate and recent latencies of one model."""
+
+    def __init__(self, alpha: float = LLM_EWMA_ALPHA) -> None:
+        self.alpha = alpha
+        self.latency: Optional[float] = None  # EWMA seconds, None until the first answer
+        self.error_rate = 0.0
+        self.last_error_at = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.recent: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def observe_latency(self, seconds: float) -> None:
+        self.latency = seconds if self.latency is None else self.latency + self.alpha * (seconds - self.latency)
+
+    def record(self, seconds: Optional[float], ok: bool, now: float) -> None:
+        self.requests += 1
+        self.error_rate += self.alpha * ((0.0 if ok else 1.0) - self.error_rate)
+        if ok:
+            self.recent.append(seconds)
+        else:
+            self.errors += 1
+            self.last_error_at = now
+        if seconds is not None:
+            self.observe_latency(seconds)
+
+    def healthy(self, now: float, max_error_rate: float, cooldown: float) -> bool:
+        return self.error_rate < max_error_rate or now - self.last_error_at >= cooldown
+
+    def score(self) -> float:
+        """Expected seconds to a successful answer; untried models score 0 so they get probed."""
+
+        if self.latency is None:
+            return 0.0
+        return self.latency / max(0.05, 1.0 - self.error_rate)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+# ---------------------------------------------------------------------------
+# Router
+# ---------------------------------------------------------------------------
+
+class ModelRouter:
+    """Chooses models for LLM calls and optionally hedges slow ones."""
+
+    def __init__(
+        self,
+        models: Optional[List[str]] = None,
+        by_difficulty: Optional[Dict[str, List[str]]] = None,
+        *,
+        default: Callable[[], str],
+        hedging: bool = LLM_HEDGING,
+        hedge_quantile: float = LLM_HEDGE_QUANTILE,
+        hedge_min_samples: int = LLM_HEDGE_MIN_SAMPLES,
+        hedge_initial_delay: float = LLM_HEDGE_INITIAL_DELAY,
+        hedge_min_delay: float = LLM_HEDGE_MIN_DELAY,
+        max_error_rate: float = LLM_MAX_ERROR_RATE,
+        cooldown: float = LLM_MODEL_COOLDOWN,
+        hedge_gate: Optional[Callable[[], Optional[Callable[[], None]]]] = None,
+    ) -> None:
+        self.models = list(models or [])
+        self.by_difficulty = {k.lower(): list(v) for k, v in (by_difficulty or {}).items()}
+        self.default = default
+        self.hedging = hedging
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_initial_delay = hedge_initial_delay
+        self.hedge_min_delay = hedge_min_delay
+        self.max_error_rate = max_error_rate
+        self.cooldown = cooldown
+        # Called before each hedge: returns a callback releasing what it
+        # reserved for the duplicate request, or None to skip the hedge
+        self.hedge_gate = hedge_gate
+        self._stats: Dict[str, ModelStats] = {}
+        self._lock = threading.Lock()
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.hedges_skipped = 0
+        self.failovers = 0
+
+    def _model_stats(self, model: str) -> ModelStats:
+        with self._lock:
+            return self._stats.setdefault(model, ModelStats())
+
+    def configured(self) -> List[str]:
+        """Every model this router may send requests to."""
+
+        models = self.models + [m for ms in self.by_difficulty.values() for m in ms] + [self.default()]
+        return list(dict.fromkeys(models))
+
+    def candidates(self, difficulty: Optional[str] = None) -> List[str]:
+        """Models for ``difficulty``, best first."""
+
+        models = self.by_difficulty.get((difficulty or "").lower()) or self.models or [self.default()]
+        now = time.time()
+
+        def key(model: str):
+            stats = self._model_stats(model)
+            return (not stats.healthy(now, self.max_error_rate, self.cooldown), stats.score())
+
+        return sorted(models, key=key)  # stable: ties keep the configured order
+
+    def pick(self, difficulty: Optional[str] = None) -> str:
+        return self.candidates(difficulty)[0]
+
+    def observe(self, model: str, seconds: float, ok: bool) -> None:
+        """Record one finished request to ``model`` (used directly for streams)."""
+
+        self._model_stats(model).record(seconds if ok else None, ok, time.time())
+        LLM_MODEL_CALLS.labels(model, "ok" if ok else "error").inc()
+
+    def hedge_delay(self, model: str) -> float:
+        """How long to wait for ``model`` before asking the runner-up too."""
+
+        stats = self._model_stats(model)
+        delay = stats.quantile(self.hedge_quantile) if len(stats.recent) >= self.hedge_min_samples else None
+        return max(self.hedge_min_delay, delay if delay is not None else self.hedge_initial_delay)
+
+    async def _attempt(self, model: str, fn: Callable[[str], Awaitable[T]]) -> T:
+        started = time.perf_counter()
+        try:
+            result = await fn(model)
+        except asyncio.CancelledError:
+            # Lost the race (or the caller went away): it took at least this long
+            self._model_stats(model).observe_latency(time.perf_counter() - started)
+            LLM_MODEL_CALLS.labels(model, "cancelled").inc()
+            raise
+        except Exception as exc:
+            if is_retryable(exc):
+                seconds = time.perf_counter() - started
+                self._model_stats(model).record(seconds if isinstance(exc, httpx.TimeoutException) else None,
+                                                False, time.time())
+                LLM_MODEL_CALLS.labels(model, "error").inc()
+            raise
+        self.observe(model, time.perf_counter() - started, True)
+        return result
+
+    async def call(self, fn: Callable[[str], Awaitable[T]], difficulty: Optional[str] = None) -> T:
+        """Return ``await fn(model)`` for the best model, hedging or failing over to the runner-up."""
+
+        ranked = self.candidates(difficulty)
+        primary, backup = ranked[0], (ranked[1] if len(ranked) > 1 else None)
+        pending: Dict["asyncio.Future[T]", str] = {}
+
+        def launch(model: str, release: Optional[Callable[[], None]] = None) -> None:
+            future = asyncio.ensure_future(self._attempt(model, fn))
+            if release is not None:
+                future.add_done_callback(lambda _: release())
+            pending[future] = model
+
+        launch(primary)
+        hedge_delay = self.hedge_delay(primary) if self.hedging and backup else None
+        started = time.perf_counter()
+        backup_launched = hedged = False
+        error: Optional[BaseException] = None
+        try:
+            while True:
+                timeout = None
+                if hedge_delay is not None and not backup_launched:
+                    timeout = max(0.0, hedge_delay - (time.perf_counter() - started))
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    release = self.hedge_gate() if self.hedge_gate is not None else None
+                    if self.hedge_gate is not None and release is None:
+                        # No capacity to spare: keep waiting for the primary alone
+                        self.hedges_skipped += 1
+                        LLM_HEDGES.labels("skipped").inc()
+                        hedge_delay = None
+                        continue
+                    logger.info("%s slower than %.1fs, hedging with %s", primary, hedge_delay, backup)
+                    self.hedges += 1
+                    LLM_HEDGES.labels("sent").inc()
+                    backup_launched = hedged = True
+                    launch(backup, release)
+                    continue
+                for future in done:
+                    model = pending.pop(future)
+                    if future.exception() is None:
+                        if hedged and model == backup:
+                            self.hedge_wins += 1
+                            LLM_HEDGES.labels("won").inc()
+                        return future.result()
+                    error = future.exception()
+                if pending:
+                    continue
+                if backup and not backup_launched and is_retryable(error):
+                    logger.warning("%s failed (%s), failing over to %s", primary, error, backup)
+                    self.failovers += 1
+                    backup_launched = True
+                    launch(backup)
+                    continue
+                raise error
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            models = dict(self._stats)
+        stats: Dict[str, object] = {
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedges_skipped": self.hedges_skipped,
+            "failovers": self.failovers,
+        }
+        for model, s in models.items():
+            stats[model] = {
+                "latency_ewma": s.latency or 0.0,
+                "latency_p90": s.quantile(0.9) or 0.0,
+                "error_rate": round(s.error_rate, 4),
+                "requests": s.requests,
+                "errors": s.errors,
+                "healthy": s.healthy(time.time(), self.max_error_rate, self.cooldown),
+            }
+        return stats
@@ -0,0 +1,289 @@
+"""Sandboxed local runner for a task's "Sample input cases".
+
+Before a submission is sent to the LLM it is executed against the task's
+sample cases in a separate, resource-limited Python process. Crashing,
+hanging or clearly wrong programs get a precise verdict in milliseconds;
+passing or ambiguous submissions are still escalated to the LLM.
+
+Isolation is defence in depth rather than a jail: every job runs in a fresh
+single-use worker (``python -I sandbox_worker.py``, see there) with CPU-time,
+address-space, process and file-size limits, an audit hook that blocks
+sockets, subprocesses, process-spawning modules and file access outside the
+Python installation, and - when the server runs as root - an unprivileged
+user (``SANDBOX_USER``). Workers get an empty environment and an empty working
+directory, and feedback never quotes what the program printed. Workers are
+started ahead of time so a job does not pay the interpreter start-up cost.
+
+Until workers run under OS-level isolation (a separate container or user
+namespace), the local check is off unless ``SANDBOX_ENABLED=1``.
+"""
+from __future__ import annotations
+
+import ast
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("app.sandbox")
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+SANDBOX_ENABLED: bool = (
+    os.name == "posix" and os.getenv("SANDBOX_ENABLED", "0").lower() not in ("0", "false", "no")
+)
+SANDBOX_POOL_SIZE: int = int(os.getenv("SANDBOX_POOL_SIZE", "2"))         # pre-warmed workers
+SANDBOX_CPU_SECONDS: int = int(os.getenv("SANDBOX_CPU_SECONDS", "2"))     # per job, all cases
+SANDBOX_MEMORY_MB: int = int(os.getenv("SANDBOX_MEMORY_MB", "256"))
+SANDBOX_WALL_TIMEOUT: float = float(os.getenv("SANDBOX_WALL_TIMEOUT", "5"))
+SANDBOX_USER: str = os.getenv("SANDBOX_USER", "nobody")  # workers started as root switch to it; "" keeps root
+SANDBOX_MAX_CASES: int = 10
+SANDBOX_MAX_OUTPUT: int = 10_000  # characters of stdout kept per case
+
+# Exceptions that usually mean the sample input is formatted differently from
+# what the program expects (e.g. "2 3" vs two lines) rather than a real bug.
+_AMBIGUOUS_ERRORS = ("EOFError", "ValueError")
+
+
+# ---------------------------------------------------------------------------
+# Worker pool
+# ---------------------------------------------------------------------------
+
+_WORKER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_worker.py")
+
+
+class SandboxPool:
+    """Pool of pre-warmed, single-use sandbox worker processes."""
+
+    def __init__(
+        self,
+        size: int = SANDBOX_POOL_SIZE,
+        *,
+        cpu_seconds: int = SANDBOX_CPU_SECONDS,
+        memory_mb: int = SANDBOX_MEMORY_MB,
+        wall_timeout: float = SANDBOX_WALL_TIMEOUT,
+        user: Optional[str] = SANDBOX_USER,
+    ) -> None:
+        self.size = size
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_mb * 1024 * 1024
+        self.wall_timeout = wall_timeout
+        self.user = user
+        self._ready: List[asyncio.subprocess.Process] = []
+        # Empty working directory shared by this pool's workers (writes are blocked)
+        self._workdir = tempfile.TemporaryDirectory(prefix="sandbox-")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._spawning = 0
+
+    async def _spawn(self) -> asyncio.subprocess.Process:
+        # No inherited environment (API keys, SMTP password) and no access to the app directory
+        return await asyncio.create_subprocess_exec(
+            sys.executable, "-I", _WORKER,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            env={"PATH": os.defpath},
+            cwd=self._workdir.name,
+        )
+
+    def _check_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Workers' pipes belong to the loop that spawned them
+            for proc in self._ready:
+                if proc.returncode is None:
+                    proc.kill()
+            self._ready = []
+            self._loop = loop
+
+    async def _replenish(self) -> None:
+        self._spawning += 1
+        try:
+            self._ready.append(await self._spawn())
+        except OSError:
+            logger.exception("Failed to start sandbox worker")
+        finally:
+            self._spawning -= 1
+
+    async def warm(self) -> None:
+        """Start workers until ``size`` of them are waiting for jobs."""
+
+        self._check_loop()
+        missing = self.size - len(self._ready) - self._spawning
+        await asyncio.gather(*(self._replenish() for _ in range(max(0, missing))))
+
+    async def close(self) -> None:
+        """Kill idle workers."""
+
+        for proc in self._ready:
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+        self._ready = []
+
+    async def _acquire(self) -> asyncio.subprocess.Process:
+        self._check_loop()
+        while self._ready:
+            proc = self._ready.pop()
+            if proc.returncode is None:
+                break
+        else:
+            proc = await self._spawn()
+        if self.size > 0:
+            asyncio.ensure_future(self.warm())
+        return proc
+
+    async def run(self, code: str, inputs: List[str]) -> List[Dict[str, Any]]:
+        """Run ``code`` once per stdin string in ``inputs``.
+
+        Returns one ``{"status", "stdout", "error"}`` dict per input; status is
+        ``ok``, ``error`` or ``timeout`` (CPU/wall limit hit - remaining cases
+        are reported as timed out too).
+        """
+
+        proc = await self._acquire()
+        job = {
+            "code": code,
+            "inputs": inputs,
+            "cpu_seconds": self.cpu_seconds,
+            "memory_bytes": self.memory_bytes,
+            "max_output": SANDBOX_MAX_OUTPUT,
+            "user": self.user,
+        }
+        assert proc.stdin is not None and proc.stdout is not None
+        results: List[Dict[str, Any]] = []
+        timed_out = False
+        try:
+            proc.stdin.write((json.dumps(job) + "\n").encode("utf-8"))
+            await proc.stdin.drain()
+            proc.stdin.close()
+
+            async def read_results() -> None:
+                assert proc.stdout is not None
+                while len(results) < len(inputs):
+                    line = await proc.stdout.readline()
+                    if not line:
+                        break
+                    results.append(json.loads(line))
+
+            await asyncio.wait_for(read_results(), timeout=self.wall_timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+        except (BrokenPipeError, ConnectionResetError, ValueError):
+            logger.warning("Sandbox worker failed", exc_info=True)
+        finally:
+            # A worker that finished (or was killed by its CPU limit) exits on
+            # its own; only kill it if it is still running. Killing an already
+            # exited child would reap it behind asyncio's child watcher.
+            if not timed_out:
+                try:
+                    await asyncio.wait_for(proc.wait(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    timed_out = True
+            if timed_out and proc.returncode is None:
+                proc.kill()
+            await proc.wait()
+
+        while len(results) < len(inputs):
+            results.append({"status": "timeout", "stdout": "", "error": "Time or memory limit exceeded"})
+        return results
+
+
+# ---------------------------------------------------------------------------
+# Verdicts
+# ---------------------------------------------------------------------------
+
+def _normalize_output(text: str) -> str:
+    return "\n".join(line.rstrip() for line in text.strip().splitlines())
+
+
+def _sample_cases(task: str) -> List[Dict[str, str]]:
+    try:
+        data = json.loads(task)
+    except (TypeError, ValueError):
+        return []
+    cases = data.get("Sample input cases") if isinstance(data, dict) else None
+    if not isinstance(cases, list):
+        return []
+    usable = []
+    for case in cases[:SANDBOX_MAX_CASES]:
+        if not isinstance(case, dict):
+            continue
+        given, expected = case.get("input"), case.get("expected_output")
+        if isinstance(expected, (int, float)) and not isinstance(expected, bool):
+            expected = str(expected)
+        if isinstance(given, str) and isinstance(expected, str):
+            usable.append({"input": given, "expected_output": expected})
+    return usable
+
+
+def _reads_stdin(tree: ast.AST) -> bool:
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "input":
+            return True
+        if isinstance(node, ast.Attribute) and node.attr == "stdin":
+            return True
+        if isinstance(node, ast.Name) and node.id == "stdin":
+            return True
+    return False
+
+
+def _wrong(feedback: str) -> Dict[str, Any]:
+    return {"question": False, "correct": False, "feedback": feedback, "checked_locally": True}
+
+
+async def local_verdict(pool: SandboxPool, task: str, code: str) -> Optional[Dict[str, Any]]:
+    """Return a local "wrong solution" verdict, or ``None`` to escalate to the LLM.
+
+    Only clear failures are decided locally: a crash, a time/memory limit or
+    output that does not match any expected output. Passing submissions,
+    questions, programs that do not read stdin (e.g. function-only solutions)
+    and input-format problems are left to the LLM.
+    """
+
+    cases = _sample_cases(task)
+    if not cases:
+        return None
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return None  # probably a question rather than code
+    if not _reads_stdin(tree):
+        return None
+
+    results = await pool.run(code, [case["input"] for case in cases])
+
+    for case, result in zip(cases, results):
+        if result["status"] == "timeout":
+            return _wrong(
+                f"⏱️ Your program exceeded the time or memory limit on input {case['input']!r}. "
+                "Check for infinite loops or unbounded data structures."
+            )
+        if result["status"] == "error":
+            if result["error"].startswith(_AMBIGUOUS_ERRORS):
+                return None
+            # Only the exception type: messages and output are under the program's control
+            error_type = result["error"].split(":", 1)[0]
+            return _wrong(f"💥 Your program crashed on input {case['input']!r} with {error_type}.")
+
+    mismatches = []
+    for case, result in zip(cases, results):
+        actual, expected = _normalize_output(result["stdout"]), _normalize_output(case["expected_output"])
+        if actual == expected:
+            continue
+        if not actual or expected.lower() in actual.lower():
+            return None  # nothing printed, or extra text around the answer: let the LLM judge
+        mismatches.append(case)
+
+    if not mismatches:
+        return None  # all samples pass - the LLM still checks the general solution
+    case = mismatches[0]
+    return _wrong(
+        f"For input {case['input']!r} the expected output is {case['expected_output']!r}, "
+        "but your program printed something else."
+    )
@@ -0,0 +1,213 @@
+"""Worker process of :mod:`sandbox` (``python -I sandbox_worker.py``).
+
+Reads one job from stdin, runs the submission once per sample input and
+writes one JSON result per line to a private descriptor, then exits.
+
+This module is kept apart from :mod:`sandbox` and only imports a handful of
+standard-library modules, so that nothing able to start a process without an
+audit event (``_posixsubprocess``, pulled in by ``asyncio``/``subprocess``)
+is loaded before user code runs. Those modules cannot be imported afterwards
+either: the audit hook refuses them.
+
+The audit hook is defence in depth, not a jail. When started as root the
+worker also switches to an unprivileged user before it compiles the
+submission, so anything that slips past the hook cannot read the server's
+files or ``/proc/<pid>/environ``.
+"""
+from __future__ import annotations
+
+import builtins
+import io
+import json
+import os
+import pwd
+import random
+import resource
+import signal
+import sys
+from typing import Any, Dict, Optional, Tuple
+
+_BLOCKED_EVENTS = (
+    "socket.",
+    "subprocess.",
+    "os.system",
+    "os.exec",
+    "os.posix_spawn",
+    "os.spawn",
+    "os.fork",
+    "os.forkpty",
+    "os.kill",
+    "os.remove",
+    "os.unlink",
+    "os.rename",
+    "os.rmdir",
+    "os.mkdir",
+    "os.chmod",
+    "os.truncate",
+    "shutil.",
+    "ctypes.",
+    "pty.",
+)
+
+# Modules that start processes or call C functions without audit events.
+# Matched on the last dotted component and on the extension file name, so a
+# hand-made spec ("x._posixsubprocess") or an explicit loader does not help.
+_BLOCKED_MODULES = frozenset({
+    "_posixsubprocess",
+    "posix",
+    "nt",
+    "_ctypes",
+    "ctypes",
+    "_winapi",
+    "subprocess",
+    "multiprocessing",
+    "_multiprocessing",
+})
+
+
+# Directories user code may read (stdlib, site-packages, its empty working
+# directory); set by the worker before the audit hook is installed.
+_READABLE_ROOTS: Tuple[str, ...] = ()
+
+
+def _readable(path: Any) -> bool:
+    if isinstance(path, int):
+        return False  # raw file descriptors, e.g. the hidden result pipe
+    try:
+        resolved = os.path.realpath(os.fsdecode(path))
+    except (TypeError, ValueError):
+        return False
+    return any(resolved == root.rstrip(os.sep) or resolved.startswith(root) for root in _READABLE_ROOTS)
+
+
+def _blocked_module(name: Any, filename: Any) -> bool:
+    if isinstance(name, str) and name.rpartition(".")[2] in _BLOCKED_MODULES:
+        return True
+    if isinstance(filename, (str, bytes)):
+        return os.path.basename(os.fsdecode(filename)).split(".")[0] in _BLOCKED_MODULES
+    return False
+
+
+def _audit(event: str, args: tuple) -> None:
+    if event == "import":
+        if _blocked_module(args[0] if args else None, args[1] if len(args) > 1 else None):
+            raise PermissionError(f"Importing '{args[0]}' is not allowed in the sandbox")
+        return
+    if event == "open":
+        # Also raised by io.open_code() and the import system's file reads
+        mode = args[1] if len(args) > 1 else None
+        flags = args[2] if len(args) > 2 else 0
+        write_flags = os.O_WRONLY | os.O_RDWR | os.O_CREAT | os.O_APPEND | os.O_TRUNC
+        if (isinstance(mode, str) and any(c in mode for c in "wax+")) or (
+            isinstance(flags, int) and flags & write_flags
+        ):
+            raise PermissionError("Writing files is not allowed in the sandbox")
+        if not _readable(args[0]):
+            raise PermissionError("Reading files is not allowed in the sandbox")
+        return
+    if event in ("os.listdir", "os.scandir"):
+        if not _readable(args[0] if args and args[0] is not None else "."):
+            raise PermissionError("Listing directories is not allowed in the sandbox")
+        return
+    if event.startswith(_BLOCKED_EVENTS):
+        raise PermissionError(f"'{event}' is not allowed in the sandbox")
+
+
+def _apply_limits(cpu_seconds: int, memory_bytes: int) -> None:
+    signal.signal(signal.SIGXFSZ, signal.SIG_IGN)  # fail writes instead of dying
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
+    resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+
+
+def _drop_privileges(user: Optional[str]) -> None:
+    """Switch to ``user`` (e.g. ``nobody``) when running as root."""
+
+    if not user or os.geteuid() != 0:
+        return
+    try:
+        entry = pwd.getpwnam(user)
+        uid, gid = entry.pw_uid, entry.pw_gid
+    except KeyError:
+        uid = gid = 65534  # conventional "nobody"
+    os.setgroups([])
+    os.setgid(gid)
+    os.setuid(uid)
+
+
+def _run_case(compiled: Any, case_input: str, max_output: int) -> Dict[str, Any]:
+    if not case_input.endswith("\n"):
+        case_input += "\n"
+    stdout = io.StringIO()
+    saved = sys.stdin, sys.stdout, sys.stderr
+    sys.stdin, sys.stdout, sys.stderr = io.StringIO(case_input), stdout, io.StringIO()
+    status, error = "ok", None
+    try:
+        exec(compiled, {"__name__": "__main__", "__builtins__": builtins})  # pylint: disable=exec-used
+    except SystemExit:
+        pass
+    except BaseException as exc:  # pylint: disable=broad-except
+        status, error = "error", f"{type(exc).__name__}: {exc}"
+    finally:
+        sys.stdin, sys.stdout, sys.stderr = saved
+    return {"status": status, "stdout": stdout.getvalue()[:max_output], "error": error}
+
+
+def _hide_fd(fd: int) -> int:
+    soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    upper = min(soft, 4096) if soft != resource.RLIM_INFINITY else 4096
+    target = random.SystemRandom().randrange(64, max(65, upper))
+    os.dup2(fd, target, inheritable=False)
+    os.close(fd)
+    return target
+
+
+def _worker_main() -> None:
+    """Wait for one job on stdin, run it under limits, stream results, exit."""
+
+    line = sys.stdin.buffer.readline()
+    if not line:
+        return
+    job = json.loads(line)
+
+    # Keep a private handle for results at an unpredictable descriptor and
+    # hide the protocol pipes from user code. Listing /proc/self/fd is blocked
+    # by the audit hook; a program that still finds the handle can only forge
+    # its own results, which never make a submission pass locally.
+    out_fd = _hide_fd(os.dup(1))
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+
+    global _READABLE_ROOTS  # pylint: disable=global-statement
+    roots = {sys.prefix, sys.base_prefix, sys.exec_prefix, sys.base_exec_prefix, os.getcwd()}
+    _READABLE_ROOTS = tuple(os.path.join(os.path.realpath(root), "") for root in roots)
+
+    # Already imported by os; drop the cached copy so "import posix" goes
+    # through the import system (and the audit hook) again.
+    for name in _BLOCKED_MODULES:
+        sys.modules.pop(name, None)
+
+    _drop_privileges(job.get("user"))
+    _apply_limits(job["cpu_seconds"], job["memory_bytes"])
+    try:
+        compiled = compile(job["code"], "<submission>", "exec")
+    except (SyntaxError, ValueError) as exc:
+        compiled = None
+        error = f"{type(exc).__name__}: {exc}"
+    sys.addaudithook(_audit)
+
+    for case_input in job["inputs"]:
+        if compiled is None:
+            result = {"status": "error", "stdout": "", "error": error}
+        else:
+            result = _run_case(compiled, case_input, job["max_output"])
+        os.write(out_fd, (json.dumps(result) + "\n").encode("utf-8"))
+    os._exit(0)  # pylint: disable=protected-access
+
+
+if __name__ == "__main__":
+    _worker_main()
@@ -0,0 +1,71 @@
+"""Single-flight coalescing of identical in-flight async calls.
+
+When many callers ask for the same thing at once (a whole class opening the
+same topic), only the first one - the *leader* - performs the upstream call;
+everybody else awaits the leader's result or error.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class _Flight(Generic[T]):
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task[T]") -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight(Generic[T]):
+    """Share one in-flight call per key between all concurrent callers.
+
+    Results are shared by reference, so callers must treat them as read-only.
+    A caller being cancelled (e.g. its client disconnected) does not cancel the
+    shared call unless it was the last one waiting for it.
+    """
+
+    def __init__(self) -> None:
+        self._flights: Dict[str, _Flight[T]] = {}
+        self.calls = 0      # upstream calls actually made
+        self.coalesced = 0  # callers served by somebody else's call
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Return ``await fn()``, sharing the call with concurrent callers of ``key``."""
+
+        flight = self._flights.get(key)
+        if flight is None or flight.task.done():
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _t, k=key, f=flight: self._forget(k, f))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _forget(self, key: str, flight: _Flight[T]) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return call/coalescing counters and waiter counts per in-flight key."""
+
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "inflight": len(self._flights),
+            "waiting": sum(flight.waiters for flight in self._flights.values()),
+            "waiters": {key: flight.waiters for key, flight in self._flights.items()},
+        }
@@ -70,22 +70,28 @@ document.addEventListener('DOMContentLoaded', () => {
   const scoreModal  = document.getElementById('score-modal');
   const scoreClose  = document.getElementById('score-close');
   const scoreText   = document.getElementById('score-text');
+  const rankText    = document.getElementById('rank-text');
+  const leaderList  = document.getElementById('leaderboard-list');
 
   let solvedCount = 0;
   const chats          = {};   // { topicKey: [outerHTML,…] }
   const lastTasks      = {};   // { topicKey: rawTaskJSON }
+  const lastTaskIds    = {};   // { topicKey: server task_id }
   const lastDifficulty = {};   // { topicKey: 'beginner' | 'medium' | 'hard' }
 
   let currentTopicKey  = null; // snake_case ключ выбранной темы
   let attemptMade = false;
 
-  const scoreKey = () => 'pp_solved_' + (userNameSp.textContent || 'anon');
-
-  const loadScore = () => {
-    solvedCount = parseInt(localStorage.getItem(scoreKey()) || '0', 10);
+  // The score lives on the server: tasks solved, counted once per task.
+  const loadScore = async () => {
+    try {
+      const r = await fetch('/score', { headers: authHeaders() });
+      if (r.ok) solvedCount = (await r.json()).score;
+    } catch (e) {
+      // keep the last known score
+    }
     updateScoreDisplay();
   };
-  const saveScore = () => localStorage.setItem(scoreKey(), solvedCount);
 
   const updateScoreDisplay = () => {
     scoreCntSp.textContent = solvedCount;
@@ -93,8 +99,26 @@ document.addEventListener('DOMContentLoaded', () => {
       `You have solved ${solvedCount} task${solvedCount === 1 ? '' : 's'} 🎉`;
   };
 
+  const loadLeaderboard = async () => {
+    try {
+      const r = await fetch('/leaderboard?limit=10', { headers: authHeaders() });
+      if (!r.ok) return;
+      const data = await r.json();
+      leaderList.innerHTML = '';
+      data.top.forEach(({ login, score }) => {
+        const li = document.createElement('li');
+        li.textContent = `${login} — ${score}`;
+        leaderList.appendChild(li);
+      });
+      rankText.textContent = data.me && data.me.score ? `Your rank: #${data.me.rank}` : '';
+    } catch (e) {
+      // the leaderboard is optional
+    }
+  };
+
   scoreBtn.addEventListener('click', () => {
-    updateScoreDisplay();
+    loadScore();
+    loadLeaderboard();
     scoreModal.classList.remove('hidden');
   });
   scoreClose.addEventListener('click',
@@ -197,13 +221,111 @@ document.addEventListener('DOMContentLoaded', () => {
 
   const fetchEval = async (url, opts={}) => {
     const r = await fetch(url, opts);
-    if (!r.ok) throw new Error(await r.text());
+    if (!r.ok) throw await responseError(r);
     const data = await r.json();
     if ('message' in data) return data.message;
     return `${data.correct ? '✅ Correct solution!' : '❌ Wrong solution.'}`
       + (data.feedback ? `\n\n${data.feedback}` : '');
   };
 
+  // Sends the session token with LLM requests so the server can share the
+  // LLM quota fairly per account instead of per (shared campus) IP.
+  const authHeaders = () => {
+    const token = localStorage.getItem('pp_token');
+    return token ? { 'Authorization': `Bearer ${token}` } : {};
+  };
+
+  // Turns an error response into a readable message (429/503 carry a "detail").
+  const responseError = async res => {
+    const text = await res.text();
+    try {
+      return new Error(JSON.parse(text).detail || text);
+    } catch (e) {
+      return new Error(text);
+    }
+  };
+
+  // Reads a Server-Sent Events response and calls onEvent(name, data) per event.
+  const readEventStream = async (res, onEvent) => {
+    if (!res.ok || !res.body) throw await responseError(res);
+    const reader  = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let sep;
+      while ((sep = buffer.indexOf('\n\n')) !== -1) {
+        const block = buffer.slice(0, sep);
+        buffer = buffer.slice(sep + 2);
+        let name = 'message', data = '';
+        block.split('\n').forEach(line => {
+          if (line.startsWith('event: ')) name = line.slice(7);
+          else if (line.startsWith('data: ')) data += line.slice(6);
+        });
+        onEvent(name, data ? JSON.parse(data) : null);
+      }
+    }
+  };
+
+  // Streams /evaluate_code/stream and formats the final verdict like fetchEval.
+  const fetchEvalStream = async (url, body) => {
+    const res = await fetch(url, {
+      method : 'POST',
+      headers: { 'Content-Type': 'application/json', ...authHeaders() },
+      body   : JSON.stringify(body)
+    });
+    let result = null;
+    await readEventStream(res, (event, data) => {
+      if (event === 'done') result = data;
+      else if (event === 'error') throw new Error(data.detail);
+    });
+    if (!result) throw new Error('Evaluation stream ended unexpectedly');
+    return `${result.correct ? '✅ Correct solution!' : '❌ Wrong solution.'}`
+      + (result.feedback ? `\n\n${result.feedback}` : '');
+  };
+
+  // Streams /generate_task/stream, previewing name + description as soon as
+  // they arrive, and resolves with { task: raw task JSON string, task_id }.
+  const streamTask = async (topic, level, requestKey) => {
+    const res = await fetch(
+      `/generate_task/stream?topic=${encodeURIComponent(topic)}&difficulty=${encodeURIComponent(level)}`,
+      { headers: authHeaders() }
+    );
+    let preview = null;
+    const fields = {};
+    const dropPreview = () => { if (preview) { preview.remove(); preview = null; } };
+    let result = null;
+    try {
+      await readEventStream(res, (event, data) => {
+        if (event === 'field') {
+          fields[data.name] = data.value;
+          if ((data.name === 'Task name' || data.name === 'Task description')
+              && currentTopicKey === requestKey) {
+            if (!preview) {
+              preview = document.createElement('div');
+              preview.className = 'message bot';
+              messagesBox.appendChild(preview);
+            }
+            preview.textContent = `📝 *${fields['Task name'] || ''}*\n\n${fields['Task description'] || ''}\n\n⏳ …`;
+            messagesBox.scrollTop = messagesBox.scrollHeight;
+          }
+        } else if (event === 'retry') {
+          dropPreview();
+        } else if (event === 'done') {
+          result = data;
+        } else if (event === 'error') {
+          throw new Error(data.detail);
+        }
+      });
+    } finally {
+      dropPreview();
+    }
+    if (!result) throw new Error('Task stream ended unexpectedly');
+    return result;
+  };
+
   const updateTopicList = arr => {
     syllabusLoaded = arr.length > 0;
     topicsList.innerHTML = '';
@@ -531,6 +653,11 @@ document.addEventListener('DOMContentLoaded', () => {
     adjustLayoutHeight();
     scoreBtn.classList.add('hidden');
     notificationSettingsBtn.classList.add('hidden'); // <-- Hide bell after logout
+    const token = localStorage.getItem('pp_token');
+    if (token) {
+      // Revoke server-side so the cached token stops working immediately
+      fetch('/logout', { method: 'POST', headers: { 'Authorization': `Bearer ${token}` } }).catch(() => {});
+    }
     localStorage.removeItem('pp_token'); // Remove token on logout
     // Clear login state from localStorage
     localStorage.removeItem('pp_loggedIn');
@@ -648,21 +775,15 @@ document.addEventListener('DOMContentLoaded', () => {
     const stopNotice = makeWaitingNotice('⏳ Generating your exercise, please wait…');
 
     try {
-      const res = await fetch(
-        `/generate_task?topic=${encodeURIComponent(selectedTopic)}&difficulty=${encodeURIComponent(level)}`
-      );
-      const json = await res.json();
+      const json = await streamTask(selectedTopic, level, requestKey);
       console.log("Raw JSON response from backend:", json);
       currentTaskRaw = json.task;
 
-      if (!res.ok) {
-        throw new Error(json.error || res.statusText);
-      }
-
       const taskObj = JSON.parse(json.task);
 
       // Всегда сохраняем в общий кэш
       lastTasks[requestKey]      = json.task;
+      lastTaskIds[requestKey]    = json.task_id;
       lastDifficulty[requestKey] = level;
 
       // Обновляем локальные переменные, только если пользователь всё ещё на этой теме
@@ -736,6 +857,7 @@ document.addEventListener('DOMContentLoaded', () => {
   const requestKey   = currentTopicKey;          // snake_case ключ темы
   const topicName    = selectedTopic;            //  название
   const taskRaw      = lastTasks[requestKey];    // ← нужная задача
+  const taskId       = lastTaskIds[requestKey];
   const diffToSend   = lastDifficulty[requestKey];
 
   if (!taskRaw) {
@@ -758,29 +880,23 @@ document.addEventListener('DOMContentLoaded', () => {
   userInput.style.height = 'auto';
   const stopNotice = makeWaitingNotice('⏳ Checking your solution…');
 
-  /* 4. Отправляем на сервер ровно тот task, что лежит в кэше топика */
+  /* 4. Отправляем на сервер task_id задачи из кэша топика
+        (или саму задачу, если сервер не смог её сохранить) */
   try {
-    const respText = await fetchEval('/submit_code', {
-      method : 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body   : JSON.stringify({
-        topic      : topicName,
-        difficulty : diffToSend,
-        task       : taskRaw,        // ← главное изменение
-        code
-      })
+    const respText = await fetchEvalStream('/evaluate_code/stream', {
+      topic      : topicName,
+      difficulty : diffToSend,
+      ...(taskId ? { task_id: taskId } : { task: taskRaw }),
+      code
     });
 
     /* 5. Ответ кладём в нужный топик */
     pushToChat(respText, 'bot', requestKey);
 
-    // --- SCORE FIX: increment only if correct ---
+    // Submissions are written in batches; refresh the score once it landed
     if (respText && respText.startsWith('✅ Correct solution!')) {
-      solvedCount++;
-      saveScore();
-      updateScoreDisplay();
+      setTimeout(loadScore, 1000);
     }
-    // --- END SCORE FIX ---
 
   } catch (err) {
     pushToChat(`Error: ${err.message}`, 'bot', requestKey);
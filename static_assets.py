@@ -0,0 +1,201 @@
+"""Fingerprinted, pre-compressed frontend assets.
+
+``script.js`` and ``style.css`` are published under content-hashed names
+(``/assets/script.3f9c0a1b2d4e.js``) so they can be cached forever, and
+``index.html`` is rewritten to reference them. Every file is compressed
+once, up front, with gzip and - if the ``brotli`` package is installed -
+brotli.
+
+The app builds this set in memory at import time and serves it without
+touching the disk (:func:`serve`). For nginx the same set is written out by
+the build step::
+
+    python static_assets.py --out static/dist
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+logger = logging.getLogger("app.static_assets")
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+STATIC_DIR: Path = Path(__file__).parent / "static"
+ASSET_PREFIX: str = "/assets/"
+FINGERPRINTED: Tuple[str, ...] = ("script.js", "style.css")
+HASH_LENGTH: int = 12
+MIN_COMPRESS_SIZE: int = 512  # bytes; smaller bodies aren't worth an encoded variant
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Preference when the client accepts several encodings equally
+_ENCODINGS: Tuple[str, ...] = ("br", "gzip")
+_SUFFIXES: Dict[str, str] = {"br": ".br", "gzip": ".gz"}
+
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Asset:
+    """One servable file with its pre-encoded variants."""
+
+    path: str  # URL path, e.g. "/assets/script.3f9c0a1b2d4e.js"
+    content_type: str
+    cache_control: str
+    digest: str
+    bodies: Dict[str, bytes] = field(default_factory=dict)  # encoding -> body ("identity" always present)
+
+    def etag(self, encoding: str) -> str:
+        # Strong validators must differ between encoded representations
+        return f'"{self.digest}"' if encoding == "identity" else f'"{self.digest}-{encoding}"'
+
+
+def _compress(body: bytes) -> Dict[str, bytes]:
+    variants = {"identity": body}
+    if len(body) < MIN_COMPRESS_SIZE:
+        return variants
+    variants["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=11)
+    # Drop variants that didn't shrink the body
+    return {enc: data for enc, data in variants.items() if enc == "identity" or len(data) < len(body)}
+
+
+def _asset(path: str, body: bytes, cache_control: str) -> Asset:
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type == "application/javascript":
+        content_type += "; charset=utf-8"
+    digest = hashlib.sha256(body).hexdigest()[:HASH_LENGTH]
+    return Asset(path, content_type, cache_control, digest, _compress(body))
+
+
+def build(static_dir: Path = STATIC_DIR) -> Dict[str, Asset]:
+    """Fingerprint and compress the frontend; returns assets by URL path."""
+
+    if brotli is None:
+        logger.debug("brotli is not installed, serving gzip-compressed assets only")
+
+    assets: Dict[str, Asset] = {}
+    index = (static_dir / "index.html").read_text(encoding="utf-8")
+    for name in FINGERPRINTED:
+        source = static_dir / name
+        if not source.exists():
+            continue
+        body = source.read_bytes()
+        stem, ext = os.path.splitext(name)
+        digest = hashlib.sha256(body).hexdigest()[:HASH_LENGTH]
+        asset = _asset(f"{ASSET_PREFIX}{stem}.{digest}{ext}", body, IMMUTABLE)
+        assets[asset.path] = asset
+        for ref in (f'"/{name}"', f'"/static/{name}"', f'"{name}"'):
+            index = index.replace(ref, f'"{asset.path}"')
+
+    assets["/"] = _asset("/index.html", index.encode("utf-8"), REVALIDATE)
+    return assets
+
+
+def write(assets: Dict[str, Asset], out_dir: Path) -> List[Path]:
+    """Write ``assets`` (and their ``.gz``/``.br`` variants) below ``out_dir``."""
+
+    written = []
+    for asset in assets.values():
+        target = out_dir / asset.path.lstrip("/")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        for encoding, body in asset.bodies.items():
+            path = target.with_name(target.name + _SUFFIXES.get(encoding, ""))
+            path.write_bytes(body)
+            written.append(path)
+    return written
+
+
+# ---------------------------------------------------------------------------
+# Serving
+# ---------------------------------------------------------------------------
+
+def _accepted(accept_encoding: str) -> Dict[str, float]:
+    """Parse ``Accept-Encoding`` into ``{coding: q}``."""
+
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip()] = q
+    return accepted
+
+
+def negotiate(asset: Asset, accept_encoding: str) -> str:
+    """Pick the best available encoding of ``asset`` for ``accept_encoding``."""
+
+    accepted = _accepted(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = "identity", 0.0
+    for encoding in _ENCODINGS:
+        q = accepted.get(encoding, wildcard)
+        if encoding in asset.bodies and q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """``If-None-Match`` uses weak comparison: ``W/"x"`` matches ``"x"``."""
+
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+def serve(asset: Asset, accept_encoding: str, if_none_match: str) -> Tuple[int, Optional[bytes], Dict[str, str]]:
+    """Return ``(status, body, headers)`` for a request of ``asset``.
+
+    ``body`` is ``None`` for a ``304 Not Modified``.
+    """
+
+    encoding = negotiate(asset, accept_encoding)
+    etag = asset.etag(encoding)
+    headers = {"ETag": etag, "Cache-Control": asset.cache_control, "Vary": "Accept-Encoding"}
+    if etag_matches(if_none_match, etag):
+        return 304, None, headers
+    headers["Content-Type"] = asset.content_type
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return 200, asset.bodies[encoding], headers
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build fingerprinted, pre-compressed frontend assets.")
+    parser.add_argument("--src", type=Path, default=STATIC_DIR)
+    parser.add_argument("--out", type=Path, default=STATIC_DIR / "dist")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+    for path in write(build(args.src), args.out):
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""Pooled SQLite access layer.
+
+One :class:`Storage` per database file holds:
+
+* a bounded pool of long-lived reader connections (so prepared statements are
+  cached per connection instead of being re-parsed on every call);
+* a single writer thread that owns the only write connection and executes
+  write jobs one at a time from a queue, so concurrent writers never race for
+  the database lock and readers never see "database is locked".
+
+Every connection runs in WAL mode with ``synchronous=NORMAL``, a busy timeout,
+memory-mapped I/O and an enlarged page cache.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, TypeVar
+
+from metrics import DB_QUERY_DURATION
+
+T = TypeVar("T")
+
+logger = logging.getLogger("app.storage")
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+STORAGE_POOL_SIZE: int = int(os.getenv("STORAGE_POOL_SIZE", "8"))            # reader connections
+STORAGE_BUSY_TIMEOUT_MS: int = int(os.getenv("STORAGE_BUSY_TIMEOUT_MS", "5000"))
+STORAGE_CACHE_SIZE_KIB: int = int(os.getenv("STORAGE_CACHE_SIZE_KIB", "16384"))  # per connection
+STORAGE_MMAP_SIZE: int = int(os.getenv("STORAGE_MMAP_SIZE", str(64 * 1024 * 1024)))
+STORAGE_STATEMENT_CACHE: int = int(os.getenv("STORAGE_STATEMENT_CACHE", "256"))
+STORAGE_CHECKOUT_TIMEOUT: float = 30.0  # seconds to wait for a free reader connection
+
+
+class Storage:
+    """Reader pool + single-writer queue for one SQLite database file."""
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        pool_size: int = STORAGE_POOL_SIZE,
+        busy_timeout_ms: int = STORAGE_BUSY_TIMEOUT_MS,
+        cache_size_kib: int = STORAGE_CACHE_SIZE_KIB,
+        mmap_size: int = STORAGE_MMAP_SIZE,
+        statement_cache: int = STORAGE_STATEMENT_CACHE,
+    ) -> None:
+        self.path = path
+        self.pool_size = pool_size
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cache_size_kib = cache_size_kib
+        self.mmap_size = mmap_size
+        self.statement_cache = statement_cache
+
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._created = 0
+        self._pool_lock = threading.Lock()
+        self._closed = False
+
+        self._jobs: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._writer_conn = self._connect()
+        self._writer = threading.Thread(
+            target=self._writer_loop, name=f"sqlite-writer:{os.path.basename(path)}", daemon=True
+        )
+        self._writer.start()
+
+    # ------------------------------------------------------------------
+    # Connections
+    # ------------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            cached_statements=self.statement_cache,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kib)}")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def _checkout(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._pool_lock:
+            if self._created < self.pool_size:
+                self._created += 1
+                return self._connect()
+        return self._idle.get(timeout=STORAGE_CHECKOUT_TIMEOUT)
+
+    @contextmanager
+    def read(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a pooled connection for read-only queries.
+
+        Inside a :meth:`write` job the writer's own connection is returned, so
+        the job sees its uncommitted changes.
+        """
+
+        if threading.current_thread() is self._writer:
+            yield self._writer_conn
+            return
+        conn = self._checkout()
+        started = time.perf_counter()
+        try:
+            yield conn
+        finally:
+            DB_QUERY_DURATION.labels("read").observe(time.perf_counter() - started)
+            if conn.in_transaction:
+                conn.rollback()
+            if self._closed:
+                conn.close()
+            else:
+                self._idle.put(conn)
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def write(self, job: Callable[[sqlite3.Connection], T]) -> T:
+        """Run ``job(conn)`` in the writer thread inside one transaction.
+
+        Blocks until the job has been committed (or rolled back) and returns
+        its result or re-raises its exception. Nested calls from inside a job
+        run inline as part of the outer transaction.
+        """
+
+        if threading.current_thread() is self._writer:
+            return job(self._writer_conn)
+        if self._closed:
+            raise RuntimeError(f"Storage for {self.path} is closed")
+        future: "Future[T]" = Future()
+        self._jobs.put((job, future))
+        return future.result()
+
+    def _writer_loop(self) -> None:
+        conn = self._writer_conn
+        while True:
+            item = self._jobs.get()
+            if item is None:
+                break
+            job, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            started = time.perf_counter()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                result = job(conn)
+                conn.commit()
+            except BaseException as exc:  # pylint: disable=broad-except
+                if conn.in_transaction:
+                    conn.rollback()
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+            DB_QUERY_DURATION.labels("write").observe(time.perf_counter() - started)
+        conn.close()
+
+    def queue_depth(self) -> int:
+        """Number of write jobs waiting for the writer thread."""
+
+        return self._jobs.qsize()
+
+    def close(self) -> None:
+        """Stop the writer thread and close all idle connections."""
+
+        if self._closed:
+            return
+        self._closed = True
+        self._jobs.put(None)
+        self._writer.join(timeout=5)
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+# ---------------------------------------------------------------------------
+# Registry
+# ---------------------------------------------------------------------------
+
+_storages: Dict[str, Storage] = {}
+_registry_lock = threading.Lock()
+
+
+def get_storage(path: str) -> Storage:
+    """Return the shared :class:`Storage` for ``path`` (created on first use)."""
+
+    key = os.path.abspath(path)
+    storage = _storages.get(key)
+    if storage is None:
+        with _registry_lock:
+            storage = _storages.get(key)
+            if storage is None:
+                storage = _storages[key] = Storage(key)
+    return storage
+
+
+def close_storage(path: Optional[str] = None) -> None:
+    """Close the storage for ``path``, or every open storage if omitted."""
+
+    with _registry_lock:
+        keys = [os.path.abspath(path)] if path else list(_storages)
+        for key in keys:
+            storage = _storages.pop(key, None)
+            if storage is not None:
+                storage.close()
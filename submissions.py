@@ -0,0 +1,171 @@
+"""Batched, asynchronous recording of graded submissions.
+
+``/evaluate_code`` must not wait for a SQLite write after every verdict.
+It hands a :class:`Submission` to :meth:`SubmissionWriter.record`, which
+returns immediately. A background thread collects submissions for up to
+``SUBMISSION_FLUSH_INTERVAL`` seconds or ``SUBMISSION_BATCH_SIZE`` rows and
+writes each batch in a single transaction (:func:`database.add_submissions`).
+That transaction also updates the task counters and the user's score.
+
+The queue is bounded (``SUBMISSION_MAX_PENDING``). If SQLite falls that far
+behind, new submissions are dropped and counted rather than blocking the
+event loop.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import database
+
+logger = logging.getLogger("app.submissions")
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+SUBMISSION_BATCH_SIZE: int = int(os.getenv("SUBMISSION_BATCH_SIZE", "200"))
+SUBMISSION_FLUSH_INTERVAL: float = float(os.getenv("SUBMISSION_FLUSH_INTERVAL", "0.25"))  # seconds
+SUBMISSION_MAX_PENDING: int = int(os.getenv("SUBMISSION_MAX_PENDING", "10000"))
+
+HISTORY_PAGE_SIZE = 20
+HISTORY_MAX_PAGE_SIZE = 100
+
+
+@dataclass(frozen=True)
+class Submission:
+    user_id: Optional[int]  # None for anonymous submissions (task counters only)
+    task_id: Optional[str]  # None when an older client sent the raw task
+    topic: str
+    difficulty: str
+    correct: bool
+    created_at: str  # ISO timestamp, also the history sort key
+
+
+def encode_cursor(created_at: str, submission_id: int) -> str:
+    return f"{submission_id}:{created_at}"
+
+
+def decode_cursor(cursor: str):
+    """Return ``(created_at, id)`` for :func:`database.get_submissions`; ``ValueError`` if malformed."""
+
+    submission_id, _, created_at = cursor.partition(":")
+    if not created_at:
+        raise ValueError("malformed cursor")
+    return created_at, int(submission_id)
+
+
+class SubmissionWriter:
+    """Single background thread appending queued submissions in batches."""
+
+    def __init__(
+        self,
+        write: Callable[[List[Submission]], None] = database.add_submissions,
+        *,
+        batch_size: int = SUBMISSION_BATCH_SIZE,
+        flush_interval: float = SUBMISSION_FLUSH_INTERVAL,
+        max_pending: int = SUBMISSION_MAX_PENDING,
+    ) -> None:
+        self._write = write
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Optional[Submission]]" = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    def record(self, submission: Submission) -> None:
+        """Queue ``submission``; it is written within ``flush_interval``."""
+
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(submission)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            logger.warning("Submission queue full, dropping a submission of user %s", submission.user_id)
+
+    def flush(self) -> None:
+        """Block until everything queued so far has been written (or failed)."""
+
+        self._queue.join()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Write what is queued and stop the thread."""
+
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "batches": self.batches,
+            }
+
+    # ------------------------------------------------------------------
+    # Writer thread
+    # ------------------------------------------------------------------
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="submission-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        stopping = False
+        while True:
+            first = self._queue.get()
+            batch: List[Submission] = []
+            if first is None:
+                stopping = True
+            else:
+                batch.append(first)
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = 0.0 if stopping else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    self._queue.task_done()
+                else:
+                    batch.append(item)
+            self._write_batch(batch)
+            for _ in range(len(batch) + (first is None)):
+                self._queue.task_done()
+            if stopping and self._queue.empty():
+                return
+
+    def _write_batch(self, batch: List[Submission]) -> None:
+        if not batch:
+            return
+        try:
+            self._write(batch)
+        except sqlite3.Error:
+            logger.exception("Failed to write %d submissions", len(batch))
+            with self._lock:
+                self.failed += len(batch)
+            return
+        with self._lock:
+            self.written += len(batch)
+            self.batches += 1
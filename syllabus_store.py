@@ -0,0 +1,132 @@
+"""In-memory syllabus with atomic writes and content ETags.
+
+Every page load asks for the syllabus, but it only changes when an admin
+uploads a new one. :class:`SyllabusStore` keeps the parsed topics and the
+ready-to-send JSON body of ``syllabus.json`` in memory, so a read is a
+dictionary lookup with no file I/O. A save writes a temporary file next to
+the target and ``os.replace``-s it over the old one (readers see either the
+old or the new file, never half of it), then swaps the snapshot.
+
+Each snapshot carries a strong ETag derived from its content, letting
+``/get_syllabus`` answer ``304 Not Modified`` to clients that already hold it.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+logger = logging.getLogger("app.syllabus")
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """Immutable view of one syllabus version."""
+
+    topics: Tuple[str, ...]
+    body: bytes  # JSON response body, ``{"topics": [...]}``
+    etag: str    # quoted strong validator
+
+
+def _snapshot(topics: List[str]) -> Snapshot:
+    body = json.dumps({"topics": topics}, ensure_ascii=False).encode("utf-8")
+    return Snapshot(tuple(topics), body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+
+
+def _read_topics(path: Path) -> List[str]:
+    """Return list of topics from ``path`` (empty if missing or unreadable)."""
+
+    if not path.exists():
+        return []
+    try:
+        with path.open("r", encoding="utf-8") as f_in:
+            data = json.load(f_in)
+        topics = data.get("topics") if isinstance(data, dict) else None
+        if not isinstance(topics, list):
+            topics = []
+    except Exception:  # pylint: disable=broad-except
+        logger.exception("Failed to read syllabus")
+        topics = []
+    return topics
+
+
+def _write_atomic(path: Path, data: Dict[str, Any]) -> None:
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f_out:
+            json.dump(data, f_out, ensure_ascii=False, indent=2)
+            f_out.flush()
+            os.fsync(f_out.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class SyllabusStore:
+    """Snapshot cache in front of the syllabus file.
+
+    Parameters
+    ----------
+    path:
+        Callable returning the file location. It is resolved on every call,
+        so pointing the app at another file (e.g. in tests) takes effect
+        immediately; each path has its own snapshot.
+    """
+
+    def __init__(self, path: Callable[[], Path]) -> None:
+        self._path = path
+        self._snapshots: Dict[Path, Snapshot] = {}
+        self._lock = threading.Lock()  # serializes writers and first loads
+        self._loads = 0
+        self._writes = 0
+
+    def snapshot(self) -> Snapshot:
+        path = self._path()
+        snap = self._snapshots.get(path)
+        if snap is not None:
+            return snap
+        with self._lock:
+            snap = self._snapshots.get(path)
+            if snap is None:
+                snap = self._snapshots[path] = _snapshot(_read_topics(path))
+                self._loads += 1
+            return snap
+
+    def topics(self) -> List[str]:
+        return list(self.snapshot().topics)
+
+    def save(self, topics: List[str]) -> Snapshot:
+        """Atomically replace the syllabus file and publish a new snapshot.
+
+        Blocking; call it from a worker thread.
+        """
+
+        path = self._path()
+        snap = _snapshot(list(topics))
+        with self._lock:
+            _write_atomic(path, {"topics": list(snap.topics)})
+            self._snapshots[path] = snap
+            self._writes += 1
+        return snap
+
+    def invalidate(self) -> None:
+        """Drop all snapshots; the next read loads the file again."""
+
+        with self._lock:
+            self._snapshots.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        snap = self._snapshots.get(self._path())
+        return {
+            "loads": self._loads,
+            "writes": self._writes,
+            "topics": len(snap.topics) if snap else None,
+            "etag": snap.etag if snap else None,
+        }
@@ -0,0 +1,255 @@
+"""Near-duplicate detection for generated tasks (MinHash + LSH).
+
+The LLM often answers the same topic and difficulty with nearly the same
+task. Before a generated task is accepted, :meth:`TaskIndex.check` compares
+it with every task generated so far for that topic and difficulty.
+
+* A task is reduced to the set of word ``TASK_DEDUP_SHINGLE``-grams of its
+  name and description. Its MinHash signature has ``TASK_DEDUP_NUM_PERM``
+  values. The share of equal values between two signatures estimates the
+  Jaccard similarity of their shingle sets.
+* Locality-sensitive hashing splits each signature into
+  ``TASK_DEDUP_BANDS`` bands. Only tasks sharing at least one band are
+  compared, so a lookup is a few dict probes, not a scan.
+* A task at or above ``TASK_DEDUP_THRESHOLD`` similarity is a duplicate.
+  Task generation then asks the LLM again, at most
+  ``TASK_DEDUP_MAX_REROLLS`` times.
+
+Signatures are stored with the task in the ``tasks`` table (see
+:mod:`task_registry`). The index reads new rows incrementally, so tasks
+registered by other workers are seen too. Only the newest
+``TASK_DEDUP_MAX_PER_SCOPE`` signatures per topic and difficulty are kept
+in memory. Duplicate rates are counted per syllabus topic; all other
+topics share the ``"other"`` bucket.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import random
+import re
+import threading
+from array import array
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import database
+
+logger = logging.getLogger("app.task_dedup")
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+TASK_DEDUP_ENABLED: bool = os.getenv("TASK_DEDUP_ENABLED", "1").lower() not in ("0", "false", "no")
+TASK_DEDUP_THRESHOLD: float = float(os.getenv("TASK_DEDUP_THRESHOLD", "0.7"))  # Jaccard similarity
+TASK_DEDUP_NUM_PERM: int = int(os.getenv("TASK_DEDUP_NUM_PERM", "64"))
+TASK_DEDUP_BANDS: int = int(os.getenv("TASK_DEDUP_BANDS", "16"))  # must divide TASK_DEDUP_NUM_PERM
+TASK_DEDUP_SHINGLE: int = int(os.getenv("TASK_DEDUP_SHINGLE", "3"))  # words per shingle
+TASK_DEDUP_MAX_REROLLS: int = int(os.getenv("TASK_DEDUP_MAX_REROLLS", "2"))
+TASK_DEDUP_MAX_PER_SCOPE: int = int(os.getenv("TASK_DEDUP_MAX_PER_SCOPE", "5000"))  # newest signatures kept
+OTHER_TOPICS = "other"  # stats bucket for topics outside the syllabus
+
+_PRIME = (1 << 61) - 1  # Mersenne prime for the (a * x + b) mod p permutations
+_MAX_HASH = _PRIME
+# Fixed seed: signatures must match across workers and restarts
+_rng = random.Random(0x7A5C)
+_PERMUTATIONS: List[Tuple[int, int]] = [
+    (_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(TASK_DEDUP_NUM_PERM)
+]
+_WORD = re.compile(r"\w+")
+
+Signature = Tuple[int, ...]
+
+
+def shingles(task: Dict[str, Any], size: int = TASK_DEDUP_SHINGLE) -> Set[str]:
+    """Word ``size``-grams of the task name and description (lower-cased)."""
+
+    words = _WORD.findall(f"{task.get('Task name', '')} {task.get('Task description', '')}".lower())
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash(task: Dict[str, Any]) -> Signature:
+    """MinHash signature of the task's shingles."""
+
+    hashes = [
+        int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") & _MAX_HASH
+        for s in shingles(task)
+    ]
+    if not hashes:
+        return tuple([_MAX_HASH] * len(_PERMUTATIONS))
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def similarity(a: Sequence[int], b: Sequence[int]) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+def pack(signature: Sequence[int]) -> bytes:
+    return array("Q", signature).tobytes()
+
+
+def unpack(blob: bytes) -> Signature:
+    return tuple(array("Q", blob))
+
+
+def _scope(topic: str, difficulty: str) -> Tuple[str, str]:
+    return topic.strip().lower(), difficulty.strip().lower()
+
+
+class TaskIndex:
+    """LSH buckets of task signatures per (topic, difficulty).
+
+    ``topics`` returns the syllabus topics, which get their own duplicate
+    counters in :meth:`stats`.
+    """
+
+    def __init__(
+        self,
+        load: Callable[[int], Sequence[Tuple[int, str, str, str, bytes]]] = database.get_task_signatures,
+        *,
+        topics: Callable[[], Iterable[str]] = lambda: (),
+        threshold: float = TASK_DEDUP_THRESHOLD,
+        bands: int = TASK_DEDUP_BANDS,
+        max_per_scope: int = TASK_DEDUP_MAX_PER_SCOPE,
+    ) -> None:
+        if len(_PERMUTATIONS) % bands:
+            raise ValueError("TASK_DEDUP_BANDS must divide TASK_DEDUP_NUM_PERM")
+        self._load = load
+        self._topics = topics
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = len(_PERMUTATIONS) // bands
+        self.max_per_scope = max_per_scope
+        self._buckets: Dict[Tuple[Tuple[str, str], int, Signature], List[str]] = {}
+        # Keyed by scope too: task ids are content hashes, the same task may come up for several topics
+        self._signatures: Dict[Tuple[Tuple[str, str], str], Signature] = {}
+        self._order: Dict[Tuple[str, str], Deque[str]] = {}  # scope -> task ids, oldest first
+        self._last_rowid = 0
+        self._lock = threading.Lock()
+        self._by_topic: Dict[str, List[int]] = {}  # syllabus topic or OTHER_TOPICS -> [checked, duplicates]
+        self.evicted = 0
+
+    def _bands(self, signature: Signature):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def add(self, topic: str, difficulty: str, task_id: str, signature: Signature) -> None:
+        scope = _scope(topic, difficulty)
+        with self._lock:
+            if (scope, task_id) in self._signatures:
+                return
+            self._signatures[scope, task_id] = signature
+            for band, values in self._bands(signature):
+                self._buckets.setdefault((scope, band, values), []).append(task_id)
+            order = self._order.setdefault(scope, deque())
+            order.append(task_id)
+            while len(order) > self.max_per_scope:
+                self._forget(scope, order.popleft())
+
+    def _forget(self, scope: Tuple[str, str], task_id: str) -> None:
+        """Drop a signature from the index (lock held)."""
+
+        signature = self._signatures.pop((scope, task_id))
+        for band, values in self._bands(signature):
+            bucket = self._buckets[scope, band, values]
+            bucket.remove(task_id)
+            if not bucket:
+                del self._buckets[scope, band, values]
+        self.evicted += 1
+
+    def _topic_bucket(self, topic: str) -> str:
+        topic = topic.strip().lower()
+        try:
+            syllabus = {t.strip().lower() for t in self._topics()}
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Failed to load topics for the duplicate stats")
+            syllabus = set()
+        return topic if topic in syllabus else OTHER_TOPICS
+
+    def find(
+        self, topic: str, difficulty: str, signature: Signature, exclude: Optional[str] = None,
+    ) -> Optional[Tuple[str, float]]:
+        """Most similar indexed task at or above the threshold, as ``(task_id, similarity)``.
+
+        ``exclude`` is the id of the task being checked, which never
+        duplicates itself.
+        """
+
+        scope = _scope(topic, difficulty)
+        best: Optional[Tuple[str, float]] = None
+        with self._lock:
+            candidates = {
+                task_id
+                for band, values in self._bands(signature)
+                for task_id in self._buckets.get((scope, band, values), ())
+            }
+            candidates.discard(exclude)
+            for task_id in candidates:
+                score = similarity(signature, self._signatures[scope, task_id])
+                if score >= self.threshold and (best is None or score > best[1]):
+                    best = (task_id, score)
+        return best
+
+    def catch_up(self) -> int:
+        """Index tasks stored (by any worker) since the last call."""
+
+        with self._lock:
+            after = self._last_rowid
+        rows = self._load(after)
+        for rowid, task_id, topic, difficulty, blob in rows:
+            self.add(topic, difficulty, task_id, unpack(blob))
+            with self._lock:
+                self._last_rowid = max(self._last_rowid, rowid)
+        return len(rows)
+
+    def check(self, topic: str, difficulty: str, task: Dict[str, Any], task_id: str) -> Optional[Tuple[str, float]]:
+        """Return the near-duplicate of ``task`` or index ``task`` as new (under ``task_id``).
+
+        Callers that shared one generated task (single-flight) check the same
+        ``task_id``; only the first indexes it and none sees a duplicate.
+        """
+
+        self.catch_up()
+        signature = minhash(task)
+        duplicate = self.find(topic, difficulty, signature, exclude=task_id)
+        bucket = self._topic_bucket(topic)
+        with self._lock:
+            counts = self._by_topic.setdefault(bucket, [0, 0])
+            counts[0] += 1
+            counts[1] += duplicate is not None
+        if duplicate is None:
+            self.add(topic, difficulty, task_id, signature)
+        return duplicate
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            checked = sum(c[0] for c in self._by_topic.values())
+            duplicates = sum(c[1] for c in self._by_topic.values())
+            stats: Dict[str, object] = {
+                "indexed": len(self._signatures),
+                "evicted": self.evicted,
+                "checked": checked,
+                "duplicates": duplicates,
+                "duplicate_rate": round(duplicates / checked, 4) if checked else 0.0,
+            }
+            for topic, (t_checked, t_duplicates) in self._by_topic.items():
+                # Distinct field names: metrics.register_stats exports these with a topic label
+                # (bounded: syllabus topics and OTHER_TOPICS, see topic_buckets)
+                stats[topic] = {
+                    "topic_checked": t_checked,
+                    "topic_duplicates": t_duplicates,
+                    "topic_duplicate_rate": round(t_duplicates / t_checked, 4),
+                }
+        return stats
+
+    def topic_buckets(self) -> List[str]:
+        """Topic keys of :meth:`stats`: syllabus topics checked so far and ``"other"``."""
+
+        with self._lock:
+            return list(self._by_topic)
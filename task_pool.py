@@ -0,0 +1,282 @@
+"""Warm pool of pre-generated tasks keyed by (topic, difficulty).
+
+Task generation takes a full LLM round trip (often several seconds), so the
+pool keeps a few ready-made tasks for every syllabus topic and difficulty and
+refills them in the background. ``/generate_task`` pops a task from the pool
+when one is available and only falls back to a live LLM call on a miss.
+
+The pool lives in the ``task_pool`` table, so all workers serve from the
+same tasks. Every worker runs the refill loop, but only the one for which
+``is_leader()`` is true generates; the others just refresh their
+``ready`` counts. Misses on keys outside the syllabus are recorded in
+``task_pool_demand`` and picked up by the leader on its next sweep.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import database
+
+logger = logging.getLogger("app.task_pool")
+
+# Difficulty levels offered by the frontend (static/script.js)
+DIFFICULTIES: Tuple[str, ...] = ("beginner", "medium", "hard")
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+TASK_POOL_ENABLED: bool = os.getenv("TASK_POOL_ENABLED", "1").lower() not in ("0", "false", "no")
+TASK_POOL_SIZE: int = int(os.getenv("TASK_POOL_SIZE", "3"))              # tasks kept per key
+TASK_POOL_LOW_WATER: int = int(os.getenv("TASK_POOL_LOW_WATER", "1"))    # refill below this
+TASK_POOL_CONCURRENCY: int = int(os.getenv("TASK_POOL_CONCURRENCY", "2"))  # parallel LLM calls
+TASK_POOL_REFILL_RATE: float = float(os.getenv("TASK_POOL_REFILL_RATE", "30"))  # tasks / minute
+TASK_POOL_TTL: float = float(os.getenv("TASK_POOL_TTL", "3600"))         # seconds a task stays fresh
+TASK_POOL_SWEEP_INTERVAL: float = float(os.getenv("TASK_POOL_SWEEP_INTERVAL", "30"))
+TASK_POOL_MAX_ADHOC_KEYS: int = 256  # cap on non-syllabus keys kept warm after a miss
+TASK_POOL_ADHOC_IDLE: float = float(os.getenv("TASK_POOL_ADHOC_IDLE", "900"))  # stop refilling unused ad-hoc keys
+
+PoolKey = Tuple[str, str]
+
+
+def _key(topic: str, difficulty: str) -> PoolKey:
+    return topic.strip().lower(), difficulty.strip().lower()
+
+
+class TaskPool:
+    """Per-(topic, difficulty) FIFO of ready tasks with bounded background refill.
+
+    Parameters
+    ----------
+    generate:
+        Coroutine function ``(topic, difficulty) -> task_json_str``.
+    topics:
+        Callable returning the current syllabus topics.
+    is_leader:
+        Callable telling whether this worker refills the shared pool.
+    enabled:
+        When false, :meth:`get` misses without touching the database.
+    """
+
+    def __init__(
+        self,
+        generate: Callable[[str, str], Awaitable[str]],
+        topics: Callable[[], List[str]],
+        *,
+        size: int = TASK_POOL_SIZE,
+        low_water: int = TASK_POOL_LOW_WATER,
+        concurrency: int = TASK_POOL_CONCURRENCY,
+        refill_rate: float = TASK_POOL_REFILL_RATE,
+        ttl: float = TASK_POOL_TTL,
+        sweep_interval: float = TASK_POOL_SWEEP_INTERVAL,
+        difficulties: Iterable[str] = DIFFICULTIES,
+        adhoc_idle: float = TASK_POOL_ADHOC_IDLE,
+        is_leader: Callable[[], bool] = lambda: True,
+        enabled: bool = TASK_POOL_ENABLED,
+    ) -> None:
+        self._generate = generate
+        self._topics = topics
+        self._is_leader = is_leader
+        self.enabled = enabled
+        self.size = size
+        self.low_water = low_water
+        self.concurrency = concurrency
+        self.refill_rate = refill_rate
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self.difficulties = tuple(difficulties)
+        self.adhoc_idle = adhoc_idle
+
+        self._levels: Dict[PoolKey, int] = {}  # ready tasks per key as of the last sweep
+        self._inflight: Dict[PoolKey, int] = {}
+        self._lock = threading.Lock()  # get() runs on the DB executor threads
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.generated = 0
+        self.failures = 0
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._workers: Set[asyncio.Task] = set()
+        self._next_start = 0.0
+        self._stopped = True
+
+    # ------------------------------------------------------------------
+    # Serving
+    # ------------------------------------------------------------------
+
+    def get(self, topic: str, difficulty: str) -> Optional[str]:
+        """Pop a fresh task for ``(topic, difficulty)`` or return ``None`` on a miss.
+
+        Blocking (a database write); call it from a worker thread.
+        """
+
+        if not self.enabled:
+            with self._lock:
+                self.misses += 1
+            return None
+        key = _key(topic, difficulty)
+        now = time.time()
+        task, expired = database.take_pool_task(*key, now - self.ttl, now)
+        if task is None and key[1] in self.difficulties:
+            # Keep ad-hoc topics warm as well once somebody asked for them, until
+            # nobody has asked for ``adhoc_idle`` seconds (see _wanted_keys)
+            database.add_pool_demand(*key, topic, difficulty, now, TASK_POOL_MAX_ADHOC_KEYS)
+        with self._lock:
+            self.expired += expired
+            if task is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        self._wake()
+        return task
+
+    def put(self, topic: str, difficulty: str, task: str) -> None:
+        """Add a ready task to the pool (dropped if the key is already full)."""
+
+        database.add_pool_task(*_key(topic, difficulty), task, self.size, time.time())
+
+    def stats(self) -> Dict[str, object]:
+        """Return hit/miss counters and current pool fill levels."""
+
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "expired": self.expired,
+            "generated": self.generated,
+            "failures": self.failures,
+            "inflight": sum(self._inflight.values()),
+            "leader": self._is_leader(),
+            "ready_total": sum(self._levels.values()),
+            "ready": {f"{t}|{d}": n for (t, d), n in self._levels.items()},
+        }
+
+    # ------------------------------------------------------------------
+    # Background refill
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Start the background refill loop on the running event loop."""
+
+        if self._runner is not None and not self._runner.done():
+            return
+        self._stopped = False
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._runner = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Cancel the refill loop and any in-flight generations."""
+
+        # The flag also ends the loop if ``wait_for`` swallows the cancellation
+        # because the wake-up event fired at the same moment.
+        self._stopped = True
+        tasks = list(self._workers)
+        if self._runner is not None:
+            tasks.append(self._runner)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._runner = None
+        self._workers.clear()
+
+    def _wake(self) -> None:
+        if self._wakeup is not None and self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _wanted_keys(self) -> Dict[PoolKey, Tuple[str, str]]:
+        """Keys to keep warm, mapped to their original (topic, difficulty)."""
+
+        keys: Dict[PoolKey, Tuple[str, str]] = {}
+        try:
+            topics = self._topics()
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Failed to load topics for the task pool")
+            topics = []
+        for topic in topics:
+            for difficulty in self.difficulties:
+                keys.setdefault(_key(topic, difficulty), (topic, difficulty))
+        # Ad-hoc keys somebody asked for in the last ``adhoc_idle`` seconds (on any worker)
+        for topic, difficulty in database.get_pool_demand(time.time() - self.adhoc_idle):
+            keys.setdefault(_key(topic, difficulty), (topic, difficulty))
+        return keys
+
+    def _sweep(self) -> Dict[PoolKey, Tuple[str, str]]:
+        """Refresh the fill levels; on the leader also purge and return the keys to keep warm."""
+
+        leader = self._is_leader()
+        fresh_after = time.time() - self.ttl
+        if leader:
+            expired = database.purge_pool_tasks(fresh_after)
+            with self._lock:
+                self.expired += expired
+        self._levels = database.get_pool_levels(fresh_after)
+        return self._wanted_keys() if leader else {}
+
+    async def _schedule_refills(self) -> None:
+        wanted = await asyncio.to_thread(self._sweep)
+        for key, (topic, difficulty) in wanted.items():
+            ready = self._levels.get(key, 0)
+            inflight = self._inflight.get(key, 0)
+            if ready + inflight >= max(self.low_water, 1):
+                continue
+            for _ in range(self.size - ready - inflight):
+                self._inflight[key] = self._inflight.get(key, 0) + 1
+                worker = asyncio.create_task(self._refill_one(key, topic, difficulty))
+                self._workers.add(worker)
+                worker.add_done_callback(self._workers.discard)
+        # Forget in-flight counters of keys that are no longer wanted
+        for key in [k for k, n in self._inflight.items() if not n and k not in wanted]:
+            del self._inflight[key]
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        while not self._stopped:
+            try:
+                await self._schedule_refills()
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Task pool sweep failed")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.sweep_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _throttle(self) -> None:
+        """Space generation starts so that at most ``refill_rate`` run per minute."""
+
+        if self.refill_rate <= 0:
+            return
+        now = time.monotonic()
+        start_at = max(now, self._next_start)
+        self._next_start = start_at + 60.0 / self.refill_rate
+        if start_at > now:
+            await asyncio.sleep(start_at - now)
+
+    async def _refill_one(self, key: PoolKey, topic: str, difficulty: str) -> None:
+        assert self._semaphore is not None
+        try:
+            async with self._semaphore:
+                await self._throttle()
+                task = await self._generate(topic, difficulty)
+            self.generated += 1
+            await asyncio.to_thread(self.put, topic, difficulty, task)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:  # pylint: disable=broad-except
+            self.failures += 1
+            logger.warning("Task pool refill failed for %s/%s: %s", topic, difficulty, exc)
+        finally:
+            self._inflight[key] = max(0, self._inflight.get(key, 1) - 1)
@@ -0,0 +1,148 @@
+"""Server-side registry of generated tasks.
+
+``/generate_task`` registers every task it hands out and returns its
+``task_id``; submissions then reference the task by id instead of uploading
+the whole task JSON again. That keeps request bodies small, means the
+evaluation prompt is built from a task the server generated (not from
+client-supplied text), and gives every task a stable key for caching and
+per-task statistics.
+
+Each task is stored once in SQLite (``tasks`` table, shared by all workers)
+together with a preprocessed *prompt fragment*: name, description and sample
+cases with whitespace collapsed. Hints are left out because the grader does
+not need them. The row also keeps the task's MinHash signature for
+near-duplicate detection (see :mod:`task_dedup`). Recently used records are
+kept in a small in-memory LRU.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import database
+import task_dedup
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+TASK_REGISTRY_CACHE_SIZE: int = int(os.getenv("TASK_REGISTRY_CACHE_SIZE", "2048"))  # records kept in memory
+
+TASK_ID_LENGTH = 16  # hex digits of the content hash (64 bits)
+
+
+def canonical_task(task: Dict[str, Any]) -> str:
+    """Serialize ``task`` so the same content always gives the same string."""
+
+    return json.dumps(task, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+
+
+def task_id_for(task: Dict[str, Any]) -> str:
+    """Content-derived id: regenerating or re-registering a task keeps its id."""
+
+    return hashlib.sha256(canonical_task(task).encode("utf-8")).hexdigest()[:TASK_ID_LENGTH]
+
+
+def _squash(value: Any) -> str:
+    return " ".join(str(value).split())
+
+
+def prompt_fragment(task: Dict[str, Any]) -> str:
+    """Token-minimized task text for the evaluation prompt.
+
+    >>> prompt_fragment({"Task name": "Sum", "Task description": "Add  two\\n numbers.",
+    ...                  "Sample input cases": [{"input": "2 3", "expected_output": "5"}],
+    ...                  "Hints": {"Hint1": "..."}})
+    'Sum: Add two numbers.\\nExamples (input => output):\\n2 3 => 5'
+    """
+
+    lines = [f"{_squash(task.get('Task name', ''))}: {_squash(task.get('Task description', ''))}"]
+    cases = task.get("Sample input cases")
+    if isinstance(cases, list) and cases:
+        lines.append("Examples (input => output):")
+        for case in cases:
+            if isinstance(case, dict):
+                lines.append(f"{_squash(case.get('input', ''))} => {_squash(case.get('expected_output', ''))}")
+    return "\n".join(lines)
+
+
+@dataclass(frozen=True)
+class TaskRecord:
+    task_id: str
+    topic: str
+    difficulty: str
+    task: str  # canonical task JSON (sandbox sample cases, evaluation cache key)
+    prompt: str  # fragment used in the evaluation prompt
+
+
+class TaskRegistry:
+    """SQLite-backed ``task_id -> TaskRecord`` map with an in-memory LRU in front."""
+
+    def __init__(self, max_entries: int = TASK_REGISTRY_CACHE_SIZE) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, TaskRecord]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.registered = 0
+        self.hits = 0
+        self.loads = 0  # found in SQLite only, e.g. registered by another worker
+        self.unknown = 0
+
+    def register(self, topic: str, difficulty: str, task_json: str) -> TaskRecord:
+        """Store a generated task (idempotent) and return its record.
+
+        Raises ``ValueError`` if ``task_json`` is not a JSON object.
+        """
+
+        task = json.loads(task_json)
+        if not isinstance(task, dict):
+            raise ValueError("task must be a JSON object")
+        task_id = task_id_for(task)
+        with self._lock:
+            record = self._entries.get(task_id)
+        if record is None:
+            record = TaskRecord(task_id, topic, difficulty, canonical_task(task), prompt_fragment(task))
+            database.save_task(record.task_id, topic, difficulty, record.task, record.prompt,
+                               task_dedup.pack(task_dedup.minhash(task)))
+            self.registered += 1
+        self._remember(record)
+        return record
+
+    def get(self, task_id: str) -> Optional[TaskRecord]:
+        """Return the record for ``task_id`` (from memory, else SQLite) or ``None``."""
+
+        with self._lock:
+            record = self._entries.get(task_id)
+            if record is not None:
+                self._entries.move_to_end(task_id)
+                self.hits += 1
+                return record
+        row = database.get_task(task_id)
+        if row is None:
+            self.unknown += 1
+            return None
+        self.loads += 1
+        record = TaskRecord(row["task_id"], row["topic"], row["difficulty"], row["task"], row["prompt"])
+        self._remember(record)
+        return record
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "registered": self.registered,
+            "hits": self.hits,
+            "loads": self.loads,
+            "unknown": self.unknown,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+        }
+
+    def _remember(self, record: TaskRecord) -> None:
+        with self._lock:
+            self._entries[record.task_id] = record
+            self._entries.move_to_end(record.task_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
@@ -2,7 +2,9 @@ import os
 import sqlite3
 import tempfile
 import pytest
+import database
 from database import init_db, register_user
+from storage import close_storage
 
 
 @pytest.fixture
@@ -11,17 +13,17 @@ def temp_db(monkeypatch):
     db_fd, db_path = tempfile.mkstemp()
     monkeypatch.setenv("DATABASE_PATH", db_path)
 
-    # Save original connect
-    original_connect = sqlite3.connect
-
-    # Patch connect to use the temp DB
-    monkeypatch.setattr(sqlite3, "connect", lambda _: original_connect(db_path))
+    # Point the database module at the temp DB
+    monkeypatch.setattr(database, "DB_PATH", db_path)
 
     init_db()
     yield db_path
 
+    close_storage(db_path)
     os.close(db_fd)
-    os.remove(db_path)
+    for path in (db_path, db_path + "-wal", db_path + "-shm"):
+        if os.path.exists(path):
+            os.remove(path)
 
 
 def test_register_user(temp_db):
@@ -0,0 +1,74 @@
+import ipaddress
+import json
+
+from fastapi.testclient import TestClient
+
+import main
+from llm_scheduler import LLMScheduler
+from main import app
+
+client = TestClient(app)
+# Requests arriving through nginx; X-Real-IP carries the browser's address
+proxied = TestClient(app, client=("10.0.0.2", 50000))
+
+
+def test_user_over_rate_gets_429(monkeypatch):
+    monkeypatch.setattr(main, "TRUSTED_PROXIES", [ipaddress.ip_network("10.0.0.0/8")])
+    monkeypatch.setattr(main, "llm_scheduler", LLMScheduler(user_rate=1, user_burst=1))
+    monkeypatch.setattr(main.eval_cache, "get", lambda task, code: None)
+    monkeypatch.setattr(main, "_local_verdict", lambda task, code: _none())
+
+    async def fake_call(prompt, **kwargs):
+        return {"choices": [{"message": {"content": json.dumps({"question": False, "correct": True, "feedback": "ok"})}}]}
+
+    monkeypatch.setattr(main, "call_openrouter", fake_call)
+    body = {"task": "Print 1", "code": "print(1)"}
+    headers = {"X-Real-IP": "203.0.113.7"}
+
+    assert proxied.post("/evaluate_code", json=body, headers=headers).status_code == 200
+    rejected = proxied.post("/evaluate_code", json=body, headers=headers)
+    assert rejected.status_code == 429
+    assert int(rejected.headers["retry-after"]) >= 1
+    assert proxied.post("/evaluate_code/stream", json=body, headers=headers).status_code == 429
+
+    # A different client has its own bucket
+    assert proxied.post("/evaluate_code", json=body, headers={"X-Real-IP": "203.0.113.8"}).status_code == 200
+    assert client.get("/llm/stats").json()["scheduler"]["rejected"] == {"user_rate": 2}
+
+
+def test_real_ip_header_is_ignored_from_other_clients(monkeypatch):
+    monkeypatch.setattr(main, "TRUSTED_PROXIES", [ipaddress.ip_network("10.0.0.0/8")])
+    monkeypatch.setattr(main, "llm_scheduler", LLMScheduler(user_rate=1, user_burst=1))
+    monkeypatch.setattr(main.eval_cache, "get", lambda task, code: None)
+    monkeypatch.setattr(main, "_local_verdict", lambda task, code: _none())
+
+    async def fake_call(prompt, **kwargs):
+        return {"choices": [{"message": {"content": json.dumps({"question": False, "correct": True, "feedback": "ok"})}}]}
+
+    monkeypatch.setattr(main, "call_openrouter", fake_call)
+    direct = TestClient(app, client=("198.51.100.4", 50000))
+    body = {"task": "Print 1", "code": "print(1)"}
+
+    # Rotating a spoofed header does not buy a fresh bucket
+    assert direct.post("/evaluate_code", json=body, headers={"X-Real-IP": "203.0.113.1"}).status_code == 200
+    assert direct.post("/evaluate_code", json=body, headers={"X-Real-IP": "203.0.113.2"}).status_code == 429
+
+
+def test_local_verdicts_are_not_admitted(monkeypatch):
+    scheduler = LLMScheduler(user_rate=1, user_burst=1)
+    monkeypatch.setattr(main, "llm_scheduler", scheduler)
+    monkeypatch.setattr(main.eval_cache, "get", lambda task, code: None)
+    monkeypatch.setattr(main.eval_cache, "put", lambda task, code, verdict: None)
+
+    async def local(task, code):
+        return {"question": False, "correct": True, "feedback": "All sample cases passed."}
+
+    monkeypatch.setattr(main, "_local_verdict", local)
+    body = {"task": "Print 1", "code": "print(1)"}
+    headers = {"X-Real-IP": "203.0.113.9"}
+    for path in ("/evaluate_code", "/evaluate_code/stream", "/evaluate_code/stream"):
+        assert client.post(path, json=body, headers=headers).status_code == 200
+    assert scheduler.admitted == 0
+
+async def _none():
+    return None
@@ -0,0 +1,34 @@
+import httpx
+from fastapi.testclient import TestClient
+
+import main
+from circuit_breaker import CircuitBreaker, RetryBudget
+from main import app
+
+client = TestClient(app)
+
+
+def test_failing_upstream_opens_the_circuit(monkeypatch):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test")
+    monkeypatch.setattr(main, "llm_breaker", CircuitBreaker(failure_threshold=2, reset_timeout=30))
+    monkeypatch.setattr(main, "retry_budget", RetryBudget())
+    monkeypatch.setattr(main, "backoff", lambda *args, **kwargs: 0.0)
+    monkeypatch.setattr(main.task_pool, "get", lambda topic, difficulty: None)
+    calls = []
+
+    async def fake_post(url, payload, **kwargs):
+        calls.append(payload["model"])
+        request = httpx.Request("POST", url)
+        raise httpx.HTTPStatusError("down", request=request, response=httpx.Response(503, request=request))
+
+    monkeypatch.setattr(main.llm_client, "post_json", fake_post)
+
+    response = client.get("/generate_task", params={"topic": "breaker", "difficulty": "a"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "30"
+    assert len(calls) == 2  # retried once, then the circuit opened
+
+    response = client.get("/generate_task", params={"topic": "breaker", "difficulty": "b"})
+    assert response.status_code == 503
+    assert len(calls) == 2  # failed fast
+    assert client.get("/llm/stats").json()["breaker"]["state"] == "open"
@@ -0,0 +1,53 @@
+import json
+
+import main
+from llm_scheduler import GENERATE, LLMScheduler, Ticket
+from model_router import ModelRouter
+
+
+def completion(content):
+    return {"choices": [{"message": {"content": content}}]}
+
+
+def test_difficulty_picks_its_own_model(monkeypatch):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test")
+    router = ModelRouter(["big/model"], {"beginner": ["small/model"]}, default=lambda: main.MODEL_NAME)
+    monkeypatch.setattr(main, "model_router", router)
+    models = []
+
+    async def fake_post(url, payload, **kwargs):
+        models.append(payload["model"])
+        return completion(json.dumps({"question": False, "correct": True, "feedback": "ok"}))
+
+    monkeypatch.setattr(main.llm_client, "post_json", fake_post)
+    main.asyncio.run(main.call_openrouter("routing beginner", difficulty="beginner"))
+    main.asyncio.run(main.call_openrouter("routing hard", difficulty="hard"))
+
+    assert models == ["small/model", "big/model"]
+    assert router.stats()["small/model"]["requests"] == 1
+
+
+def test_background_calls_do_not_share_a_flight_with_users(monkeypatch):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test")
+    calls = []
+
+    async def fake_post(url, payload, **kwargs):
+        calls.append(payload["model"])
+        await main.asyncio.sleep(0.05)
+        return completion("{}")
+
+    monkeypatch.setattr(main.llm_client, "post_json", fake_post)
+    monkeypatch.setattr(main, "llm_scheduler", LLMScheduler(user_rate=0))
+
+    async def as_user(user):
+        with Ticket(user, GENERATE):
+            return await main.call_openrouter("same prompt", difficulty="beginner")
+
+    async def scenario():
+        # The pool call (no ticket: background) and the two user calls arrive together
+        await main.asyncio.gather(
+            main.call_openrouter("same prompt", difficulty="beginner"), as_user("user:1"), as_user("user:2"),
+        )
+
+    main.asyncio.run(scenario())
+    assert len(calls) == 2
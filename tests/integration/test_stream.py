@@ -0,0 +1,73 @@
+import json
+
+from fastapi.testclient import TestClient
+
+import main
+from main import app
+
+client = TestClient(app)
+
+TASK = {
+    "Task name": "Sum two numbers",
+    "Task description": "Read two numbers and print their sum.",
+    "Sample input cases": [{"input": "2 3", "expected_output": "5"}],
+    "Hints": {"Hint1": "input()", "Hint2": "split", "Hint3": "int()"},
+}
+
+
+def fake_stream(text, chunk=7):
+    async def stream(prompt, **kwargs):
+        for i in range(0, len(text), chunk):
+            yield text[i:i + chunk]
+    return stream
+
+
+def parse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_generate_task_stream_emits_fields_before_done(monkeypatch):
+    monkeypatch.setattr(main, "stream_openrouter", fake_stream(json.dumps(TASK)))
+
+    response = client.get("/generate_task/stream", params={"topic": "stream-test", "difficulty": "beginner"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_events(response.text)
+    names = [data["name"] for event, data in events if event == "field"]
+    assert names == ["Task name", "Task description", "Sample input cases", "Hints"]
+    assert events[-1][0] == "done"
+    assert json.loads(events[-1][1]["task"]) == TASK
+
+
+def test_generate_task_stream_retries_invalid_json(monkeypatch):
+    replies = iter(['{"Task name": "broken"', json.dumps(TASK)])
+
+    async def stream(prompt, **kwargs):
+        yield next(replies)
+
+    monkeypatch.setattr(main, "stream_openrouter", stream)
+    response = client.get("/generate_task/stream", params={"topic": "stream-retry", "difficulty": "hard"})
+
+    kinds = [event for event, _ in parse_events(response.text)]
+    assert "retry" in kinds
+    assert kinds[-1] == "done"
+
+
+def test_evaluate_code_stream_returns_final_verdict(monkeypatch):
+    verdict = {"question": False, "correct": True, "feedback": "Nice work!"}
+    monkeypatch.setattr(main, "stream_openrouter", fake_stream("```json\n" + json.dumps(verdict) + "\n```"))
+    main.eval_cache.clear()
+
+    response = client.post(
+        "/evaluate_code/stream",
+        json={"task": json.dumps(TASK), "code": "a, b = map(int, input().split())\nprint(a + b)"},
+    )
+
+    events = parse_events(response.text)
+    assert ("field", {"name": "correct", "value": True}) in events
+    assert events[-1] == ("done", verdict)
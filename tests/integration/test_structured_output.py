@@ -0,0 +1,75 @@
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+
+import llm_schemas
+import main
+from main import app
+
+client = TestClient(app)
+
+TASK = {
+    "Task name": "Reverse a string",
+    "Task description": "Read a line and print it reversed.",
+    "Sample input cases": [{"input": "abc", "expected_output": "cba"}],
+    "Hints": {"Hint1": "Slicing", "Hint2": "Step -1", "Hint3": "s[::-1]"},
+}
+
+
+def completion(content):
+    return {"choices": [{"message": {"content": content}}]}
+
+
+def test_only_missing_fields_are_requested(monkeypatch):
+    partial = {key: TASK[key] for key in ("Task name", "Task description", "Sample input cases")}
+    partial["Hints"] = {"Hint1": "Slicing"}
+    calls = []
+
+    async def fake_call(prompt, **kwargs):
+        calls.append(kwargs.get("schema"))
+        if len(calls) == 1:
+            return completion(json.dumps(partial))
+        return completion(json.dumps({"Hints": {"Hint2": "Step -1", "Hint3": "s[::-1]"}}))
+
+    monkeypatch.setattr(main, "call_openrouter", fake_call)
+    monkeypatch.setattr(main.task_pool, "get", lambda topic, difficulty: None)
+    response = client.get("/generate_task", params={"topic": "strings", "difficulty": "fields"})
+
+    assert response.status_code == 200
+    assert json.loads(response.json()["task"]) == TASK
+    assert calls[0] is llm_schemas.Task
+    assert calls[1].__name__ == "TaskFields"
+
+
+def test_schema_is_sent_for_supported_models(monkeypatch):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test")
+    monkeypatch.setattr(main, "MODEL_NAME", "openai/gpt-4o-mini")
+    monkeypatch.setattr(llm_schemas, "_rejected", set())
+    _, payload = main._openrouter_request("prompt", llm_schemas.Task)
+    assert payload["response_format"]["json_schema"]["name"] == "Task"
+
+    monkeypatch.setattr(main, "MODEL_NAME", "deepseek/deepseek-r1-0528-qwen3-8b:free")
+    _, payload = main._openrouter_request("prompt", llm_schemas.Task)
+    assert "response_format" not in payload
+
+
+def test_rejected_schema_falls_back_to_plain_json(monkeypatch):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test")
+    monkeypatch.setattr(main, "MODEL_NAME", "openai/gpt-4o-mini")
+    monkeypatch.setattr(llm_schemas, "_rejected", set())
+    payloads = []
+
+    async def fake_post(url, payload, **kwargs):
+        payloads.append(dict(payload))
+        if "response_format" in payload:
+            request = httpx.Request("POST", url)
+            raise httpx.HTTPStatusError("bad", request=request, response=httpx.Response(400, request=request))
+        return completion(json.dumps(TASK))
+
+    monkeypatch.setattr(main.llm_client, "post_json", fake_post)
+    result = main.asyncio.run(main.call_openrouter("schema fallback", schema=llm_schemas.Task))
+
+    assert result == completion(json.dumps(TASK))
+    assert ["response_format" in p for p in payloads] == [True, False]
+    assert not llm_schemas.structured_output_supported("openai/gpt-4o-mini")
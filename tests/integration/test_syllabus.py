@@ -1,5 +1,3 @@
-import json
-import pytest
 from fastapi.testclient import TestClient
 from main import app
 
@@ -23,3 +21,31 @@ def test_save_and_get_syllabus(tmp_path, monkeypatch):
     assert response.status_code == 200
     assert response.json() == syllabus_data
 
+
+
+def test_get_syllabus_revalidates_with_etag(tmp_path, monkeypatch):
+    monkeypatch.setattr("main.SYLLABUS_FILE", tmp_path / "syllabus.json")
+    client.post("/save_syllabus", json={"topics": ["loops"]})
+
+    first = client.get("/get_syllabus")
+    etag = first.headers["etag"]
+    assert first.json() == {"topics": ["loops"]}
+
+    repeat = client.get("/get_syllabus", headers={"If-None-Match": etag})
+    assert repeat.status_code == 304
+    assert repeat.content == b""
+
+    client.post("/save_syllabus", json={"topics": ["loops", "strings"]})
+    changed = client.get("/get_syllabus", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json() == {"topics": ["loops", "strings"]}
+
+
+def test_clear_syllabus(tmp_path, monkeypatch):
+    monkeypatch.setattr("main.SYLLABUS_FILE", tmp_path / "syllabus.json")
+    client.post("/save_syllabus", json={"topics": ["loops"]})
+
+    response = client.delete("/clear_syllabus")
+    assert response.status_code == 200
+    assert client.get("/get_syllabus").json() == {"topics": []}
@@ -0,0 +1,112 @@
+import json
+import uuid
+
+from fastapi.testclient import TestClient
+
+import database
+import llm_schemas
+import main
+from jwt_utils import create_user_token
+from llm_scheduler import LLMScheduler
+from main import app
+
+client = TestClient(app)
+
+
+def completion(content):
+    return {"choices": [{"message": {"content": content}}]}
+
+
+def test_submission_by_task_id(monkeypatch):
+    task = {
+        "Task name": f"Echo {uuid.uuid4().hex}",
+        "Task description": "Read a line and print it.",
+        "Sample input cases": [{"input": "hi", "expected_output": "hi"}],
+        "Hints": {"Hint1": "SECRET-HINT", "Hint2": "print", "Hint3": "print(input())"},
+    }
+    prompts = []
+
+    async def fake_call(prompt, **kwargs):
+        prompts.append(prompt)
+        if kwargs.get("schema") is llm_schemas.Task:
+            return completion(json.dumps(task))
+        return completion(json.dumps({"question": False, "correct": True, "feedback": "Nice"}))
+
+    async def no_local_verdict(task, code):
+        return None
+
+    monkeypatch.setattr(main, "call_openrouter", fake_call)
+    monkeypatch.setattr(main, "_local_verdict", no_local_verdict)
+    monkeypatch.setattr(main, "llm_scheduler", LLMScheduler(user_rate=0))
+    monkeypatch.setattr(main.task_pool, "get", lambda topic, difficulty: None)
+
+    login = f"tasks-{uuid.uuid4().hex[:12]}"
+    database.create_user(f"{login}@example.com", login, "hash")
+    user_id = database.get_user_for_login(login)[0]
+    headers = {"Authorization": f"Bearer {create_user_token(user_id, login, f'{login}@example.com')}"}
+
+    generated = client.get("/generate_task", params={"topic": "io", "difficulty": "beginner"}).json()
+    task_id = generated["task_id"]
+    assert json.loads(generated["task"]) == task
+
+    response = client.post("/submit_code", json={"task_id": task_id, "code": "print(input())"}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["correct"] is True
+    eval_prompt = prompts[-1]
+    assert task["Task name"] in eval_prompt and "hi => hi" in eval_prompt
+    assert "SECRET-HINT" not in eval_prompt
+
+    # The same solution again is a cache hit but still counts as a submission
+    client.post("/evaluate_code/stream", json={"task_id": task_id, "code": "print(input())"}, headers=headers)
+    main.submission_writer.flush()
+    stats = client.get(f"/tasks/{task_id}").json()
+    assert (stats["topic"], stats["submissions"], stats["solved"], stats["solve_rate"]) == ("io", 2, 2, 1.0)
+
+    # Both attempts are in the history, but the task counts once towards the score
+    page = client.get("/submissions", params={"limit": 1}, headers=headers).json()
+    assert page["items"][0]["task_id"] == task_id and page["items"][0]["correct"] is True
+    rest = client.get("/submissions", params={"limit": 1, "cursor": page["next_cursor"]}, headers=headers).json()
+    assert rest["items"][0]["id"] < page["items"][0]["id"]
+    assert client.get("/score", headers=headers).json() == {"score": 1, "submissions": 2, "solved": 2}
+    board = client.get("/leaderboard", headers=headers).json()
+    assert board["me"]["score"] == 1 and user_id in [e["user_id"] for e in board["neighbors"]]
+    assert client.get("/submissions", params={"cursor": "garbage"}, headers=headers).status_code == 400
+
+
+def test_unknown_task_id_is_404():
+    assert client.post("/evaluate_code", json={"task_id": "0" * 16, "code": "print(1)"}).status_code == 404
+    assert client.post("/evaluate_code/stream", json={"task_id": "0" * 16, "code": "print(1)"}).status_code == 404
+    assert client.get(f"/tasks/{'0' * 16}").status_code == 404
+
+
+def test_near_duplicate_tasks_are_regenerated(monkeypatch):
+    topic = f"loops-{uuid.uuid4().hex[:8]}"
+    description = "Read integers from one line and print the sum of the even ones, or 0 if there are none."
+    outputs = [
+        {"Task name": "Sum of evens", "Task description": description},
+        {"Task name": "Sum of evens", "Task description": description.replace("none.", "none at all.")},
+        {"Task name": "Count vowels", "Task description": "Read a word and print how many vowels it has."},
+    ]
+    prompts = []
+
+    async def fake_call(prompt, **kwargs):
+        prompts.append(prompt)
+        hints = {"Hint1": "loop", "Hint2": "sum", "Hint3": "print"}
+        return completion(json.dumps({**outputs.pop(0), "Sample input cases": [], "Hints": hints}))
+
+    monkeypatch.setattr(main, "call_openrouter", fake_call)
+    monkeypatch.setattr(main, "llm_scheduler", LLMScheduler(user_rate=0))
+    monkeypatch.setattr(main.task_pool, "get", lambda topic, difficulty: None)
+
+    def other_topics():
+        # Topics outside the syllabus are counted together
+        stats = client.get("/task_dedup/stats").json().get("other", {})
+        return stats.get("topic_checked", 0), stats.get("topic_duplicates", 0)
+
+    before = other_topics()
+    params = {"topic": topic, "difficulty": "beginner"}
+    assert json.loads(client.get("/generate_task", params=params).json()["task"])["Task name"] == "Sum of evens"
+    assert json.loads(client.get("/generate_task", params=params).json()["task"])["Task name"] == "Count vowels"
+    assert "'Sum of evens'" in prompts[-1]
+    after = other_topics()
+    assert (after[0] - before[0], after[1] - before[1]) == (3, 1)
@@ -0,0 +1,158 @@
+import random
+import time
+import unittest
+from email.utils import formatdate
+from unittest.mock import patch
+
+import httpx
+
+import circuit_breaker
+from circuit_breaker import CircuitBreaker, CircuitOpen, RetryBudget, backoff, is_retryable, retry_after_seconds
+
+
+def _status_error(status, headers=None):
+    request = httpx.Request("POST", "https://llm.test/")
+    response = httpx.Response(status, request=request, headers=headers or {})
+    return httpx.HTTPStatusError("upstream", request=request, response=response)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def _clock(self, start=1000.0):
+        self.now = start
+        patcher = patch.object(circuit_breaker.time, "monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_opens_after_consecutive_failures_and_fails_fast(self):
+        self._clock()
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+        for _ in range(2):
+            breaker.before_call()
+            breaker.record(_status_error(502))
+        breaker.before_call()
+        breaker.record(None)  # a success resets the count
+        for _ in range(3):
+            breaker.before_call()
+            breaker.record(_status_error(503))
+        self.assertEqual(breaker.state, "open")
+        with self.assertRaises(CircuitOpen) as raised:
+            breaker.before_call()
+        self.assertEqual(raised.exception.retry_after, 30)
+        self.assertEqual(breaker.stats()["rejected"], 1)
+
+    def test_half_open_probe_closes_or_reopens(self):
+        self._clock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, half_open_probes=1)
+        breaker.before_call()
+        breaker.record(_status_error(500))
+        self.now += 10
+        breaker.before_call()  # the probe
+        self.assertEqual(breaker.state, "half_open")
+        with self.assertRaises(CircuitOpen):
+            breaker.before_call()  # only one probe at a time
+        breaker.record(httpx.ConnectError("down"))
+        self.assertEqual(breaker.state, "open")
+
+        self.now += 10
+        breaker.before_call()
+        breaker.record(None)
+        self.assertEqual(breaker.state, "closed")
+        self.assertEqual(breaker.stats()["opened"], 2)
+
+    def test_retry_after_extends_the_open_period(self):
+        self._clock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=5)
+        breaker.before_call()
+        breaker.record(_status_error(429, {"Retry-After": "60"}))
+        self.now += 30
+        with self.assertRaises(CircuitOpen) as raised:
+            breaker.before_call()
+        self.assertEqual(raised.exception.retry_after, 30)
+
+    def test_request_errors_do_not_trip_it(self):
+        breaker = CircuitBreaker(failure_threshold=1)
+        breaker.before_call()
+        breaker.record(_status_error(401))
+        breaker.before_call()
+        breaker.record(ValueError("our bug"))
+        self.assertEqual(breaker.state, "closed")
+
+    def test_abandoned_probe_is_released(self):
+        self._clock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=1)
+        breaker.before_call()
+        breaker.record(_status_error(500))
+        self.now += 1
+        breaker.before_call()
+        breaker.record(GeneratorExit())
+        breaker.before_call()  # the slot is free again
+
+
+    def test_opening_is_shared_with_other_workers(self):
+        self._clock()
+        opened = []
+        first = CircuitBreaker(failure_threshold=1, reset_timeout=30, on_open=opened.append)
+        second = CircuitBreaker(failure_threshold=1, reset_timeout=30, on_open=opened.append)
+        first.before_call()
+        first.record(_status_error(503))
+        self.assertEqual(len(opened), 1)
+        self.assertAlmostEqual(opened[0], time.time() + 30, delta=1)
+
+        second.trip(opened[0])
+        self.assertEqual(second.state, "open")
+        self.assertEqual(len(opened), 1)  # a tripped breaker does not report back
+        with self.assertRaises(CircuitOpen) as raised:
+            second.before_call()
+        self.assertAlmostEqual(raised.exception.retry_after, 30, delta=1)
+        second.trip(time.time() - 1)  # stale: ignored, keeps the later deadline
+        self.assertAlmostEqual(second.retry_after(), 30, delta=1)
+        self.now += 30
+        second.before_call()  # half-open probe as usual
+
+class TestBackoff(unittest.TestCase):
+
+    def test_full_jitter_grows_and_is_capped(self):
+        rng = random.Random(0)
+        for attempt, ceiling in ((1, 0.5), (2, 1.0), (3, 2.0), (10, 8.0)):
+            delays = [backoff(attempt, base=0.5, cap=8.0, rng=rng) for _ in range(200)]
+            self.assertTrue(all(0 <= d <= ceiling for d in delays))
+            self.assertGreater(max(delays), ceiling * 0.8)
+
+    def test_never_shorter_than_retry_after(self):
+        self.assertGreaterEqual(backoff(1, 3.0, base=0.5), 3.0)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(retry_after_seconds(_status_error(429, {"Retry-After": "7"})), 7.0)
+        date = formatdate(time.time() + 120, usegmt=True)
+        self.assertAlmostEqual(retry_after_seconds(_status_error(503, {"Retry-After": date})), 120, delta=2)
+        self.assertIsNone(retry_after_seconds(_status_error(429, {"Retry-After": "soon"})))
+        self.assertIsNone(retry_after_seconds(_status_error(429)))
+        self.assertIsNone(retry_after_seconds(httpx.ConnectError("down")))
+
+    def test_retryable_errors(self):
+        self.assertTrue(is_retryable(_status_error(429)))
+        self.assertTrue(is_retryable(_status_error(502)))
+        self.assertTrue(is_retryable(httpx.ReadTimeout("slow")))
+        self.assertFalse(is_retryable(_status_error(400)))
+        self.assertFalse(is_retryable(_status_error(401)))
+        self.assertFalse(is_retryable(ValueError("bad json")))
+        self.assertFalse(is_retryable(CircuitOpen(5)))
+
+
+class TestRetryBudget(unittest.TestCase):
+
+    def test_retries_are_limited_to_a_fraction_of_requests(self):
+        budget = RetryBudget(ratio=0.2, min_per_second=0.0, capacity=2.0)
+        self.assertTrue(budget.try_spend())
+        self.assertTrue(budget.try_spend())
+        self.assertFalse(budget.try_spend())
+        for _ in range(5):
+            budget.deposit()
+        self.assertTrue(budget.try_spend())
+        self.assertFalse(budget.try_spend())
+        self.assertEqual((budget.spent, budget.denied), (3, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime
+
+import database
+from coordination import GenerationWatcher, LeaderLease
+from database import (add_revoked_token, claim_notification, get_revoked_tokens, init_db, release_lease,
+                      try_acquire_lease)
+from storage import close_storage
+
+
+class _TempDB(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._original_db_path = database.DB_PATH
+        database.DB_PATH = os.path.join(self._tmp.name, "test.db")
+        init_db()
+
+    def tearDown(self):
+        close_storage(database.DB_PATH)
+        database.DB_PATH = self._original_db_path
+        self._tmp.cleanup()
+
+
+class TestLeases(_TempDB):
+
+    def test_lease_is_exclusive_until_it_expires(self):
+        now = 1000.0
+        self.assertTrue(try_acquire_lease("scheduler", "a", 30, now))
+        self.assertFalse(try_acquire_lease("scheduler", "b", 30, now + 10))
+        self.assertTrue(try_acquire_lease("scheduler", "a", 30, now + 10))  # renewal
+        self.assertFalse(try_acquire_lease("scheduler", "b", 30, now + 39))
+        self.assertTrue(try_acquire_lease("scheduler", "b", 30, now + 41))  # a crashed
+        self.assertFalse(try_acquire_lease("scheduler", "a", 30, now + 42))
+
+    def test_release_hands_over_immediately(self):
+        self.assertTrue(try_acquire_lease("scheduler", "a", 30, 1000.0))
+        release_lease("scheduler", "b")  # not the holder: no effect
+        self.assertFalse(try_acquire_lease("scheduler", "b", 30, 1001.0))
+        release_lease("scheduler", "a")
+        self.assertTrue(try_acquire_lease("scheduler", "b", 30, 1001.0))
+
+    def test_only_one_leader_lease_object_leads(self):
+        first, second = LeaderLease("scheduler", holder="a"), LeaderLease("scheduler", holder="b")
+        self.assertEqual((first.renew(), second.renew()), (True, False))
+        self.assertTrue(first.is_leader())
+        self.assertFalse(second.is_leader())
+        first.release()
+        self.assertFalse(first.is_leader())
+        self.assertTrue(second.renew())
+        self.assertEqual(second.stats()["acquired"], 1)
+
+
+class TestNotificationLedger(_TempDB):
+
+    def test_one_send_per_user_per_day(self):
+        morning, evening = datetime(2024, 1, 8, 9, 0), datetime(2024, 1, 8, 21, 0)
+        self.assertTrue(claim_notification(1, morning))
+        self.assertFalse(claim_notification(1, evening))
+        self.assertTrue(claim_notification(2, evening))
+        self.assertTrue(claim_notification(1, datetime(2024, 1, 9, 9, 0)))
+
+
+class TestGenerationWatcher(_TempDB):
+
+    def test_other_workers_see_bumps_once(self):
+        writer, reader = GenerationWatcher(), GenerationWatcher()
+        calls = []
+        reader.on_change("syllabus", lambda: calls.append("syllabus"))
+        writer.on_change("syllabus", lambda: calls.append("own"))
+
+        writer.bump("syllabus")
+        self.assertEqual(reader.poll(), ["syllabus"])
+        self.assertEqual(reader.poll(), [])
+        self.assertEqual(writer.poll(), [])  # the writer already updated its own cache
+        self.assertEqual(calls, ["syllabus"])
+
+    def test_start_ignores_earlier_bumps(self):
+        GenerationWatcher().bump("syllabus")
+        watcher = GenerationWatcher(interval=0.01)
+        calls = []
+        watcher.on_change("syllabus", lambda: calls.append(1))
+        watcher.start()
+        try:
+            time.sleep(0.05)
+            self.assertEqual(calls, [])
+            GenerationWatcher().bump("syllabus")
+            deadline = time.time() + 2
+            while not calls and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(calls, [1])
+        finally:
+            watcher.stop()
+
+    def test_failing_callback_does_not_stop_others(self):
+        watcher, calls = GenerationWatcher(), []
+        watcher.on_change("syllabus", lambda: 1 / 0)
+        watcher.on_change("syllabus", lambda: calls.append(1))
+        GenerationWatcher().bump("syllabus")
+        with self.assertLogs("app.coordination", level="ERROR"):
+            watcher.poll()
+        self.assertEqual(calls, [1])
+
+
+class TestRevokedTokens(_TempDB):
+
+    def test_revocations_persist_until_expiry(self):
+        add_revoked_token(b"k1", 2000.0, now=1000.0)
+        add_revoked_token(b"k2", 1500.0, now=1000.0)
+        self.assertEqual(sorted(get_revoked_tokens(1200.0)), [(b"k1", 2000.0), (b"k2", 1500.0)])
+        self.assertEqual(get_revoked_tokens(1600.0), [(b"k1", 2000.0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
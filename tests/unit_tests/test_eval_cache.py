@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+
+import database
+from database import init_db
+from eval_cache import EvaluationCache, cache_key, normalize_code
+from storage import close_storage
+
+TASK = '{"Task name": "Sum", "Task description": "Print a + b"}'
+
+
+class TestNormalizeCode(unittest.TestCase):
+    def test_formatting_comments_and_docstrings_ignored(self):
+        original = 'def f(a, b):\n    """Add."""\n    return a + b\nprint(f(1, 2))\n'
+        reformatted = "# solution\ndef f(a,b):\n\n    return a+b   # sum\n\nprint( f(1,2) )"
+        self.assertEqual(normalize_code(original), normalize_code(reformatted))
+
+    def test_different_code_differs(self):
+        self.assertNotEqual(normalize_code("print(1)"), normalize_code("print(2)"))
+
+    def test_non_python_falls_back_to_text(self):
+        self.assertEqual(normalize_code("what  is\nthe input?"), "what is the input?")
+
+    def test_task_json_formatting_ignored(self):
+        spaced = '{ "Task description": "Print a + b",\n  "Task name": "Sum" }'
+        self.assertEqual(cache_key(TASK, "print(1)"), cache_key(spaced, "print(1)"))
+
+
+class TestEvaluationCache(unittest.TestCase):
+    def test_hit_after_put(self):
+        cache = EvaluationCache(max_entries=10, persistent=False)
+        self.assertIsNone(cache.get(TASK, "print(1)"))
+        cache.put(TASK, "print(1)", {"correct": True, "feedback": "ok"})
+        self.assertEqual(cache.get(TASK, "print( 1 )  # again"), {"correct": True, "feedback": "ok"})
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_lru_eviction(self):
+        cache = EvaluationCache(max_entries=2, persistent=False)
+        cache.put(TASK, "print(1)", {"correct": True})
+        cache.put(TASK, "print(2)", {"correct": True})
+        cache.get(TASK, "print(1)")
+        cache.put(TASK, "print(3)", {"correct": True})
+        self.assertIsNotNone(cache.get(TASK, "print(1)"))
+        self.assertIsNone(cache.get(TASK, "print(2)"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+
+class TestEvaluationCacheStorage(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._original_db_path = database.DB_PATH
+        database.DB_PATH = os.path.join(self._tmp.name, "test.db")
+        init_db()
+
+    def tearDown(self):
+        close_storage(database.DB_PATH)
+        database.DB_PATH = self._original_db_path
+        self._tmp.cleanup()
+
+    def test_sqlite_persistence_survives_restart(self):
+        EvaluationCache(max_entries=10, persistent=True).put(TASK, "print(1)", {"correct": False})
+        restarted = EvaluationCache(max_entries=10, persistent=True)
+        self.assertEqual(restarted.get(TASK, "print(1)"), {"correct": False})
+        self.assertEqual(restarted.stats()["disk_hits"], 1)
+
+    def test_table_is_pruned_to_max_entries(self):
+        cache = EvaluationCache(max_entries=2, persistent=True)
+        for i in range(64):
+            cache.put(TASK, f"print({i})", {"correct": True})
+        with database._db().read() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM eval_cache").fetchone()[0], 2)
+        cache.clear()
+        self.assertIsNone(EvaluationCache(persistent=True).get(TASK, "print(63)"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import asyncio
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from executors import InstrumentedExecutor, check_password, cpu_executor, hash_password
+
+
+class TestInstrumentedExecutor(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.executor = InstrumentedExecutor("test", lambda: ThreadPoolExecutor(max_workers=2), 2)
+
+    async def asyncTearDown(self):
+        self.executor.shutdown()
+
+    async def test_run_returns_result(self):
+        self.assertEqual(await self.executor.run(sum, [1, 2, 3]), 6)
+        stats = self.executor.stats()
+        self.assertEqual(stats["submitted"], 1)
+        self.assertEqual(stats["completed"], 1)
+        self.assertEqual(stats["queue_depth"], 0)
+
+    async def test_exceptions_propagate_and_are_counted(self):
+        with self.assertRaises(ZeroDivisionError):
+            await self.executor.run(lambda: 1 / 0)
+        self.assertEqual(self.executor.stats()["failed"], 1)
+
+    async def test_queue_depth_and_wait_time(self):
+        release = threading.Event()
+        jobs = [asyncio.ensure_future(self.executor.run(release.wait)) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.executor.queue_depth(), 3)
+        self.assertEqual(self.executor.stats()["running"], 2)
+
+        release.set()
+        await asyncio.gather(*jobs)
+        stats = self.executor.stats()
+        self.assertEqual(stats["queue_depth"], 0)
+        self.assertEqual(stats["completed"], 5)
+        self.assertGreater(stats["wait_max_ms"], 0)
+
+
+class TestPasswordHashing(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncTearDown(self):
+        cpu_executor.shutdown()
+
+    async def test_hash_and_check_in_process_pool(self):
+        hashed = await cpu_executor.run(hash_password, "secret123")
+        self.assertTrue(await cpu_executor.run(check_password, "secret123", hashed))
+        self.assertFalse(await cpu_executor.run(check_password, "wrong", hashed))
+
+
+if __name__ == "__main__":
+    unittest.main()
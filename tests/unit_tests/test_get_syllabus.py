@@ -1,22 +1,26 @@
+import os
+import tempfile
 import unittest
-import sqlite3
+import database
 from database import save_syllabus, get_syllabus, init_db
-
-TEST_DB = "test_users.db"
+from storage import close_storage
 
 class TestGetSyllabus(unittest.TestCase):
 
     def setUp(self):
-        # Patch sqlite3.connect to always use a test database
-        self._original_connect = sqlite3.connect
-        sqlite3.connect = lambda _: self._original_connect(TEST_DB)
+        # Point the database module at a test database
+        self._original_db_path = database.DB_PATH
+        self._tmpdir = tempfile.TemporaryDirectory()
+        database.DB_PATH = os.path.join(self._tmpdir.name, "test_users.db")
 
         # Initialize the schema
         init_db()
 
     def tearDown(self):
-        # Restore original connect method
-        sqlite3.connect = self._original_connect
+        # Close the pooled connections and restore original database path
+        close_storage(database.DB_PATH)
+        database.DB_PATH = self._original_db_path
+        self._tmpdir.cleanup()
 
 
     def test_get_syllabus_returns_saved_topics1(self):
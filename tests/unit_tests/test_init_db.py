@@ -1,26 +1,30 @@
+import os
+import tempfile
 import unittest
 import sqlite3
-import os
+import database
 from database import init_db
-
-TEST_DB = "test_users.db"
+from storage import close_storage
 
 class TestInitDB(unittest.TestCase):
 
     def setUp(self):
-        # Patch sqlite3 to use a test DB
-        self._original_connect = sqlite3.connect
-        sqlite3.connect = lambda _: self._original_connect(TEST_DB)
+        # Point the database module at a test DB
+        self._original_db_path = database.DB_PATH
+        self._tmpdir = tempfile.TemporaryDirectory()
+        database.DB_PATH = os.path.join(self._tmpdir.name, "test_users.db")
 
         # Initialize the DB schema
         init_db()
 
     def tearDown(self):
-        # Restore original connect method
-        sqlite3.connect = self._original_connect
+        # Close the pooled connections and restore original database path
+        close_storage(database.DB_PATH)
+        database.DB_PATH = self._original_db_path
+        self._tmpdir.cleanup()
 
     def test_tables_and_indexes_exist(self):
-        conn = sqlite3.connect(TEST_DB)
+        conn = sqlite3.connect(database.DB_PATH)
         cursor = conn.cursor()
 
         # Check required tables
@@ -0,0 +1,79 @@
+import json
+import os
+import unittest
+
+import llm_schemas
+from json_repair import RepairError, parse_task, repair_json
+
+CORPUS = os.path.join(os.path.dirname(__file__), "..", "data", "llm_json_corpus.json")
+
+
+def load_corpus():
+    with open(CORPUS, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def parse(kind, text):
+    """Repair and validate a reply the way main._parse_llm_json does."""
+    if kind == "task":
+        obj, repairs = parse_task(text)
+        return obj, repairs, llm_schemas.validate(llm_schemas.Task, obj)
+    obj, repairs = repair_json(text)
+    return obj, repairs, llm_schemas.validate(llm_schemas.Evaluation, obj)
+
+
+class TestRepairCorpus(unittest.TestCase):
+    """Every sample in the corpus of real-world-style LLM replies."""
+
+    def test_corpus(self):
+        for sample in load_corpus():
+            with self.subTest(sample["kind"], label=sample["label"]):
+                if sample["expected"] == "unrepairable":
+                    with self.assertRaises(RepairError):
+                        parse(sample["kind"], sample["text"])
+                    continue
+                obj, repairs, canonical = parse(sample["kind"], sample["text"])
+                # Type coercions (e.g. "true" -> true) happen in the schema, not in json_repair
+                repaired = bool(repairs) or json.loads(json.dumps(obj)) != canonical
+                self.assertEqual(repaired, sample["expected"] == "repaired", repairs)
+                # The repaired object must survive a strict JSON round trip
+                self.assertEqual(json.loads(json.dumps(canonical)), canonical)
+
+    def test_repaired_task_keeps_content(self):
+        sample = next(s for s in load_corpus() if s["label"] == "single_quotes")
+        _, _, task = parse("task", sample["text"])
+        self.assertEqual(task["Task name"], "Sum two numbers")
+        self.assertEqual(task["Sample input cases"][1], {"input": "10 -4", "expected_output": "6"})
+
+
+class TestRepairJson(unittest.TestCase):
+
+    def test_valid_json_is_not_rewritten(self):
+        self.assertEqual(repair_json('{"a": [1, 2]}'), ({"a": [1, 2]}, []))
+
+    def test_reports_each_repair_once(self):
+        value, repairs = repair_json("{'a': (1, 2,), 'b': None, 'c': 'x',}")
+        self.assertEqual(value, {"a": [1, 2], "b": None, "c": "x"})
+        self.assertEqual(sorted(repairs), ["python_literals", "single_quotes", "trailing_commas", "tuples"])
+
+    def test_closes_truncated_containers(self):
+        self.assertEqual(repair_json('{"a": {"b": [1, 2')[0], {"a": {"b": [1, 2]}})
+        self.assertEqual(repair_json('{"a": 1, "b"')[0], {"a": 1})
+        self.assertEqual(repair_json('{"a": 1, "b":')[0], {"a": 1, "b": None})
+
+    def test_truncated_string_is_not_guessed(self):
+        with self.assertRaises(RepairError):
+            repair_json('{"a": "half a sent')
+
+    def test_hints_list_becomes_an_object(self):
+        task, repairs = parse_task('{"Task name": "x", "Hints": ["a", "b", "c"]}')
+        self.assertEqual(task["Hints"], {"Hint1": "a", "Hint2": "b", "Hint3": "c"})
+        self.assertEqual(repairs, ["hints_list"])
+
+    def test_shape_is_not_checked(self):
+        task, repairs = parse_task('{"Task name": "x", "Hints": {"Hint1": "a"}}')
+        self.assertEqual((task["Hints"], repairs), ({"Hint1": "a"}, []))
+
+
+if __name__ == "__main__":
+    unittest.main()
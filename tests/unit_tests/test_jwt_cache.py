@@ -0,0 +1,89 @@
+import time
+import unittest
+from datetime import timedelta
+from unittest import mock
+
+from fastapi import HTTPException
+
+import jwt_utils
+from jwt_utils import TokenCache, create_access_token, create_user_token, revoke_token, verify_token
+
+
+class TestVerifiedTokenCache(unittest.TestCase):
+
+    def setUp(self):
+        jwt_utils.token_cache.clear()
+
+    def tearDown(self):
+        jwt_utils.token_cache.clear()
+
+    def test_repeat_verification_is_served_from_cache(self):
+        token = create_user_token(1, "alice", "alice@innopolis.university")
+        with mock.patch.object(jwt_utils.jwt, "decode", wraps=jwt_utils.jwt.decode) as decode:
+            first = verify_token(token)
+            second = verify_token(token)
+        self.assertEqual(decode.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertEqual(second["username"], "alice")
+        self.assertEqual(jwt_utils.token_cache.stats()["hits"], 1)
+
+    def test_cached_payload_is_a_copy(self):
+        token = create_user_token(1, "alice", "alice@innopolis.university")
+        verify_token(token)["username"] = "mallory"
+        self.assertEqual(verify_token(token)["username"], "alice")
+
+    def test_entry_expires_at_token_exp(self):
+        token = create_access_token({"sub": "1"}, expires_delta=timedelta(seconds=5))
+        verify_token(token)
+        with mock.patch.object(jwt_utils.time, "time", return_value=time.time() + 10):
+            self.assertIsNone(jwt_utils.token_cache.get(TokenCache.key(token)))
+        self.assertEqual(jwt_utils.token_cache.stats()["size"], 0)
+
+    def test_invalid_token_is_rejected_and_not_cached(self):
+        with self.assertRaises(HTTPException) as ctx:
+            verify_token("not-a-jwt")
+        self.assertEqual(ctx.exception.status_code, 401)
+        self.assertEqual(jwt_utils.token_cache.stats()["size"], 0)
+
+    def test_revoked_token_is_rejected_immediately(self):
+        token = create_user_token(2, "bob", "bob@innopolis.university")
+        verify_token(token)
+        revoke_token(token)
+        with self.assertRaises(HTTPException):
+            verify_token(token)
+        other = create_user_token(3, "carol", "carol@innopolis.university")
+        self.assertEqual(verify_token(other)["sub"], "3")
+
+    def test_revoked_token_is_rejected_with_the_cache_disabled(self):
+        token = create_user_token(2, "bob", "bob@innopolis.university")
+        with mock.patch.object(jwt_utils, "TOKEN_CACHE_ENABLED", False):
+            self.assertEqual(verify_token(token)["sub"], "2")
+            self.assertIsNotNone(revoke_token(token))
+            with self.assertRaises(HTTPException):
+                verify_token(token)
+        self.assertEqual(jwt_utils.token_cache.stats()["size"], 0)
+
+    def test_only_valid_tokens_are_revoked(self):
+        forged = jwt_utils.jwt.encode({"sub": "1", "exp": 2 ** 40}, "not-the-secret", algorithm="HS256")
+        self.assertIsNone(revoke_token(forged))
+        self.assertIsNone(revoke_token("garbage"))
+        token = create_user_token(4, "dan", "dan@innopolis.university")
+        self.assertIsNotNone(revoke_token(token))
+        self.assertIsNone(revoke_token(token))  # already revoked: nothing new to share
+
+    def test_revocation_expiry_is_capped(self):
+        token = create_access_token({"sub": "5"}, expires_delta=timedelta(days=365))
+        _, expires_at = revoke_token(token)
+        self.assertLessEqual(expires_at, time.time() + jwt_utils.ACCESS_TOKEN_EXPIRE_MINUTES * 60 + 1)
+
+    def test_cache_is_bounded(self):
+        cache = TokenCache(max_entries=2)
+        exp = time.time() + 60
+        for i in range(3):
+            cache.put(TokenCache.key(str(i)), {"exp": exp, "sub": str(i)})
+        self.assertIsNone(cache.get(TokenCache.key("0")))
+        self.assertEqual(cache.get(TokenCache.key("2"))["sub"], "2")
+
+
+if __name__ == "__main__":
+    unittest.main()
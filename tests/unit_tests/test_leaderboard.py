@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+
+import database
+from database import add_submissions, create_user, init_db, save_task
+from leaderboard import Leaderboard
+from storage import close_storage
+from submissions import Submission
+
+
+def _board(rows, changes=()):
+    return Leaderboard(lambda: (0, rows), lambda after: [c for c in changes if c[3] > after])
+
+
+class TestLeaderboard(unittest.TestCase):
+
+    def test_top_and_ties_share_a_rank(self):
+        board = _board([(1, "ann", 5), (2, "bob", 9), (3, "cid", 5), (4, "dan", 1)])
+        self.assertEqual(
+            [(e["login"], e["rank"]) for e in board.top(10)],
+            [("bob", 1), ("ann", 2), ("cid", 2), ("dan", 4)],
+        )
+        self.assertEqual(board.rank(3), {"rank": 2, "score": 5})
+        self.assertEqual(board.rank(99), {"rank": 5, "score": 0})
+
+    def test_neighbours(self):
+        board = _board([(i, f"u{i}", 100 - i) for i in range(1, 11)])
+        self.assertEqual([e["user_id"] for e in board.around(5, radius=2)], [3, 4, 5, 6, 7])
+        self.assertEqual([e["user_id"] for e in board.around(1, radius=2)], [1, 2, 3])
+        self.assertEqual([e["user_id"] for e in board.around(99, radius=2)], [9, 10])
+
+    def test_incremental_updates(self):
+        board = _board([(1, "ann", 3), (2, "bob", 2)])
+        board.set_score(2, "bob", 4)
+        self.assertEqual(board.rank(2)["rank"], 1)
+        board.set_score(1, "ann", 0)
+        self.assertEqual(len(board), 1)
+
+    def test_catch_up_applies_only_newer_changes(self):
+        changes = []
+        board = _board([(1, "ann", 3), (2, "bob", 5)], changes)
+        self.assertEqual(board.catch_up(), 0)  # first call loads
+        changes.extend([(1, "ann", 7, 1), (3, "cid", 1, 2)])
+        self.assertEqual(board.catch_up(), 2)
+        self.assertEqual([e["login"] for e in board.top(3)], ["ann", "bob", "cid"])
+        self.assertEqual(board.catch_up(), 0)
+        self.assertEqual(board.stats()["generation"], 2)
+
+    def test_changes_made_during_a_rebuild_are_kept(self):
+        board = _board([(1, "ann", 3)])
+        board.rebuild()
+        changes = []
+
+        def load():
+            # Another request scores while the snapshot is being read
+            board.set_score(2, "bob", 4)
+            changes.append((2, "bob", 4, 1))
+            return 0, [(1, "ann", 3)]
+
+        board._load = load
+        board._changes = lambda after: [c for c in changes if c[3] > after]
+        board.rebuild()
+        self.assertEqual(board.rank(2), {"rank": 1, "score": 4})
+        self.assertEqual(board.stats()["generation"], 1)
+
+
+class TestLeaderboardStorage(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._original_db_path = database.DB_PATH
+        database.DB_PATH = os.path.join(self._tmp.name, "test.db")
+        init_db()
+        for login in ("ann", "bob"):
+            create_user(f"{login}@example.com", login, "hash")
+
+    def tearDown(self):
+        close_storage(database.DB_PATH)
+        database.DB_PATH = self._original_db_path
+        self._tmp.cleanup()
+
+    def test_score_changes_reach_other_workers(self):
+        writer_side, reader_side = Leaderboard(), Leaderboard()
+        writer_side.rebuild()
+        reader_side.rebuild()
+        save_task("t1", "Math", "beginner", "{}", "")
+        add_submissions([Submission(2, "t1", "Math", "beginner", True, "2026-01-01T00:00:00")])
+        database.update_score(1, 2)
+        self.assertEqual(reader_side.catch_up(), 2)
+        self.assertEqual([(e["login"], e["score"]) for e in reader_side.top(5)], [("ann", 2), ("bob", 1)])
+        # A fresh worker builds the same board from the index scan
+        fresh = Leaderboard()
+        self.assertEqual(fresh.top(5), reader_side.top(5))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import asyncio
+import unittest
+
+import httpx
+
+from llm_client import ClientDisconnected, LLMClient, run_until_disconnected
+
+
+class _FakeRequest:
+    """Minimal stand-in for :class:`fastapi.Request` disconnect polling."""
+
+    def __init__(self, disconnect_after: int):
+        self._polls = 0
+        self._disconnect_after = disconnect_after
+
+    async def is_disconnected(self):
+        self._polls += 1
+        return self._polls > self._disconnect_after
+
+
+class TestLLMClient(unittest.IsolatedAsyncioTestCase):
+    async def test_client_is_reused_within_loop(self):
+        client = LLMClient(http2=False)
+        self.assertIs(client._get(), client._get())
+        await client.aclose()
+
+    async def test_post_json_returns_decoded_body(self):
+        def handler(request):
+            return httpx.Response(200, json={"choices": [{"message": {"content": "hi"}}]})
+
+        client = LLMClient(http2=False)
+        client._get()
+        client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        result = await client.post_json("https://llm.test/", {}, headers={}, timeout=5)
+        self.assertEqual(result["choices"][0]["message"]["content"], "hi")
+        await client.aclose()
+
+    async def test_post_json_raises_on_error_status(self):
+        client = LLMClient(http2=False)
+        client._get()
+        client._client = httpx.AsyncClient(transport=httpx.MockTransport(lambda r: httpx.Response(401)))
+        with self.assertRaises(httpx.HTTPStatusError):
+            await client.post_json("https://llm.test/", {}, headers={}, timeout=5)
+        await client.aclose()
+
+    async def test_run_until_disconnected_returns_result(self):
+        async def work():
+            return 42
+
+        self.assertEqual(await run_until_disconnected(_FakeRequest(10), work()), 42)
+
+    async def test_run_until_disconnected_cancels_on_disconnect(self):
+        cancelled = asyncio.Event()
+
+        async def slow():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with self.assertRaises(ClientDisconnected):
+            await run_until_disconnected(_FakeRequest(0), slow())
+        await asyncio.sleep(0)
+        self.assertTrue(cancelled.is_set())
+
+
+if __name__ == "__main__":
+    unittest.main()
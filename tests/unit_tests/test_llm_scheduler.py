@@ -0,0 +1,156 @@
+import asyncio
+import unittest
+
+from llm_scheduler import (BACKGROUND, GENERATE, INTERACTIVE, AdmissionRejected, LLMScheduler, Ticket,
+                           current_ticket)
+
+
+class TestAdmission(unittest.TestCase):
+
+    def test_user_bucket_allows_bursts_then_rejects(self):
+        scheduler = LLMScheduler(user_rate=6, user_burst=2)  # one token per 10 s
+        scheduler.admit("user:1", GENERATE)
+        scheduler.admit("user:1", INTERACTIVE)
+        with self.assertRaises(AdmissionRejected) as raised:
+            scheduler.admit("user:1", GENERATE)
+        self.assertEqual(raised.exception.reason, "user_rate")
+        self.assertAlmostEqual(raised.exception.retry_after, 10, delta=0.5)
+        scheduler.admit("user:2", GENERATE)  # other users are unaffected
+        scheduler.admit(None, BACKGROUND)    # background work is not rate limited
+        self.assertEqual(scheduler.stats()["rejected"], {"user_rate": 1})
+
+    def test_ticket_is_scoped(self):
+        self.assertEqual(current_ticket().priority, BACKGROUND)
+        with Ticket("user:1", INTERACTIVE):
+            self.assertEqual(current_ticket().user, "user:1")
+        self.assertIsNone(current_ticket().user)
+
+
+class TestSlots(unittest.IsolatedAsyncioTestCase):
+
+    async def _queue(self, scheduler, tickets, order):
+        """Occupy the only slot, queue ``tickets``, then release and record the grant order."""
+
+        release = asyncio.Event()
+
+        async def holder():
+            async with scheduler.slot():
+                await release.wait()
+
+        async def waiter(ticket, label):
+            with ticket:
+                async with scheduler.slot():
+                    order.append(label)
+
+        tasks = [asyncio.ensure_future(holder())]
+        await asyncio.sleep(0)
+        for label, ticket in tickets:
+            tasks.append(asyncio.ensure_future(waiter(ticket, label)))
+            await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(*tasks)
+
+    async def test_interactive_work_goes_first(self):
+        order = []
+        await self._queue(LLMScheduler(max_concurrency=1), [
+            ("pool", Ticket(None, BACKGROUND)),
+            ("task", Ticket("user:1", GENERATE)),
+            ("eval", Ticket("user:2", INTERACTIVE)),
+        ], order)
+        self.assertEqual(order, ["eval", "task", "pool"])
+
+    async def test_fair_queueing_across_users(self):
+        order = []
+        await self._queue(LLMScheduler(max_concurrency=1), [
+            ("a1", Ticket("user:a", GENERATE)),
+            ("a2", Ticket("user:a", GENERATE)),
+            ("a3", Ticket("user:a", GENERATE)),
+            ("b1", Ticket("user:b", GENERATE)),
+        ], order)
+        self.assertEqual(order, ["a1", "b1", "a2", "a3"])
+
+    async def test_full_queue_is_rejected(self):
+        scheduler = LLMScheduler(max_concurrency=1, max_depth=1)
+        release = asyncio.Event()
+
+        async def hold():
+            async with scheduler.slot():
+                await release.wait()
+
+        tasks = [asyncio.ensure_future(hold()), asyncio.ensure_future(hold())]
+        await asyncio.sleep(0)
+        self.assertEqual(scheduler.stats()["queue_depth"], 1)
+        with self.assertRaises(AdmissionRejected) as raised:
+            async with scheduler.slot():
+                pass
+        self.assertEqual(raised.exception.reason, "queue_full")
+        release.set()
+        await asyncio.gather(*tasks)
+        self.assertEqual(scheduler.stats()["in_flight"], 0)
+
+    async def test_waiting_longer_than_the_budget_is_rejected(self):
+        scheduler = LLMScheduler(max_concurrency=1, max_wait=0.05)
+        release = asyncio.Event()
+
+        async def hold():
+            async with scheduler.slot():
+                await release.wait()
+
+        holder = asyncio.ensure_future(hold())
+        await asyncio.sleep(0)
+        with self.assertRaises(AdmissionRejected) as raised:
+            async with scheduler.slot():
+                pass
+        self.assertEqual(raised.exception.reason, "wait_timeout")
+        self.assertEqual(scheduler.stats()["queue_depth"], 0)
+        release.set()
+        await holder
+        async with scheduler.slot():  # the abandoned waiter did not leak the slot
+            self.assertEqual(scheduler.stats()["in_flight"], 1)
+
+    async def test_cancelled_waiter_leaves_the_queue(self):
+        scheduler = LLMScheduler(max_concurrency=1)
+        release = asyncio.Event()
+
+        async def hold():
+            async with scheduler.slot():
+                await release.wait()
+
+        holder = asyncio.ensure_future(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(hold())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+        self.assertEqual(scheduler.stats()["queue_depth"], 0)
+        release.set()
+        await holder
+        self.assertEqual(scheduler.stats()["in_flight"], 0)
+
+
+    async def test_try_acquire_never_jumps_the_queue(self):
+        scheduler = LLMScheduler(max_concurrency=2)
+        release = asyncio.Event()
+
+        async def hold():
+            async with scheduler.slot():
+                await release.wait()
+
+        self.assertTrue(scheduler.try_acquire())
+        holder = asyncio.ensure_future(hold())
+        await asyncio.sleep(0)
+        self.assertFalse(scheduler.try_acquire())  # both slots taken
+        waiter = asyncio.ensure_future(hold())
+        await asyncio.sleep(0)
+        scheduler.release()  # hands the slot to the queued call
+        await asyncio.sleep(0)
+        self.assertEqual(scheduler.stats()["queue_depth"], 0)
+        self.assertFalse(scheduler.try_acquire())
+        release.set()
+        await asyncio.gather(holder, waiter)
+        self.assertEqual(scheduler.stats()["in_flight"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+from unittest import mock
+
+import llm_schemas
+from json_repair import RepairError
+from llm_schemas import Evaluation, Task
+
+TASK = {
+    "Task name": "Sum two numbers",
+    "Task description": "Read two numbers and print their sum.",
+    "Sample input cases": [{"input": "2 3", "expected_output": "5"}],
+    "Hints": {"Hint1": "input()", "Hint2": "split", "Hint3": "int()"},
+}
+
+
+def _objects(schema):
+    """Yield every object schema inside ``schema``."""
+    if "properties" in schema:
+        yield schema
+    for sub in list(schema.get("properties", {}).values()) + list(schema.get("$defs", {}).values()):
+        yield from _objects(sub)
+    if isinstance(schema.get("items"), dict):
+        yield from _objects(schema["items"])
+
+
+class TestResponseFormat(unittest.TestCase):
+
+    def test_schemas_are_strict(self):
+        for model in (Task, Evaluation):
+            fmt = llm_schemas.response_format(model)
+            self.assertEqual(fmt["type"], "json_schema")
+            self.assertTrue(fmt["json_schema"]["strict"])
+            for obj in _objects(fmt["json_schema"]["schema"]):
+                self.assertFalse(obj["additionalProperties"])
+                self.assertEqual(sorted(obj["required"]), sorted(obj["properties"]))
+
+    def test_task_schema_uses_the_client_field_names(self):
+        schema = llm_schemas.response_format(Task)["json_schema"]["schema"]
+        self.assertEqual(list(schema["properties"]), list(TASK))
+
+    def test_model_support_list(self):
+        with mock.patch.object(llm_schemas, "STRUCTURED_OUTPUT_MODELS", ["openai/*", "x/exact"]):
+            self.assertTrue(llm_schemas.structured_output_supported("openai/gpt-4o-mini"))
+            self.assertTrue(llm_schemas.structured_output_supported("x/exact"))
+            self.assertFalse(llm_schemas.structured_output_supported("x/exact-2"))
+            with mock.patch.object(llm_schemas, "_rejected", set()):
+                llm_schemas.mark_unsupported("openai/gpt-4o-mini")
+                self.assertFalse(llm_schemas.structured_output_supported("openai/gpt-4o-mini"))
+
+
+class TestFieldsModel(unittest.TestCase):
+
+    def test_only_missing_fields_are_requested(self):
+        model = llm_schemas.fields_model(Task, ["Hint2", "Sample input cases"])
+        schema = llm_schemas.response_format(model)["json_schema"]["schema"]
+        self.assertEqual(schema["required"], ["Sample input cases", "Hints"])
+        hints = schema["$defs"][schema["properties"]["Hints"]["$ref"].split("/")[-1]]
+        self.assertEqual(hints["required"], ["Hint2"])
+
+    def test_unknown_names_give_no_model(self):
+        self.assertIsNone(llm_schemas.fields_model(Evaluation, ["Hint1"]))
+
+    def test_merge_keeps_existing_fields(self):
+        partial = {"Task name": "x", "Hints": {"Hint1": "a"}}
+        merged = llm_schemas.merge(partial, {"Hints": {"Hint2": "b", "Hint3": "c"}})
+        self.assertEqual(merged["Hints"], {"Hint1": "a", "Hint2": "b", "Hint3": "c"})
+        self.assertEqual(partial["Hints"], {"Hint1": "a"})
+
+    def test_can_fill(self):
+        self.assertTrue(llm_schemas.can_fill(Task, RepairError("", ["Hint3"], {"Task name": "x"})))
+        self.assertFalse(llm_schemas.can_fill(Task, RepairError("", ["Task description"], {"Task name": "x"})))
+        self.assertFalse(llm_schemas.can_fill(Task, RepairError("", ["Hint3"])))
+
+
+class TestValidate(unittest.TestCase):
+
+    def test_extra_keys_are_dropped(self):
+        self.assertEqual(llm_schemas.validate(Task, {**TASK, "Tags": ["math"]}), TASK)
+
+    def test_blank_hint_is_reported(self):
+        task = {**TASK, "Hints": {"Hint1": "a", "Hint2": " ", "Hint3": "c"}}
+        with self.assertRaises(RepairError) as ctx:
+            llm_schemas.validate(Task, task)
+        self.assertEqual(ctx.exception.missing, ["Hint2"])
+
+    def test_question_needs_no_verdict(self):
+        self.assertEqual(
+            llm_schemas.validate(Evaluation, {"question": True, "feedback": "It reads stdin."}),
+            {"question": True, "feedback": "It reads stdin."},
+        )
+        with self.assertRaises(RepairError):
+            llm_schemas.validate(Evaluation, {"question": False, "feedback": "?"})
+
+
+if __name__ == "__main__":
+    unittest.main()
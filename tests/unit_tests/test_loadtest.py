@@ -0,0 +1,112 @@
+import json
+import random
+import unittest
+
+from fastapi.testclient import TestClient
+
+import llm_schemas
+from json_repair import RepairError, parse_task, repair_json
+from loadtest.fake_openrouter import FakeConfig, create_app
+from loadtest.loadgen import SLO, Sample, check_slo, percentile, summarize
+
+TASK_PROMPT = "Create one Python programming task on 'loops' with 'hard' difficulty.\n"
+EVAL_PROMPT = "Task:\n{}\n\nUser message:\n print(1)\nCheck if the user message is a code solution"
+
+
+def _post(client, prompt, **extra):
+    return client.post(
+        "/api/v1/chat/completions",
+        json={"model": "fake/model", "messages": [{"role": "user", "content": prompt}], **extra},
+    )
+
+
+class TestFakeOpenRouter(unittest.TestCase):
+
+    def test_replies_match_the_app_schemas(self):
+        client = TestClient(create_app(FakeConfig(latency_ms=0, seed=1)))
+        task = _post(client, TASK_PROMPT).json()["choices"][0]["message"]["content"]
+        verdict = _post(client, EVAL_PROMPT).json()["choices"][0]["message"]["content"]
+        task = llm_schemas.validate(llm_schemas.Task, parse_task(task)[0])
+        verdict = llm_schemas.validate(llm_schemas.Evaluation, repair_json(verdict)[0])
+        self.assertEqual(task["Task name"], "Loops warm-up (hard)")
+        self.assertIn("correct", verdict)
+
+    def test_injected_failures(self):
+        errors = TestClient(create_app(FakeConfig(latency_ms=0, error_rate=1.0)))
+        self.assertEqual(_post(errors, TASK_PROMPT).status_code, 500)
+
+        limited = TestClient(create_app(FakeConfig(latency_ms=0, rate_limit_rate=1.0, retry_after=2)))
+        response = _post(limited, TASK_PROMPT)
+        self.assertEqual((response.status_code, response.headers["retry-after"]), (429, "2"))
+
+    def test_malformed_replies_need_repair_or_reroll(self):
+        client = TestClient(create_app(FakeConfig(latency_ms=0, malformed_rate=1.0, seed=3)))
+        for _ in range(10):
+            content = _post(client, TASK_PROMPT).json()["choices"][0]["message"]["content"]
+            with self.assertRaises(ValueError):
+                json.loads(content)
+            try:
+                task, repairs = parse_task(content)
+                llm_schemas.validate(llm_schemas.Task, task)
+                self.assertTrue(repairs)
+            except RepairError:
+                pass
+
+    def test_stream(self):
+        client = TestClient(create_app(FakeConfig(latency_ms=0, stream_chunk=5)))
+        response = _post(client, TASK_PROMPT, stream=True)
+        deltas = [
+            json.loads(line[len("data: "):])["choices"][0]["delta"]["content"]
+            for line in response.text.splitlines()
+            if line.startswith("data: {")
+        ]
+        self.assertGreater(len(deltas), 1)
+        llm_schemas.validate(llm_schemas.Task, parse_task("".join(deltas))[0])
+
+    def test_latency_distributions(self):
+        rng = random.Random(0)
+        self.assertEqual(FakeConfig(latency_ms=100, distribution="fixed").latency(rng), 0.1)
+        uniform = [FakeConfig(latency_ms=100, jitter=0.5, distribution="uniform").latency(rng) for _ in range(200)]
+        self.assertTrue(all(0.05 <= x <= 0.15 for x in uniform))
+        lognormal = sorted(FakeConfig(latency_ms=100, jitter=0.5).latency(rng) for _ in range(2001))
+        self.assertAlmostEqual(lognormal[1000], 0.1, delta=0.01)
+
+
+class TestReport(unittest.TestCase):
+
+    def test_percentile_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 100), 100)
+        self.assertEqual(percentile([7.0], 50), 7.0)
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def _report(self, slow_ms):
+        samples = [Sample("get_syllabus", 0.005, True) for _ in range(90)]
+        samples += [Sample("generate_task", slow_ms / 1000, True) for _ in range(10)]
+        return summarize(samples, duration=10.0)
+
+    def test_summary_per_endpoint(self):
+        report = self._report(200)
+        self.assertEqual(report["overall"]["requests"], 100)
+        self.assertEqual(report["endpoints"]["generate_task"]["p95_ms"], 200.0)
+        self.assertEqual(report["endpoints"]["get_syllabus"]["rps"], 9.0)
+
+    def test_slo_checks(self):
+        self.assertEqual(check_slo(self._report(200), SLO()), [])
+        self.assertEqual(len(check_slo(self._report(200), SLO(endpoint_p95_ms={"generate_task": 150}))), 1)
+
+        failing = self._report(200)
+        failing["overall"]["p95_ms"] = 450.0
+        failing["overall"]["error_rate"] = 0.05
+        self.assertEqual(len(check_slo(failing, SLO())), 2)
+
+    def test_baseline_regression(self):
+        baseline = self._report(100)
+        violations = check_slo(self._report(200), SLO(baseline=baseline, max_regression=0.2))
+        self.assertEqual(len(violations), 1)
+        self.assertIn("generate_task", violations[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
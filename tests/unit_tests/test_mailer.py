@@ -0,0 +1,159 @@
+import smtplib
+import socket
+import threading
+import unittest
+from email.mime.text import MIMEText
+
+from mailer import Mailer
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:  # optional test dependency
+    Controller = None
+
+
+class FakeSMTP:
+    """Records sessions and messages; can be told to fail."""
+
+    instances = []
+    fail_next = []  # exceptions raised by upcoming sendmail calls
+    fail_login = []  # exceptions raised by upcoming login calls
+
+    def __init__(self, host, port, timeout=None):
+        self.sent = []
+        self.tls = self.logged_in = self.closed = False
+        FakeSMTP.instances.append(self)
+
+    def starttls(self):
+        self.tls = True
+
+    def login(self, user, password):
+        if FakeSMTP.fail_login:
+            raise FakeSMTP.fail_login.pop(0)
+        self.logged_in = True
+
+    def sendmail(self, from_addr, to_addrs, msg):
+        if FakeSMTP.fail_next:
+            raise FakeSMTP.fail_next.pop(0)
+        self.sent.append((from_addr, tuple(to_addrs), msg))
+
+    def quit(self):
+        self.closed = True
+
+    close = quit
+
+
+def _message(n=0):
+    msg = MIMEText(f"hello {n}")
+    msg["Subject"] = "Reminder"
+    return msg
+
+
+class TestMailer(unittest.TestCase):
+
+    def setUp(self):
+        FakeSMTP.instances = []
+        FakeSMTP.fail_next = []
+        FakeSMTP.fail_login = []
+
+    def _mailer(self, **kwargs):
+        options = dict(host="smtp.test", port=25, username="bot", password="pw", from_email="bot@test",
+                       workers=1, max_per_minute=0, retry_base_delay=0.01, smtp_factory=FakeSMTP)
+        options.update(kwargs)
+        mailer = Mailer(**options)
+        self.addCleanup(mailer.stop)
+        return mailer
+
+    def test_messages_share_one_authenticated_session(self):
+        mailer = self._mailer()
+        for i in range(20):
+            mailer.send(f"user{i}@innopolis.university", _message(i))
+        self.assertTrue(mailer.flush(5))
+
+        self.assertEqual(len(FakeSMTP.instances), 1)
+        session = FakeSMTP.instances[0]
+        self.assertTrue(session.tls and session.logged_in)
+        self.assertEqual(len(session.sent), 20)
+        self.assertEqual(mailer.stats()["sent"], 20)
+
+    def test_transient_failure_is_retried_on_new_session(self):
+        FakeSMTP.fail_next = [smtplib.SMTPServerDisconnected("gone")]
+        mailer = self._mailer()
+        mailer.send("a@innopolis.university", _message())
+        self.assertTrue(mailer.flush(5))
+
+        stats = mailer.stats()
+        self.assertEqual((stats["sent"], stats["retried"], stats["failed"]), (1, 1, 0))
+        self.assertEqual(len(FakeSMTP.instances), 2)
+
+    def test_failed_login_closes_the_connection(self):
+        FakeSMTP.fail_login = [smtplib.SMTPServerDisconnected("gone")]
+        mailer = self._mailer()
+        mailer.send("a@innopolis.university", _message())
+        self.assertTrue(mailer.flush(5))
+
+        self.assertEqual(mailer.stats()["sent"], 1)
+        self.assertEqual(len(FakeSMTP.instances), 2)
+        self.assertTrue(FakeSMTP.instances[0].closed)
+        self.assertFalse(FakeSMTP.instances[0].logged_in)
+
+    def test_permanent_failure_is_not_retried(self):
+        FakeSMTP.fail_next = [smtplib.SMTPRecipientsRefused({"a@x": (550, b"no such user")})]
+        mailer = self._mailer()
+        mailer.send("a@x", _message())
+        self.assertTrue(mailer.flush(5))
+        self.assertEqual(mailer.stats()["failed"], 1)
+        self.assertEqual(mailer.stats()["retried"], 0)
+
+    def test_gives_up_after_max_attempts(self):
+        FakeSMTP.fail_next = [smtplib.SMTPServerDisconnected("gone")] * 3
+        mailer = self._mailer(max_attempts=3)
+        mailer.send("a@innopolis.university", _message())
+        self.assertTrue(mailer.flush(5))
+        self.assertEqual(mailer.stats()["failed"], 1)
+        self.assertEqual(mailer.stats()["retried"], 2)
+
+    def test_rate_limit_caps_throughput(self):
+        mailer = self._mailer(max_per_minute=60)  # bucket starts full, then one per second
+        mailer._rate._tokens = 0
+        mailer.send("a@innopolis.university", _message())
+        self.assertFalse(mailer.flush(0.5))
+        self.assertTrue(mailer.flush(2))
+
+
+@unittest.skipIf(Controller is None, "aiosmtpd is not installed")
+class TestMailerAgainstLocalSMTP(unittest.TestCase):
+
+    def setUp(self):
+        class Handler:
+            def __init__(self):
+                self.envelopes = []
+                self.lock = threading.Lock()
+
+            async def handle_DATA(self, server, session, envelope):
+                with self.lock:
+                    self.envelopes.append(envelope)
+                return "250 OK"
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        self.handler = Handler()
+        self.controller = Controller(self.handler, hostname="127.0.0.1", port=port)
+        self.controller.start()
+        self.addCleanup(self.controller.stop)
+        self.port = port
+
+    def test_delivers_queued_messages(self):
+        mailer = Mailer(host="127.0.0.1", port=self.port, username="", password="", from_email="bot@test",
+                        starttls=False, workers=2, max_per_minute=0)
+        self.addCleanup(mailer.stop)
+        for i in range(10):
+            mailer.send(f"user{i}@innopolis.university", _message(i))
+        self.assertTrue(mailer.flush(10))
+        self.assertEqual(len(self.handler.envelopes), 10)
+        self.assertLessEqual(mailer.stats()["sessions_opened"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
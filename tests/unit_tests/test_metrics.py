@@ -0,0 +1,103 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import metrics
+
+requires_prometheus = unittest.skipUnless(metrics.PROMETHEUS_AVAILABLE, "prometheus_client is not installed")
+
+
+def _sample(name, labels):
+    from prometheus_client import REGISTRY
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def _app():
+    app = FastAPI()
+    app.add_middleware(metrics.PrometheusMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    return app
+
+
+@requires_prometheus
+class TestPrometheusMiddleware(unittest.TestCase):
+
+    def test_requests_are_labelled_by_route_template(self):
+        labels = {"method": "GET", "route": "/items/{item_id}", "status": "200"}
+        before = _sample("http_request_duration_seconds_count", labels)
+        client = TestClient(_app())
+        client.get("/items/1")
+        client.get("/items/2")
+        self.assertEqual(_sample("http_request_duration_seconds_count", labels), before + 2)
+        self.assertEqual(_sample("http_requests_in_flight", {"method": "GET", "route": "/items/{item_id}"}), 0)
+
+    def test_unknown_paths_share_one_label(self):
+        labels = {"method": "GET", "route": "unmatched", "status": "404"}
+        before = _sample("http_request_duration_seconds_count", labels)
+        TestClient(_app()).get("/nope/123")
+        self.assertEqual(_sample("http_request_duration_seconds_count", labels), before + 1)
+
+
+@requires_prometheus
+class TestStatsBridge(unittest.TestCase):
+
+    def test_numeric_stats_become_gauges(self):
+        metrics.register_stats("unit_test", lambda: {"hits": 3, "label": "x", "cpu": {"depth": 2}}, labels=("cpu",))
+        self.assertEqual(_sample("studybuddy_unit_test_hits", {}), 3)
+        self.assertEqual(_sample("studybuddy_unit_test_depth", {"key": "cpu"}), 2)
+
+    def test_only_listed_nested_keys_become_labels(self):
+        metrics.register_stats("unit_test_keys", lambda: {
+            "ready": {"loops|beginner": 4},
+            "pools": {"depth": 1},
+            "other": {"depth": 5},
+        }, labels=lambda: ["pools"])
+        self.assertEqual(_sample("studybuddy_unit_test_keys_depth", {"key": "pools"}), 1)
+        from prometheus_client import REGISTRY
+        self.assertIsNone(REGISTRY.get_sample_value("studybuddy_unit_test_keys_depth", {"key": "other"}))
+        self.assertIsNone(REGISTRY.get_sample_value("studybuddy_unit_test_keys_loops|beginner", {"key": "ready"}))
+
+
+@requires_prometheus
+class TestMultiprocess(unittest.TestCase):
+
+    def test_render_reads_the_multiprocess_directory(self):
+        from prometheus_client import Counter, values
+        in_process = values.ValueClass
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.dict(os.environ, {"PROMETHEUS_MULTIPROC_DIR": tmp}):
+            values.ValueClass = values.get_value_class()  # as if imported with the variable set
+            try:
+                Counter("unit_test_worker_total", "written by another worker", registry=None).inc(2)
+            finally:
+                values.ValueClass = in_process
+            metrics.register_stats("unit_test_mp", lambda: {"hits": 1})
+            with mock.patch.object(metrics, "MULTIPROCESS", True):
+                body = metrics.render()[0].decode()
+            metrics.mark_process_dead()
+        self.assertIn("unit_test_worker_total 2.0", body)
+        self.assertIn("studybuddy_unit_test_mp_hits 1.0", body)
+
+
+class TestMetricsEndpoint(unittest.TestCase):
+
+    def test_metrics_endpoint(self):
+        from main import app
+        response = TestClient(app).get("/metrics")
+        if not metrics.PROMETHEUS_AVAILABLE:
+            self.assertEqual(response.status_code, 503)
+            return
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("http_request_duration_seconds", response.text)
+        self.assertIn("llm_request_duration_seconds", response.text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+import asyncio
+import unittest
+
+import httpx
+
+from model_router import ModelRouter, _parse_difficulty_models
+
+
+def _status_error(status):
+    request = httpx.Request("POST", "https://llm.test/")
+    return httpx.HTTPStatusError("upstream", request=request, response=httpx.Response(status, request=request))
+
+
+def _router(models, **kwargs):
+    kwargs.setdefault("hedge_min_samples", 1)
+    kwargs.setdefault("hedge_min_delay", 0.0)
+    return ModelRouter(models, default=lambda: "default/model", **kwargs)
+
+
+class TestRanking(unittest.TestCase):
+
+    def test_fastest_healthy_model_first(self):
+        router = _router(["slow", "fast", "flaky"])
+        router.observe("slow", 2.0, True)
+        router.observe("fast", 0.5, True)
+        router.observe("flaky", 0.1, True)
+        for _ in range(5):
+            router.observe("flaky", 0.1, False)
+        self.assertEqual(router.candidates(), ["fast", "slow", "flaky"])
+
+    def test_unhealthy_model_is_probed_after_cooldown(self):
+        router = _router(["a", "b"], cooldown=3600)
+        router.observe("a", 0.1, True)
+        for _ in range(5):
+            router.observe("a", 0.1, False)
+        router.observe("b", 1.0, True)
+        self.assertEqual(router.candidates(), ["b", "a"])
+        router.cooldown = 0.0
+        self.assertEqual(router.candidates(), ["a", "b"])
+
+    def test_untried_models_are_probed_first(self):
+        router = _router(["a", "b"])
+        router.observe("a", 0.1, True)
+        self.assertEqual(router.pick(), "b")
+
+    def test_per_difficulty_models_and_default(self):
+        routes = _parse_difficulty_models("beginner=small/a|small/b, hard=big/c,broken")
+        self.assertEqual(routes, {"beginner": ["small/a", "small/b"], "hard": ["big/c"]})
+        router = ModelRouter([], routes, default=lambda: "default/model")
+        self.assertEqual(router.candidates("Beginner"), ["small/a", "small/b"])
+        self.assertEqual(router.candidates("medium"), ["default/model"])
+
+
+class TestCall(unittest.IsolatedAsyncioTestCase):
+
+    async def test_hedge_after_primary_p90(self):
+        router = _router(["primary", "backup"])
+        router.observe("primary", 0.05, True)  # p90 = 50 ms
+        router.observe("backup", 0.06, True)
+        calls = []
+
+        async def fn(model):
+            calls.append(model)
+            await asyncio.sleep(1.0 if model == "primary" else 0.01)
+            return model
+
+        self.assertEqual(await router.call(fn), "backup")
+        self.assertEqual(calls, ["primary", "backup"])
+        self.assertEqual((router.hedges, router.hedge_wins), (1, 1))
+        await asyncio.sleep(0)
+        # The cancelled primary still taught the router it is slow
+        self.assertGreater(router.stats()["primary"]["latency_ewma"], 0.05)
+
+    async def test_hedge_gate_can_veto_and_is_released(self):
+        released = []
+
+        async def fn(model):
+            await asyncio.sleep(0.05 if model == "primary" else 0.0)
+            return model
+
+        vetoed = _router(["primary", "backup"], hedge_initial_delay=0.0, hedge_min_samples=100,
+                         hedge_gate=lambda: None)
+        self.assertEqual(await vetoed.call(fn), "primary")
+        self.assertEqual((vetoed.hedges, vetoed.hedges_skipped), (0, 1))
+
+        allowed = _router(["primary", "backup"], hedge_initial_delay=0.0, hedge_min_samples=100,
+                          hedge_gate=lambda: lambda: released.append(True))
+        self.assertEqual(await allowed.call(fn), "backup")
+        await asyncio.sleep(0)
+        self.assertEqual((allowed.hedges, released), (1, [True]))
+
+    async def test_no_hedge_when_primary_is_fast(self):
+        router = _router(["primary", "backup"], hedge_initial_delay=1.0, hedge_min_samples=100)
+        calls = []
+
+        async def fn(model):
+            calls.append(model)
+            return model
+
+        self.assertEqual(await router.call(fn), "primary")
+        self.assertEqual(calls, ["primary"])
+        self.assertEqual(router.hedges, 0)
+
+    async def test_failover_on_upstream_error(self):
+        router = _router(["primary", "backup"], hedging=False)
+
+        async def fn(model):
+            if model == "primary":
+                raise _status_error(502)
+            return model
+
+        self.assertEqual(await router.call(fn), "backup")
+        self.assertEqual(router.failovers, 1)
+        self.assertEqual(router.stats()["primary"]["errors"], 1)
+
+    async def test_request_errors_are_not_failed_over(self):
+        router = _router(["primary", "backup"])
+        calls = []
+
+        async def fn(model):
+            calls.append(model)
+            raise _status_error(401)
+
+        with self.assertRaises(httpx.HTTPStatusError):
+            await router.call(fn)
+        self.assertEqual(calls, ["primary"])
+        self.assertEqual(router.stats()["primary"]["errors"], 0)
+
+    async def test_cancelling_the_call_cancels_both_requests(self):
+        router = _router(["primary", "backup"], hedge_initial_delay=0.0, hedge_min_samples=100)
+        cancelled = []
+
+        async def fn(model):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(model)
+                raise
+
+        call = asyncio.ensure_future(router.call(fn))
+        await asyncio.sleep(0.05)
+        call.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await call
+        await asyncio.sleep(0)
+        self.assertEqual(sorted(cancelled), ["backup", "primary"])
+
+
+if __name__ == "__main__":
+    unittest.main()
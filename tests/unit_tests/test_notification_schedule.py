@@ -0,0 +1,107 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import database
+from database import (
+    claim_notification,
+    get_users_with_notifications_enabled,
+    init_db,
+    next_fire_time,
+    update_last_notification_date,
+    update_notification_settings,
+)
+from storage import close_storage, get_storage
+
+# 2024-01-01 is a Monday
+MONDAY_0800 = datetime(2024, 1, 1, 8, 0)
+
+
+class TestNextFireTime(unittest.TestCase):
+
+    def test_same_day_when_slot_still_ahead(self):
+        self.assertEqual(next_fire_time("09:00", ["1"], MONDAY_0800), datetime(2024, 1, 1, 9, 0))
+
+    def test_slot_at_current_minute_is_due(self):
+        self.assertEqual(next_fire_time("08:00", ["1"], MONDAY_0800.replace(second=30)), MONDAY_0800)
+
+    def test_skips_to_next_enabled_weekday(self):
+        self.assertEqual(next_fire_time("07:00", ["1", "3"], MONDAY_0800), datetime(2024, 1, 3, 7, 0))
+        self.assertEqual(next_fire_time("07:00", ["1"], MONDAY_0800), datetime(2024, 1, 8, 7, 0))
+
+    def test_no_days_means_never(self):
+        self.assertIsNone(next_fire_time("09:00", [], MONDAY_0800))
+
+
+class TestDueNotifications(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._original_db_path = database.DB_PATH
+        database.DB_PATH = os.path.join(self._tmp.name, "test.db")
+        init_db()
+        get_storage(database.DB_PATH).write(lambda conn: conn.executemany(
+            "INSERT INTO users (user_id, email, login, password_hash, registration_date)"
+            " VALUES (?, ?, ?, 'x', 'now')",
+            [(i, f"u{i}@innopolis.university", f"u{i}") for i in (1, 2, 3)],
+        ))
+
+    def tearDown(self):
+        close_storage(database.DB_PATH)
+        database.DB_PATH = self._original_db_path
+        self._tmp.cleanup()
+
+    def _schedule(self, user_id, time_str, days, enabled=True):
+        update_notification_settings(user_id, enabled, time_str, days)
+
+    def test_only_due_users_are_returned(self):
+        self._schedule(1, "23:59", [1, 2, 3, 4, 5, 6, 7])
+        self._schedule(2, "23:59", [1, 2, 3, 4, 5, 6, 7], enabled=False)
+        now = datetime.now().replace(hour=23, minute=59)
+        self.assertEqual(get_users_with_notifications_enabled(now), [(1, "u1@innopolis.university", "u1")])
+
+    def test_sent_notification_moves_to_next_day(self):
+        self._schedule(1, "23:59", [1, 2, 3, 4, 5, 6, 7])
+        now = datetime.now().replace(hour=23, minute=59)
+        update_last_notification_date(1, now)
+        self.assertEqual(get_users_with_notifications_enabled(now), [])
+        with get_storage(database.DB_PATH).read() as conn:
+            next_fire = conn.execute("SELECT next_fire_at FROM notification_settings WHERE user_id = 1").fetchone()[0]
+        self.assertGreater(next_fire, now.strftime("%Y-%m-%d %H:%M"))
+
+    def test_stale_slots_are_rescheduled_not_sent(self):
+        get_storage(database.DB_PATH).write(lambda conn: conn.execute(
+            "INSERT INTO notification_settings (user_id, notification_time, notification_days, next_fire_at)"
+            " VALUES (3, '09:00', '1,2,3,4,5,6,7', '2000-01-01 09:00')"
+        ))
+        now = datetime.now()
+        self.assertEqual(get_users_with_notifications_enabled(now), [])
+        with get_storage(database.DB_PATH).read() as conn:
+            next_fire = conn.execute("SELECT next_fire_at FROM notification_settings WHERE user_id = 3").fetchone()[0]
+        self.assertGreaterEqual(next_fire, now.strftime("%Y-%m-%d"))
+
+    def test_already_claimed_notification_is_rescheduled(self):
+        import main
+
+        now = datetime.now()
+        self._schedule(1, now.strftime("%H:%M"), [1, 2, 3, 4, 5, 6, 7])
+        self.assertTrue(claim_notification(1, now))  # sent by the previous leader
+        with mock.patch.object(main.scheduler_lease, "is_leader", return_value=True), \
+                mock.patch.object(main, "send_email_notification") as send:
+            main.scheduled_notifications_job()
+        send.assert_not_called()
+        self.assertEqual(get_users_with_notifications_enabled(), [])
+
+    def test_due_query_uses_index(self):
+        with get_storage(database.DB_PATH).read() as conn:
+            plan = " ".join(str(row) for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT user_id FROM notification_settings"
+                " WHERE enabled = 1 AND next_fire_at <= ?", ("2024-01-01 00:00",)
+            ))
+        self.assertIn("idx_notification_next_fire", plan)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,23 +1,27 @@
+import os
+import tempfile
 import unittest
 import sqlite3
-import os
 import bcrypt
 import uuid
+import database
 from database import register_user, init_db
-
-TEST_DB = "test_users.db"
+from storage import close_storage
 
 class TestRegisterUser(unittest.TestCase):
 
     def setUp(self):
-        # Patch sqlite3.connect to use a test DB file
-        self._original_connect = sqlite3.connect
-        sqlite3.connect = lambda _: self._original_connect(TEST_DB)
+        # Point the database module at a test DB file
+        self._original_db_path = database.DB_PATH
+        self._tmpdir = tempfile.TemporaryDirectory()
+        database.DB_PATH = os.path.join(self._tmpdir.name, "test_users.db")
         init_db()
 
     def tearDown(self):
-        # Restore original connect
-        sqlite3.connect = self._original_connect
+        # Close the pooled connections and restore original database path
+        close_storage(database.DB_PATH)
+        database.DB_PATH = self._original_db_path
+        self._tmpdir.cleanup()
 
     def test_register_user_success(self):
         email = f"user_{uuid.uuid4()}@innopolis.university"
@@ -26,7 +30,7 @@ class TestRegisterUser(unittest.TestCase):
 
         register_user(email, login, password)
 
-        conn = sqlite3.connect(TEST_DB)
+        conn = sqlite3.connect(database.DB_PATH)
         cur = conn.cursor()
         cur.execute("SELECT email, login, password_hash FROM users WHERE email = ?", (email.lower(),))
         row = cur.fetchone()
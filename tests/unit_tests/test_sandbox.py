@@ -0,0 +1,104 @@
+import json
+import os
+import unittest
+
+from sandbox import SandboxPool, local_verdict
+
+TASK = json.dumps({
+    "Task name": "Sum",
+    "Sample input cases": [
+        {"input": "2 3", "expected_output": "5"},
+        {"input": "10 -1", "expected_output": "9"},
+    ],
+})
+
+
+@unittest.skipUnless(os.name == "posix", "sandbox requires POSIX resource limits")
+class TestLocalVerdict(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        # Checks the audit hook without switching users: the test interpreter
+        # may live in a home directory "nobody" cannot import from
+        self.pool = SandboxPool(1, cpu_seconds=1, wall_timeout=3, user=None)
+        await self.pool.warm()
+
+    async def asyncTearDown(self):
+        await self.pool.close()
+
+    async def verdict(self, code):
+        return await local_verdict(self.pool, TASK, code)
+
+    async def test_passing_solution_is_escalated(self):
+        self.assertIsNone(await self.verdict("a, b = map(int, input().split())\nprint(a + b)"))
+
+    async def test_wrong_output(self):
+        result = await self.verdict("a, b = map(int, input().split())\nprint(a * b)")
+        self.assertFalse(result["correct"])
+        self.assertIn("'5'", result["feedback"])
+
+    async def test_crash(self):
+        result = await self.verdict("a, b = map(int, input().split())\nprint(a // 0)")
+        self.assertIn("ZeroDivisionError", result["feedback"])
+
+    async def test_infinite_loop_hits_limit(self):
+        result = await self.verdict("input()\nwhile True:\n    pass")
+        self.assertIn("time or memory limit", result["feedback"])
+
+    async def test_file_writes_are_blocked(self):
+        result = await self.verdict("input()\nopen('sandbox_escape.txt', 'w').write('x')")
+        self.assertIn("PermissionError", result["feedback"])
+        self.assertFalse(os.path.exists("sandbox_escape.txt"))
+
+    async def test_network_is_blocked(self):
+        result = await self.verdict("import socket\ninput()\nsocket.socket()")
+        self.assertIn("PermissionError", result["feedback"])
+
+    async def test_server_environment_is_not_inherited(self):
+        os.environ["SANDBOX_TEST_SECRET"] = "hunter2"
+        try:
+            await self.pool.close()  # workers spawned from now on see the variable if inherited
+            result = await self.verdict(
+                "import os\na, b = map(int, input().split())\n"
+                "print(a + b if os.environ.get('SANDBOX_TEST_SECRET') is None else 0)"
+            )
+        finally:
+            del os.environ["SANDBOX_TEST_SECRET"]
+        self.assertIsNone(result)
+
+    async def test_reads_outside_python_are_blocked(self):
+        secret = os.path.abspath(__file__)
+        for code in (f"input()\nprint(open({secret!r}).read())",
+                     "input()\nprint(open('/proc/self/environ').read())",
+                     "import os\ninput()\nprint(os.listdir('/proc/self/fd'))"):
+            result = await self.verdict(code)
+            self.assertIn("PermissionError", result["feedback"])
+        result = await self.verdict(f"import io\ninput()\nprint(io.open_code({secret!r}).read())")
+        self.assertIn("PermissionError", result["feedback"])
+        # The standard library can still be imported
+        self.assertIsNone(await self.verdict("import fractions\na, b = map(int, input().split())\nprint(a + b)"))
+
+    async def test_process_spawning_modules_are_blocked(self):
+        for module in ("_posixsubprocess", "posix", "_ctypes", "ctypes", "subprocess"):
+            result = await self.verdict(f"import {module}\ninput()")
+            self.assertIn("PermissionError", result["feedback"], module)
+
+    @unittest.skipUnless(hasattr(os, "geteuid") and os.geteuid() == 0, "only root switches users")
+    async def test_privileges_are_dropped(self):
+        pool = SandboxPool(0, cpu_seconds=1, wall_timeout=3, user="nobody")
+        code = "import os\na, b = map(int, input().split())\nprint(a + b if os.getuid() else 0)"
+        self.assertIsNone(await local_verdict(pool, TASK, code))
+
+    async def test_feedback_does_not_echo_program_output(self):
+        result = await self.verdict("input()\nprint('leaked-secret')")
+        self.assertNotIn("leaked-secret", result["feedback"])
+        result = await self.verdict("input()\nraise RuntimeError('leaked-secret')")
+        self.assertIn("RuntimeError", result["feedback"])
+        self.assertNotIn("leaked-secret", result["feedback"])
+
+    async def test_ambiguous_cases_are_escalated(self):
+        self.assertIsNone(await self.verdict("def add(a, b):\n    return a + b"))
+        self.assertIsNone(await self.verdict("How should I read the input?"))
+        self.assertIsNone(await self.verdict("a = int(input())\nprint(a)"))  # input format mismatch
+
+
+if __name__ == "__main__":
+    unittest.main()
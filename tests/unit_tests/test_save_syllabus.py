@@ -1,22 +1,25 @@
-import unittest
-import sqlite3
 import os
+import tempfile
+import unittest
+import database
 from database import save_syllabus, get_syllabus, init_db
-
-TEST_DB = "test_users.db"
+from storage import close_storage
 
 class TestSaveSyllabus(unittest.TestCase):
 
     def setUp(self):
-        # Redirect sqlite3.connect to test DB
-        self._original_connect = sqlite3.connect
-        sqlite3.connect = lambda _: self._original_connect(TEST_DB)
+        # Redirect the database module to test DB
+        self._original_db_path = database.DB_PATH
+        self._tmpdir = tempfile.TemporaryDirectory()
+        database.DB_PATH = os.path.join(self._tmpdir.name, "test_users.db")
 
         init_db()
 
     def tearDown(self):
-        # Restore original connect
-        sqlite3.connect = self._original_connect
+        # Close the pooled connections and restore original database path
+        close_storage(database.DB_PATH)
+        database.DB_PATH = self._original_db_path
+        self._tmpdir.cleanup()
 
     def test_save_syllabus_overwrites_existing(self):
         # Initial insert
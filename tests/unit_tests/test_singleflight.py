@@ -0,0 +1,71 @@
+import asyncio
+import unittest
+
+from singleflight import SingleFlight
+
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_callers_share_one_call(self):
+        flight = SingleFlight()
+        calls = 0
+        release = asyncio.Event()
+
+        async def upstream():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return {"answer": 42}
+
+        callers = [asyncio.create_task(flight.do("k", upstream)) for _ in range(5)]
+        await asyncio.sleep(0)
+        self.assertEqual(flight.stats()["waiters"], {"k": 5})
+        release.set()
+        results = await asyncio.gather(*callers)
+
+        self.assertEqual(calls, 1)
+        self.assertTrue(all(r == {"answer": 42} for r in results))
+        self.assertEqual(flight.stats()["coalesced"], 4)
+        self.assertEqual(flight.stats()["inflight"], 0)
+
+    async def test_error_is_shared(self):
+        flight = SingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        results = await asyncio.gather(
+            flight.do("k", failing), flight.do("k", failing), return_exceptions=True
+        )
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+        self.assertEqual(flight.stats()["calls"], 1)
+
+    async def test_new_call_after_completion(self):
+        flight = SingleFlight()
+
+        async def value():
+            return 1
+
+        await flight.do("k", value)
+        await flight.do("k", value)
+        self.assertEqual(flight.stats()["calls"], 2)
+
+    async def test_cancelled_waiter_does_not_cancel_shared_call(self):
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def upstream():
+            await release.wait()
+            return "done"
+
+        first = asyncio.create_task(flight.do("k", upstream))
+        second = asyncio.create_task(flight.do("k", upstream))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        self.assertEqual(await second, "done")
+
+
+if __name__ == "__main__":
+    unittest.main()
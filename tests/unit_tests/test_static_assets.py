@@ -0,0 +1,105 @@
+import gzip
+import re
+import tempfile
+import unittest
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+import static_assets
+
+SCRIPT = "console.log('hello');\n" * 100
+STYLE = "body { margin: 0; }\n"
+INDEX = '<link rel="stylesheet" href="/style.css" />\n<script src="/script.js" defer></script>\n'
+
+
+class TestBuild(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.src = Path(self._dir.name)
+        (self.src / "script.js").write_text(SCRIPT, encoding="utf-8")
+        (self.src / "style.css").write_text(STYLE, encoding="utf-8")
+        (self.src / "index.html").write_text(INDEX, encoding="utf-8")
+        self.assets = static_assets.build(self.src)
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def test_index_references_fingerprinted_names(self):
+        index = self.assets["/"].bodies["identity"].decode()
+        paths = re.findall(r'"(/assets/[^"]+)"', index)
+        self.assertEqual(len(paths), 2)
+        for path in paths:
+            self.assertIn(path, self.assets)
+            self.assertEqual(self.assets[path].cache_control, static_assets.IMMUTABLE)
+        self.assertEqual(self.assets["/"].cache_control, static_assets.REVALIDATE)
+
+    def test_name_changes_with_content(self):
+        (self.src / "script.js").write_text(SCRIPT + "//", encoding="utf-8")
+        old = {path for path in self.assets if path.endswith(".js")}
+        new = {path for path in static_assets.build(self.src) if path.endswith(".js")}
+        self.assertTrue(old and new and old != new)
+
+    def test_small_files_are_not_compressed(self):
+        style = next(a for p, a in self.assets.items() if p.endswith(".css"))
+        script = next(a for p, a in self.assets.items() if p.endswith(".js"))
+        self.assertEqual(list(style.bodies), ["identity"])
+        self.assertEqual(gzip.decompress(script.bodies["gzip"]).decode(), SCRIPT)
+
+    def test_write_emits_precompressed_variants(self):
+        with tempfile.TemporaryDirectory() as out:
+            written = {p.relative_to(out).as_posix() for p in static_assets.write(self.assets, Path(out))}
+        script = next(p for p in self.assets if p.endswith(".js")).lstrip("/")
+        self.assertIn("index.html", written)
+        self.assertIn(script, written)
+        self.assertIn(script + ".gz", written)
+
+
+class TestNegotiation(unittest.TestCase):
+
+    def setUp(self):
+        self.asset = static_assets.Asset(
+            "/assets/x.js", "application/javascript", static_assets.IMMUTABLE, "abc",
+            {"identity": b"plain", "gzip": b"gz", "br": b"br"},
+        )
+
+    def test_prefers_brotli_then_gzip(self):
+        self.assertEqual(static_assets.negotiate(self.asset, "gzip, deflate, br"), "br")
+        self.assertEqual(static_assets.negotiate(self.asset, "gzip, br;q=0"), "gzip")
+        self.assertEqual(static_assets.negotiate(self.asset, "br;q=0.5, gzip"), "gzip")
+        self.assertEqual(static_assets.negotiate(self.asset, ""), "identity")
+        self.assertEqual(static_assets.negotiate(self.asset, "*"), "br")
+
+    def test_etag_differs_per_encoding_and_revalidates(self):
+        status, body, headers = static_assets.serve(self.asset, "gzip", "")
+        self.assertEqual((status, body, headers["Content-Encoding"]), (200, b"gz", "gzip"))
+        self.assertNotEqual(headers["ETag"], self.asset.etag("identity"))
+
+        status, body, _ = static_assets.serve(self.asset, "gzip", headers["ETag"])
+        self.assertEqual((status, body), (304, None))
+        status, _, _ = static_assets.serve(self.asset, "", headers["ETag"])
+        self.assertEqual(status, 200)
+
+
+class TestFrontendRoutes(unittest.TestCase):
+
+    def test_index_and_assets_are_served_from_memory(self):
+        from main import app
+        client = TestClient(app)
+        index = client.get("/", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(index.status_code, 200)
+        self.assertEqual(index.headers["content-encoding"], "gzip")
+        script = re.search(r'src="(/assets/script\.[0-9a-f]+\.js)"', index.text).group(1)
+
+        response = client.get(script, headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("immutable", response.headers["cache-control"])
+        self.assertEqual(response.headers["vary"], "Accept-Encoding")
+        again = client.get(script, headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(client.get("/assets/script.0000.js").status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
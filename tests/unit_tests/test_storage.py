@@ -0,0 +1,95 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from storage import Storage
+
+
+class TestStorage(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.storage = Storage(os.path.join(self._tmp.name, "test.db"), pool_size=2)
+        self.storage.write(lambda conn: conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, value TEXT)"))
+
+    def tearDown(self):
+        self.storage.close()
+        self._tmp.cleanup()
+
+    def test_connections_use_wal(self):
+        with self.storage.read() as conn:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+            self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)  # NORMAL
+
+    def test_write_returns_result_and_commits(self):
+        row_id = self.storage.write(
+            lambda conn: conn.execute("INSERT INTO items (value) VALUES ('a')").lastrowid
+        )
+        with self.storage.read() as conn:
+            self.assertEqual(conn.execute("SELECT value FROM items WHERE id = ?", (row_id,)).fetchone(), ("a",))
+
+    def test_failed_write_rolls_back(self):
+        def job(conn):
+            conn.execute("INSERT INTO items (value) VALUES ('b')")
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            self.storage.write(job)
+        with self.storage.read() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM items").fetchone()[0], 0)
+
+    def test_nested_calls_inside_write_job(self):
+        def job(conn):
+            conn.execute("INSERT INTO items (value) VALUES ('c')")
+            with self.storage.read() as inner:
+                seen = inner.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+            self.storage.write(lambda c: c.execute("INSERT INTO items (value) VALUES ('d')"))
+            return seen
+
+        self.assertEqual(self.storage.write(job), 1)
+        with self.storage.read() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM items").fetchone()[0], 2)
+
+    def test_reader_pool_is_bounded(self):
+        with self.storage.read() as first, self.storage.read() as second:
+            self.assertIsNot(first, second)
+        with self.storage.read() as again:
+            self.assertIn(again, (first, second))
+        self.assertEqual(self.storage._created, 2)
+
+    def test_concurrent_readers_and_writers_never_lock(self):
+        errors = []
+
+        def writer(n):
+            try:
+                for i in range(50):
+                    self.storage.write(
+                        lambda conn: conn.execute("INSERT INTO items (value) VALUES (?)", (f"{n}-{i}",))
+                    )
+            except sqlite3.OperationalError as exc:
+                errors.append(exc)
+
+        def reader():
+            try:
+                for _ in range(100):
+                    with self.storage.read() as conn:
+                        conn.execute("SELECT COUNT(*) FROM items").fetchone()
+            except sqlite3.OperationalError as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+        threads += [threading.Thread(target=reader) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        with self.storage.read() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM items").fetchone()[0], 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import tempfile
+import threading
+import unittest
+
+import database
+from database import add_submissions, create_user, get_score, get_submissions, init_db, save_task
+from storage import close_storage
+from submissions import Submission, SubmissionWriter, decode_cursor, encode_cursor
+
+
+def _submission(user_id=1, task_id="t1", correct=True, created_at="2026-01-01T00:00:00"):
+    return Submission(user_id, task_id, "Math", "beginner", correct, created_at)
+
+
+class TestSubmissionWriter(unittest.TestCase):
+
+    def test_submissions_are_written_in_batches(self):
+        batches = []
+        release = threading.Event()
+
+        def write(batch):
+            release.wait(5)
+            batches.append(list(batch))
+
+        writer = SubmissionWriter(write, batch_size=3, flush_interval=0.05)
+        for i in range(7):
+            writer.record(_submission(task_id=str(i)))
+        release.set()
+        writer.flush()
+        self.assertEqual(sum(len(b) for b in batches), 7)
+        self.assertTrue(all(len(b) <= 3 for b in batches))
+        self.assertLess(len(batches), 7)
+        self.assertEqual(writer.stats()["written"], 7)
+        writer.stop()
+
+    def test_stop_writes_what_is_queued(self):
+        written = []
+        writer = SubmissionWriter(written.extend, flush_interval=10)
+        writer.record(_submission())
+        writer.record(_submission(task_id="t2"))
+        writer.stop()
+        self.assertEqual([s.task_id for s in written], ["t1", "t2"])
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        release = threading.Event()
+        writer = SubmissionWriter(lambda batch: release.wait(5), batch_size=1, max_pending=1)
+        for _ in range(5):
+            writer.record(_submission())
+        self.assertGreaterEqual(writer.stats()["dropped"], 1)
+        release.set()
+        writer.stop()
+
+    def test_cursor_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor("2026-01-01T10:00:00+00:00", 42)),
+                         ("2026-01-01T10:00:00+00:00", 42))
+        with self.assertRaises(ValueError):
+            decode_cursor("garbage")
+
+
+class TestSubmissionStorage(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._original_db_path = database.DB_PATH
+        database.DB_PATH = os.path.join(self._tmp.name, "test.db")
+        init_db()
+        create_user("a@example.com", "alice", "hash")
+        save_task("t1", "Math", "beginner", "{}", "")
+
+    def tearDown(self):
+        close_storage(database.DB_PATH)
+        database.DB_PATH = self._original_db_path
+        self._tmp.cleanup()
+
+    def test_score_counts_each_registered_task_once(self):
+        add_submissions([
+            _submission(correct=False, created_at="2026-01-01T00:00:01"),
+            _submission(created_at="2026-01-01T00:00:02"),
+            _submission(created_at="2026-01-01T00:00:03"),
+            _submission(task_id=None, created_at="2026-01-01T00:00:04"),
+            _submission(task_id=None, created_at="2026-01-01T00:00:05"),
+            _submission(user_id=None, created_at="2026-01-01T00:00:06"),
+        ])
+        # Raw tasks without an id are recorded but never score
+        self.assertEqual(get_score(1), {"score": 1, "submissions": 5, "solved": 4})
+        self.assertEqual(database.get_task("t1")["submissions"], 4)
+        self.assertEqual(database.get_task("t1")["solved"], 3)
+
+    def test_history_pages_newest_first(self):
+        add_submissions([_submission(created_at=f"2026-01-01T00:00:{i:02d}") for i in range(5)])
+        first = get_submissions(1, 2)
+        self.assertEqual([s["created_at"][-2:] for s in first], ["04", "03"])
+        second = get_submissions(1, 2, (first[-1]["created_at"], first[-1]["id"]))
+        self.assertEqual([s["created_at"][-2:] for s in second], ["02", "01"])
+        self.assertEqual(get_submissions(2, 10), [])
+
+    def test_history_and_totals_use_covering_index(self):
+        with database._db().read() as conn:
+            for query, params in [
+                ("SELECT id, task_id, topic, difficulty, correct, created_at FROM submissions "
+                 "WHERE user_id = ? AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT ?",
+                 (1, "2026", 10, 20)),
+                ("SELECT COUNT(*), COALESCE(SUM(correct), 0) FROM submissions WHERE user_id = ?", (1,)),
+            ]:
+                plan = " ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params))
+                self.assertIn("COVERING INDEX idx_submissions_user_created", plan)
+                self.assertNotIn("TEMP B-TREE", plan)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from syllabus_store import SyllabusStore
+
+
+class TestSyllabusStore(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.path = Path(self._dir.name) / "syllabus.json"
+        self.store = SyllabusStore(lambda: self.path)
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def test_missing_file_is_empty(self):
+        self.assertEqual(self.store.topics(), [])
+
+    def test_reads_are_served_from_memory(self):
+        self.path.write_text(json.dumps({"topics": ["graphs"]}), encoding="utf-8")
+        self.assertEqual(self.store.topics(), ["graphs"])
+        with mock.patch.object(Path, "open", side_effect=AssertionError("file read")):
+            for _ in range(3):
+                self.assertEqual(self.store.topics(), ["graphs"])
+        self.assertEqual(self.store.stats()["loads"], 1)
+
+    def test_save_replaces_file_and_snapshot(self):
+        old = self.store.snapshot()
+        new = self.store.save(["recursion", "trees"])
+        self.assertEqual(self.store.topics(), ["recursion", "trees"])
+        self.assertEqual(json.loads(self.path.read_text(encoding="utf-8")), {"topics": ["recursion", "trees"]})
+        self.assertNotEqual(old.etag, new.etag)
+        self.assertEqual(os.listdir(self._dir.name), ["syllabus.json"])  # no temp files left
+
+    def test_etag_depends_only_on_content(self):
+        first = self.store.save(["a", "b"])
+        self.store.save(["c"])
+        self.assertEqual(self.store.save(["a", "b"]).etag, first.etag)
+
+    def test_failed_write_keeps_old_version(self):
+        self.store.save(["kept"])
+        with mock.patch("syllabus_store.os.replace", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                self.store.save(["lost"])
+        self.assertEqual(self.store.topics(), ["kept"])
+        self.assertEqual(os.listdir(self._dir.name), ["syllabus.json"])
+
+    def test_readers_never_see_partial_files(self):
+        big = [f"topic {i}" for i in range(2000)]
+        self.store.save(big)
+        errors = []
+        stop = threading.Event()
+
+        def reader():
+            fresh = SyllabusStore(lambda: self.path)
+            while not stop.is_set():
+                fresh.invalidate()
+                if len(fresh.topics()) not in (len(big), 1):
+                    errors.append("partial read")
+
+        thread = threading.Thread(target=reader)
+        thread.start()
+        for i in range(20):
+            self.store.save(big if i % 2 else ["tiny"])
+        stop.set()
+        thread.join()
+        self.assertEqual(errors, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import json
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+from database import init_db
+from storage import close_storage
+from task_dedup import TaskIndex, minhash, pack, shingles, similarity, unpack
+from task_registry import TaskRegistry
+
+TASK = {
+    "Task name": "Sum of even numbers",
+    "Task description": "Read a list of integers separated by spaces from one line of input and print "
+                        "the sum of the even numbers in it. If there are no even numbers, print 0.",
+}
+REWORDED = {
+    "Task name": "Sum of even numbers",
+    "Task description": "Read a list of integers separated by spaces from one line of input and print "
+                        "the sum of the even numbers in it. If there are no even numbers, output 0.",
+}
+OTHER = {
+    "Task name": "Reverse a string",
+    "Task description": "Read a word and print it backwards, keeping the letter case unchanged.",
+}
+
+
+def _index(rows=(), **kwargs):
+    return TaskIndex(lambda after: [r for r in rows if r[0] > after], **kwargs)
+
+
+class TestMinHash(unittest.TestCase):
+
+    def test_shingles_ignore_case_and_punctuation(self):
+        self.assertEqual(shingles({"Task name": "Sum, two", "Task description": "NUMBERS!"}), {"sum two numbers"})
+        self.assertEqual(shingles({}), set())
+
+    def test_similarity_tracks_jaccard(self):
+        self.assertEqual(similarity(minhash(TASK), minhash(dict(TASK))), 1.0)
+        self.assertGreater(similarity(minhash(TASK), minhash(REWORDED)), 0.6)
+        self.assertLess(similarity(minhash(TASK), minhash(OTHER)), 0.2)
+
+    def test_pack_round_trip(self):
+        self.assertEqual(unpack(pack(minhash(TASK))), minhash(TASK))
+
+
+class TestTaskIndex(unittest.TestCase):
+
+    def test_near_duplicates_are_found_per_topic_and_difficulty(self):
+        index = _index()
+        self.assertIsNone(index.check("Loops", "beginner", TASK, "a"))
+        duplicate = index.check("loops ", "Beginner", REWORDED, "b")
+        self.assertEqual(duplicate[0], "a")
+        self.assertIsNone(index.check("Loops", "beginner", OTHER, "c"))
+        self.assertIsNone(index.check("Loops", "hard", REWORDED, "d"))
+        self.assertIsNone(index.check("Strings", "beginner", TASK, "a"))  # same content, other topic
+        self.assertEqual(index.check("Strings", "beginner", REWORDED, "f")[0], "a")
+
+    def test_coalesced_callers_do_not_see_their_own_task(self):
+        index = _index()
+        with ThreadPoolExecutor(2) as pool:
+            results = list(pool.map(lambda _: index.check("Loops", "beginner", TASK, "a"), range(2)))
+        self.assertEqual(results, [None, None])
+        self.assertIsNone(index.check("Loops", "beginner", TASK, "a"))
+        self.assertEqual(index.check("Loops", "beginner", REWORDED, "b")[0], "a")
+        self.assertEqual(index.stats()["indexed"], 1)
+
+    def test_threshold_is_configurable(self):
+        strict = TaskIndex(lambda after: [], threshold=1.0)
+        strict.check("Loops", "beginner", TASK, "a")
+        self.assertIsNone(strict.find("Loops", "beginner", minhash(REWORDED)))
+        self.assertEqual(strict.find("Loops", "beginner", minhash(TASK)), ("a", 1.0))
+
+    def test_catch_up_reads_only_new_rows(self):
+        rows = [(1, "a", "Loops", "beginner", pack(minhash(TASK)))]
+        index = _index(rows)
+        self.assertEqual(index.catch_up(), 1)
+        self.assertEqual(index.catch_up(), 0)
+        self.assertEqual(index.find("Loops", "beginner", minhash(TASK))[0], "a")
+
+    def test_duplicate_rate_per_topic(self):
+        index = _index(topics=lambda: ["Loops", "Strings"])
+        index.check("Loops", "beginner", TASK, "a")
+        index.check("Loops", "beginner", REWORDED, "b")
+        index.check("Strings", "beginner", OTHER, "c")
+        stats = index.stats()
+        self.assertEqual((stats["checked"], stats["duplicates"], stats["indexed"]), (3, 1, 2))
+        self.assertEqual(stats["loops"]["topic_duplicate_rate"], 0.5)
+        self.assertEqual(stats["strings"]["topic_duplicate_rate"], 0.0)
+
+    def test_topics_outside_the_syllabus_share_one_bucket(self):
+        index = _index(topics=lambda: ["Loops"])
+        for i in range(5):
+            index.check(f"made up {i}", "beginner", OTHER, str(i))
+        index.check("Loops", "beginner", TASK, "a")
+        self.assertEqual(sorted(index.topic_buckets()), ["loops", "other"])
+        self.assertEqual(index.stats()["other"]["topic_checked"], 5)
+
+    def test_signatures_per_scope_are_capped(self):
+        index = _index(max_per_scope=1)
+        index.check("Loops", "beginner", TASK, "a")
+        index.check("Loops", "beginner", OTHER, "c")  # evicts "a"
+        index.check("Loops", "hard", TASK, "d")  # other scope, own budget
+        self.assertIsNone(index.find("Loops", "beginner", minhash(TASK)))
+        self.assertEqual(index.find("Loops", "beginner", minhash(OTHER))[0], "c")
+        stats = index.stats()
+        self.assertEqual((stats["indexed"], stats["evicted"]), (2, 1))
+
+
+class TestTaskIndexStorage(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._original_db_path = database.DB_PATH
+        database.DB_PATH = os.path.join(self._tmp.name, "test.db")
+        init_db()
+
+    def tearDown(self):
+        close_storage(database.DB_PATH)
+        database.DB_PATH = self._original_db_path
+        self._tmp.cleanup()
+
+    def test_registered_tasks_are_seen_by_other_workers(self):
+        record = TaskRegistry().register("Loops", "beginner", json.dumps(TASK))
+        self.assertEqual(TaskIndex().check("Loops", "beginner", REWORDED, "x")[0], record.task_id)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+import database
+from database import init_db
+from storage import close_storage
+from task_pool import TaskPool
+
+
+class TestTaskPool(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._original_db_path = database.DB_PATH
+        database.DB_PATH = os.path.join(self._tmp.name, "test.db")
+        init_db()
+
+    def tearDown(self):
+        close_storage(database.DB_PATH)
+        database.DB_PATH = self._original_db_path
+        self._tmp.cleanup()
+
+    def make_pool(self, **kwargs):
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+
+        async def generate(topic, difficulty):
+            self.calls.append((topic, difficulty))
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            await asyncio.sleep(0.01)
+            self.running -= 1
+            return f'{{"Task name": "{topic}/{difficulty}"}}'
+
+        options = dict(size=2, low_water=1, concurrency=2, refill_rate=0, ttl=60, sweep_interval=0.05)
+        options.update(kwargs)
+        return TaskPool(generate, lambda: ["Loops"], **options)
+
+    async def wait_for(self, predicate, timeout=2.0):
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not predicate():
+            if asyncio.get_running_loop().time() > deadline:
+                self.fail("condition not reached")
+            await asyncio.sleep(0.01)
+
+    async def test_background_fill_serves_hits(self):
+        pool = self.make_pool()
+        pool.start()
+        try:
+            await self.wait_for(lambda: pool.stats()["generated"] >= 6)
+            task = pool.get("Loops", "beginner")
+            self.assertEqual(task, '{"Task name": "Loops/beginner"}')
+            self.assertEqual(pool.stats()["hits"], 1)
+            self.assertLessEqual(self.max_running, 2)
+        finally:
+            await pool.stop()
+
+    async def test_miss_when_empty(self):
+        pool = self.make_pool()
+        self.assertIsNone(pool.get("Loops", "hard"))
+        self.assertEqual(pool.stats()["misses"], 1)
+
+    async def test_disabled_pool_does_not_touch_the_database(self):
+        pool = self.make_pool(enabled=False)
+        pool.put("Loops", "hard", "{}")
+        self.assertIsNone(pool.get("Loops", "hard"))
+        self.assertIsNone(pool.get("Recursion", "hard"))
+        self.assertEqual(pool.stats()["misses"], 2)
+        self.assertEqual(database.get_pool_levels(0), {("loops", "hard"): 1})
+        self.assertEqual(database.get_pool_demand(0), [])
+
+    async def test_expired_tasks_are_not_served(self):
+        pool = self.make_pool(ttl=0)
+        pool.put("Loops", "medium", "{}")
+        await asyncio.sleep(0.01)
+        self.assertIsNone(pool.get("Loops", "medium"))
+        self.assertEqual(pool.stats()["expired"], 1)
+
+    async def test_refill_below_low_water(self):
+        pool = self.make_pool(size=3, low_water=2)
+        pool.start()
+        try:
+            await self.wait_for(lambda: pool.stats()["ready"].get("loops|hard") == 3)
+            pool.get("Loops", "hard")
+            pool.get("Loops", "hard")
+            await self.wait_for(lambda: pool.stats()["ready"].get("loops|hard") == 3)
+        finally:
+            await pool.stop()
+
+    async def test_adhoc_keys_are_bounded_and_expire(self):
+        pool = self.make_pool(adhoc_idle=0.1)
+        for i in range(5):
+            pool.get(f"topic {i}", "no-such-difficulty")
+        self.assertEqual(database.get_pool_demand(0), [])
+        pool.get("Recursion", "hard")
+        self.assertEqual(database.get_pool_demand(0), [("Recursion", "hard")])
+        pool.start()
+        try:
+            await self.wait_for(lambda: pool.stats()["ready"].get("recursion|hard") == 2)
+            await asyncio.sleep(0.2)
+            await self.wait_for(lambda: database.get_pool_demand(0) == [])
+            pool.get("Recursion", "hard")
+            pool.get("Recursion", "hard")
+            await asyncio.sleep(0.2)
+            self.assertNotIn("recursion|hard", pool.stats()["ready"])
+        finally:
+            await pool.stop()
+
+    async def test_workers_share_the_pool_and_only_the_leader_refills(self):
+        leader = self.make_pool()
+        follower = self.make_pool(is_leader=lambda: False)
+        leader.start()
+        follower.start()
+        try:
+            await self.wait_for(lambda: leader.stats()["generated"] >= 6)
+            self.assertEqual(follower.get("Loops", "beginner"), '{"Task name": "Loops/beginner"}')
+            await self.wait_for(lambda: follower.stats()["ready"].get("loops|medium") == 2)
+            self.assertEqual(follower.stats()["generated"], 0)
+            self.assertFalse(follower.stats()["leader"])
+        finally:
+            await follower.stop()
+            await leader.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
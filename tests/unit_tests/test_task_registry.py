@@ -0,0 +1,72 @@
+import json
+import os
+import tempfile
+import unittest
+
+import database
+from database import init_db
+from storage import close_storage
+from task_registry import TaskRegistry, prompt_fragment, task_id_for
+
+TASK = {
+    "Task name": "Sum two numbers",
+    "Task description": "Read two numbers\n   and print their sum.",
+    "Sample input cases": [{"input": "2 3", "expected_output": "5"}, {"input": "0 0", "expected_output": "0"}],
+    "Hints": {"Hint1": "input()", "Hint2": "split", "Hint3": "int()"},
+}
+
+
+class TestTaskIds(unittest.TestCase):
+
+    def test_id_depends_on_content_not_formatting(self):
+        reordered = dict(reversed(list(TASK.items())))
+        self.assertEqual(task_id_for(TASK), task_id_for(json.loads(json.dumps(reordered, indent=2))))
+        self.assertNotEqual(task_id_for(TASK), task_id_for({**TASK, "Task name": "Sum three numbers"}))
+
+    def test_prompt_fragment_is_compact_and_has_no_hints(self):
+        self.assertEqual(
+            prompt_fragment(TASK),
+            "Sum two numbers: Read two numbers and print their sum.\n"
+            "Examples (input => output):\n2 3 => 5\n0 0 => 0",
+        )
+
+
+class TestTaskRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._original_db_path = database.DB_PATH
+        database.DB_PATH = os.path.join(self._tmp.name, "test.db")
+        init_db()
+
+    def tearDown(self):
+        close_storage(database.DB_PATH)
+        database.DB_PATH = self._original_db_path
+        self._tmp.cleanup()
+
+    def test_register_is_idempotent(self):
+        registry = TaskRegistry()
+        first = registry.register("Math", "beginner", json.dumps(TASK))
+        again = registry.register("Math", "beginner", json.dumps(TASK, indent=2))
+        self.assertEqual(first, again)
+        self.assertEqual(registry.stats()["registered"], 1)
+        self.assertEqual(json.loads(first.task), TASK)
+
+    def test_other_workers_load_from_sqlite(self):
+        record = TaskRegistry().register("Math", "beginner", json.dumps(TASK))
+        other = TaskRegistry()
+        self.assertEqual(other.get(record.task_id), record)
+        self.assertIsNone(other.get("0" * 16))
+        self.assertEqual((other.stats()["loads"], other.stats()["unknown"]), (1, 1))
+
+    def test_lru_is_bounded(self):
+        registry = TaskRegistry(max_entries=2)
+        ids = [registry.register("Math", "hard", json.dumps({**TASK, "Task name": str(i)})).task_id
+               for i in range(3)]
+        self.assertEqual(registry.stats()["size"], 2)
+        self.assertIsNotNone(registry.get(ids[0]))  # evicted, still in SQLite
+        self.assertEqual(registry.stats()["loads"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()